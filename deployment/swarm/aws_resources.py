@@ -64,7 +64,8 @@ class AWSResourceManager:
             "bank_table": os.getenv("DYNAMODB_BANK_TABLE", "BankTradeData"),
             "counterparty_table": os.getenv("DYNAMODB_COUNTERPARTY_TABLE", "CounterpartyTradeData"),
             "exceptions_table": os.getenv("DYNAMODB_EXCEPTIONS_TABLE", "ExceptionsTable"),
-            "bedrock_model_id": os.getenv("BEDROCK_MODEL_ID", "amazon.nova-pro-v1:0")
+            "bedrock_model_id": os.getenv("BEDROCK_MODEL_ID", "amazon.nova-pro-v1:0"),
+            "scan_total_segments": int(os.getenv("DYNAMODB_SCAN_SEGMENTS", "4"))
         }
 
 
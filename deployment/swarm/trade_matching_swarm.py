@@ -58,6 +58,7 @@ logger = logging.getLogger(__name__)
 
 # Import shared AWS resources
 from aws_resources import get_aws_client, get_config
+from dynamodb_scan import parallel_scan
 
 # Get shared configuration
 _config = get_config()
@@ -67,6 +68,7 @@ BANK_TABLE = _config["bank_table"]
 COUNTERPARTY_TABLE = _config["counterparty_table"]
 EXCEPTIONS_TABLE = _config["exceptions_table"]
 BEDROCK_MODEL_ID = _config["bedrock_model_id"]
+SCAN_TOTAL_SEGMENTS = _config["scan_total_segments"]
 
 
 # ============================================================================
@@ -297,6 +299,17 @@ def store_trade_in_dynamodb(trade_data_json: str, source_type: str) -> str:
 # Trade Matching Tools
 # ============================================================================
 
+def _simple_trade_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a DynamoDB item to a JSON-friendly dict, keeping string and number attributes."""
+    trade = {}
+    for key, value in item.items():
+        if "S" in value:
+            trade[key] = value["S"]
+        elif "N" in value:
+            trade[key] = float(value["N"])
+    return trade
+
+
 @tool
 def scan_trades_table(source_type: str) -> str:
     """
@@ -312,18 +325,8 @@ def scan_trades_table(source_type: str) -> str:
         dynamodb_client = get_aws_client('dynamodb')
         table_name = BANK_TABLE if source_type == "BANK" else COUNTERPARTY_TABLE
         
-        response = dynamodb_client.scan(TableName=table_name)
-        
-        # Convert DynamoDB format to simple dict
-        trades = []
-        for item in response.get("Items", []):
-            trade = {}
-            for key, value in item.items():
-                if "S" in value:
-                    trade[key] = value["S"]
-                elif "N" in value:
-                    trade[key] = float(value["N"])
-            trades.append(trade)
+        # Follow every page across parallel segments, not just the first page
+        trades = parallel_scan(dynamodb_client, table_name, SCAN_TOTAL_SEGMENTS, deserialize=_simple_trade_item)
         
         return json.dumps({
             "success": True,
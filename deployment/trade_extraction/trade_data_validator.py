@@ -12,6 +12,8 @@ from datetime import datetime, timezone
 from typing import Dict, Any, List, Tuple, Optional
 from dataclasses import dataclass
 
+from date_parsing import DateParser
+
 # from data_models import CanonicalTradeData  # Import not needed for validator
 
 logger = logging.getLogger(__name__)
@@ -59,6 +61,23 @@ class TradeDataValidator:
         'AUSTRALIAN DOLLAR': 'AUD'
     }
     
+    # Date formats accepted for trade and maturity dates, tried in order
+    DATE_FORMATS = [
+        '%Y-%m-%d',           # ISO format
+        '%Y-%m-%dT%H:%M:%S',  # ISO with time
+        '%Y-%m-%dT%H:%M:%SZ', # ISO with time and Z
+        '%m/%d/%Y',           # US format
+        '%d/%m/%Y',           # European format
+        '%m-%d-%Y',           # US with dashes
+        '%d-%m-%Y',           # European with dashes
+        '%Y/%m/%d',           # ISO with slashes
+        '%B %d, %Y',          # Month name format
+        '%d %B %Y',           # European month name
+    ]
+    
+    # Shared across validator instances so the parse cache survives between documents
+    _date_parser = DateParser(DATE_FORMATS)
+    
     # Required fields for trade data
     REQUIRED_FIELDS = {
         'trade_id', 'counterparty', 'notional_amount', 'currency',
@@ -242,26 +261,9 @@ class TradeDataValidator:
         
         date_str = str(date_value).strip()
         
-        # Common date formats to try
-        date_formats = [
-            '%Y-%m-%d',           # ISO format
-            '%Y-%m-%dT%H:%M:%S',  # ISO with time
-            '%Y-%m-%dT%H:%M:%SZ', # ISO with time and Z
-            '%m/%d/%Y',           # US format
-            '%d/%m/%Y',           # European format
-            '%m-%d-%Y',           # US with dashes
-            '%d-%m-%Y',           # European with dashes
-            '%Y/%m/%d',           # ISO with slashes
-            '%B %d, %Y',          # Month name format
-            '%d %B %Y',           # European month name
-        ]
-        
-        for fmt in date_formats:
-            try:
-                parsed_date = datetime.strptime(date_str, fmt)
-                return True, parsed_date.date().isoformat(), None
-            except ValueError:
-                continue
+        iso_date = self._date_parser.to_iso(date_str)
+        if iso_date:
+            return True, iso_date, None
         
         # Try parsing with dateutil if available
         try:
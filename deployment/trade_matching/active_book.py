@@ -0,0 +1,233 @@
+"""
+Active Trade Book for the Trade Matching Agent
+
+The trade tables only grow, and every table load, blocking index and
+reconciliation pays for trades that settled months ago. ActiveBookPolicy
+keeps candidate retrieval to the trades that can still need matching:
+
+- a trade is active when its latest trade or settlement date is no more than
+  window_days before today, when it has neither date (it cannot be aged), or
+  when it is not matched yet;
+- every other trade is inactive: excluded from candidate retrieval and
+  eligible for the archive.
+
+Whether a trade is matched comes from MatchedTradeIds, a periodically
+reloaded set of matched trade IDs per table. Without that information the
+window alone decides; when loading it fails, every trade counts as unmatched,
+so nothing is excluded by mistake.
+
+S3TradeArchive stores inactive trades in S3, one run per archive call:
+
+    <prefix><table>/<run>/trades.npz      trades in the columnar snapshot format
+    <prefix><table>/<run>/manifest.json   trade IDs, cutoff, window and objects
+
+The manifest is written last, so a run without one is incomplete and
+ignored. Archived trades are read back only for explicit archive searches
+(investigations of old trades).
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import AbstractSet, Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from trade_book_snapshot import decode_trades, encode_trades
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_DAYS = 90
+DEFAULT_ARCHIVE_PREFIX = 'trade-archive/'
+DEFAULT_MATCHES_REFRESH_SECONDS = 300.0
+MANIFEST_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+TRADES_NAME = 'trades.npz'
+
+
+class ActiveBookPolicy:
+    """Splits trades into the active candidate set and the inactive (archivable) rest."""
+
+    def __init__(
+        self,
+        window_days: int,
+        trade_dates: Callable[[Dict], Iterable[Optional[int]]],
+        trade_id_of: Callable[[Dict], Any],
+        today: Callable[[], date] = date.today,
+    ):
+        """
+        Args:
+            window_days: Days before today within which a trade's latest date keeps it active
+            trade_dates: Date ordinals (or None) of a trade's trade and settlement dates
+            trade_id_of: Trade ID of a trade, compared with the matched IDs as a string
+            today: Current date, injectable for tests
+        """
+        self.window_days = window_days
+        self._trade_dates = trade_dates
+        self._trade_id_of = trade_id_of
+        self._today = today
+
+    def cutoff(self) -> int:
+        """Ordinal of the oldest date that keeps a trade active today."""
+        return self._today().toordinal() - self.window_days
+
+    def is_active(
+        self, trade: Dict, matched_ids: Optional[AbstractSet[str]] = None, cutoff: Optional[int] = None
+    ) -> bool:
+        """
+        Whether a trade belongs to the active book.
+
+        Args:
+            trade: The trade
+            matched_ids: IDs of the matched trades of its table, or None to decide by the window alone
+            cutoff: Result of cutoff(), when deciding for many trades
+        """
+        dates = [ordinal for ordinal in self._trade_dates(trade) if ordinal is not None]
+        if not dates or max(dates) >= (self.cutoff() if cutoff is None else cutoff):
+            return True
+        return matched_ids is not None and str(self._trade_id_of(trade)) not in matched_ids
+
+    def split(
+        self, trades: Iterable[Dict], matched_ids: Optional[AbstractSet[str]] = None, cutoff: Optional[int] = None
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """Return (active trades, inactive trades), both in input order."""
+        cutoff = self.cutoff() if cutoff is None else cutoff
+        active: List[Dict] = []
+        inactive: List[Dict] = []
+        for trade in trades:
+            (active if self.is_active(trade, matched_ids, cutoff) else inactive).append(trade)
+        return active, inactive
+
+
+class MatchedTradeIds:
+    """
+    Matched trade IDs per table, reloaded at most every refresh_seconds.
+
+    A failed reload keeps the previous IDs; a failed first load counts every
+    trade as unmatched.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Dict[str, AbstractSet[str]]],
+        refresh_seconds: float = DEFAULT_MATCHES_REFRESH_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            loader: Loads table name -> IDs of its matched trades
+            refresh_seconds: Maximum age of the loaded IDs
+            clock: Monotonic clock, injectable for tests
+        """
+        self._loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ids: Dict[str, FrozenSet[str]] = {}
+        self._loaded_at: Optional[float] = None
+        # Incremented on every load, so results derived from the IDs can be cached per version
+        self.version = 0
+        self.load_failures = 0
+
+    def get(self) -> Tuple[int, Dict[str, FrozenSet[str]]]:
+        """Return (version, table name -> matched trade IDs), reloading first when they are too old."""
+        with self._lock:
+            if self._loaded_at is None or self._clock() - self._loaded_at >= self.refresh_seconds:
+                try:
+                    self._ids = {table: frozenset(ids) for table, ids in self._loader().items()}
+                except Exception as e:
+                    self.load_failures += 1
+                    logger.warning(f"Could not load matched trade IDs, keeping the previous ones: {e}")
+                self._loaded_at = self._clock()
+                self.version += 1
+            return self.version, self._ids
+
+
+class S3TradeArchive:
+    """Archive runs of inactive trades under <prefix><table>/<run>/ (see the module docstring)."""
+
+    def __init__(self, client: Any, bucket: str, prefix: str = DEFAULT_ARCHIVE_PREFIX,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            client: boto3 S3 client
+            bucket: Bucket name
+            prefix: Key prefix of the archive
+            clock: Time source (seconds since the epoch)
+        """
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self._clock = clock
+
+    def write(
+        self,
+        table_name: str,
+        trades: List[Dict[str, Any]],
+        trade_ids: List[str],
+        cutoff: date,
+        window_days: int,
+    ) -> Dict[str, Any]:
+        """
+        Store one archive run and return its manifest.
+
+        Args:
+            table_name: Table the trades come from
+            trades: Whole trade items
+            trade_ids: Their trade IDs, recorded in the manifest
+            cutoff: Oldest date that kept a trade active
+            window_days: Active window of the policy
+        """
+        now = self._clock()
+        run = datetime.fromtimestamp(now, timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        base = f"{self.prefix}{table_name}/{run}/"
+        data = encode_trades(trades, written_at=now)
+        self.client.put_object(
+            Bucket=self.bucket, Key=base + TRADES_NAME, Body=data, ContentType='application/octet-stream'
+        )
+        manifest = {
+            'format': MANIFEST_FORMAT,
+            'table': table_name,
+            'run': run,
+            'archived_at': now,
+            'cutoff': cutoff.isoformat(),
+            'window_days': window_days,
+            'trade_count': len(trades),
+            'trade_ids': trade_ids,
+            'objects': [{'key': base + TRADES_NAME, 'bytes': len(data)}],
+        }
+        self.client.put_object(
+            Bucket=self.bucket, Key=base + MANIFEST_NAME,
+            Body=json.dumps(manifest).encode('utf-8'), ContentType='application/json',
+        )
+        logger.info(f"Archived {len(trades)} trades of {table_name} to s3://{self.bucket}/{base}")
+        return manifest
+
+    def manifests(self, table_name: str) -> List[Dict[str, Any]]:
+        """Manifests of the complete archive runs of a table, oldest first."""
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}{table_name}/"):
+            keys.extend(entry['Key'] for entry in page.get('Contents', []) if entry['Key'].endswith('/' + MANIFEST_NAME))
+        manifests = []
+        for key in sorted(keys):
+            body = self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+            manifest = json.loads(body.decode('utf-8'))
+            if manifest.get('format') != MANIFEST_FORMAT:
+                logger.warning(f"Skipping archive manifest {key} of unsupported format {manifest.get('format')}")
+                continue
+            manifests.append(manifest)
+        return manifests
+
+    def archived_ids(self, table_name: str) -> FrozenSet[str]:
+        """IDs of every archived trade of a table."""
+        return frozenset(trade_id for manifest in self.manifests(table_name) for trade_id in manifest['trade_ids'])
+
+    def load(self, table_name: str) -> List[Dict[str, Any]]:
+        """Every archived trade of a table, oldest run first."""
+        trades: List[Dict[str, Any]] = []
+        for manifest in self.manifests(table_name):
+            for entry in manifest['objects']:
+                body = self.client.get_object(Bucket=self.bucket, Key=entry['key'])['Body'].read()
+                trades.extend(decode_trades(body).trades)
+        return trades
@@ -0,0 +1,143 @@
+"""
+Allocation Matching for the Trade Matching Agent
+
+A block trade is often confirmed by the other side as several allocations, so
+no single opposite trade matches it: one-to-one scoring sees notionals that
+are a fraction of the block's and the trade ends up a BREAK. When the
+one-to-one result is not a match, find_trade_matches searches the blocked
+candidates (same currency, product type and trade-date window) for a subset
+whose notionals sum to the source notional within a tolerance.
+
+Subset sum is exponential in general. The search stays fast on blocks of 50+
+candidates because:
+- amounts are integer cents and only amounts that can be one leg of several
+  (positive, below the upper bound less the smallest other amount) are kept,
+- the amounts are sorted and dealt into two halves; each half's subsets of at
+  most max_legs legs are enumerated in ascending amount order, abandoning a
+  branch as soon as its sum exceeds the upper bound (meet in the middle),
+- one half's subset sums are sorted, and every subset of the other half finds
+  its complements by binary search over the tolerance window,
+- enumeration stops at max_subsets per half; the result then says the search
+  was truncated and may have missed a subset.
+
+More than one subset can fit the same sum. The best one is the closest to the
+target, then the one with the fewest legs; the number of fitting subsets is
+reported so the caller can treat an ambiguous allocation with care.
+"""
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+DEFAULT_MAX_LEGS = 8
+DEFAULT_MAX_SUBSETS = 100_000
+
+# (sum, indexes into the amounts)
+Subset = Tuple[int, Tuple[int, ...]]
+
+
+def to_cents(amount: float) -> int:
+    """Integer cents of an amount, so that sums compare exactly."""
+    return int(round(amount * 100))
+
+
+@dataclass
+class AllocationSearch:
+    """Outcome of find_allocation_subset."""
+    # Indexes of the best subset's amounts, ascending; None when no subset fits
+    indexes: Optional[List[int]]
+    total: Optional[int]
+    # Distinct subsets within the tolerance
+    solutions: int
+    # Half subsets enumerated
+    enumerated: int
+    truncated: bool
+
+
+def _half_subsets(items: List[Tuple[int, int]], upper: int, max_legs: int, max_subsets: int) -> Tuple[List[Subset], bool]:
+    """Subsets of (amount, index) items sorted by amount, with sums <= upper and at most max_legs items."""
+    subsets: List[Subset] = [(0, ())]
+    truncated = False
+
+    def extend(start: int, total: int, chosen: Tuple[int, ...]) -> None:
+        nonlocal truncated
+        for i in range(start, len(items)):
+            amount, index = items[i]
+            if total + amount > upper:
+                # Every later item is at least as large
+                break
+            if len(subsets) >= max_subsets:
+                truncated = True
+                return
+            subset = chosen + (index,)
+            subsets.append((total + amount, subset))
+            if len(subset) < max_legs:
+                extend(i + 1, total + amount, subset)
+            if truncated:
+                return
+
+    extend(0, 0, ())
+    return subsets, truncated
+
+
+def find_allocation_subset(
+    target: int,
+    amounts: Sequence[int],
+    tolerance: int = 0,
+    min_legs: int = 2,
+    max_legs: int = DEFAULT_MAX_LEGS,
+    max_subsets: int = DEFAULT_MAX_SUBSETS,
+) -> AllocationSearch:
+    """
+    Find the subset of amounts summing closest to target within tolerance.
+
+    Args:
+        target: Amount to reach, in integer units (cents)
+        amounts: Candidate amounts, in the same units
+        tolerance: Largest accepted absolute difference between the sum and target
+        min_legs: Fewest amounts in a subset
+        max_legs: Most amounts in a subset
+        max_subsets: Most subsets enumerated per half
+
+    Returns:
+        AllocationSearch with the best subset (closest sum, then fewest legs,
+        then lowest indexes) and the number of subsets that fit
+    """
+    if min_legs < 1 or max_legs < min_legs:
+        raise ValueError("need 1 <= min_legs <= max_legs")
+    lower, upper = target - tolerance, target + tolerance
+    positive = [amount for amount in amounts if amount > 0]
+    if len(positive) < min_legs or upper <= 0:
+        return AllocationSearch(None, None, 0, 0, False)
+
+    # A leg of a subset with at least two legs leaves room for the smallest other amount
+    smallest = min(positive)
+    limit = upper if min_legs == 1 else upper - smallest
+    items = sorted((amount, index) for index, amount in enumerate(amounts) if 0 < amount <= limit)
+    left, left_truncated = _half_subsets(items[0::2], upper, max_legs, max_subsets)
+    right, right_truncated = _half_subsets(items[1::2], upper, max_legs, max_subsets)
+    left.sort()
+    left_sums = [total for total, _ in left]
+
+    best: Optional[Tuple[Tuple[int, int, Tuple[int, ...]], int]] = None
+    solutions = 0
+    for right_total, right_subset in right:
+        start = bisect_left(left_sums, lower - right_total)
+        stop = bisect_right(left_sums, upper - right_total)
+        for left_total, left_subset in left[start:stop]:
+            legs = len(left_subset) + len(right_subset)
+            if not min_legs <= legs <= max_legs:
+                continue
+            solutions += 1
+            total = left_total + right_total
+            key = (abs(total - target), legs, tuple(sorted(left_subset + right_subset)))
+            if best is None or key < best[0]:
+                best = (key, total)
+
+    return AllocationSearch(
+        indexes=list(best[0][2]) if best else None,
+        total=best[1] if best else None,
+        solutions=solutions,
+        enumerated=len(left) + len(right),
+        truncated=left_truncated or right_truncated,
+    )
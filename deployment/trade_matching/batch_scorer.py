@@ -0,0 +1,440 @@
+"""
+Batch Scorer for the Trade Matching Agent
+
+Vectorized implementation of the CDM match rules in _calculate_match_score.
+The candidate set is loaded once into columnar NumPy arrays (dictionary-encoded
+normalized values, numbers as float64, dates as ordinal days), after which one
+source trade is scored against every candidate in a single vectorized pass.
+
+Fields, weights, tiers and the breakdown order are read from the compiled
+rule set (CDM_MATCH_RULES by default); each comparison kind has a vectorized
+counterpart here, and a rule whose kind or parameters have none is rejected
+when the scorer is built.
+
+String attributes are dictionary-encoded. Comparisons that are not plain
+equality (containment, fuzzy counterparty names) are evaluated once per
+distinct value and gathered back onto the candidate axis, so the Python-level
+work per source trade scales with the number of distinct values rather than
+the number of candidates. Counterparty names are further narrowed with a
+CounterpartyNameIndex so only names that can score above zero are compared.
+
+BatchScoreResult.match_result(i) materializes exactly the dict returned by
+_calculate_match_score for candidate i.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from counterparty_index import CounterpartyNameIndex
+from trade_record import TradeRecord
+from match_rules import ABSENT, POINTS, SOURCE, UNPARSEABLE, CompiledRule, RuleSet
+from cdm_rules import CDM_MATCH_RULES
+
+logger = logging.getLogger(__name__)
+
+# Per-field comparison states stored in BatchScoreResult.field_states
+FIELD_NOT_COMPARED = -1
+FIELD_MISMATCH = 0
+FIELD_MATCH = 1
+FIELD_PARTIAL = 2
+FIELD_PARSE_ERROR = 3
+
+_MATCH_VALUES = {FIELD_MATCH: True, FIELD_PARTIAL: 'partial', FIELD_MISMATCH: False}
+
+# Comparison kinds with a vectorized counterpart -> the parameters it supports
+_SUPPORTED_PARAMS = {
+    'equal': set(),
+    'containment': {'partial'},
+    'dates': {'tiers', 'decay', 'compare_text'},
+    'relative_difference': {'tiers', 'base', 'decay', 'guard', 'report_percent'},
+    'basis_points': {'tiers'},
+    'similarity': {'measure', 'tiers'},
+}
+
+
+def _tier_credits(values: np.ndarray, tiers: Sequence[Tuple[float, float]], beyond: np.ndarray) -> np.ndarray:
+    """Credit of the first (limit, credit) tier with value <= limit, else `beyond`."""
+    credit = beyond
+    for limit, points in reversed(tiers):
+        credit = np.where(values <= limit, points, credit)
+    return credit
+
+
+def _states(credit: np.ndarray, full: float) -> np.ndarray:
+    """MATCH on full credit, PARTIAL on some credit, else MISMATCH (as FieldResult.match)."""
+    return np.where(credit >= full, FIELD_MATCH, np.where(credit > 0, FIELD_PARTIAL, FIELD_MISMATCH)).astype(np.int8)
+
+
+class _EncodedColumn:
+    """Dictionary-encoded column: int32 codes (-1 where absent) plus vocabulary."""
+
+    def __init__(self, keys: List[Optional[Any]]):
+        self.vocabulary: Dict[Any, int] = {}
+        self.codes = np.full(len(keys), -1, dtype=np.int32)
+        for position, key in enumerate(keys):
+            if key is not None:
+                self.codes[position] = self.vocabulary.setdefault(key, len(self.vocabulary))
+        self.present = self.codes >= 0
+
+    def code_of(self, key: Any) -> int:
+        """Code of a key, or -2 (never equal to any candidate code) if unseen."""
+        return self.vocabulary.get(key, -2)
+
+    def gather(self, per_value: np.ndarray, fill) -> np.ndarray:
+        """Map a per-vocabulary-entry array onto the candidate axis."""
+        if not len(per_value):
+            return np.full(len(self.codes), fill, dtype=per_value.dtype)
+        return np.where(self.present, per_value[np.maximum(self.codes, 0)], fill)
+
+
+class _NameColumn(_EncodedColumn):
+    """Raw counterparty names, dictionary-encoded and indexed for fuzzy lookups."""
+
+    def __init__(self, values: List[Any]):
+        # Falsy names never match, which the empty-string key reproduces
+        super().__init__([None if value is ABSENT else (str(value) if value else '') for value in values])
+        self.index = CounterpartyNameIndex(self.vocabulary)
+
+
+class _NumericColumn:
+    """Parsed numeric column with presence and parse-success masks."""
+
+    def __init__(self, values: List[Any], normalize: Callable[[Any], Any],
+                 preparsed: Optional[List[Optional[float]]] = None):
+        count = len(values)
+        self.values = np.full(count, np.nan, dtype=np.float64)
+        self.present = np.zeros(count, dtype=bool)
+        self.parsed = np.zeros(count, dtype=bool)
+        for position, value in enumerate(values):
+            if value is ABSENT:
+                continue
+            self.present[position] = True
+            if preparsed is not None:
+                # Parsed when the trade record was built; None if it failed to parse
+                number = preparsed[position]
+                if number is None:
+                    continue
+            else:
+                number = normalize(value)
+                if number is UNPARSEABLE:
+                    continue
+            self.values[position] = number
+            self.parsed[position] = True
+
+
+class _DateColumn:
+    """
+    Date column as ordinal days. Dates that fail to parse keep their text for
+    the text comparison; a date that parses never has the text of one that
+    does not, so parsed dates need no text.
+    """
+
+    def __init__(self, values: List[Any], normalize: Callable[[Any], Tuple[Optional[int], str]],
+                 preparsed: Optional[List[Optional[int]]] = None):
+        count = len(values)
+        self.ordinals = np.zeros(count, dtype=np.int64)
+        self.present = np.zeros(count, dtype=bool)
+        self.parsed = np.zeros(count, dtype=bool)
+        text_keys: List[Optional[str]] = []
+        for position, value in enumerate(values):
+            text = None
+            if value is not ABSENT:
+                self.present[position] = True
+                ordinal = preparsed[position] if preparsed is not None else None
+                if ordinal is None:
+                    ordinal, text = normalize(value)
+                if ordinal is not None:
+                    self.ordinals[position] = ordinal
+                    self.parsed[position] = True
+                    text = None
+            text_keys.append(text)
+        self.text = _EncodedColumn(text_keys)
+
+
+class BatchScorer:
+    """
+    Columnar candidate book that scores one source trade against all candidates at once.
+
+    Build it once per candidate set and call score() for each source trade.
+    """
+
+    def __init__(self, trades: List[Dict], extract_attributes: Callable[[Dict], Dict],
+                 rules: RuleSet = CDM_MATCH_RULES):
+        """
+        Load the candidate trades into columnar arrays.
+
+        Args:
+            trades: Candidate trades (typically the opposite table)
+            extract_attributes: Function returning CDM-aligned attributes for a trade
+            rules: Rule set scored in points; similarity rules are scored with
+                the counterparty name similarity of CounterpartyNameIndex
+        """
+        if rules.scoring != POINTS:
+            raise ValueError("Batch scoring needs a rule set scored in points")
+        for rule in rules.rules:
+            supported = _SUPPORTED_PARAMS.get(rule.kind)
+            if supported is None or not set(rule.params) <= supported or \
+                    rule.params.get('guard') not in (None, 'positive_source'):
+                raise ValueError(f"Rule {rule.name} ({rule.kind} {sorted(rule.params)}) has no vectorized comparison")
+
+        self.trades = trades
+        self.extract_attributes = extract_attributes
+        self.rules = rules.rules
+        self.attributes = [extract_attributes(trade) for trade in trades]
+        self.columns = {rule.name: self._column(rule) for rule in self.rules}
+
+    def __len__(self) -> int:
+        return len(self.trades)
+
+    def _column(self, rule: CompiledRule) -> Any:
+        values = [rule.get_target(attrs) for attrs in self.attributes]
+        if rule.kind == 'similarity':
+            return _NameColumn(values)
+        if rule.kind == 'dates':
+            return _DateColumn(values, rule.normalize or (lambda value: value), self._preparsed(rule.field))
+        if rule.kind in ('relative_difference', 'basis_points'):
+            return _NumericColumn(values, rule.normalize or (lambda value: value), self._preparsed(rule.field))
+        normalize = rule.normalize
+        return _EncodedColumn([
+            None if value is ABSENT else (normalize(value) if normalize is not None else value) for value in values
+        ])
+
+    def _preparsed(self, name: Optional[str]) -> Optional[List[Any]]:
+        """
+        Values parsed when the candidates were converted to TradeRecords, or None to parse here.
+
+        The agent's record layout parses notionals and dates with the same
+        parsers as the CDM rule normalizers, under the spelling the alias
+        resolver picks.
+        """
+        if name is None or not self.trades or not all(
+            isinstance(trade, TradeRecord) and name in trade.parsed_names for trade in self.trades
+        ):
+            return None
+        return [trade.parsed(name) for trade in self.trades]
+
+    def score(self, source_trade: Dict) -> 'BatchScoreResult':
+        """Score a source trade against every candidate in one vectorized pass."""
+        return self.score_attributes(self.extract_attributes(source_trade))
+
+    def score_attributes(self, source: Dict) -> 'BatchScoreResult':
+        """Score pre-extracted source attributes against every candidate."""
+        count = len(self.trades)
+        earned = np.zeros(count, dtype=np.float64)
+        possible = np.zeros(count, dtype=np.float64)
+        states = {rule.name: np.full(count, FIELD_NOT_COMPARED, dtype=np.int8) for rule in self.rules}
+        similarities: Dict[str, np.ndarray] = {}
+        source_values: Dict[str, Tuple[Any, Any]] = {}
+        # Candidates compared on each non-fallback rule, and those that earned its full credit
+        compared: Dict[str, np.ndarray] = {}
+        full_credit: Dict[str, np.ndarray] = {}
+
+        for rule in self.rules:
+            s_raw = rule.get_source(source)
+            if s_raw is ABSENT:
+                continue
+            s_value = rule.normalize(s_raw) if rule.normalize is not None else s_raw
+            source_values[rule.name] = (s_raw, s_value)
+            column = self.columns[rule.name]
+            if rule.kind == 'similarity':
+                credit, field_states, similarities[rule.name] = self._similarity(rule, column, s_raw)
+            else:
+                credit, field_states = getattr(self, f"_{rule.kind}")(rule, column, s_value)
+
+            eligible = column.present
+            counted = column.present
+            if rule.fallback_for is not None:
+                # Skipped where the primary rule earned full credit, counted only where it was not compared
+                primary = rule.fallback_for
+                if primary in compared:
+                    eligible = eligible & ~full_credit[primary]
+                    counted = eligible & ~compared[primary]
+            else:
+                compared[rule.name] = column.present
+                full_credit[rule.name] = column.present & (credit >= rule.full)
+            possible[:] += rule.weight * counted
+            earned[:] += np.where(eligible, credit, 0)
+            states[rule.name][eligible] = field_states[eligible]
+
+        scores = _rounded_percentages(earned, possible)
+        return BatchScoreResult(self, source, source_values, scores, earned, possible, states, similarities)
+
+    # ------------------------------------------------------------------
+    # Comparison kinds: (credit, states) over all candidates, valid where present
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _equal(rule: CompiledRule, column: _EncodedColumn, s_value: Any) -> Tuple[np.ndarray, np.ndarray]:
+        credit = np.where(column.codes == column.code_of(s_value), rule.full, 0.0)
+        return credit, _states(credit, rule.full)
+
+    @staticmethod
+    def _containment(rule: CompiledRule, column: _EncodedColumn, s_value: Any) -> Tuple[np.ndarray, np.ndarray]:
+        per_value = np.array([rule.compare(s_value, t_value)[0] for t_value in column.vocabulary], dtype=np.float64)
+        credit = column.gather(per_value, 0.0)
+        return credit, _states(credit, rule.full)
+
+    @staticmethod
+    def _similarity(rule: CompiledRule, column: _NameColumn, s_raw: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        per_value = np.zeros(len(column.vocabulary), dtype=np.float64)
+        for code, similarity in column.index.similarities(s_raw).items():
+            per_value[code] = similarity
+        similarity = column.gather(per_value, 0.0)
+        tiers = rule.params.get('tiers')
+        if tiers is None:
+            credit = similarity * rule.full
+        else:
+            credit = np.zeros(len(similarity), dtype=np.float64)
+            for minimum, points in reversed(tiers):
+                credit = np.where(similarity >= minimum, points, credit)
+        return credit, _states(credit, rule.full), similarity
+
+    @staticmethod
+    def _dates(rule: CompiledRule, column: _DateColumn, s_value: Tuple[Optional[int], str]) -> Tuple[np.ndarray, np.ndarray]:
+        s_ordinal, s_text = s_value
+        params = rule.params
+        if s_ordinal is not None:
+            days = np.abs(column.ordinals - s_ordinal)
+            decay = params.get('decay')
+            beyond = np.maximum(0.0, rule.full - days * decay) if decay is not None else np.zeros(len(days))
+            credit = np.where(column.parsed, _tier_credits(days, params['tiers'], beyond), 0.0)
+        elif params.get('compare_text', False):
+            credit = np.where(column.text.codes == column.text.code_of(s_text), rule.full, 0.0)
+        else:
+            credit = np.zeros(len(column.present), dtype=np.float64)
+        return credit, _states(credit, rule.full)
+
+    @staticmethod
+    def _relative_difference(rule: CompiledRule, column: _NumericColumn, s_value: Any) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(column.present)
+        if s_value is UNPARSEABLE:
+            return np.zeros(count), np.full(count, FIELD_PARSE_ERROR, dtype=np.int8)
+        params = rule.params
+        if params.get('guard') == 'positive_source' and not s_value > 0:
+            # Not scored, and only unparseable candidates are reported
+            return np.zeros(count), np.where(column.parsed, FIELD_NOT_COMPARED, FIELD_PARSE_ERROR).astype(np.int8)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            base = s_value if params.get('base', SOURCE) == SOURCE else np.maximum(s_value, column.values)
+            difference = np.abs(s_value - column.values) / base
+            decay = params.get('decay')
+            beyond = np.maximum(0.0, rule.full - difference * decay) if decay is not None else np.zeros(count)
+            credit = np.where(column.parsed, _tier_credits(difference, params.get('tiers', ()), beyond), 0.0)
+        states = np.where(column.parsed, _states(credit, rule.full), FIELD_PARSE_ERROR).astype(np.int8)
+        return credit, states
+
+    @staticmethod
+    def _basis_points(rule: CompiledRule, column: _NumericColumn, s_value: Any) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(column.present)
+        if s_value is UNPARSEABLE:
+            return np.zeros(count), np.full(count, FIELD_PARSE_ERROR, dtype=np.int8)
+        with np.errstate(invalid='ignore'):
+            s_adjusted, t_adjusted = _scaled_rates(s_value, column.values)
+            diff_bps = np.abs(s_adjusted - t_adjusted) * 10000
+            credit = np.where(column.parsed, _tier_credits(diff_bps, rule.params['tiers'], np.zeros(count)), 0.0)
+        states = np.where(column.parsed, _states(credit, rule.full), FIELD_PARSE_ERROR).astype(np.int8)
+        return credit, states
+
+
+def _scaled_rates(s_rate: Any, t_rate: Any) -> Tuple[Any, Any]:
+    """Normalize if one side is a percentage and the other a decimal (as the basis_points comparison)."""
+    source_scaled = (s_rate > 1) & (t_rate < 1)
+    target_scaled = ~source_scaled & (t_rate > 1) & (s_rate < 1)
+    return np.where(source_scaled, s_rate / 100, s_rate), np.where(target_scaled, t_rate / 100, t_rate)
+
+
+def _rounded_percentages(earned: np.ndarray, possible: np.ndarray) -> np.ndarray:
+    """
+    Compute round(earned / possible * 100, 1) exactly as Python does.
+
+    Python's round() and np.round() can disagree on ties, so the distinct
+    percentages (few, because points are small integers) are rounded in Python.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(possible > 0, earned / possible * 100, 0.0)
+    if not len(percentages):
+        return percentages
+    distinct, inverse = np.unique(percentages, return_inverse=True)
+    rounded = np.array([round(float(value), 1) for value in distinct], dtype=np.float64)
+    return rounded[inverse.reshape(-1)]
+
+
+class BatchScoreResult:
+    """Score vector and per-field states for one source trade against a BatchScorer."""
+
+    def __init__(
+        self,
+        scorer: BatchScorer,
+        source: Dict,
+        source_values: Dict[str, Tuple[Any, Any]],
+        scores: np.ndarray,
+        points_earned: np.ndarray,
+        points_possible: np.ndarray,
+        field_states: Dict[str, np.ndarray],
+        similarities: Dict[str, np.ndarray],
+    ):
+        self.scorer = scorer
+        self.source = source
+        # Rule name -> (raw, normalized) source value
+        self.source_values = source_values
+        self.scores = scores
+        self.points_earned = points_earned
+        self.points_possible = points_possible
+        self.field_states = field_states
+        self.similarities = similarities
+
+    def match_mask(self, field: str) -> np.ndarray:
+        """Boolean mask of candidates with a full match on a breakdown field."""
+        return self.field_states[field] == FIELD_MATCH
+
+    def top_k(self, k: int) -> np.ndarray:
+        """Positions of the k best candidates, ties kept in candidate order."""
+        order = np.argsort(-self.scores, kind='stable')
+        return order[:k]
+
+    def match_result(self, position: int) -> Dict[str, Any]:
+        """Materialize the _calculate_match_score result for one candidate."""
+        target = self.scorer.attributes[position]
+        breakdown: Dict[str, Any] = {}
+
+        for rule in self.scorer.rules:
+            field = rule.name
+            state = int(self.field_states[field][position])
+            if state == FIELD_NOT_COMPARED:
+                continue
+            if state == FIELD_PARSE_ERROR:
+                breakdown[field] = {'match': False, 'error': 'parse_error'}
+                continue
+            s_raw, s_value = self.source_values[field]
+            if rule.kind == 'relative_difference':
+                t_value = float(self.scorer.columns[field].values[position])
+                base = s_value if rule.params.get('base', SOURCE) == SOURCE else max(s_value, t_value)
+                breakdown[field] = {'match': _MATCH_VALUES[state], 'source': s_value, 'target': t_value}
+                if rule.params.get('report_percent'):
+                    breakdown[field]['diff_pct'] = round(abs(s_value - t_value) / base * 100, 2)
+            elif rule.kind == 'basis_points':
+                s_rate, t_rate = s_value, float(self.scorer.columns[field].values[position])
+                if s_rate > 1 and t_rate < 1:
+                    s_rate = s_rate / 100
+                elif t_rate > 1 and s_rate < 1:
+                    t_rate = t_rate / 100
+                breakdown[field] = {
+                    'match': _MATCH_VALUES[state], 'source': s_rate, 'target': t_rate,
+                    'diff_bps': round(abs(s_rate - t_rate) * 10000, 2),
+                }
+            else:
+                t_raw = rule.get_target(target)
+                if rule.display_normalized:
+                    s_raw, t_raw = s_value, rule.normalize(t_raw) if rule.normalize is not None else t_raw
+                breakdown[field] = {'match': _MATCH_VALUES[state], 'source': s_raw, 'target': t_raw}
+                if rule.kind == 'similarity':
+                    breakdown[field]['similarity'] = round(float(self.similarities[field][position]), 2)
+
+        return {
+            'score': float(self.scores[position]),
+            'breakdown': breakdown,
+            'points_earned': float(self.points_earned[position]),
+            'points_possible': float(self.points_possible[position]),
+            'fields_compared': len(breakdown),
+        }
@@ -0,0 +1,201 @@
+"""
+Candidate Blocking for the Trade Matching Agent
+
+Groups trades from the opposite table into blocks keyed by normalized currency,
+product type and trade-date bucket so that find_trade_matches only fully scores
+trades that could plausibly match the source trade.
+
+Trades missing a blocking attribute are indexed under a wildcard for that
+dimension and are always returned as candidates, so incomplete extractions are
+never silently excluded. Recall against the unblocked table is sampled and
+logged by the caller via BlockingRecallTracker.
+"""
+
+import math
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from match_normalizers import normalize_currency, normalize_product_type
+
+logger = logging.getLogger(__name__)
+
+# Width of a trade-date bucket in days. With a 3-day bucket, expanding one
+# bucket either side always covers the ±2 day matching tolerance.
+DEFAULT_BUCKET_DAYS = 3
+DEFAULT_DATE_TOLERANCE_DAYS = 2
+
+BlockingKey = Tuple[Optional[str], Optional[str], Optional[int]]
+
+
+def _block_value(value: Any, normalize: Callable[[Any], str]) -> Optional[str]:
+    """Normalize a blocking attribute, mapping missing or blank values to the wildcard."""
+    if value is None:
+        return None
+    normalized = normalize(value).strip()
+    return normalized or None
+
+
+def currency_product_key(attributes: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """Normalized (currency, product type) of CDM-aligned attributes; None marks the wildcard."""
+    return (
+        _block_value(attributes.get('currency'), normalize_currency),
+        _block_value(attributes.get('product_type'), normalize_product_type),
+    )
+
+
+class CandidateBlockingIndex:
+    """
+    In-memory blocking index over the trades of one table.
+
+    The index is a three-level dict: currency -> product type -> date bucket ->
+    list of positions in the original trade list. Positions are returned in
+    ascending order so that downstream sorting keeps the table order for ties.
+    """
+
+    def __init__(
+        self,
+        trades: List[Dict],
+        extract_attributes: Callable[[Dict], Dict],
+        parse_date: Callable[[Any], Optional[datetime]],
+        bucket_days: int = DEFAULT_BUCKET_DAYS,
+        date_tolerance_days: int = DEFAULT_DATE_TOLERANCE_DAYS,
+    ):
+        """
+        Build the index.
+
+        Args:
+            trades: Trades from the table being searched (the target table)
+            extract_attributes: Function returning CDM-aligned attributes for a trade
+            parse_date: Function parsing a raw date value into a datetime (or None)
+            bucket_days: Width of a trade-date bucket in days
+            date_tolerance_days: Trade-date tolerance used when expanding buckets
+        """
+        if bucket_days < 1:
+            raise ValueError("bucket_days must be at least 1")
+
+        self.trades = trades
+        self.bucket_days = bucket_days
+        self.date_tolerance_days = date_tolerance_days
+        self._extract_attributes = extract_attributes
+        self._parse_date = parse_date
+        self._index: Dict[Optional[str], Dict[Optional[str], Dict[Optional[int], List[int]]]] = {}
+
+        for position, trade in enumerate(trades):
+            ccy, product, bucket = self.blocking_key(trade)
+            self._index.setdefault(ccy, {}).setdefault(product, {}).setdefault(bucket, []).append(position)
+
+    def blocking_key(self, trade: Dict) -> BlockingKey:
+        """Compute the (currency, product type, date bucket) key for a trade."""
+        attributes = self._extract_attributes(trade)
+        ccy, product = currency_product_key(attributes)
+        bucket = None
+        trade_date = self._parse_date(attributes.get('trade_date'))
+        if trade_date:
+            bucket = trade_date.toordinal() // self.bucket_days
+        return ccy, product, bucket
+
+    @property
+    def block_count(self) -> int:
+        """Number of distinct non-empty blocks in the index."""
+        return sum(len(buckets) for products in self._index.values() for buckets in products.values())
+
+    def candidate_positions(self, source_trade: Dict) -> List[int]:
+        """
+        Return positions of trades sharing a block with the source trade.
+
+        Wildcard (missing) dimensions match everything on both sides, and the
+        date bucket is expanded by enough neighbours to cover the tolerance.
+        """
+        return self.positions_for_key(self.blocking_key(source_trade))
+
+    def positions_for_key(self, key: BlockingKey) -> List[int]:
+        """Return candidate positions for a blocking key (see candidate_positions)."""
+        ccy, product, bucket = key
+
+        ccy_keys = [ccy, None] if ccy is not None else list(self._index.keys())
+
+        if bucket is not None:
+            radius = math.ceil(self.date_tolerance_days / self.bucket_days)
+            bucket_keys = [bucket + offset for offset in range(-radius, radius + 1)] + [None]
+        else:
+            bucket_keys = None
+
+        positions: List[int] = []
+        for ccy_key in dict.fromkeys(ccy_keys):
+            products = self._index.get(ccy_key)
+            if not products:
+                continue
+            product_keys = [product, None] if product is not None else list(products.keys())
+            for product_key in dict.fromkeys(product_keys):
+                buckets = products.get(product_key)
+                if not buckets:
+                    continue
+                for bucket_key in (bucket_keys if bucket_keys is not None else list(buckets.keys())):
+                    positions.extend(buckets.get(bucket_key, ()))
+
+        positions.sort()
+        return positions
+
+    def candidates(self, source_trade: Dict) -> List[Dict]:
+        """Return the blocked candidate trades for a source trade, in table order."""
+        return [self.trades[position] for position in self.candidate_positions(source_trade)]
+
+
+class BlockingRecallTracker:
+    """
+    Cumulative recall metric for candidate blocking.
+
+    A "true match" is any target trade whose full score reaches the threshold.
+    Recall is the fraction of true matches found in the full table that were
+    also present in the blocked candidate set.
+    """
+
+    def __init__(self, match_threshold: float = 70.0):
+        self.match_threshold = match_threshold
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.true_matches = 0
+        self.retained_matches = 0
+
+    def record(self, full_scores: Dict[Any, float], blocked_ids: set) -> Optional[float]:
+        """
+        Record one sampled comparison between the full and blocked candidate sets.
+
+        Args:
+            full_scores: Score for every target trade in the unblocked table, keyed by
+                trade ID or table position
+            blocked_ids: Keys of the target trades that survived blocking
+
+        Returns:
+            Recall for this sample, or None if the sample had no true matches
+        """
+        true_ids = {trade_id for trade_id, score in full_scores.items() if score >= self.match_threshold}
+        retained = true_ids & blocked_ids
+        with self._lock:
+            self.samples += 1
+            self.true_matches += len(true_ids)
+            self.retained_matches += len(retained)
+        if not true_ids:
+            return None
+        return len(retained) / len(true_ids)
+
+    @property
+    def recall(self) -> Optional[float]:
+        """Cumulative recall across all samples, or None before any true match is seen."""
+        with self._lock:
+            if not self.true_matches:
+                return None
+            return self.retained_matches / self.true_matches
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the counters as a JSON-serializable dict."""
+        recall = self.recall
+        with self._lock:
+            return {
+                "samples": self.samples,
+                "true_matches": self.true_matches,
+                "retained_matches": self.retained_matches,
+                "recall": round(recall, 4) if recall is not None else None,
+            }
@@ -0,0 +1,101 @@
+"""
+Index-Targeted Candidate Retrieval for the Trade Matching Agent
+
+Reads only the slice of a trade table around a trade date by querying the
+TradeDateIndex GSI (hash key Trade_Date) once per day of the ±N day window.
+The per-day Query calls run in parallel on a thread pool and their results
+are merged in date order.
+
+The index is sparse: it holds only items with a Trade_Date attribute, keyed
+by the ISO (YYYY-MM-DD) string. Callers fall back to a full scan when the
+source trade has no usable date or the window yields nothing.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from dynamodb_scan import deserialize_item, projection_arguments
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATE_INDEX = "TradeDateIndex"
+DEFAULT_DATE_ATTRIBUTE = "Trade_Date"
+
+
+def date_window(center: date, window_days: int) -> List[str]:
+    """Return the ISO dates from center - window_days to center + window_days."""
+    return [(center + timedelta(days=offset)).isoformat() for offset in range(-window_days, window_days + 1)]
+
+
+class TradeDateQueryPlanner:
+    """Plans and runs the per-day TradeDateIndex queries for a date window."""
+
+    def __init__(
+        self,
+        client: Any,
+        index_name: str = DEFAULT_DATE_INDEX,
+        date_attribute: str = DEFAULT_DATE_ATTRIBUTE,
+        attributes: Optional[Sequence[str]] = None,
+    ):
+        """
+        Args:
+            client: boto3 DynamoDB client (thread-safe)
+            index_name: GSI whose hash key is the trade date
+            date_attribute: Name of the GSI hash key attribute
+            attributes: Attribute names to fetch, or None for whole items
+        """
+        self.client = client
+        self.index_name = index_name
+        self.date_attribute = date_attribute
+        self.attributes = list(attributes) if attributes else None
+        self.queries = 0
+
+    def _query_kwargs(self, table_name: str, day: str) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "TableName": table_name,
+            "IndexName": self.index_name,
+            "KeyConditionExpression": "#trade_date = :trade_date",
+            "ExpressionAttributeNames": {"#trade_date": self.date_attribute},
+            "ExpressionAttributeValues": {":trade_date": {"S": day}},
+        }
+        if self.attributes:
+            projection = projection_arguments(self.attributes)
+            kwargs["ProjectionExpression"] = projection["ProjectionExpression"]
+            kwargs["ExpressionAttributeNames"].update(projection["ExpressionAttributeNames"])
+        return kwargs
+
+    def _query_pages(self, kwargs: Dict[str, Any]) -> Iterator[List[Dict]]:
+        response = self.client.query(**kwargs)
+        yield response.get('Items', [])
+        while 'LastEvaluatedKey' in response:
+            response = self.client.query(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
+            yield response.get('Items', [])
+
+    def query_day(self, table_name: str, day: str) -> List[Dict]:
+        """Return the deserialized items of one trade date, following every page."""
+        kwargs = self._query_kwargs(table_name, day)
+        return [deserialize_item(item) for page in self._query_pages(kwargs) for item in page]
+
+    def query_window(self, table_name: str, center: date, window_days: int) -> List[Dict]:
+        """
+        Return every indexed trade dated within ±window_days of center.
+
+        Args:
+            table_name: Table owning the index
+            center: Trade date of the source trade
+            window_days: Date tolerance in days
+
+        Returns:
+            Items merged in date order
+        """
+        days = date_window(center, window_days)
+        self.queries += len(days)
+        with ThreadPoolExecutor(max_workers=len(days), thread_name_prefix=f"query-{table_name}") as pool:
+            per_day = list(pool.map(lambda day: self.query_day(table_name, day), days))
+        items = [item for day_items in per_day for item in day_items]
+        logger.info(
+            f"Queried {self.index_name} on {table_name} for {days[0]}..{days[-1]}: {len(items)} items"
+        )
+        return items
@@ -0,0 +1,87 @@
+"""
+CDM Match Rules for the Trade Matching Agent
+
+The CDM-aligned (FINOS/ISDA Common Domain Model) rule set behind every
+one-to-one trade comparison of the agent: _calculate_match_score evaluates it
+with the rules engine, and the pruned phase-1 scorer (pruned_scoring.py) and
+the vectorized BatchScorer (batch_scorer.py) read their field order, weights
+and tolerance tiers from the compiled rules, so the three cannot drift apart.
+"""
+
+from typing import Any, Optional, Tuple
+
+from match_rules import RuleSet, POINTS, UNPARSEABLE
+from match_normalizers import (
+    parse_date_ordinal,
+    normalize_counterparty_name,
+    normalized_name_similarity,
+    normalize_currency,
+    normalize_lei,
+    normalize_product_type,
+    normalize_day_count,
+    normalize_payment_frequency,
+    normalize_rate_index,
+    parse_notional,
+    parse_rate,
+)
+
+
+def _parse_or_unparseable(parser):
+    """Wrap a parser so a value that fails to parse normalizes to UNPARSEABLE."""
+    def parse(value: Any) -> Any:
+        try:
+            return parser(value)
+        except (ValueError, ZeroDivisionError):
+            return UNPARSEABLE
+    return parse
+
+
+def _cdm_date(value: Any) -> Tuple[Optional[int], str]:
+    return parse_date_ordinal(value), str(value).strip()
+
+
+def _counterparty_name(value: Any) -> Optional[str]:
+    return normalize_counterparty_name(value) if value else None
+
+
+def _counterparty_similarity(name1: Optional[str], name2: Optional[str]) -> float:
+    if name1 is None or name2 is None:
+        return 0.0
+    return normalized_name_similarity(name1, name2)
+
+
+# CDM matching criteria (FINOS/ISDA Common Domain Model), in points. A field
+# is compared only when both trades carry it (after alias resolution).
+CDM_MATCH_RULES = RuleSet([
+    # Currency: exact match, high weight
+    {'name': 'currency', 'weight': 12, 'presence': 'both',
+     'normalize': normalize_currency, 'compare': 'equal'},
+    # Notional: ±2% of the source notional, partial credit within 5%
+    {'name': 'notional', 'weight': 15, 'presence': 'both',
+     'normalize': _parse_or_unparseable(parse_notional), 'compare': 'relative_difference',
+     'params': {'tiers': [(0.02, 15), (0.05, 8)], 'guard': 'positive_source', 'report_percent': True}},
+    # Product type: exact match, partial credit when one contains the other
+    {'name': 'product_type', 'weight': 10, 'presence': 'both',
+     'normalize': normalize_product_type, 'compare': 'containment', 'params': {'partial': 6}},
+    # Trade, effective and termination dates: ±2 days
+    *({'name': field, 'weight': 8, 'presence': 'both', 'normalize': _cdm_date, 'compare': 'dates',
+       'params': {'tiers': [(2, 8)], 'compare_text': True}}
+      for field in ('trade_date', 'effective_date', 'termination_date')),
+    # Counterparty: exact LEI, else fuzzy name when the LEIs are missing or differ
+    {'name': 'counterparty_lei', 'fields': 'party_b_lei', 'weight': 8, 'presence': 'both',
+     'normalize': normalize_lei, 'compare': 'equal'},
+    {'name': 'counterparty_name', 'fields': 'party_b_name', 'weight': 8, 'presence': 'both',
+     'fallback_for': 'counterparty_lei', 'normalize': _counterparty_name, 'compare': 'similarity',
+     'params': {'measure': _counterparty_similarity, 'tiers': [(0.8, 8), (0.5, 4)]}},
+    # Day count fraction, payment frequency, floating rate index: exact after aliasing
+    {'name': 'day_count_fraction', 'weight': 8, 'presence': 'both',
+     'normalize': normalize_day_count, 'compare': 'equal'},
+    {'name': 'payment_frequency', 'weight': 7, 'presence': 'both',
+     'normalize': normalize_payment_frequency, 'compare': 'equal'},
+    {'name': 'floating_rate_index', 'weight': 8, 'presence': 'both',
+     'normalize': normalize_rate_index, 'compare': 'equal'},
+    # Fixed rate/price: ±1bp, partial credit within 5bp
+    {'name': 'fixed_rate', 'weight': 8, 'presence': 'both',
+     'normalize': _parse_or_unparseable(parse_rate), 'compare': 'basis_points',
+     'params': {'tiers': [(1, 8), (5, 4)]}},
+], scoring=POINTS)
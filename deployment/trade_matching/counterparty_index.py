@@ -0,0 +1,121 @@
+"""
+Counterparty Name Index for the Trade Matching Agent
+
+Inverted index over the counterparty names of a candidate book, so that a
+fuzzy lookup only scores names that can have a non-zero similarity instead of
+running fuzzy_match_counterparty against every name.
+
+A book name can score above zero against a query for three reasons, and the
+index covers each of them:
+- the normalized names share a word (Jaccard) - token postings,
+- the query is contained in the name - character trigram postings,
+- the name is contained in the query - lookup of the query's substrings of
+  every name length present in the book.
+
+similarities() therefore returns exactly the non-zero scores that
+fuzzy_match_counterparty would produce.
+"""
+
+from typing import Dict, Iterable, List, Set
+
+from match_normalizers import counterparty_tokens, normalize_counterparty_name, normalized_name_similarity
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CounterpartyNameIndex:
+    """
+    Token and trigram index over raw counterparty names.
+
+    Names are addressed by their position in the list passed to the
+    constructor (e.g. a dictionary-encoded column's vocabulary).
+    """
+
+    def __init__(self, names: Iterable[str]):
+        """
+        Build the index.
+
+        Args:
+            names: Raw counterparty names; falsy names never match anything
+        """
+        self.names: List[str] = list(names)
+        # Normalized name -> positions of the raw names that normalize to it
+        self._groups: Dict[str, List[int]] = {}
+        for position, name in enumerate(self.names):
+            if name:
+                self._groups.setdefault(normalize_counterparty_name(name), []).append(position)
+
+        self._token_postings: Dict[str, Set[str]] = {}
+        self._trigram_postings: Dict[str, Set[str]] = {}
+        for normalized in self._groups:
+            for token in counterparty_tokens(normalized):
+                self._token_postings.setdefault(token, set()).add(normalized)
+            for trigram in _trigrams(normalized):
+                self._trigram_postings.setdefault(trigram, set()).add(normalized)
+        self._lengths = sorted({len(normalized) for normalized in self._groups if normalized})
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def _containing(self, query: str) -> Iterable[str]:
+        """Book names that contain the (non-empty) normalized query."""
+        if len(query) < 3:
+            return [normalized for normalized in self._groups if query in normalized]
+        postings = sorted(
+            (self._trigram_postings.get(trigram, set()) for trigram in _trigrams(query)),
+            key=len,
+        )
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return [normalized for normalized in candidates if query in normalized]
+
+    def _contained(self, query: str) -> Iterable[str]:
+        """Book names contained in the (non-empty) normalized query."""
+        found = [''] if '' in self._groups else []
+        for length in self._lengths:
+            if length >= len(query):
+                break
+            for start in range(len(query) - length + 1):
+                fragment = query[start:start + length]
+                if fragment in self._groups:
+                    found.append(fragment)
+        return found
+
+    def normalized_similarities(self, query: str) -> Dict[str, float]:
+        """Non-zero similarity of every normalized book name to a normalized query."""
+        if not query:
+            # The empty name is contained in every name
+            return {normalized: normalized_name_similarity(query, normalized) for normalized in self._groups}
+
+        scores: Dict[str, float] = {}
+        if query in self._groups:
+            scores[query] = 1.0
+        for normalized in self._containing(query):
+            scores.setdefault(normalized, 0.9)
+        for normalized in self._contained(query):
+            scores.setdefault(normalized, 0.9)
+
+        candidates = set()
+        for token in counterparty_tokens(query):
+            candidates.update(self._token_postings.get(token, ()))
+        for normalized in candidates:
+            if normalized not in scores:
+                scores[normalized] = normalized_name_similarity(query, normalized)
+        return scores
+
+    def similarities(self, name: str) -> Dict[int, float]:
+        """
+        Fuzzy match a raw name against the book.
+
+        Returns:
+            Position -> fuzzy_match_counterparty(name, names[position]) for every
+            position with a non-zero score
+        """
+        if not name:
+            return {}
+        result: Dict[int, float] = {}
+        for normalized, score in self.normalized_similarities(normalize_counterparty_name(name)).items():
+            for position in self._groups[normalized]:
+                result[position] = score
+        return result
@@ -0,0 +1,188 @@
+"""
+Counterparty Name LSH Index for the Trade Matching Agent
+
+fuzzy_match_counterparty compares normalized names by containment and word
+Jaccard. Legal suffixes (INTL, LTD, ...) are stripped before comparing, but
+anything that changes a word scores low or zero: typos ("GOLDMAN SACHES"),
+joined or split words ("JPMORGAN" vs "JP MORGAN"), and abbreviations that
+are not suffixes ("MERRILL LYNCH CAP MKTS" vs "MERRILL LYNCH CAPITAL MARKETS").
+Character trigrams overlap heavily for all of these.
+
+CounterpartyLshIndex finds book names whose trigram Jaccard similarity to a
+query name is above a threshold without comparing the query with every name:
+- every distinct normalized name is shingled into padded character trigrams
+  and summarized by a MinHash signature (num_perm minimum hash values, each
+  equal between two names with probability equal to their trigram Jaccard),
+- signatures are split into bands; names sharing all rows of any band land in
+  the same bucket (locality-sensitive hashing), with the fewest bands that
+  make a name exactly at the threshold a candidate with 85% probability
+  (names above it are found more reliably, dissimilar names rarely collide),
+- a query probes one bucket per band and verifies the (few) candidates with
+  the exact trigram Jaccard, which is the returned similarity. The MinHash
+  estimate only selects candidates, so similarities do not depend on num_perm
+  or the banding and compare directly with the threshold.
+
+Build it once per trade book version and use near_positions() to narrow a
+candidate set to the trades of near-duplicate counterparties.
+"""
+
+import zlib
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from match_normalizers import normalize_counterparty_name
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.5
+# Probability that a name exactly at the threshold becomes a candidate
+DEFAULT_BAND_RECALL = 0.85
+
+# Universal hashing (a * x + b) mod p over 32-bit trigram hashes; a, b < 2^32
+# keeps every intermediate value within uint64
+_PRIME = np.uint64(4294967291)
+
+
+def name_trigrams(normalized: str) -> FrozenSet[str]:
+    """Character trigrams of a normalized name, padded so that word boundaries and short names count."""
+    padded = f" {normalized} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def trigram_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def choose_bands(num_perm: int, threshold: float, recall: float = DEFAULT_BAND_RECALL) -> int:
+    """
+    Band count for a signature length and similarity threshold.
+
+    Returns the smallest divisor b of num_perm for which two names exactly at
+    the threshold share a bucket with probability 1 - (1 - t^(num_perm/b))^b of
+    at least recall. Fewer bands mean fewer dissimilar candidates to verify.
+    """
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands == 0 and 1 - (1 - threshold ** (num_perm // bands)) ** bands >= recall:
+            return bands
+    return num_perm
+
+
+class CounterpartyLshIndex:
+    """
+    MinHash/LSH index over raw counterparty names.
+
+    Names are addressed by their position in the list passed to the
+    constructor (e.g. one name per trade of a book).
+    """
+
+    def __init__(
+        self,
+        names: Iterable[Optional[str]],
+        num_perm: int = DEFAULT_NUM_PERM,
+        threshold: float = DEFAULT_THRESHOLD,
+        bands: Optional[int] = None,
+        seed: int = 1,
+    ):
+        """
+        Build the index.
+
+        Args:
+            names: Raw counterparty names by position; falsy names are not indexed
+            num_perm: MinHash signature length
+            threshold: Minimum trigram Jaccard similarity returned by lookups
+            bands: LSH band count (a divisor of num_perm); chosen from the threshold if omitted
+            seed: Seed of the hash functions
+        """
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands = bands or choose_bands(num_perm, threshold)
+        if num_perm % self.bands:
+            raise ValueError(f"{self.bands} bands do not divide a signature of {num_perm}")
+        self.rows = num_perm // self.bands
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 2**32, size=num_perm, dtype=np.uint64)
+
+        # Normalized name -> positions of the raw names that normalize to it
+        self._groups: Dict[str, List[int]] = {}
+        # Positions without a name: never near anything, but not excluded by near_positions()
+        self.unnamed: List[int] = []
+        for position, name in enumerate(names):
+            normalized = normalize_counterparty_name(name) if name else ''
+            if normalized:
+                self._groups.setdefault(normalized, []).append(position)
+            else:
+                self.unnamed.append(position)
+
+        self._trigrams: Dict[str, FrozenSet[str]] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        for normalized in self._groups:
+            trigrams = name_trigrams(normalized)
+            self._trigrams[normalized] = trigrams
+            for key in self._band_keys(self.signature(trigrams)):
+                self._buckets.setdefault(key, []).append(normalized)
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def signature(self, trigrams: Iterable[str]) -> np.ndarray:
+        """MinHash signature of a trigram set."""
+        hashes = np.fromiter((zlib.crc32(trigram.encode()) for trigram in trigrams), dtype=np.uint64)
+        if not len(hashes):
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def normalized_similarities(self, query: str) -> Dict[str, float]:
+        """Book names (normalized) with trigram similarity to a normalized query of at least the threshold."""
+        if not query:
+            return {}
+        trigrams = name_trigrams(query)
+        candidates: Set[str] = set()
+        for key in self._band_keys(self.signature(trigrams)):
+            candidates.update(self._buckets.get(key, ()))
+        if query in self._groups:
+            candidates.add(query)
+        scores = {}
+        for normalized in candidates:
+            similarity = trigram_similarity(trigrams, self._trigrams[normalized])
+            if similarity >= self.threshold:
+                scores[normalized] = similarity
+        return scores
+
+    def similarities(self, name: Optional[str]) -> Dict[int, float]:
+        """
+        Near-duplicate lookup of a raw name.
+
+        Returns:
+            Position -> trigram Jaccard similarity, for the positions whose
+            name is at least threshold-similar (candidates missed by LSH are
+            absent; none are reported below the threshold)
+        """
+        if not name:
+            return {}
+        result: Dict[int, float] = {}
+        for normalized, score in self.normalized_similarities(normalize_counterparty_name(name)).items():
+            for position in self._groups[normalized]:
+                result[position] = score
+        return result
+
+    def near_positions(self, name: Optional[str]) -> Optional[Set[int]]:
+        """
+        Positions that may belong to the same counterparty as a raw name.
+
+        Returns:
+            Positions of near-duplicate names plus positions without a name, or
+            None when the query has no usable name (nothing to narrow by)
+        """
+        if not name or not normalize_counterparty_name(name):
+            return None
+        return set(self.similarities(name)).union(self.unnamed)
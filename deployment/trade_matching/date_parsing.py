@@ -0,0 +1,173 @@
+"""
+Shared Date Parsing for Trade Extraction and Matching
+
+Parses the date strings found in extracted trades into integer ordinal days
+(date.toordinal()), so tolerance checks are plain integer subtraction.
+
+Parsing used to try every strptime format in sequence for every date in every
+comparison. DateParser instead:
+- memoizes results in a bounded LRU cache keyed on the raw string,
+- classifies the string by its shape (punctuation sequence and whether it
+  contains letters) and only tries the formats that can match that shape,
+  in the configured priority order,
+- builds YYYY-MM-DD dates directly from the digits instead of going
+  through strptime.
+
+The result is always identical to trying the formats in order with
+datetime.strptime, so a string valid in more than one format of the same
+shape (e.g. 03/04/2025 under %d/%m/%Y and %m/%d/%Y) is read by format
+priority.
+
+This module is shared by the trade_extraction and trade_matching agents; each
+deployment directory carries an identical copy.
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Directives that only consume digits
+_NUMERIC_DIRECTIVES = set('YmdHMSyjf')
+# Directives that consume letters
+_ALPHA_DIRECTIVES = set('BbAap')
+
+_ISO_DATE_FORMAT = '%Y-%m-%d'
+_ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_PUNCTUATION_RE = re.compile(r'[\w\s]+')
+_LETTER_RE = re.compile(r'[^\W\d_]')
+
+DEFAULT_CACHE_SIZE = 8192
+
+Shape = Tuple[str, bool]
+
+
+def _format_shape(fmt: str) -> Optional[Shape]:
+    """
+    Return (literal punctuation sequence, consumes letters) for a strptime format.
+
+    Returns None for formats using directives whose shape is not modelled;
+    such formats are tried for every input shape.
+    """
+    punctuation: List[str] = []
+    letters = False
+    i = 0
+    while i < len(fmt):
+        char = fmt[i]
+        if char == '%':
+            if i + 1 >= len(fmt):
+                return None
+            directive = fmt[i + 1]
+            if directive == '%':
+                punctuation.append('%')
+            elif directive in _ALPHA_DIRECTIVES:
+                letters = True
+            elif directive not in _NUMERIC_DIRECTIVES:
+                return None
+            i += 2
+            continue
+        if char.isalpha():
+            letters = True
+        elif not char.isspace() and not char.isdigit() and char != '_':
+            punctuation.append(char)
+        i += 1
+    return ''.join(punctuation), letters
+
+
+def _value_shape(text: str) -> Shape:
+    """Return (punctuation sequence, contains letters) for an input string."""
+    return _PUNCTUATION_RE.sub('', text), _LETTER_RE.search(text) is not None
+
+
+class DateParser:
+    """
+    Memoized multi-format date parser returning ordinal days.
+
+    Thread-safe. Instances are cheap to keep at module level; each owns its
+    own LRU cache.
+    """
+
+    def __init__(self, formats: Sequence[str], cache_size: int = DEFAULT_CACHE_SIZE, strip: bool = True):
+        """
+        Compile the format list.
+
+        Args:
+            formats: strptime formats in priority order
+            cache_size: Maximum number of cached raw strings
+            strip: Strip surrounding whitespace before parsing
+        """
+        self.formats = list(formats)
+        self.strip = strip
+        self._shapes = [(fmt, _format_shape(fmt)) for fmt in self.formats]
+        self._candidates: Dict[Shape, Tuple[str, ...]] = {}
+        self._cached_parse = lru_cache(maxsize=cache_size)(self._parse_uncached)
+
+    def _candidates_for(self, shape: Shape) -> Tuple[str, ...]:
+        """Formats able to match a string of the given shape, in priority order."""
+        candidates = self._candidates.get(shape)
+        if candidates is None:
+            punctuation, has_letters = shape
+            candidates = tuple(
+                fmt for fmt, fmt_shape in self._shapes
+                if fmt_shape is None
+                or (fmt_shape[0] == punctuation and (fmt_shape[1] or not has_letters))
+            )
+            self._candidates[shape] = candidates
+        return candidates
+
+    @staticmethod
+    def _parse_format(text: str, fmt: str) -> Optional[int]:
+        """Parse a string with one format, returning the ordinal or None."""
+        if fmt == _ISO_DATE_FORMAT and _ISO_DATE_RE.fullmatch(text):
+            try:
+                return date(int(text[:4]), int(text[5:7]), int(text[8:10])).toordinal()
+            except ValueError:
+                return None
+        try:
+            return datetime.strptime(text, fmt).toordinal()
+        except ValueError:
+            return None
+
+    def _parse_uncached(self, text: str) -> Optional[int]:
+        """Parse one string, returning the ordinal or None."""
+        if self.strip:
+            text = text.strip()
+        for fmt in self._candidates_for(_value_shape(text)):
+            ordinal = self._parse_format(text, fmt)
+            if ordinal is not None:
+                return ordinal
+        return None
+
+    def parse_ordinal(self, value: Any) -> Optional[int]:
+        """
+        Parse a raw date value to ordinal days.
+
+        Args:
+            value: Raw date value (usually a string)
+
+        Returns:
+            date.toordinal() of the parsed date, or None if empty or unparseable
+        """
+        if not value:
+            return None
+        # Keyed on the string form so that equal-hashing values of different
+        # types (20250115 vs 20250115.0) never share a cache entry
+        return self._cached_parse(str(value))
+
+    def parse_date(self, value: Any) -> Optional[datetime]:
+        """Parse a raw date value to a midnight datetime, or None."""
+        ordinal = self.parse_ordinal(value)
+        return datetime.fromordinal(ordinal) if ordinal is not None else None
+
+    def to_iso(self, value: Any) -> Optional[str]:
+        """Parse a raw date value to an ISO 8601 date string, or None."""
+        ordinal = self.parse_ordinal(value)
+        return date.fromordinal(ordinal).isoformat() if ordinal is not None else None
+
+    def cache_info(self):
+        """Return the functools cache statistics (hits, misses, maxsize, currsize)."""
+        return self._cached_parse.cache_info()
+
+    def cache_clear(self) -> None:
+        """Clear memoized results."""
+        self._cached_parse.cache_clear()
@@ -0,0 +1,83 @@
+"""
+Rules-First Execution for the Trade Matching Agent
+
+find_trade_matches already produces a deterministic score and classification.
+In rules-first mode the entrypoint runs it directly and only hands the trade
+to the LLM when the result is ambiguous:
+
+- confidence >= 85 (MATCHED) or < 50 (BREAK): answered on the fast path,
+  without a Bedrock call,
+- 50 <= confidence < 85, or a result the rules could not produce (e.g. an
+  error): escalated to the Strands agent.
+
+ExecutionPathTracker keeps the share of requests served per path and their
+latencies, for the agent's logs and the execution_stats mode.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from reconciliation import MATCHED_THRESHOLD, REVIEW_THRESHOLD
+
+EXECUTION_MODES = ("agent", "rules_first")
+
+FAST_PATH = "rules"
+LLM_PATH = "llm"
+
+# Latencies kept per path for percentiles
+DEFAULT_LATENCY_WINDOW = 1024
+
+
+def is_unambiguous(result: Dict[str, Any]) -> bool:
+    """Whether a find_trade_matches result can be returned without the LLM."""
+    if "error" in result or "confidence" not in result:
+        return False
+    confidence = result["confidence"]
+    return confidence >= MATCHED_THRESHOLD or confidence < REVIEW_THRESHOLD
+
+
+def _percentile(ordered, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ExecutionPathTracker:
+    """Thread-safe request counts and latency summaries per execution path."""
+
+    def __init__(self, latency_window: int = DEFAULT_LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {FAST_PATH: 0, LLM_PATH: 0}
+        self._latencies: Dict[str, Deque[float]] = {
+            FAST_PATH: deque(maxlen=latency_window),
+            LLM_PATH: deque(maxlen=latency_window),
+        }
+
+    def record(self, path: str, latency_ms: float) -> None:
+        with self._lock:
+            self._counts[path] += 1
+            self._latencies[path].append(latency_ms)
+
+    def fast_path_fraction(self) -> Optional[float]:
+        """Share of requests answered without the LLM, or None before the first request."""
+        with self._lock:
+            total = sum(self._counts.values())
+            return self._counts[FAST_PATH] / total if total else None
+
+    def stats(self) -> Dict[str, Any]:
+        fraction = self.fast_path_fraction()
+        with self._lock:
+            latency = {}
+            for path, samples in self._latencies.items():
+                if not samples:
+                    continue
+                ordered = sorted(samples)
+                latency[path] = {
+                    "mean_ms": round(sum(ordered) / len(ordered), 1),
+                    "p50_ms": round(_percentile(ordered, 0.5), 1),
+                    "p95_ms": round(_percentile(ordered, 0.95), 1),
+                }
+            return {
+                "requests": dict(self._counts),
+                "fast_path_fraction": round(fraction, 4) if fraction is not None else None,
+                "latency": latency,
+            }
@@ -0,0 +1,155 @@
+"""
+Field Alias Resolution for the Trade Matching Agent
+
+Maps the many field spellings produced by different extractor versions
+(Trade_ID, trade_id, TradeID, ...) onto the CDM-aligned attribute names used
+by the matching rules.
+
+The alias table is compiled once into a reverse lookup, and the resolution
+plan for each distinct item key set is cached. Items from the same extractor
+version share the same keys, so after the first item of each schema shape,
+resolution is a single pass of direct dictionary lookups.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+# CDM-aligned field name variations (supporting both CDM standard names and legacy formats).
+# Variations are listed in priority order: the first one present in an item wins.
+KEY_FIELD_ALIASES: Dict[str, List[str]] = {
+    # Core Identification
+    'trade_id': ['trade_id', 'Trade_ID', 'TradeID', 'tradeId', 'usi', 'uti'],
+
+    # Product Classification
+    'product_type': ['product_type', 'Product_Type', 'ProductType', 'product_qualifier',
+                     'Instrument', 'instrument', 'Trade_Type', 'trade_type', 'asset_class'],
+    'sub_product_type': ['sub_product_type', 'SubProductType'],
+
+    # Economic Terms - Dates
+    'trade_date': ['trade_date', 'Trade_Date', 'TradeDate', 'tradeDate', 'execution_date'],
+    'effective_date': ['effective_date', 'Effective_Date', 'EffectiveDate', 'effectiveDate',
+                       'Start_Date', 'start_date', 'value_date'],
+    'termination_date': ['termination_date', 'Termination_Date', 'TerminationDate',
+                         'Maturity_Date', 'maturity_date', 'End_Date', 'end_date', 'expiry_date'],
+
+    # Quantity & Price
+    'currency': ['currency', 'Currency', 'CCY', 'ccy', 'notional_currency'],
+    'notional': ['notional_amount', 'notional', 'Notional', 'NotionalAmount',
+                 'Quantity', 'quantity', 'Total_Quantity', 'principal'],
+    'currency_2': ['currency_2', 'Currency_2', 'second_currency'],
+    'notional_2': ['notional_amount_2', 'notional_2', 'Notional_2'],
+
+    # Counterparty Information
+    'party_a_name': ['party_a_name', 'Party_A_Name', 'Party_A', 'bank_name', 'Bank_Name'],
+    'party_b_name': ['party_b_name', 'Party_B_Name', 'Party_B', 'counterparty', 'Counterparty',
+                     'CounterpartyName', 'Counterparty_Name'],
+    'party_a_lei': ['party_a_lei', 'Party_A_LEI', 'bank_lei', 'Bank_LEI'],
+    'party_b_lei': ['party_b_lei', 'Party_B_LEI', 'counterparty_lei', 'Counterparty_LEI'],
+
+    # Interest Rate Terms (CDM critical fields)
+    'fixed_rate': ['fixed_rate', 'Fixed_Rate', 'FixedRate', 'Fixed_Price', 'fixed_price',
+                   'Price', 'price', 'Rate', 'rate', 'coupon_rate'],
+    'floating_rate_index': ['floating_rate_index', 'Floating_Rate_Index', 'FloatingIndex',
+                            'Index', 'index', 'reference_rate', 'benchmark'],
+    'floating_rate_spread': ['floating_rate_spread', 'Spread', 'spread', 'margin'],
+    'day_count_fraction': ['day_count_fraction', 'Day_Count_Fraction', 'DayCountFraction',
+                           'day_count', 'Day_Count', 'DayCount', 'day_count_convention'],
+    'payment_frequency': ['payment_frequency', 'Payment_Frequency', 'PaymentFrequency',
+                          'frequency', 'Frequency', 'payment_period'],
+    'payment_frequency_2': ['payment_frequency_2', 'Payment_Frequency_2'],
+    'business_day_convention': ['business_day_convention', 'Business_Day_Convention',
+                                'BusinessDayConvention', 'bdc'],
+    'reset_frequency': ['reset_frequency', 'Reset_Frequency', 'ResetFrequency'],
+
+    # FX Terms
+    'fx_rate': ['fx_rate', 'FX_Rate', 'exchange_rate', 'Exchange_Rate'],
+
+    # Settlement Terms
+    'settlement_type': ['settlement_type', 'Settlement_Type', 'SettlementType'],
+    'settlement_date': ['settlement_date', 'Settlement_Date', 'SettlementDate'],
+}
+
+# Resolution plan: (standard name, item key) pairs in alias-table order
+ResolutionPlan = Tuple[Tuple[str, str], ...]
+
+
+def alias_field_names(aliases: Dict[str, List[str]] = KEY_FIELD_ALIASES) -> List[str]:
+    """Return every item key the alias table can read, in table order without duplicates."""
+    return list(dict.fromkeys(variation for variations in aliases.values() for variation in variations))
+
+
+class FieldAliasResolver:
+    """
+    Resolves item fields to standard attribute names using cached per-shape plans.
+
+    Thread-safe; plans are kept in a bounded LRU so that tables with unusual
+    key churn cannot grow the cache without limit.
+    """
+
+    def __init__(self, aliases: Dict[str, List[str]] = KEY_FIELD_ALIASES, max_plans: int = 1024):
+        """
+        Compile the alias table.
+
+        Args:
+            aliases: Standard attribute name -> field spellings in priority order
+            max_plans: Maximum number of cached schema-shape plans
+        """
+        self.aliases = aliases
+        self.max_plans = max_plans
+        # Reverse lookup: item key -> list of (standard name, priority)
+        self._candidates: Dict[str, List[Tuple[str, int]]] = {}
+        for standard_name, variations in aliases.items():
+            for priority, variation in enumerate(variations):
+                self._candidates.setdefault(variation, []).append((standard_name, priority))
+        self._standard_order = {name: position for position, name in enumerate(aliases)}
+
+        self._plans: "OrderedDict[FrozenSet[str], ResolutionPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def compile_plan(self, keys: FrozenSet[str]) -> ResolutionPlan:
+        """Build the resolution plan for one item key set."""
+        best: Dict[str, Tuple[int, str]] = {}
+        for key in keys:
+            for standard_name, priority in self._candidates.get(key, ()):
+                current = best.get(standard_name)
+                if current is None or priority < current[0]:
+                    best[standard_name] = (priority, key)
+        ordered = sorted(best.items(), key=lambda entry: self._standard_order[entry[0]])
+        return tuple((standard_name, key) for standard_name, (_, key) in ordered)
+
+    def plan_for(self, item: Dict[str, Any]) -> ResolutionPlan:
+        """Return the cached plan for an item's key set, compiling it on first sight."""
+        signature = frozenset(item)
+        with self._lock:
+            plan = self._plans.get(signature)
+            if plan is not None:
+                self.hits += 1
+                self._plans.move_to_end(signature)
+                return plan
+            self.misses += 1
+
+        plan = self.compile_plan(signature)
+        with self._lock:
+            self._plans[signature] = plan
+            if len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+        return plan
+
+    def resolve(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract standard attributes from an item."""
+        return {standard_name: item[key] for standard_name, key in self.plan_for(item)}
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters; schema_shapes is the number of distinct key sets seen and cached."""
+        with self._lock:
+            return {
+                "schema_shapes": len(self._plans),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,135 @@
+"""
+LEI Hash Join for the Trade Matching Agent
+
+An equal party_b_lei is authoritative in the CDM match rules: the fuzzy
+counterparty-name rule only runs when the LEIs are missing or differ. The
+blocking index does not know this, so a source trade carrying an LEI is still
+scored against every trade in its (currency, product type, date) block and the
+LEI equality is only discovered while scoring.
+
+LeiJoinIndex is a hash index from (normalized LEI, normalized currency) to the
+positions of the target trades carrying them. When the source trade has an
+LEI and a currency, candidate generation is one dict probe, followed by the
+trade-date tolerance check on the (few) trades of that counterparty and
+currency. Every probed candidate shares the source LEI, so no counterparty
+name is ever compared for them.
+
+The caller decides whether the LEI candidates are good enough (see
+find_trade_matches) and falls back to the blocked candidate set otherwise;
+LeiJoinTracker counts how often each outcome occurs.
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from match_normalizers import normalize_currency, normalize_lei
+
+DEFAULT_DATE_TOLERANCE_DAYS = 2
+
+# Probe outcomes counted by LeiJoinTracker
+LEI_PATH = "lei_path"
+NO_SOURCE_LEI = "no_source_lei"
+NO_LEI_CANDIDATES = "no_lei_candidates"
+BELOW_THRESHOLD = "below_threshold"
+OUTCOMES = (LEI_PATH, NO_SOURCE_LEI, NO_LEI_CANDIDATES, BELOW_THRESHOLD)
+
+LeiKey = Tuple[str, str]
+
+
+def lei_key(attributes: Dict) -> Optional[LeiKey]:
+    """(normalized LEI, normalized currency) of CDM-aligned attributes, or None if either is missing."""
+    lei = attributes.get('party_b_lei')
+    currency = attributes.get('currency')
+    if lei is None or currency is None:
+        return None
+    # Same normalization as the match rules, so a probe hit is a currency and LEI match
+    lei, currency = normalize_lei(lei), normalize_currency(currency)
+    if not lei.strip() or not currency.strip():
+        return None
+    return lei, currency
+
+
+class LeiJoinIndex:
+    """Hash index of target trades by (LEI, currency), with trade-date ordinals for the tolerance check."""
+
+    def __init__(
+        self,
+        trades: List[Dict],
+        extract_attributes: Callable[[Dict], Dict],
+        parse_date: Callable[[Any], Optional[datetime]],
+        date_tolerance_days: int = DEFAULT_DATE_TOLERANCE_DAYS,
+    ):
+        """
+        Build the index.
+
+        Args:
+            trades: Trades from the table being searched (the target table)
+            extract_attributes: Function returning CDM-aligned attributes for a trade
+            parse_date: Function parsing a raw date value into a datetime (or None)
+            date_tolerance_days: Trade-date tolerance of a probe
+        """
+        self.date_tolerance_days = date_tolerance_days
+        self._parse_date = parse_date
+        # Key -> (trade-date ordinal or None, position), in ascending position order
+        self._index: Dict[LeiKey, List[Tuple[Optional[int], int]]] = {}
+        for position, trade in enumerate(trades):
+            attributes = extract_attributes(trade)
+            key = lei_key(attributes)
+            if key is not None:
+                self._index.setdefault(key, []).append((self._ordinal(attributes), position))
+
+    def _ordinal(self, attributes: Dict) -> Optional[int]:
+        trade_date = self._parse_date(attributes.get('trade_date'))
+        return trade_date.toordinal() if trade_date else None
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._index.values())
+
+    def probe(self, source: Dict) -> Optional[List[int]]:
+        """
+        Positions of the target trades with the source's LEI and currency.
+
+        Trades dated outside the tolerance are dropped; trades without a
+        parseable trade date are kept, as in blocking.
+
+        Args:
+            source: CDM-aligned attributes of the source trade
+
+        Returns:
+            Positions in ascending order (possibly empty), or None if the source
+            has no LEI or currency to probe with
+        """
+        key = lei_key(source)
+        if key is None:
+            return None
+        entries = self._index.get(key, ())
+        source_ordinal = self._ordinal(source)
+        if source_ordinal is None:
+            return [position for _, position in entries]
+        return [
+            position for ordinal, position in entries
+            if ordinal is None or abs(ordinal - source_ordinal) <= self.date_tolerance_days
+        ]
+
+
+class LeiJoinTracker:
+    """Thread-safe counts of LEI probe outcomes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = dict.fromkeys(OUTCOMES, 0)
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the counters and the share of source trades matched on the LEI path."""
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        return {
+            "probes": counts,
+            "lei_path_fraction": round(counts[LEI_PATH] / total, 4) if total else None,
+        }
@@ -0,0 +1,298 @@
+"""
+Content-Hash Match-Result Cache
+
+Caches the result of scoring one (source, target) trade pair under
+
+    <rules version>/<hash of source match attributes>/<hash of target match attributes>
+
+The hashes cover exactly the attributes the match rules read
+(RuleSet.match_attributes), so a change to either trade's match attributes
+or to the rule set produces a new key: stale entries are never looked up
+again, no explicit invalidation is needed, and the cached result of an
+unchanged pair is reused instead of recomputed. Only what callers resolve
+through the cache is cached; the Strands agent caches the phase-2 breakdowns
+of its top-k survivors, not the cheap phase-1 points or allocation leg scores.
+
+Two tiers:
+- an in-process LRU of serialized results (MatchResultCache)
+- an optional persistent store shared by all instances: a DynamoDB table
+  (DynamoDBResultStore, entries expire through TTL) or an S3 prefix
+  (S3ResultStore, expire through a lifecycle rule)
+
+Results are stored as JSON with Decimals preserved; tuples come back as
+lists, sets as sorted lists and other values as their str(). Store errors are logged and treated as misses; the cache
+never fails a match.
+
+This module has no dependencies besides boto3/botocore; the web portal
+carries an identical copy in app/services/match_cache.py.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+# BatchGetItem / BatchWriteItem request limits
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+MAX_UNPROCESSED_RETRIES = 5
+
+_MISS = object()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+def _json_object_hook(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and '__decimal__' in value:
+        return Decimal(value['__decimal__'])
+    return value
+
+
+def _hash_default(value: Any) -> Any:
+    # Tagged with the type, so Decimal('1'), 1.0 and '1' (which may be reported differently) hash apart
+    if isinstance(value, (set, frozenset)):
+        return {'__set__': sorted(map(str, value))}
+    return {f"__{type(value).__name__}__": str(value)}
+
+
+def content_hash(attributes: Dict[str, Any]) -> str:
+    """Stable hash of a trade's match attributes (key order does not matter)."""
+    canonical = json.dumps(attributes, sort_keys=True, separators=(',', ':'), default=_hash_default)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _serialize(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), default=_json_default)
+
+
+class DynamoDBResultStore:
+    """Persistent tier in a DynamoDB table keyed by cache_key, expiring through TTL."""
+
+    def __init__(
+        self,
+        client: Any,
+        table_name: str,
+        ttl_seconds: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            client: boto3 DynamoDB client
+            table_name: Table with string hash key 'cache_key' and TTL attribute 'ttl'
+            ttl_seconds: Lifetime of an entry, or None to keep entries until evicted by hand
+            clock: Time source (seconds since the epoch)
+        """
+        self.client = client
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        now = self._clock()
+        for start in range(0, len(keys), BATCH_GET_LIMIT):
+            request = {self.table_name: {
+                'Keys': [{'cache_key': {'S': key}} for key in keys[start:start + BATCH_GET_LIMIT]],
+                'ProjectionExpression': 'cache_key, payload, #ttl',
+                'ExpressionAttributeNames': {'#ttl': 'ttl'},
+            }}
+            for attempt in range(MAX_UNPROCESSED_RETRIES + 1):
+                response = self.client.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    # TTL deletion is lazy; expired entries can still be read
+                    if 'ttl' in item and float(item['ttl']['N']) <= now:
+                        continue
+                    found[item['cache_key']['S']] = item['payload']['S']
+                request = response.get('UnprocessedKeys') or {}
+                if not request:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+        return found
+
+    def put_many(self, payloads: Dict[str, str]) -> None:
+        expires = int(self._clock() + self.ttl_seconds) if self.ttl_seconds else None
+        items = []
+        for key, payload in payloads.items():
+            item = {'cache_key': {'S': key}, 'payload': {'S': payload}}
+            if expires is not None:
+                item['ttl'] = {'N': str(expires)}
+            items.append({'PutRequest': {'Item': item}})
+        for start in range(0, len(items), BATCH_WRITE_LIMIT):
+            request = {self.table_name: items[start:start + BATCH_WRITE_LIMIT]}
+            for attempt in range(MAX_UNPROCESSED_RETRIES + 1):
+                response = self.client.batch_write_item(RequestItems=request)
+                request = response.get('UnprocessedItems') or {}
+                if not request:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+
+
+class S3ResultStore:
+    """Persistent tier as one JSON object per entry under an S3 prefix."""
+
+    def __init__(self, client: Any, bucket: str, prefix: str = 'match-cache/'):
+        """
+        Args:
+            client: boto3 S3 client
+            bucket: Bucket name
+            prefix: Key prefix of the cache objects
+        """
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        for key in keys:
+            try:
+                response = self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}.json")
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                    continue
+                raise
+            found[key] = response['Body'].read().decode('utf-8')
+        return found
+
+    def put_many(self, payloads: Dict[str, str]) -> None:
+        for key, payload in payloads.items():
+            self.client.put_object(
+                Bucket=self.bucket, Key=f"{self.prefix}{key}.json",
+                Body=payload.encode('utf-8'), ContentType='application/json',
+            )
+
+
+class MatchResultCache:
+    """In-process LRU of pair results with an optional persistent tier."""
+
+    def __init__(self, rules_version: str, max_entries: int = 50000, store: Optional[Any] = None):
+        """
+        Args:
+            rules_version: RuleSet.version of the rules producing the results
+            max_entries: LRU capacity; 0 disables the in-process tier
+            store: DynamoDBResultStore, S3ResultStore or None
+        """
+        self.rules_version = rules_version
+        self.max_entries = max_entries
+        self.store = store
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.store_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self.store is not None
+
+    def key(self, source_hash: str, target_hash: str) -> str:
+        return f"{self.rules_version}/{source_hash}/{target_hash}"
+
+    def _remember(self, key: str, payload: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Cached results for the keys that have one, checking the LRU, then the store."""
+        payloads: Dict[str, str] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                payload = self._entries.get(key)
+                if payload is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                payloads[key] = payload
+            self.memory_hits += len(payloads)
+
+        stored: Dict[str, str] = {}
+        if missing and self.store is not None:
+            try:
+                stored = self.store.get_many(missing)
+            except (ClientError, BotoCoreError) as e:
+                self.store_errors += 1
+                logger.warning(f"Match cache store read failed, treating {len(missing)} entries as misses: {e}")
+            for key, payload in stored.items():
+                self._remember(key, payload)
+            payloads.update(stored)
+        with self._lock:
+            self.store_hits += len(stored)
+            self.misses += len(missing) - len(stored)
+        return {key: json.loads(payload, object_hook=_json_object_hook) for key, payload in payloads.items()}
+
+    def put_many(self, results: Dict[str, Any]) -> None:
+        """Store computed results in both tiers."""
+        payloads = {key: _serialize(result) for key, result in results.items()}
+        for key, payload in payloads.items():
+            self._remember(key, payload)
+        if payloads and self.store is not None:
+            try:
+                self.store.put_many(payloads)
+            except (ClientError, BotoCoreError) as e:
+                self.store_errors += 1
+                logger.warning(f"Match cache store write failed for {len(payloads)} entries: {e}")
+
+    def resolve(self, requests: Sequence[Tuple[str, Callable[[], Any]]]) -> List[Any]:
+        """
+        Results of (key, compute) requests in order; only misses are computed.
+
+        Cached results come back deserialized from JSON, computed ones as
+        returned by compute().
+        """
+        if not self.enabled:
+            return [compute() for _, compute in requests]
+        cached = self.get_many(key for key, _ in requests)
+        computed: Dict[str, Any] = {}
+        results = []
+        for key, compute in requests:
+            result = cached.get(key, _MISS)
+            if result is _MISS:
+                result = computed.get(key, _MISS)
+                if result is _MISS:
+                    result = computed[key] = compute()
+            results.append(result)
+        if computed:
+            self.put_many(computed)
+        return results
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        return self.resolve([(key, compute)])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return {
+            'rules_version': self.rules_version,
+            'entries': size,
+            'max_entries': self.max_entries,
+            'persistent_tier': type(self.store).__name__ if self.store is not None else None,
+            'memory_hits': self.memory_hits,
+            'store_hits': self.store_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.store_hits) / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'store_errors': self.store_errors,
+        }
@@ -0,0 +1,199 @@
+"""
+CDM Match Normalizers for the Trade Matching Agent
+
+Pure normalization and comparison helpers used by both the scalar scorer
+(_calculate_match_score) and the vectorized BatchScorer. Keeping them in one
+place is what guarantees that both scorers produce identical results.
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, FrozenSet, Optional
+
+from date_parsing import DateParser
+
+# Date formats accepted by parse_date, tried in order
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%B %d, %Y",
+    "%Y%m%d",
+]
+
+# Legal suffixes stripped before fuzzy counterparty comparison
+COUNTERPARTY_SUFFIXES = [
+    'LIMITED', 'LTD', 'LLC', 'INC', 'CORP', 'CORPORATION',
+    'INTERNATIONAL', 'INTL', 'INT\'L', 'PLC', 'SA', 'AG', 'GMBH',
+    '(CAYMAN)', 'CAYMAN', 'LP', 'LLP',
+]
+
+DAY_COUNT_ALIASES = {
+    'ACT/360': ['ACT/360', 'ACTUAL/360', 'A/360'],
+    'ACT/365': ['ACT/365', 'ACTUAL/365', 'A/365', 'ACT/365F', 'ACT/365FIXED'],
+    '30/360': ['30/360', '30E/360', 'BOND', 'BONDBASIS'],
+    'ACT/ACT': ['ACT/ACT', 'ACTUAL/ACTUAL', 'ACT/ACTISDA', 'ACT/ACTISMA'],
+}
+
+PAYMENT_FREQUENCY_ALIASES = {
+    'MONTHLY': ['MONTHLY', '1M', 'M', 'MONTH'],
+    'QUARTERLY': ['QUARTERLY', '3M', 'Q', 'QUARTER'],
+    'SEMI_ANNUAL': ['SEMI_ANNUAL', 'SEMIANNUAL', '6M', 'S', 'SEMI-ANNUAL'],
+    'ANNUAL': ['ANNUAL', '12M', 'A', 'YEARLY', '1Y'],
+}
+
+RATE_INDEX_ALIASES = {
+    'SOFR': ['SOFR', 'USD-SOFR', 'SECURED OVERNIGHT FINANCING RATE'],
+    'EURIBOR': ['EURIBOR', 'EUR-EURIBOR', 'EURO INTERBANK OFFERED RATE'],
+    'ESTR': ['ESTR', 'EUR-ESTR', '€STR', 'EURO SHORT-TERM RATE'],
+    'SONIA': ['SONIA', 'GBP-SONIA', 'STERLING OVERNIGHT INDEX AVERAGE'],
+    'LIBOR': ['LIBOR', 'USD-LIBOR', 'GBP-LIBOR', 'EUR-LIBOR'],
+    'EIBOR': ['EIBOR', 'AED-EIBOR', 'EMIRATES INTERBANK OFFERED RATE'],
+}
+
+# Alias lists are disjoint, so exact-match aliases resolve with one lookup
+_DAY_COUNT_LOOKUP = {alias: standard for standard, aliases in DAY_COUNT_ALIASES.items() for alias in aliases}
+_PAYMENT_FREQUENCY_LOOKUP = {
+    alias: standard for standard, aliases in PAYMENT_FREQUENCY_ALIASES.items() for alias in aliases
+}
+# Substring aliases are checked in declaration order; the last hit wins
+_RATE_INDEX_SEQUENCE = [(alias, standard) for standard, aliases in RATE_INDEX_ALIASES.items() for alias in aliases]
+
+
+_date_parser = DateParser(DATE_FORMATS)
+
+
+def parse_date(date_str: str) -> Optional[datetime]:
+    """Parse various date formats to datetime object."""
+    return _date_parser.parse_date(date_str)
+
+
+def parse_date_ordinal(date_str: str) -> Optional[int]:
+    """Parse various date formats to ordinal days (date.toordinal())."""
+    return _date_parser.parse_ordinal(date_str)
+
+
+def dates_within_tolerance(date1_str: str, date2_str: str, tolerance_days: int = 2) -> bool:
+    """Check if two dates are within tolerance (±days)."""
+    date1 = parse_date_ordinal(date1_str)
+    date2 = parse_date_ordinal(date2_str)
+
+    if date1 is not None and date2 is not None:
+        return abs(date1 - date2) <= tolerance_days
+
+    # Fallback to string comparison if parsing fails
+    return str(date1_str).strip() == str(date2_str).strip()
+
+
+# Counterparty names repeat across thousands of comparisons; bound the memoized forms
+COUNTERPARTY_CACHE_SIZE = 16384
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+@lru_cache(maxsize=COUNTERPARTY_CACHE_SIZE)
+def _normalize_counterparty_text(name: str) -> str:
+    name = name.upper()
+    # Suffixes are removed one after another; the order matters (e.g. CORP
+    # before CORPORATION), so this is deliberately not a single alternation
+    for suffix in COUNTERPARTY_SUFFIXES:
+        name = name.replace(suffix, '')
+    # Remove punctuation and extra spaces
+    name = _PUNCTUATION_RE.sub('', name)
+    name = ' '.join(name.split())
+    return name
+
+
+def normalize_counterparty_name(name: Any) -> str:
+    """Normalize a counterparty name: uppercase, strip legal suffixes and punctuation."""
+    return _normalize_counterparty_text(str(name))
+
+
+@lru_cache(maxsize=COUNTERPARTY_CACHE_SIZE)
+def counterparty_tokens(normalized_name: str) -> FrozenSet[str]:
+    """Word set of an already-normalized counterparty name."""
+    return frozenset(normalized_name.split())
+
+
+def fuzzy_match_counterparty(name1: str, name2: str) -> float:
+    """
+    Fuzzy match counterparty names. Returns a score between 0 and 1.
+    Handles variations like:
+    - "Merrill Lynch International" vs "MERRILL LYNCH INTL"
+    - "FAB Global Markets (Cayman) Limited" vs "FAB GLOBAL MARKETS"
+    """
+    if not name1 or not name2:
+        return 0.0
+
+    return normalized_name_similarity(normalize_counterparty_name(name1), normalize_counterparty_name(name2))
+
+
+def normalized_name_similarity(n1: str, n2: str) -> float:
+    """Similarity of two already-normalized counterparty names (see fuzzy_match_counterparty)."""
+    # Exact match after normalization
+    if n1 == n2:
+        return 1.0
+
+    # Check if one contains the other
+    if n1 in n2 or n2 in n1:
+        return 0.9
+
+    # Word overlap scoring
+    words1 = counterparty_tokens(n1)
+    words2 = counterparty_tokens(n2)
+
+    if not words1 or not words2:
+        return 0.0
+
+    # Jaccard similarity
+    return len(words1 & words2) / len(words1 | words2)
+
+
+def normalize_currency(value: Any) -> str:
+    """Normalize a currency code for exact comparison."""
+    return str(value).upper()
+
+
+def normalize_lei(value: Any) -> str:
+    """Normalize an LEI for exact comparison."""
+    return str(value).upper()
+
+
+def normalize_product_type(value: Any) -> str:
+    """Normalize a product type: uppercase with underscores and hyphens as spaces."""
+    return str(value).upper().replace('_', ' ').replace('-', ' ')
+
+
+def normalize_day_count(value: Any) -> str:
+    """Normalize a day count fraction to its standard alias (ACT/360, 30/360, ...)."""
+    day_count = str(value).upper().replace(' ', '').replace('_', '/')
+    return _DAY_COUNT_LOOKUP.get(day_count, day_count)
+
+
+def normalize_payment_frequency(value: Any) -> str:
+    """Normalize a payment frequency to its standard alias (MONTHLY, QUARTERLY, ...)."""
+    frequency = str(value).upper().replace('-', '_').replace(' ', '')
+    return _PAYMENT_FREQUENCY_LOOKUP.get(frequency, frequency)
+
+
+def normalize_rate_index(value: Any) -> str:
+    """Normalize a floating rate index to its standard name (SOFR, EURIBOR, ...)."""
+    index = str(value).upper().replace('-', ' ').replace('_', ' ')
+    normalized = index
+    for alias, standard in _RATE_INDEX_SEQUENCE:
+        if alias in index:
+            normalized = standard
+    return normalized
+
+
+def parse_notional(value: Any) -> float:
+    """Parse a notional amount, ignoring thousands separators. Raises ValueError."""
+    return float(str(value).replace(',', '').replace(' ', ''))
+
+
+def parse_rate(value: Any) -> float:
+    """Parse a fixed rate or price, ignoring separators and percent signs. Raises ValueError."""
+    return float(str(value).replace(',', '').replace('%', ''))
@@ -0,0 +1,555 @@
+"""
+Compiled Match-Rules Engine
+
+One engine behind every trade comparison in the system: the Strands agent's
+CDM scorer, the legacy attribute matcher and the web portal's batch matcher.
+Each of them declares a rule set (fields and alias tables, normalizers,
+comparison kind, weights, tolerances, reporting thresholds) and the engine
+compiles it once, at import, into:
+
+- per-side value getters (alias groups resolved to one value per group),
+- the normalizer of each rule, so a trade is normalized once with prepare()
+  and can then be compared against any number of counterparts,
+- a comparison closure per rule with its tiers and tolerances bound.
+
+A rule set scores either in points (credit is earned points, up to the rule
+weight) or weighted (credit is a 0..1 field score multiplied by the weight).
+
+RuleSet.version fingerprints the rule specs, so results cached under it
+(match_cache.py) are not reused once weights, tolerances or fields change.
+
+This module has no dependencies outside the standard library; rule sets pass
+their normalizers and similarity measures in as callables. The web portal
+carries an identical copy in app/services/match_rules.py.
+"""
+
+import hashlib
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+POINTS = 'points'
+WEIGHTED = 'weighted'
+
+# Normalized value of a field that failed to parse
+UNPARSEABLE = object()
+
+# Prepared value of a rule whose field is absent from the trade
+ABSENT = object()
+
+SOURCE = 'source'
+TARGET = 'target'
+
+# A comparison returns (credit, detail, display):
+# - credit: earned points (POINTS) or field score (WEIGHTED)
+# - detail: extra metrics of the comparison, or None when there is nothing
+#   to report (the field is treated as missing, or was not scored)
+# - display: (source, target) values to report, or None for the raw values
+Comparison = Tuple[float, Optional[Dict[str, Any]], Optional[Tuple[Any, Any]]]
+Comparator = Callable[[Any, Any], Comparison]
+
+
+def _tier_credit(value: float, tiers: Sequence[Tuple[float, float]]) -> Optional[float]:
+    """Credit of the first (limit, credit) tier with value <= limit, or None."""
+    for limit, credit in tiers:
+        if value <= limit:
+            return credit
+    return None
+
+
+# ----------------------------------------------------------------------------
+# Comparison kinds; each factory binds a rule's parameters into a closure
+# ----------------------------------------------------------------------------
+
+def _equal(full: float) -> Comparator:
+    def compare(a: Any, b: Any) -> Comparison:
+        return (full if a == b else 0.0), {}, None
+    return compare
+
+
+def _containment(full: float, partial: float, otherwise: Optional[Callable[[Any, Any], float]] = None) -> Comparator:
+    """Full credit when equal, partial when one contains the other, else otherwise(a, b) * full."""
+    def compare(a: Any, b: Any) -> Comparison:
+        if a == b:
+            return full, {}, None
+        if a in b or b in a:
+            return partial, {}, None
+        return (otherwise(a, b) * full if otherwise else 0.0), {}, None
+    return compare
+
+
+def _dates(
+    full: float,
+    tiers: Sequence[Tuple[float, float]],
+    decay: Optional[float] = None,
+    compare_text: bool = False,
+) -> Comparator:
+    """
+    Dates normalized to (ordinal, text). Tiers are (max days apart, credit);
+    beyond them credit decays by `decay` per day, or is 0. Unparsed dates
+    score full credit on equal text when compare_text is set, otherwise 0.
+    """
+    def compare(a: Tuple[Optional[int], str], b: Tuple[Optional[int], str]) -> Comparison:
+        a_day, a_text = a
+        b_day, b_text = b
+        if a_day is None or b_day is None:
+            return (full if compare_text and a_text == b_text else 0.0), {}, None
+        days = abs(a_day - b_day)
+        credit = _tier_credit(days, tiers)
+        if credit is None:
+            credit = max(0.0, full - days * decay) if decay is not None else 0.0
+        return credit, {}, None
+    return compare
+
+
+def _relative_difference(
+    full: float,
+    tiers: Sequence[Tuple[float, float]] = (),
+    base: str = SOURCE,
+    decay: Optional[float] = None,
+    guard: Optional[str] = None,
+    missing_credit: float = 0,
+    report_percent: bool = False,
+    floor: float = 0.0,
+) -> Comparator:
+    """
+    Numbers compared by |a - b| / base, base being the source value or the
+    larger of the two. Tiers are (max relative difference, credit); beyond
+    them credit decays linearly by `decay` down to `floor`, or is 0.
+
+    Guards, checked before the difference is taken:
+    - 'positive_source': a source value <= 0 is not scored
+    - 'nonzero': equal values score full credit, a zero on one side scores 0
+    - 'positive': equal values score full credit, a value <= 0 on either
+      side counts as missing and scores missing_credit
+    """
+    def compare(a: Any, b: Any) -> Comparison:
+        if a is UNPARSEABLE or b is UNPARSEABLE:
+            return 0.0, {'error': 'parse_error'}, None
+        if guard == 'positive_source' and not a > 0:
+            return 0.0, None, None
+        if guard in ('nonzero', 'positive') and a == b:
+            return full, {}, None
+        if guard == 'nonzero' and (a == 0 or b == 0):
+            return 0.0, {}, None
+        if guard == 'positive' and not (a > 0 and b > 0):
+            return missing_credit, None, None
+        difference = abs(a - b) / (a if base == SOURCE else max(a, b))
+        credit = _tier_credit(difference, tiers)
+        if credit is None:
+            credit = max(floor, full - difference * decay) if decay is not None else 0.0
+        detail = {'diff_pct': round(difference * 100, 2)} if report_percent else {}
+        return credit, detail, (a, b)
+    return compare
+
+
+def _basis_points(full: float, tiers: Sequence[Tuple[float, float]]) -> Comparator:
+    """
+    Rates compared in basis points. A rate above 1 facing one below 1 is
+    read as a percentage. Tiers are (max bps apart, credit).
+    """
+    def compare(a: Any, b: Any) -> Comparison:
+        if a is UNPARSEABLE or b is UNPARSEABLE:
+            return 0.0, {'error': 'parse_error'}, None
+        if a > 1 and b < 1:
+            a = a / 100
+        elif b > 1 and a < 1:
+            b = b / 100
+        diff_bps = abs(a - b) * 10000
+        credit = _tier_credit(diff_bps, tiers)
+        return (credit if credit is not None else 0.0), {'diff_bps': round(diff_bps, 2)}, (a, b)
+    return compare
+
+
+def _similarity(
+    full: float, measure: Callable[[Any, Any], float], tiers: Optional[Sequence[Tuple[float, float]]] = None
+) -> Comparator:
+    """
+    Similarity in 0..1 from measure(a, b); for multi-valued fields the best
+    pair counts. Tiers are (min similarity, credit); without tiers the
+    credit is similarity * full.
+    """
+    def compare(a: Any, b: Any) -> Comparison:
+        if isinstance(a, tuple):
+            similarity = max(measure(x, y) for x in a for y in b)
+        else:
+            similarity = measure(a, b)
+        if tiers is None:
+            credit = similarity * full
+        else:
+            credit = next((credit for minimum, credit in tiers if similarity >= minimum), 0.0)
+        return credit, {'similarity': round(similarity, 2)}, None
+    return compare
+
+
+def _value(full: float, tolerance: float, text_credit: float) -> Comparator:
+    """
+    Untyped values: missing on one side scores 0, equal values full credit,
+    numbers within `tolerance` relative difference full credit and
+    proportionally less beyond it, strings equal up to case and surrounding
+    whitespace `text_credit`.
+    """
+    def compare(a: Any, b: Any) -> Comparison:
+        if a is None or b is None:
+            return (0.0 if a != b else full), {}, None
+        if a == b:
+            return full, {}, None
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            if a == 0 and b == 0:
+                return full, {}, None
+            largest = max(abs(a), abs(b))
+            if largest == 0:
+                return full, {}, None
+            difference = abs(a - b)
+            if difference <= largest * tolerance:
+                return full, {}, None
+            return max(0.0, full - (difference / largest)), {}, None
+        if isinstance(a, str) and isinstance(b, str):
+            if a.strip().lower() == b.strip().lower():
+                return text_credit, {}, None
+            return 0.0, {}, None
+        return 0.0, {}, None
+    return compare
+
+
+COMPARATORS: Dict[str, Callable[..., Comparator]] = {
+    'equal': _equal,
+    'containment': _containment,
+    'dates': _dates,
+    'relative_difference': _relative_difference,
+    'basis_points': _basis_points,
+    'similarity': _similarity,
+    'value': _value,
+}
+
+
+def decimal_to_float(value: Any) -> Any:
+    """Normalizer for untyped values: DynamoDB Decimals become floats."""
+    return float(value) if isinstance(value, Decimal) else value
+
+
+# ----------------------------------------------------------------------------
+# Compiled rules and evaluation results
+# ----------------------------------------------------------------------------
+
+AliasGroups = Union[str, Sequence[Union[str, Sequence[str]]]]
+
+
+def _alias_groups(spec: AliasGroups) -> List[Tuple[str, ...]]:
+    """'a' -> [('a',)]; ['a', ('b', 'c')] -> [('a',), ('b', 'c')]."""
+    if isinstance(spec, str):
+        return [(spec,)]
+    return [(group,) if isinstance(group, str) else tuple(group) for group in spec]
+
+
+def _compile_getter(
+    groups: List[Tuple[str, ...]], presence: str, default: Any
+) -> Callable[[Dict], Any]:
+    """
+    Value getter for one side: each alias group yields its first truthy
+    value (else the last alias' value), several groups yield a tuple.
+    With presence 'both' a field none of whose aliases is in the trade is
+    ABSENT.
+    """
+    def group_value(trade: Dict, aliases: Tuple[str, ...]) -> Any:
+        value = default
+        for alias in aliases:
+            value = trade.get(alias, default)
+            if value:
+                return value
+        return value
+
+    if len(groups) == 1 and len(groups[0]) == 1:
+        field = groups[0][0]
+        if presence == 'both':
+            return lambda trade: trade.get(field, ABSENT)
+        return lambda trade: trade.get(field, default)
+
+    def get(trade: Dict) -> Any:
+        if presence == 'both' and not any(alias in trade for aliases in groups for alias in aliases):
+            return ABSENT
+        if len(groups) == 1:
+            return group_value(trade, groups[0])
+        return tuple(group_value(trade, aliases) for aliases in groups)
+    return get
+
+
+def _spec_token(value: Any) -> str:
+    """Stable text form of a rule spec value; callables are named by module and qualified name."""
+    if isinstance(value, dict):
+        return '{' + ','.join(f"{key}:{_spec_token(value[key])}" for key in sorted(value)) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_spec_token(item) for item in value) + ']'
+    if callable(value):
+        return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', type(value).__name__)}"
+    if type(value).__repr__ is object.__repr__:
+        # Default reprs carry the object's address, which changes between processes
+        return type(value).__qualname__
+    return repr(value)
+
+
+class CompiledRule:
+    """One rule of a compiled rule set."""
+
+    __slots__ = (
+        'name', 'weight', 'full', 'reason', 'reason_below', 'report_below', 'fallback_for',
+        'display_normalized', 'field', 'get_source', 'get_target', 'normalize', 'kind', 'params', 'compare',
+    )
+
+    def __init__(self, spec: Dict[str, Any], scoring: str):
+        self.name: str = spec['name']
+        self.weight: float = spec['weight']
+        # Credit of a perfect comparison
+        self.full: float = self.weight if scoring == POINTS else 1.0
+        self.reason: Optional[str] = spec.get('reason')
+        self.reason_below: float = spec.get('reason_below', 1.0)
+        self.report_below: float = spec.get('report_below', 1.0)
+        self.fallback_for: Optional[str] = spec.get('fallback_for')
+        self.display_normalized: bool = spec.get('display') == 'normalized'
+
+        presence = spec.get('presence', 'any')
+        default = spec.get('default')
+        fields = spec.get('fields', self.name)
+        source_groups = _alias_groups(spec.get('source_fields', fields))
+        target_groups = _alias_groups(spec.get('target_fields', fields))
+        if len(source_groups) != len(target_groups):
+            raise ValueError(f"Rule {self.name} has {len(source_groups)} source and {len(target_groups)} target alias groups")
+        # The one field both sides read, when the rule has no aliases
+        unaliased = len(source_groups) == 1 and len(source_groups[0]) == 1 and target_groups == source_groups
+        self.field: Optional[str] = source_groups[0][0] if unaliased else None
+        self.get_source = _compile_getter(source_groups, presence, default)
+        self.get_target = _compile_getter(target_groups, presence, default)
+
+        normalize = spec.get('normalize')
+        if normalize is not None and len(source_groups) > 1:
+            single = normalize
+            normalize = lambda values: tuple(single(value) for value in values)  # noqa: E731
+        self.normalize: Optional[Callable[[Any], Any]] = normalize
+
+        # Comparison kind and parameters, for scorers that reimplement a kind (e.g. vectorized)
+        self.kind: str = spec['compare']
+        self.params: Dict[str, Any] = dict(spec.get('params', {}))
+        self.compare: Comparator = COMPARATORS[self.kind](full=self.full, **self.params)
+
+
+class FieldResult:
+    """Outcome of one rule for a pair of trades."""
+
+    __slots__ = ('name', 'weight', 'credit', 'earned', 'counted', 'source', 'target', 'detail', '_rule')
+
+    def __init__(self, rule: CompiledRule, credit: float, earned: float, counted: bool,
+                 source: Any, target: Any, detail: Optional[Dict[str, Any]]):
+        self.name = rule.name
+        self.weight = rule.weight
+        self.credit = credit
+        self.earned = earned
+        self.counted = counted
+        self.source = source
+        self.target = target
+        self.detail = detail
+        self._rule = rule
+
+    @property
+    def match(self) -> Union[bool, str]:
+        """True on full credit, 'partial' on some credit, else False."""
+        if self.credit >= self._rule.full:
+            return True
+        return 'partial' if self.credit > 0 else False
+
+    @property
+    def reportable(self) -> bool:
+        """False when the field was missing or not scored."""
+        return self.detail is not None
+
+    @property
+    def is_difference(self) -> bool:
+        return self.detail is not None and self.credit < self._rule.report_below
+
+    @property
+    def reason(self) -> Optional[str]:
+        rule = self._rule
+        if rule.reason and self.detail is not None and self.credit < rule.reason_below:
+            return rule.reason
+        return None
+
+    def __repr__(self) -> str:
+        return f"FieldResult({self.name!r}, credit={self.credit!r}, source={self.source!r}, target={self.target!r})"
+
+
+class Evaluation:
+    """Field results of comparing two trades plus the totals."""
+
+    __slots__ = ('results', 'earned', 'possible', '_reason_order')
+
+    def __init__(self, results: List[FieldResult], earned: float, possible: float,
+                 reason_order: Optional[Dict[str, int]]):
+        self.results = results
+        self.earned = earned
+        self.possible = possible
+        self._reason_order = reason_order
+
+    def __getitem__(self, name: str) -> FieldResult:
+        for result in self.results:
+            if result.name == name:
+                return result
+        raise KeyError(name)
+
+    def scores(self) -> Dict[str, float]:
+        """Field name -> credit, in rule order."""
+        return {result.name: result.credit for result in self.results}
+
+    def differences(self) -> List[FieldResult]:
+        """Reportable results below their rule's report threshold, in rule order."""
+        return [result for result in self.results if result.is_difference]
+
+    def reason_codes(self) -> List[str]:
+        """Reason codes of the results below their rule's reason threshold."""
+        codes = [result.reason for result in self.results if result.reason]
+        if self._reason_order is not None:
+            codes.sort(key=lambda code: self._reason_order.get(code, len(self._reason_order)))
+        return codes
+
+
+class PreparedTrade:
+    """A trade with every rule's value resolved and normalized for one side."""
+
+    __slots__ = ('trade', 'side', 'values')
+
+    def __init__(self, trade: Dict, side: str, values: List[Any]):
+        self.trade = trade
+        self.side = side
+        self.values = values
+
+
+class RuleSet:
+    """
+    A declarative rule set compiled for repeated evaluation.
+
+    Each rule spec is a dict:
+
+    - name: result name; also the field name unless `fields` is given
+    - fields / source_fields / target_fields: alias groups, e.g.
+      'currency' or [('counterparty', 'seller'), 'buyer']
+    - presence: 'both' to compare only when the field is on both sides
+      (default 'any': absent fields take `default`)
+    - normalize: callable applied to each value before comparison
+    - compare: comparison kind (COMPARATORS) and params: its tolerances/tiers
+    - weight: points (POINTS scoring) or weight of the 0..1 field score
+    - fallback_for: name of a preceding rule; this rule is skipped when that
+      one earned full credit and its weight only counts when that one was
+      not compared
+    - report_below / reason / reason_below: thresholds for differences()
+      and reason_codes()
+    - display: 'normalized' to report normalized instead of raw values
+
+    `version` is the given label plus a digest of the specs. Normalizers and
+    measures enter the digest by name only, so bump the label when their
+    behaviour changes.
+    """
+
+    def __init__(self, rules: Iterable[Dict[str, Any]], scoring: str = WEIGHTED,
+                 reason_order: Optional[Sequence[str]] = None, version: str = '1'):
+        if scoring not in (POINTS, WEIGHTED):
+            raise ValueError(f"Unknown scoring: {scoring}")
+        self.scoring = scoring
+        specs = list(rules)
+        digest = hashlib.blake2b(
+            _spec_token([scoring, list(reason_order or []), specs]).encode('utf-8'), digest_size=6
+        ).hexdigest()
+        self.version = f"{version}-{digest}"
+        self.rules: List[CompiledRule] = [CompiledRule(spec, scoring) for spec in specs]
+        positions = {rule.name: position for position, rule in enumerate(self.rules)}
+        self._fallback_of: List[Optional[int]] = []
+        for position, rule in enumerate(self.rules):
+            if rule.fallback_for is not None and positions.get(rule.fallback_for, position) >= position:
+                raise ValueError(f"Rule {rule.name} falls back to {rule.fallback_for}, which must precede it")
+            self._fallback_of.append(positions[rule.fallback_for] if rule.fallback_for is not None else None)
+        self._reason_order = (
+            {code: rank for rank, code in enumerate(reason_order)} if reason_order is not None else None
+        )
+        # Per-rule bindings unpacked once per evaluation loop step
+        self._plan = [
+            (position, rule, rule.get_source, rule.get_target, rule.normalize, rule.compare, self._fallback_of[position])
+            for position, rule in enumerate(self.rules)
+        ]
+
+    def prepare(self, trade: Dict, side: str = SOURCE) -> PreparedTrade:
+        """Resolve and normalize a trade's fields once, for comparisons on one side."""
+        values = []
+        for rule in self.rules:
+            value = rule.get_source(trade) if side == SOURCE else rule.get_target(trade)
+            if value is not ABSENT:
+                value = (value, rule.normalize(value) if rule.normalize is not None else value)
+            values.append(value)
+        return PreparedTrade(trade, side, values)
+
+    def match_attributes(self, trade: Dict, side: str = SOURCE) -> Dict[str, Any]:
+        """
+        The raw values the rules read from a trade on one side, by rule name.
+
+        Two trades with equal match attributes score identically against any
+        counterpart, so this is what a result cache hashes.
+        """
+        attributes = {}
+        for rule in self.rules:
+            value = rule.get_source(trade) if side == SOURCE else rule.get_target(trade)
+            if value is not ABSENT:
+                attributes[rule.name] = value
+        return attributes
+
+    def evaluate(self, source: Union[Dict, PreparedTrade], target: Union[Dict, PreparedTrade]) -> Evaluation:
+        """
+        Compare two trades.
+
+        Args:
+            source: Source-side trade, or prepare(trade, SOURCE)
+            target: Target-side trade, or prepare(trade, TARGET)
+
+        Returns:
+            Evaluation with a FieldResult per compared rule
+        """
+        # Raw trades are resolved lazily, so fields absent on the other side are never normalized
+        s_values = source.values if isinstance(source, PreparedTrade) else None
+        t_values = target.values if isinstance(target, PreparedTrade) else None
+
+        points = self.scoring == POINTS
+        results: List[FieldResult] = []
+        by_position: Dict[int, FieldResult] = {}
+        earned_total = 0.0
+        possible = 0.0
+        for position, rule, get_source, get_target, normalize, compare, fallback_of in self._plan:
+            s_value = s_values[position] if s_values is not None else get_source(source)
+            if s_value is ABSENT:
+                continue
+            t_value = t_values[position] if t_values is not None else get_target(target)
+            if t_value is ABSENT:
+                continue
+            counted = True
+            if fallback_of is not None and fallback_of in by_position:
+                primary = by_position[fallback_of]
+                if primary.credit >= primary._rule.full:
+                    continue
+                counted = False
+            if s_values is not None:
+                s_raw, s_normalized = s_value
+            else:
+                s_raw = s_value
+                s_normalized = normalize(s_value) if normalize is not None else s_value
+            if t_values is not None:
+                t_raw, t_normalized = t_value
+            else:
+                t_raw = t_value
+                t_normalized = normalize(t_value) if normalize is not None else t_value
+            credit, detail, display = compare(s_normalized, t_normalized)
+            earned = credit if points else credit * rule.weight
+            if display is not None:
+                s_raw, t_raw = display
+            elif rule.display_normalized:
+                s_raw, t_raw = s_normalized, t_normalized
+            result = FieldResult(rule, credit, earned, counted, s_raw, t_raw, detail)
+            results.append(result)
+            if fallback_of is None:
+                by_position[position] = result
+            earned_total += earned
+            if counted:
+                possible += rule.weight
+        return Evaluation(results, earned_total, possible, self._reason_order)
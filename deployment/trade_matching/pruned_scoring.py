@@ -0,0 +1,186 @@
+"""
+Pruned Top-K Scoring for the Trade Matching Agent
+
+Two-phase candidate scoring for find_trade_matches:
+
+1. Points only: each candidate's score is computed without building the
+   breakdown. Rules are evaluated in descending weight order, and a
+   candidate is abandoned as soon as its best achievable score (points
+   earned plus the weight of the rules still to evaluate) can no longer
+   beat the current k-th best. Survivors are kept in a bounded min-heap.
+2. Only the k survivors get the full _calculate_match_score breakdown and
+   attribute dicts.
+
+Target-side normalization can be done once per candidate with
+normalize_attributes() and passed to top_k(), so that batches scoring many
+source trades against the same candidates do not re-normalize them.
+
+Fields, weights, normalizers and comparisons are those of the compiled
+CDM_MATCH_RULES that _calculate_match_score evaluates, and the top-k equals a
+stable descending sort of all scores truncated to k (ties keep candidate
+order), so results are unchanged.
+"""
+
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from match_rules import ABSENT, POINTS, SOURCE, TARGET, CompiledRule, RuleSet
+from cdm_rules import CDM_MATCH_RULES
+
+
+def normalize_attributes(attributes: Dict, rules: RuleSet = CDM_MATCH_RULES) -> List[Any]:
+    """Resolve and normalize a candidate's attributes once, as the target side of the rules."""
+    return rules.prepare(attributes, TARGET).values
+
+
+class PrunedMatchScorer:
+    """
+    Points-only scorer for one source trade with upper-bound pruning.
+
+    Source-side normalization is done once in the constructor, so each
+    candidate only pays for its own side.
+    """
+
+    def __init__(self, source: Dict, rules: RuleSet = CDM_MATCH_RULES):
+        """
+        Args:
+            source: CDM-aligned attributes of the source trade (_extract_key_attributes output)
+            rules: Rule set scored in points; the scores equal its evaluate() earned / possible
+        """
+        if rules.scoring != POINTS:
+            raise ValueError("Pruned scoring needs a rule set scored in points")
+        self.source = source
+        self._rules = rules.rules
+        self._values = rules.prepare(source, SOURCE).values
+
+        # Rules present in the source, grouped into steps: a fallback rule is
+        # evaluated right after the rule it falls back to. Steps run in
+        # descending weight order, ties in rule order.
+        positions = {rule.name: position for position, rule in enumerate(self._rules)}
+        steps: Dict[int, List[int]] = {}
+        for position, rule in enumerate(self._rules):
+            if self._values[position] is ABSENT:
+                continue
+            primary = positions[rule.fallback_for] if rule.fallback_for is not None else position
+            steps.setdefault(primary, []).append(position)
+        self._steps = sorted(
+            steps.values(), key=lambda step: -max(self._rules[position].weight for position in step)
+        )
+
+    def _comparable(
+        self, target: Dict, normalized: Optional[List[Any]]
+    ) -> Tuple[List[Tuple[float, List[Tuple[CompiledRule, Any, Any]]]], float]:
+        """
+        Steps applicable to a target, i.e. rules present on both sides.
+
+        Returns:
+            ([(step bound, [(rule, source value, target value)])], points possible),
+            values being normalized except targets that were not pre-normalized
+        """
+        comparable = []
+        possible = 0.0
+        for step in self._steps:
+            members = []
+            bound = 0.0
+            primary_compared = False
+            for position in step:
+                rule = self._rules[position]
+                t_value = normalized[position] if normalized is not None else rule.get_target(target)
+                if t_value is ABSENT:
+                    continue
+                # A fallback only counts towards the possible points when its rule was not compared
+                if rule.fallback_for is None:
+                    primary_compared = True
+                    possible += rule.weight
+                elif not primary_compared:
+                    possible += rule.weight
+                members.append((rule, self._values[position][1], t_value))
+                bound += rule.full
+            if members:
+                comparable.append((bound, members))
+        return comparable, possible
+
+    def score(
+        self, target: Dict, floor: Optional[float] = None, normalized: Optional[List[Any]] = None
+    ) -> Optional[float]:
+        """
+        Score a target's attributes.
+
+        Args:
+            target: CDM-aligned attributes of the candidate trade
+            floor: Abandon the candidate once its rounded upper bound is <= floor
+            normalized: normalize_attributes(target), if already computed
+
+        Returns:
+            The rounded percentage score (identical to _calculate_match_score's 'score'),
+            or None if the candidate was pruned
+        """
+        comparable, possible = self._comparable(target, normalized)
+        earned = 0.0
+        remaining = sum(bound for bound, _ in comparable)
+        for bound, members in comparable:
+            if floor is not None and round((earned + remaining) / possible * 100, 1) <= floor:
+                return None
+            primary_full = False
+            for rule, s_value, t_value in members:
+                if rule.fallback_for is not None and primary_full:
+                    continue
+                if normalized is not None:
+                    t_value = t_value[1]
+                elif rule.normalize is not None:
+                    t_value = rule.normalize(t_value)
+                credit = rule.compare(s_value, t_value)[0]
+                earned += credit
+                if rule.fallback_for is None:
+                    primary_full = credit >= rule.full
+            remaining -= bound
+        final = round(earned / possible * 100, 1) if possible > 0 else 0.0
+        if floor is not None and final <= floor:
+            return None
+        return final
+
+    def top_k(
+        self, candidates: Iterable[Tuple[int, Dict]], k: int, normalized: Optional[Sequence[List[Any]]] = None
+    ) -> 'TopKResult':
+        """
+        Select the k best candidates.
+
+        Args:
+            candidates: (position, target attributes) pairs in ascending position order
+            k: Number of candidates to keep
+            normalized: normalize_attributes() output indexed by position, shared across source trades
+
+        Returns:
+            TopKResult with (score, position) entries sorted by score descending, then position
+        """
+        heap: List[Tuple[float, int]] = []
+        scored = 0
+        pruned = 0
+        if k <= 0:
+            return TopKResult([], 0, 0)
+        for position, target in candidates:
+            floor = heap[0][0] if len(heap) >= k else None
+            result = self.score(target, floor, normalized[position] if normalized is not None else None)
+            scored += 1
+            if result is None:
+                pruned += 1
+                continue
+            entry = (result, -position)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heapreplace(heap, entry)
+        entries = sorted(((score, -negative) for score, negative in heap), key=lambda e: (-e[0], e[1]))
+        return TopKResult(entries, scored, pruned)
+
+
+class TopKResult:
+    """Survivors of pruned top-k scoring plus counters."""
+
+    def __init__(self, entries: List[Tuple[float, int]], scored: int, pruned: int):
+        self.entries = entries
+        self.scored = scored
+        self.pruned = pruned
+
+    def __repr__(self) -> str:
+        return f"TopKResult(entries={self.entries}, scored={self.scored}, pruned={self.pruned})"
@@ -0,0 +1,279 @@
+"""
+Batch Reconciliation for the Trade Matching Agent
+
+Reconciles a whole business day of bank trades against counterparty trades in
+one pass, instead of matching each trade independently through
+find_trade_matches.
+
+Independent matching lets two bank trades claim the same counterparty trade.
+Here every blocked (bank, counterparty) pair is scored once, pairs below the
+candidate threshold are dropped, and a one-to-one assignment is solved over
+the remaining sparse score graph:
+- "hungarian": maximum total score per connected component, using
+  scipy.optimize.linear_sum_assignment (optional dependency),
+- "greedy": highest-scoring pairs first, skipping trades already assigned.
+
+"auto" uses the Hungarian method when scipy is installed and the component is
+small enough to hold as a dense matrix, and greedy otherwise.
+
+Bank trades that share a blocking key share a candidate set, so each
+candidate set is loaded into a BatchScorer once and scored for all of them.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from batch_scorer import BatchScorer
+from candidate_blocking import CandidateBlockingIndex, DEFAULT_BUCKET_DAYS, DEFAULT_DATE_TOLERANCE_DAYS
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Classification thresholds (same as find_trade_matches)
+MATCHED_THRESHOLD = 85.0
+PROBABLE_MATCH_THRESHOLD = 70.0
+REVIEW_THRESHOLD = 50.0
+
+# Largest component solved as a dense matrix; bigger components fall back to greedy
+DEFAULT_MAX_DENSE_CELLS = 4_000_000
+
+ASSIGNMENT_METHODS = ("auto", "hungarian", "greedy")
+
+# (score, bank position, counterparty position)
+Edge = Tuple[float, int, int]
+
+
+def classify_score(score: Optional[float]) -> str:
+    """Map an assigned pair's score to a match classification."""
+    if score is None:
+        return "BREAK"
+    if score >= MATCHED_THRESHOLD:
+        return "MATCHED"
+    if score >= PROBABLE_MATCH_THRESHOLD:
+        return "PROBABLE_MATCH"
+    if score >= REVIEW_THRESHOLD:
+        return "REVIEW_REQUIRED"
+    return "BREAK"
+
+
+@dataclass
+class ReconciliationResult:
+    """One-to-one assignment between bank and counterparty trades."""
+    # Bank position -> (counterparty position, score)
+    assignments: Dict[int, Tuple[int, float]]
+    bank_count: int
+    counterparty_count: int
+    pairs_scored: int
+    edges: int
+    methods: Dict[str, int] = field(default_factory=dict)
+    # Partitions scored in parallel (ShardedTradeReconciler); 1 when scored in-process
+    shards: int = 1
+
+    def counterparty_for(self, bank_position: int) -> Optional[Tuple[int, float]]:
+        return self.assignments.get(bank_position)
+
+    @property
+    def unmatched_counterparty_positions(self) -> List[int]:
+        assigned = {counterparty for counterparty, _ in self.assignments.values()}
+        return [position for position in range(self.counterparty_count) if position not in assigned]
+
+    def classification_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for bank_position in range(self.bank_count):
+            assigned = self.assignments.get(bank_position)
+            label = classify_score(assigned[1] if assigned else None)
+            counts[label] = counts.get(label, 0) + 1
+        return counts
+
+
+def _components(edges: List[Edge]) -> List[List[Edge]]:
+    """Split a bipartite edge list into connected components (union-find)."""
+    parent: Dict[Tuple[str, int], Tuple[str, int]] = {}
+
+    def find(node):
+        root = node
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for _, bank, counterparty in edges:
+        a, b = find(('b', bank)), find(('c', counterparty))
+        if a != b:
+            parent[a] = b
+
+    grouped: Dict[Tuple[str, int], List[Edge]] = {}
+    for edge in edges:
+        grouped.setdefault(find(('b', edge[1])), []).append(edge)
+    return list(grouped.values())
+
+
+def assign_greedy(edges: List[Edge]) -> Dict[int, Tuple[int, float]]:
+    """Take pairs in descending score order (ties by position) while both sides are free."""
+    assignments: Dict[int, Tuple[int, float]] = {}
+    taken = set()
+    for score, bank, counterparty in sorted(edges, key=lambda edge: (-edge[0], edge[1], edge[2])):
+        if bank in assignments or counterparty in taken:
+            continue
+        assignments[bank] = (counterparty, score)
+        taken.add(counterparty)
+    return assignments
+
+
+def assign_hungarian(edges: List[Edge]) -> Dict[int, Tuple[int, float]]:
+    """Maximum total score one-to-one assignment over one component (requires scipy)."""
+    banks = sorted({edge[1] for edge in edges})
+    counterparties = sorted({edge[2] for edge in edges})
+    row = {bank: i for i, bank in enumerate(banks)}
+    col = {counterparty: j for j, counterparty in enumerate(counterparties)}
+
+    # Missing pairs score 0; all real edges are above the candidate threshold,
+    # so a zero-weight assignment is never preferred and is dropped below
+    weights = np.zeros((len(banks), len(counterparties)), dtype=np.float64)
+    for score, bank, counterparty in edges:
+        weights[row[bank], col[counterparty]] = score
+
+    rows, cols = linear_sum_assignment(weights, maximize=True)
+    assignments: Dict[int, Tuple[int, float]] = {}
+    for i, j in zip(rows, cols):
+        if weights[i, j] > 0:
+            assignments[banks[i]] = (counterparties[j], float(weights[i, j]))
+    return assignments
+
+
+def solve_assignment(
+    edges: List[Edge],
+    method: str = "auto",
+    max_dense_cells: int = DEFAULT_MAX_DENSE_CELLS
+) -> Tuple[Dict[int, Tuple[int, float]], Dict[str, int]]:
+    """
+    Solve the one-to-one assignment over a sparse edge list.
+
+    Returns:
+        (assignments, number of components solved by each method)
+    """
+    if method not in ASSIGNMENT_METHODS:
+        raise ValueError(f"Unknown assignment method: {method}")
+    if method == "hungarian" and not SCIPY_AVAILABLE:
+        raise ValueError("Hungarian assignment requires scipy")
+
+    assignments: Dict[int, Tuple[int, float]] = {}
+    methods = {"hungarian": 0, "greedy": 0}
+    for component in _components(edges):
+        cells = len({edge[1] for edge in component}) * len({edge[2] for edge in component})
+        use_hungarian = (
+            len(component) > 1
+            and method != "greedy"
+            and SCIPY_AVAILABLE
+            and (method == "hungarian" or cells <= max_dense_cells)
+        )
+        if use_hungarian:
+            assignments.update(assign_hungarian(component))
+            methods["hungarian"] += 1
+        else:
+            assignments.update(assign_greedy(component))
+            methods["greedy"] += 1
+    return assignments, methods
+
+
+class TradeReconciler:
+    """Scores blocked candidate pairs for a book and solves the one-to-one assignment."""
+
+    def __init__(
+        self,
+        extract_attributes: Callable[[Dict], Dict],
+        parse_date: Callable[[Any], Any],
+        min_score: float = REVIEW_THRESHOLD,
+        method: str = "auto",
+        bucket_days: int = DEFAULT_BUCKET_DAYS,
+        date_tolerance_days: int = DEFAULT_DATE_TOLERANCE_DAYS,
+        max_dense_cells: int = DEFAULT_MAX_DENSE_CELLS,
+    ):
+        """
+        Args:
+            extract_attributes: Function returning CDM-aligned attributes for a trade
+            parse_date: Function parsing a raw date value into a datetime (or None)
+            min_score: Pairs scoring below this are never assigned
+            method: "auto", "hungarian" or "greedy"
+            bucket_days: Blocking trade-date bucket width
+            date_tolerance_days: Blocking trade-date tolerance
+            max_dense_cells: Largest component solved as a dense matrix in "auto" mode
+        """
+        if method not in ASSIGNMENT_METHODS:
+            raise ValueError(f"Unknown assignment method: {method}")
+        self.extract_attributes = extract_attributes
+        self.parse_date = parse_date
+        self.min_score = min_score
+        self.method = method
+        self.bucket_days = bucket_days
+        self.date_tolerance_days = date_tolerance_days
+        self.max_dense_cells = max_dense_cells
+
+    def score_edges(self, bank_trades: List[Dict], counterparty_trades: List[Dict]) -> Tuple[List[Edge], int]:
+        """
+        Score every blocked pair once.
+
+        Returns:
+            (edges at or above min_score, number of pairs scored)
+        """
+        counterparty_attributes = [self.extract_attributes(trade) for trade in counterparty_trades]
+        index = CandidateBlockingIndex(
+            counterparty_attributes,
+            extract_attributes=_identity,
+            parse_date=self.parse_date,
+            bucket_days=self.bucket_days,
+            date_tolerance_days=self.date_tolerance_days,
+        )
+
+        # Bank trades with the same blocking key share one candidate set
+        groups: Dict[Any, List[Tuple[int, Dict]]] = {}
+        for bank_position, trade in enumerate(bank_trades):
+            attributes = self.extract_attributes(trade)
+            groups.setdefault(index.blocking_key(attributes), []).append((bank_position, attributes))
+
+        edges: List[Edge] = []
+        pairs_scored = 0
+        for key, members in groups.items():
+            positions = index.positions_for_key(key)
+            if not positions:
+                continue
+            scorer = BatchScorer([counterparty_attributes[p] for p in positions], _identity)
+            candidate_positions = np.asarray(positions)
+            for bank_position, attributes in members:
+                scores = scorer.score_attributes(attributes).scores
+                pairs_scored += len(positions)
+                keep = np.flatnonzero(scores >= self.min_score)
+                edges.extend(
+                    (float(scores[k]), bank_position, int(candidate_positions[k])) for k in keep
+                )
+        return edges, pairs_scored
+
+    def reconcile(self, bank_trades: List[Dict], counterparty_trades: List[Dict]) -> ReconciliationResult:
+        """Score and assign a bank book against a counterparty book."""
+        edges, pairs_scored = self.score_edges(bank_trades, counterparty_trades)
+        assignments, methods = solve_assignment(edges, self.method, self.max_dense_cells)
+        logger.info(
+            f"Reconciled {len(bank_trades)} bank / {len(counterparty_trades)} counterparty trades: "
+            f"{pairs_scored} pairs scored, {len(edges)} edges, {len(assignments)} assigned, methods={methods}"
+        )
+        return ReconciliationResult(
+            assignments=assignments,
+            bank_count=len(bank_trades),
+            counterparty_count=len(counterparty_trades),
+            pairs_scored=pairs_scored,
+            edges=len(edges),
+            methods=methods,
+        )
+
+
+def _identity(attributes: Dict) -> Dict:
+    return attributes
@@ -0,0 +1,365 @@
+"""
+Sharded Batch Reconciliation
+
+Scoring a large reconciliation run (TradeReconciler.score_edges) is CPU-bound
+and runs on one core. ShardedTradeReconciler partitions both books by the
+(currency, product type) part of the blocking key and scores the shards in a
+pool of worker processes; the per-shard edges are merged and the one-to-one
+assignment is solved once over the whole book, exactly as in the serial run.
+
+A shard is the set of bank trades with one (currency, product type) key. Its
+counterparty rows are the counterparty trades the blocking index could return
+for that key: the same currency or a missing one, and the same product type
+or a missing one (a missing bank value matches every counterparty value).
+Each worker scores its bank trades against those rows with TradeReconciler
+itself, so every bank trade sees the same candidates and scores as in the
+serial run. Large shards are split into chunks of bank trades (in trade-date
+order, so blocks stay together) to keep the workers evenly loaded.
+
+Both books are extracted once in the parent and packed into one shared memory
+block: an int32 matrix of value codes per (trade, attribute) plus a
+vocabulary of the distinct values, serialized once each. Tasks sent to the
+workers name the block and a range of bank trades; no trade lists are pickled
+per task. The worker pool is started once per process and reused by every
+run.
+"""
+
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import threading
+from decimal import Decimal
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from candidate_blocking import currency_product_key
+from reconciliation import Edge, ReconciliationResult, TradeReconciler
+
+logger = logging.getLogger(__name__)
+
+# Books with fewer bank trades are scored in-process; pool start-up would dominate
+DEFAULT_MIN_PARALLEL_TRADES = 5000
+
+# Chunks per worker, so one slow chunk does not leave the other workers idle
+TASKS_PER_WORKER = 4
+
+# Workers must not inherit the agent's threads and locks
+START_METHOD = "spawn"
+
+# Shard key code of a missing currency or product type (matches every value)
+WILDCARD = -1
+
+# (currency code, product type code, start, stop) into the shared bank order
+Task = Tuple[int, int, int, int]
+
+_UNDECODED = object()
+
+
+class SharedArrays:
+    """NumPy arrays packed into one shared memory block."""
+
+    def __init__(self, memory: SharedMemory, layout: Dict[str, Tuple[int, str, Tuple[int, ...]]]):
+        self.memory = memory
+        self.layout = layout
+
+    @classmethod
+    def create(cls, arrays: Dict[str, np.ndarray]) -> 'SharedArrays':
+        layout: Dict[str, Tuple[int, str, Tuple[int, ...]]] = {}
+        size = 0
+        for name, array in arrays.items():
+            size = -(-size // 8) * 8
+            layout[name] = (size, array.dtype.str, array.shape)
+            size += array.nbytes
+        shared = cls(SharedMemory(create=True, size=max(size, 1)), layout)
+        for name, array in arrays.items():
+            shared[name][...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, name: str, layout: Dict[str, Tuple[int, str, Tuple[int, ...]]]) -> 'SharedArrays':
+        return cls(SharedMemory(name=name), layout)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        offset, dtype, shape = self.layout[name]
+        return np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=offset)
+
+    def release(self) -> None:
+        """Close and remove the block (owner only; views must no longer be in use)."""
+        self.memory.close()
+        self.memory.unlink()
+
+
+def _value_key(value: Any) -> Any:
+    # Equal values that score or report differently (1 and True, Decimal('1') and Decimal('1.0')) get their own entries
+    kind = type(value)
+    if kind in (str, int, float, bool):
+        return kind, value
+    if kind is Decimal:
+        return kind, str(value)
+    return kind, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def encode_rows(rows: Sequence[Dict[str, Any]], fields: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Dictionary-encode attribute dicts as shareable arrays.
+
+    Returns:
+        codes (rows x fields, int32, -1 where absent), vocabulary (uint8 blob of
+        the serialized distinct values) and offsets (int64, one past each value)
+    """
+    codes = np.full((len(rows), len(fields)), -1, dtype=np.int32)
+    vocabulary: Dict[Any, int] = {}
+    blobs: List[bytes] = []
+    for column, name in enumerate(fields):
+        for position, attributes in enumerate(rows):
+            if name not in attributes:
+                continue
+            value = attributes[name]
+            key = _value_key(value)
+            code = vocabulary.get(key)
+            if code is None:
+                code = vocabulary[key] = len(blobs)
+                blobs.append(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            codes[position, column] = code
+    offsets = np.cumsum([len(blob) for blob in blobs], dtype=np.int64) if blobs else np.zeros(0, dtype=np.int64)
+    return {
+        'codes': codes,
+        'vocabulary': np.frombuffer(b''.join(blobs), dtype=np.uint8).copy(),
+        'offsets': offsets,
+    }
+
+
+class RowDecoder:
+    """Rebuilds attribute dicts from encode_rows arrays, deserializing each distinct value once."""
+
+    def __init__(self, codes: np.ndarray, vocabulary: np.ndarray, offsets: np.ndarray, fields: Sequence[str]):
+        self.codes = codes
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.fields = list(fields)
+        self._values: Dict[int, Any] = {}
+
+    def value(self, code: int) -> Any:
+        value = self._values.get(code, _UNDECODED)
+        if value is _UNDECODED:
+            start = int(self.offsets[code - 1]) if code else 0
+            value = self._values[code] = pickle.loads(self.vocabulary[start:int(self.offsets[code])].tobytes())
+        return value
+
+    def rows(self, positions: np.ndarray) -> List[Dict[str, Any]]:
+        value = self.value
+        return [
+            {name: value(code) for name, code in zip(self.fields, row) if code >= 0}
+            for row in self.codes[positions].tolist()
+        ]
+
+
+def shard_mask(currency_codes: np.ndarray, product_codes: np.ndarray, currency: int, product: int) -> np.ndarray:
+    """Counterparty rows the blocking index can return for a (currency, product type) shard key."""
+    mask = np.ones(len(currency_codes), dtype=bool)
+    if currency != WILDCARD:
+        mask &= (currency_codes == currency) | (currency_codes == WILDCARD)
+    if product != WILDCARD:
+        mask &= (product_codes == product) | (product_codes == WILDCARD)
+    return mask
+
+
+def _identity(attributes: Dict) -> Dict:
+    return attributes
+
+
+# ----------------------------------------------------------------------------
+# Worker processes
+# ----------------------------------------------------------------------------
+
+class _ShardWorker:
+    """Per-process view of one run's shared books."""
+
+    def __init__(self, shared: SharedArrays, fields: List[str], bank_count: int, reconciler: TradeReconciler):
+        self.shared = shared
+        self.bank_count = bank_count
+        self.reconciler = reconciler
+        self.decoder = RowDecoder(shared['codes'], shared['vocabulary'], shared['offsets'], fields)
+        self.bank_order = shared['bank_order']
+        self.currency = shared['currency'][bank_count:]
+        self.product = shared['product'][bank_count:]
+
+    def score(self, task: Task) -> Tuple[List[Edge], int]:
+        currency, product, start, stop = task
+        bank_positions = self.bank_order[start:stop]
+        counterparty_positions = np.flatnonzero(shard_mask(self.currency, self.product, currency, product))
+        edges, pairs_scored = self.reconciler.score_edges(
+            self.decoder.rows(bank_positions), self.decoder.rows(counterparty_positions + self.bank_count)
+        )
+        return [
+            (score, int(bank_positions[bank]), int(counterparty_positions[counterparty]))
+            for score, bank, counterparty in edges
+        ], pairs_scored
+
+    def close(self) -> None:
+        # Views into the block must be gone before it can be closed
+        self.decoder = self.bank_order = self.currency = self.product = None
+        self.shared.memory.close()
+
+
+# The run a worker process is attached to: (shared memory name, worker)
+_attached: Optional[Tuple[str, _ShardWorker]] = None
+
+
+def _score_task(job: Tuple[str, Dict, List[str], int, Dict[str, Any], Task]) -> Tuple[List[Edge], int]:
+    global _attached
+    memory_name, layout, fields, bank_count, settings, task = job
+    if _attached is None or _attached[0] != memory_name:
+        if _attached is not None:
+            _attached[1].close()
+            _attached = None
+        reconciler = TradeReconciler(extract_attributes=_identity, **settings)
+        _attached = (memory_name, _ShardWorker(SharedArrays.attach(memory_name, layout), fields, bank_count, reconciler))
+    return _attached[1].score(task)
+
+
+# Worker pool shared by all runs of a process, so workers start (and import) once
+_pool: Optional[Any] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> Any:
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != workers:
+            if _pool is not None:
+                _pool.terminate()
+            _pool = multiprocessing.get_context(START_METHOD).Pool(workers)
+            _pool_size = workers
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool = None
+
+
+# ----------------------------------------------------------------------------
+# Reconciler
+# ----------------------------------------------------------------------------
+
+class ShardedTradeReconciler(TradeReconciler):
+    """TradeReconciler that scores (currency, product type) shards in worker processes."""
+
+    def __init__(
+        self,
+        extract_attributes: Callable[[Dict], Dict],
+        parse_date: Callable[[Any], Any],
+        workers: Optional[int] = None,
+        min_parallel_trades: int = DEFAULT_MIN_PARALLEL_TRADES,
+        **kwargs: Any,
+    ):
+        """
+        Args:
+            extract_attributes: Function returning CDM-aligned attributes for a trade
+            parse_date: Function parsing a raw date value into a datetime (or None); must be
+                importable by the workers (a module-level function)
+            workers: Worker processes; None or 0 for one per CPU, 1 to score in-process
+            min_parallel_trades: Bank books smaller than this are scored in-process
+            **kwargs: TradeReconciler settings (min_score, method, bucket_days, ...)
+        """
+        super().__init__(extract_attributes, parse_date, **kwargs)
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel_trades = min_parallel_trades
+        self.shards = 1
+
+    def _worker_settings(self) -> Dict[str, Any]:
+        return {
+            'parse_date': self.parse_date,
+            'min_score': self.min_score,
+            'method': self.method,
+            'bucket_days': self.bucket_days,
+            'date_tolerance_days': self.date_tolerance_days,
+        }
+
+    def plan(self, bank_attributes: List[Dict], counterparty_attributes: List[Dict]) -> Tuple[Dict[str, np.ndarray], List[Task]]:
+        """
+        Partition the books into shard tasks.
+
+        Returns:
+            (shard key arrays shared with the workers, tasks largest first)
+        """
+        keys: Dict[Optional[str], int] = {None: WILDCARD}
+        pairs = [currency_product_key(attributes) for attributes in bank_attributes + counterparty_attributes]
+        currency = np.fromiter((keys.setdefault(c, len(keys) - 1) for c, _ in pairs), dtype=np.int32, count=len(pairs))
+        product = np.fromiter((keys.setdefault(p, len(keys) - 1) for _, p in pairs), dtype=np.int32, count=len(pairs))
+
+        bank_count = len(bank_attributes)
+        buckets = np.full(bank_count, -1, dtype=np.int64)
+        for position, attributes in enumerate(bank_attributes):
+            trade_date = self.parse_date(attributes.get('trade_date'))
+            if trade_date:
+                buckets[position] = trade_date.toordinal() // self.bucket_days
+        bank_order = np.lexsort((np.arange(bank_count), buckets, product[:bank_count], currency[:bank_count]))
+
+        chunk = max(1, math.ceil(bank_count / (self.workers * TASKS_PER_WORKER)))
+        ordered_currency = currency[:bank_count][bank_order]
+        ordered_product = product[:bank_count][bank_order]
+        boundaries = np.flatnonzero(
+            (np.diff(ordered_currency) != 0) | (np.diff(ordered_product) != 0)
+        ) + 1
+        tasks: List[Tuple[int, Task]] = []
+        for start, stop in zip([0, *boundaries.tolist()], [*boundaries.tolist(), bank_count]):
+            shard = (int(ordered_currency[start]), int(ordered_product[start]))
+            rows = int(shard_mask(currency[bank_count:], product[bank_count:], *shard).sum())
+            if not rows:
+                continue
+            for chunk_start in range(start, stop, chunk):
+                chunk_stop = min(stop, chunk_start + chunk)
+                tasks.append(((chunk_stop - chunk_start) * rows, (*shard, chunk_start, chunk_stop)))
+        self.shards = len(boundaries) + 1 if bank_count else 0
+        tasks.sort(key=lambda task: -task[0])
+        arrays = {'currency': currency, 'product': product, 'bank_order': bank_order.astype(np.int64)}
+        return arrays, [task for _, task in tasks]
+
+    def score_edges(self, bank_trades: List[Dict], counterparty_trades: List[Dict]) -> Tuple[List[Edge], int]:
+        """Score every blocked pair once, in worker processes for large books (see TradeReconciler.score_edges)."""
+        if self.workers <= 1 or len(bank_trades) < self.min_parallel_trades or not counterparty_trades:
+            self.shards = 1
+            return super().score_edges(bank_trades, counterparty_trades)
+
+        bank_attributes = [self.extract_attributes(trade) for trade in bank_trades]
+        counterparty_attributes = [self.extract_attributes(trade) for trade in counterparty_trades]
+        arrays, tasks = self.plan(bank_attributes, counterparty_attributes)
+        if not tasks:
+            return [], 0
+        fields = list(dict.fromkeys(name for attributes in bank_attributes + counterparty_attributes for name in attributes))
+        arrays.update(encode_rows(bank_attributes + counterparty_attributes, fields))
+        shared = SharedArrays.create(arrays)
+
+        edges: List[Edge] = []
+        pairs_scored = 0
+        run = (shared.memory.name, shared.layout, fields, len(bank_trades), self._worker_settings())
+        try:
+            for task_edges, task_pairs in _get_pool(self.workers).imap_unordered(_score_task, [(*run, task) for task in tasks]):
+                edges.extend(task_edges)
+                pairs_scored += task_pairs
+        finally:
+            shared.release()
+
+        edges.sort(key=lambda edge: (edge[1], edge[2]))
+        logger.info(
+            f"Scored {self.shards} shards in {len(tasks)} tasks on {self.workers} workers: "
+            f"{pairs_scored} pairs, {len(edges)} edges"
+        )
+        return edges, pairs_scored
+
+    def reconcile(self, bank_trades: List[Dict], counterparty_trades: List[Dict]) -> ReconciliationResult:
+        result = super().reconcile(bank_trades, counterparty_trades)
+        result.shards = self.shards
+        return result
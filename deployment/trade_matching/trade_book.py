@@ -0,0 +1,477 @@
+"""
+Resident Trade Book for the Trade Matching Agent
+
+Keeps an in-memory copy of a trade table inside the matching runtime so that
+repeat matches read from memory instead of scanning DynamoDB on every call.
+
+- Bootstrap: one full load (parallel scan).
+- Incremental updates: INSERT/MODIFY/REMOVE records from a change feed are
+  applied on access once the book is older than its staleness bound.
+  DynamoDB Streams is the production feed; FileChangeFeed reads the same
+  record format from a JSON-lines file for local runs and tests.
+- Without a feed (or when the feed fails, e.g. an expired shard iterator) the
+  book falls back to a full reload when the staleness bound is exceeded.
+- refresh(force=True) reloads immediately.
+- Snapshots: with a snapshot store (trade_book_snapshot.py) the first load
+  restores the latest snapshot and resumes the change feed from the
+  checkpoint saved with it, so only changes written since are replayed.
+  Any problem with the snapshot or the checkpoint falls back to a full load.
+- Items can be converted on the way in (loads, snapshots and change records
+  alike), e.g. into compact read-only TradeRecords (trade_record.py).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_STALENESS_SECONDS = 30.0
+DEFAULT_KEY_ATTRIBUTES = ('Trade_ID',)
+
+# Upper bound on GetRecords calls per shard per poll, so a single access never
+# spins on a very hot stream
+MAX_GET_RECORDS_CALLS = 50
+
+
+class ChangeFeedError(Exception):
+    """The change feed lost continuity; the book must be reloaded."""
+
+
+class ChangeRecord:
+    """One item-level change: eventName INSERT, MODIFY or REMOVE with deserialized keys and image."""
+
+    __slots__ = ('event_name', 'keys', 'new_image')
+
+    def __init__(self, event_name: str, keys: Dict[str, Any], new_image: Optional[Dict[str, Any]]):
+        self.event_name = event_name
+        self.keys = keys
+        self.new_image = new_image
+
+    @classmethod
+    def from_stream_record(cls, record: Dict[str, Any], deserializer: TypeDeserializer) -> 'ChangeRecord':
+        """Build from a DynamoDB Streams record (typed attribute values)."""
+        data = record.get('dynamodb', {})
+        keys = {k: deserializer.deserialize(v) for k, v in data.get('Keys', {}).items()}
+        new_image = None
+        if 'NewImage' in data:
+            new_image = {k: deserializer.deserialize(v) for k, v in data['NewImage'].items()}
+        return cls(record['eventName'], keys, new_image)
+
+
+class FileChangeFeed:
+    """
+    Change feed stand-in reading DynamoDB Streams-format records from a JSON-lines file.
+
+    Each line is one stream record, e.g.
+    {"eventName": "MODIFY", "dynamodb": {"Keys": {...}, "NewImage": {...}}}.
+    Lines appended after start() are returned by poll().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offset = 0
+        self._deserializer = TypeDeserializer()
+
+    def start(self, checkpoint: Optional[Dict[str, Any]] = None) -> None:
+        """Position the feed at the current end of the file, or at a checkpoint()."""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if checkpoint is None:
+            self._offset = size
+            return
+        if checkpoint.get('path') != self.path or checkpoint['offset'] > size:
+            raise ChangeFeedError(f"Checkpoint does not belong to change feed file {self.path}")
+        self._offset = checkpoint['offset']
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Position after the last record returned by poll()."""
+        return {'path': self.path, 'offset': self._offset}
+
+    def poll(self) -> List[ChangeRecord]:
+        if not os.path.exists(self.path):
+            return []
+        size = os.path.getsize(self.path)
+        if size < self._offset:
+            raise ChangeFeedError(f"Change feed file {self.path} was truncated")
+        records = []
+        with open(self.path, 'r') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith('\n'):
+                    # Partially written line; read it on the next poll
+                    break
+                self._offset += len(line.encode('utf-8'))
+                if line.strip():
+                    records.append(ChangeRecord.from_stream_record(json.loads(line), self._deserializer))
+        return records
+
+
+class DynamoDBStreamChangeFeed:
+    """
+    Change feed over a table's DynamoDB stream.
+
+    Requires the stream view type to include new images (NEW_IMAGE or
+    NEW_AND_OLD_IMAGES). Child shards are read only after their parent shard
+    is exhausted, so changes to one item are applied in order.
+    """
+
+    def __init__(self, table_name: str, dynamodb_client: Any, streams_client: Any):
+        description = dynamodb_client.describe_table(TableName=table_name)['Table']
+        stream_arn = description.get('LatestStreamArn')
+        view_type = description.get('StreamSpecification', {}).get('StreamViewType')
+        if not stream_arn:
+            raise ChangeFeedError(f"Table {table_name} has no stream enabled")
+        if view_type not in ('NEW_IMAGE', 'NEW_AND_OLD_IMAGES'):
+            raise ChangeFeedError(f"Stream on {table_name} does not carry new images ({view_type})")
+
+        self.table_name = table_name
+        self.stream_arn = stream_arn
+        self._streams = streams_client
+        self._deserializer = TypeDeserializer()
+        self._iterators: Dict[str, Optional[str]] = {}
+        self._parents: Dict[str, Optional[str]] = {}
+        self._finished: set = set()
+        # Sequence number of the last record read per shard, for checkpoints
+        self._positions: Dict[str, str] = {}
+
+    def _list_shards(self) -> List[Dict[str, Any]]:
+        shards: List[Dict[str, Any]] = []
+        kwargs: Dict[str, Any] = {'StreamArn': self.stream_arn}
+        while True:
+            description = self._streams.describe_stream(**kwargs)['StreamDescription']
+            shards.extend(description.get('Shards', []))
+            last = description.get('LastEvaluatedShardId')
+            if not last:
+                return shards
+            kwargs['ExclusiveStartShardId'] = last
+
+    def _iterator(self, shard_id: str, iterator_type: str) -> Optional[str]:
+        if iterator_type == 'AFTER_SEQUENCE_NUMBER':
+            return self._streams.get_shard_iterator(
+                StreamArn=self.stream_arn, ShardId=shard_id, ShardIteratorType=iterator_type,
+                SequenceNumber=self._positions[shard_id],
+            ).get('ShardIterator')
+        return self._streams.get_shard_iterator(
+            StreamArn=self.stream_arn, ShardId=shard_id, ShardIteratorType=iterator_type
+        ).get('ShardIterator')
+
+    def start(self, checkpoint: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Position at the tip of every open shard; call before the bootstrap load.
+
+        With a checkpoint(), resume where it was taken instead: after the last
+        record read from each shard, and from the start of shards it had not
+        read from yet. Records older than the checkpoint may be returned
+        again, which is harmless since changes are applied in order.
+        """
+        self._iterators.clear()
+        self._parents.clear()
+        self._finished.clear()
+        self._positions.clear()
+        shards = self._list_shards()
+        if checkpoint is None:
+            for shard in shards:
+                shard_id = shard['ShardId']
+                self._parents[shard_id] = shard.get('ParentShardId')
+                if 'EndingSequenceNumber' in shard.get('SequenceNumberRange', {}):
+                    self._finished.add(shard_id)
+                else:
+                    self._iterators[shard_id] = self._iterator(shard_id, 'LATEST')
+            return
+
+        if checkpoint.get('stream_arn') != self.stream_arn:
+            raise ChangeFeedError(f"Checkpoint is for another stream than {self.stream_arn}")
+        finished = set(checkpoint.get('finished', []))
+        listed = {shard['ShardId'] for shard in shards}
+        trimmed = set(checkpoint.get('open', [])) - listed
+        if trimmed:
+            # Unread records of these shards are past the stream's retention
+            raise ChangeFeedError(f"Checkpoint shards {sorted(trimmed)} were trimmed from {self.stream_arn}")
+        self._positions.update(checkpoint.get('positions', {}))
+        for shard in shards:
+            shard_id = shard['ShardId']
+            self._parents[shard_id] = shard.get('ParentShardId')
+            if shard_id in finished:
+                self._finished.add(shard_id)
+            elif shard_id in self._positions:
+                self._iterators[shard_id] = self._iterator(shard_id, 'AFTER_SEQUENCE_NUMBER')
+            else:
+                self._iterators[shard_id] = None  # From TRIM_HORIZON once the parent is exhausted
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Shards and positions after the last records returned by poll()."""
+        return {
+            'stream_arn': self.stream_arn,
+            'open': sorted(self._iterators),
+            'finished': sorted(self._finished),
+            'positions': dict(self._positions),
+        }
+
+    def _discover_shards(self) -> None:
+        """Track shards created after start() (shard splits and rollovers) from their beginning."""
+        for shard in self._list_shards():
+            shard_id = shard['ShardId']
+            if shard_id in self._iterators or shard_id in self._finished:
+                continue
+            self._parents[shard_id] = shard.get('ParentShardId')
+            self._iterators[shard_id] = None  # Opened lazily once the parent is exhausted
+
+    def poll(self) -> List[ChangeRecord]:
+        try:
+            self._discover_shards()
+            records: List[ChangeRecord] = []
+            progressed = True
+            while progressed:
+                progressed = False
+                for shard_id in list(self._iterators):
+                    parent = self._parents.get(shard_id)
+                    if parent in self._iterators:
+                        continue
+                    iterator = self._iterators[shard_id]
+                    if iterator is None:
+                        iterator = self._iterator(shard_id, 'TRIM_HORIZON')
+                    for _ in range(MAX_GET_RECORDS_CALLS):
+                        if iterator is None:
+                            break
+                        response = self._streams.get_records(ShardIterator=iterator, Limit=1000)
+                        batch = response.get('Records', [])
+                        records.extend(ChangeRecord.from_stream_record(r, self._deserializer) for r in batch)
+                        sequence = batch[-1].get('dynamodb', {}).get('SequenceNumber') if batch else None
+                        if sequence:
+                            self._positions[shard_id] = sequence
+                        iterator = response.get('NextShardIterator')
+                        if not batch:
+                            break
+                    if iterator is None:
+                        del self._iterators[shard_id]
+                        self._finished.add(shard_id)
+                        progressed = True
+                    else:
+                        self._iterators[shard_id] = iterator
+            return records
+        except ChangeFeedError:
+            raise
+        except Exception as e:
+            # Expired iterators, trimmed data, throttling: continuity can no longer be proven
+            raise ChangeFeedError(f"Stream poll failed for {self.table_name}: {e}") from e
+
+
+class TradeBook:
+    """
+    Resident copy of one trade table.
+
+    Thread-safe. trades() returns a list snapshot that callers may iterate
+    freely; it is rebuilt only after the book changes.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        loader: Callable[[], List[Dict]],
+        change_feed: Any = None,
+        max_staleness_seconds: float = DEFAULT_MAX_STALENESS_SECONDS,
+        key_attributes: Sequence[str] = DEFAULT_KEY_ATTRIBUTES,
+        clock: Callable[[], float] = time.monotonic,
+        snapshot_store: Any = None,
+        convert: Optional[Callable[[Dict], Dict]] = None,
+    ):
+        """
+        Args:
+            table_name: Name of the table mirrored by this book
+            loader: Full load of the table (e.g. a parallel scan)
+            change_feed: Optional feed with start() and poll() (DynamoDBStreamChangeFeed, FileChangeFeed)
+            max_staleness_seconds: Maximum age of the book before an access syncs it
+            key_attributes: Primary key attribute names
+            clock: Monotonic clock, injectable for tests
+            snapshot_store: Optional store with load() and save() (S3SnapshotStore) to
+                bootstrap from and write snapshots to; only used together with a change feed
+            convert: Optional conversion of every item kept in the book, e.g.
+                TradeRecordLayout.record for compact read-only trade records
+        """
+        self.table_name = table_name
+        self.max_staleness_seconds = max_staleness_seconds
+        self.key_attributes = tuple(key_attributes)
+        self._loader = loader
+        self._feed = change_feed
+        self._clock = clock
+        self._snapshot_store = snapshot_store
+        self._convert = convert
+        self._lock = threading.RLock()
+        self._items: Dict[Tuple, Dict] = {}
+        self._snapshot: Optional[List[Dict]] = None
+        self._derived: Dict[str, Any] = {}
+        self._synced_at: Optional[float] = None
+        # Incremented on every load and applied change; snapshots are skipped while unchanged
+        self._version = 0
+        self._saved_version: Optional[int] = None
+        self.full_loads = 0
+        self.snapshot_loads = 0
+        self.snapshots_written = 0
+        self.feed_polls = 0
+        self.changes_applied = 0
+        self.feed_failures = 0
+
+    def _key(self, item: Dict) -> Tuple:
+        return tuple(item.get(attribute) for attribute in self.key_attributes)
+
+    def _index(self, items: Iterable[Dict]) -> Dict[Tuple, Dict]:
+        if self._convert is not None:
+            items = map(self._convert, items)
+        return {self._key(item): item for item in items}
+
+    def _full_load(self) -> None:
+        # Start the feed first so that changes made during the load are replayed
+        # afterwards; applying them again is idempotent
+        if self._feed is not None:
+            try:
+                self._feed.start()
+            except Exception as e:
+                logger.warning(f"Change feed for {self.table_name} unavailable, using full reloads: {e}")
+                self._feed = None
+        self._items = self._index(self._loader())
+        self._snapshot = None
+        self._version += 1
+        self.full_loads += 1
+        logger.info(f"Trade book {self.table_name}: loaded {len(self._items)} trades")
+
+    def _restore_snapshot(self) -> bool:
+        """Load the latest snapshot and resume the change feed at its checkpoint; False if unusable."""
+        if self._snapshot_store is None or self._feed is None:
+            return False
+        try:
+            snapshot = self._snapshot_store.load(self.table_name)
+            if snapshot is None or snapshot.checkpoint is None:
+                return False
+            self._feed.start(snapshot.checkpoint)
+        except Exception as e:
+            logger.warning(f"Trade book {self.table_name}: snapshot unusable, loading the table instead: {e}")
+            return False
+        self._items = self._index(snapshot.trades)
+        self._snapshot = None
+        self._version += 1
+        self.snapshot_loads += 1
+        logger.info(
+            f"Trade book {self.table_name}: restored {len(self._items)} trades from a "
+            f"{snapshot.age_seconds:.0f}s old snapshot"
+        )
+        return True
+
+    def _apply(self, records: List[ChangeRecord]) -> None:
+        for record in records:
+            key = tuple(record.keys.get(attribute) for attribute in self.key_attributes)
+            if record.event_name == 'REMOVE':
+                self._items.pop(key, None)
+            elif record.new_image is not None:
+                self._items[key] = record.new_image if self._convert is None else self._convert(record.new_image)
+            else:
+                raise ChangeFeedError(f"{record.event_name} record without NewImage for {key}")
+        if records:
+            self._snapshot = None
+            self._version += 1
+            self.changes_applied += len(records)
+
+    def _poll(self) -> None:
+        try:
+            self.feed_polls += 1
+            self._apply(self._feed.poll())
+        except ChangeFeedError as e:
+            self.feed_failures += 1
+            logger.warning(f"Trade book {self.table_name}: {e}; reloading")
+            self._full_load()
+
+    def _sync(self, force: bool = False) -> None:
+        if self._synced_at is None and not force and self._restore_snapshot():
+            # Replay the changes written since the snapshot
+            self._poll()
+        elif self._synced_at is None or self._feed is None:
+            self._full_load()
+        else:
+            self._poll()
+        self._synced_at = self._clock()
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Bring the book up to date.
+
+        Args:
+            force: Discard the resident copy and reload the full table now
+        """
+        with self._lock:
+            if force:
+                self._synced_at = None
+                self._sync(force=True)
+            elif self._synced_at is None or self._clock() - self._synced_at >= self.max_staleness_seconds:
+                self._sync()
+
+    def trades(self, force_refresh: bool = False) -> List[Dict]:
+        """Return all trades, syncing first if the book is older than the staleness bound."""
+        with self._lock:
+            self.refresh(force=force_refresh)
+            if self._snapshot is None:
+                self._snapshot = list(self._items.values())
+                self._derived.clear()
+            return self._snapshot
+
+    def derived(self, name: str, build: Callable[[List[Dict]], Any], force_refresh: bool = False) -> Any:
+        """
+        Return a structure built from the current trades snapshot, e.g. a lookup index.
+
+        build(trades) runs again only after the book has changed.
+
+        Args:
+            name: Cache key of the structure
+            build: Builds the structure from the trades snapshot
+            force_refresh: Reload the book first
+        """
+        with self._lock:
+            trades = self.trades(force_refresh=force_refresh)
+            if name not in self._derived:
+                self._derived[name] = build(trades)
+            return self._derived[name]
+
+    def write_snapshot(self) -> bool:
+        """
+        Save the book and the change feed position to the snapshot store.
+
+        Skipped (False) without a store or feed, before the first load and
+        while nothing changed since the last snapshot written by this book.
+        """
+        with self._lock:
+            if self._snapshot_store is None or self._feed is None or self._synced_at is None:
+                return False
+            if self._saved_version == self._version:
+                return False
+            # Items are replaced, never mutated, so the list can be encoded outside the lock
+            trades = list(self._items.values())
+            checkpoint = self._feed.checkpoint()
+            version = self._version
+        self._snapshot_store.save(self.table_name, trades, checkpoint)
+        with self._lock:
+            self._saved_version = version
+            self.snapshots_written += 1
+        return True
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the last sync, or None before the first load."""
+        with self._lock:
+            return None if self._synced_at is None else self._clock() - self._synced_at
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "table": self.table_name,
+                "trades": len(self._items),
+                "feed": type(self._feed).__name__ if self._feed is not None else None,
+                "full_loads": self.full_loads,
+                "snapshot_loads": self.snapshot_loads,
+                "snapshots_written": self.snapshots_written,
+                "feed_polls": self.feed_polls,
+                "feed_failures": self.feed_failures,
+                "changes_applied": self.changes_applied,
+            }
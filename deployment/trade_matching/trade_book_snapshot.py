@@ -0,0 +1,281 @@
+"""
+Columnar Trade Book Snapshots
+
+A cold matching runtime would otherwise bootstrap each trade book with a full
+parallel scan. Instead, running books periodically save a snapshot to S3 and
+new books restore the latest one, then replay only the changes written since
+through the change feed (TradeBook, trade_book.py).
+
+A snapshot is one compressed NumPy .npz archive per table holding one column
+per attribute:
+
+- decimal: float64 values plus a presence mask, for attributes whose values
+  are all DynamoDB numbers that survive the float round trip exactly
+- str: int32 codes into a dictionary of the distinct strings (-1: absent)
+- json: int32 codes into a dictionary of distinct JSON-encoded values, for
+  everything else (maps, lists, booleans, sets, mixed types)
+
+and a JSON metadata entry with the row count, the snapshot time and the change
+feed checkpoint the trades are consistent with. Archives are written without
+pickling and read with allow_pickle=False.
+"""
+
+import io
+import json
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+DEFAULT_PREFIX = 'trade-book-snapshots/'
+DEFAULT_INTERVAL_SECONDS = 300.0
+
+DECIMAL = 'decimal'
+STRING = 'str'
+JSON = 'json'
+
+# Column value of a trade without the attribute
+_ABSENT = object()
+
+
+# ----------------------------------------------------------------------------
+# Value encoding
+# ----------------------------------------------------------------------------
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, (set, frozenset)):
+        return {'__set__': sorted((_encode_json(item) for item in value))}
+    raise TypeError(f"Cannot snapshot a value of type {type(value).__name__}")
+
+
+def _json_object_hook(value: Dict[str, Any]) -> Any:
+    if len(value) == 1:
+        if '__decimal__' in value:
+            return Decimal(value['__decimal__'])
+        if '__set__' in value:
+            return {_decode_json(item) for item in value['__set__']}
+    return value
+
+
+def _encode_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=_json_default)
+
+
+def _decode_json(text: str) -> Any:
+    return json.loads(text, object_hook=_json_object_hook)
+
+
+def _decode_float(value: float) -> Decimal:
+    return Decimal(int(value)) if value.is_integer() else Decimal(repr(value))
+
+
+def _is_float_exact(value: Any) -> bool:
+    """True for a finite Decimal that decodes back from float64 with the same digits."""
+    if type(value) is not Decimal or not value.is_finite():
+        return False
+    decoded = _decode_float(float(value))
+    return str(decoded) == str(value)
+
+
+def _column_kind(values: List[Any]) -> str:
+    present = [value for value in values if value is not _ABSENT]
+    if present and all(_is_float_exact(value) for value in present):
+        return DECIMAL
+    if all(type(value) is str for value in present):
+        return STRING
+    return JSON
+
+
+# ----------------------------------------------------------------------------
+# Archive encoding
+# ----------------------------------------------------------------------------
+
+def encode_trades(trades: List[Dict[str, Any]], checkpoint: Optional[Dict[str, Any]] = None,
+                  written_at: Optional[float] = None) -> bytes:
+    """
+    Encode trades as a columnar snapshot archive.
+
+    Args:
+        trades: Trade items (deserialized DynamoDB items)
+        checkpoint: Change feed checkpoint the trades are consistent with
+        written_at: Snapshot time, seconds since the epoch
+
+    Returns:
+        The .npz archive
+    """
+    names: Dict[str, None] = {}
+    for trade in trades:
+        names.update(dict.fromkeys(trade))
+
+    arrays: Dict[str, np.ndarray] = {}
+    columns = []
+    for position, name in enumerate(names):
+        values = [trade.get(name, _ABSENT) for trade in trades]
+        kind = _column_kind(values)
+        columns.append({'name': name, 'kind': kind})
+        if kind == DECIMAL:
+            present = np.fromiter((value is not _ABSENT for value in values), dtype=bool, count=len(values))
+            arrays[f"c{position}_values"] = np.fromiter(
+                (float(value) if value is not _ABSENT else np.nan for value in values),
+                dtype=np.float64, count=len(values),
+            )
+            arrays[f"c{position}_present"] = present
+            continue
+        encode = (lambda value: value) if kind == STRING else _encode_json
+        dictionary: Dict[str, int] = {}
+        codes = np.fromiter(
+            (dictionary.setdefault(encode(value), len(dictionary)) if value is not _ABSENT else -1
+             for value in values),
+            dtype=np.int32, count=len(values),
+        )
+        arrays[f"c{position}_codes"] = codes
+        arrays[f"c{position}_dictionary"] = np.array(list(dictionary), dtype=np.str_)
+
+    meta = {
+        'format': SNAPSHOT_FORMAT,
+        'count': len(trades),
+        'written_at': written_at if written_at is not None else time.time(),
+        'checkpoint': checkpoint,
+        'columns': columns,
+    }
+    arrays['meta'] = np.array(json.dumps(meta))
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+class Snapshot:
+    """Trades of a snapshot with the change feed checkpoint they are consistent with."""
+
+    __slots__ = ('trades', 'checkpoint', 'written_at', 'age_seconds')
+
+    def __init__(self, trades: List[Dict[str, Any]], checkpoint: Optional[Dict[str, Any]],
+                 written_at: float, age_seconds: float):
+        self.trades = trades
+        self.checkpoint = checkpoint
+        self.written_at = written_at
+        self.age_seconds = age_seconds
+
+
+def decode_trades(data: bytes, clock: Callable[[], float] = time.time) -> Snapshot:
+    """Decode a snapshot archive written by encode_trades."""
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        meta = json.loads(str(archive['meta']))
+        if meta.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format {meta.get('format')}")
+        count = meta['count']
+        trades: List[Dict[str, Any]] = [{} for _ in range(count)]
+        for position, column in enumerate(meta['columns']):
+            name, kind = column['name'], column['kind']
+            if kind == DECIMAL:
+                values = archive[f"c{position}_values"].tolist()
+                present = archive[f"c{position}_present"].tolist()
+                for trade, value, is_present in zip(trades, values, present):
+                    if is_present:
+                        trade[name] = _decode_float(value)
+                continue
+            dictionary = archive[f"c{position}_dictionary"].tolist()
+            if kind == JSON:
+                texts, dictionary = dictionary, [_decode_json(text) for text in dictionary]
+                # Containers are decoded per trade so that no two trades share a mutable value
+                for trade, code in zip(trades, archive[f"c{position}_codes"].tolist()):
+                    if code >= 0:
+                        value = dictionary[code]
+                        trade[name] = _decode_json(texts[code]) if isinstance(value, (dict, list, set)) else value
+                continue
+            for trade, code in zip(trades, archive[f"c{position}_codes"].tolist()):
+                if code >= 0:
+                    trade[name] = dictionary[code]
+    return Snapshot(trades, meta.get('checkpoint'), meta['written_at'], max(0.0, clock() - meta['written_at']))
+
+
+# ----------------------------------------------------------------------------
+# Storage and periodic writer
+# ----------------------------------------------------------------------------
+
+class S3SnapshotStore:
+    """The latest snapshot of each table as one S3 object, <prefix><table>.npz."""
+
+    def __init__(self, client: Any, bucket: str, prefix: str = DEFAULT_PREFIX,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            client: boto3 S3 client
+            bucket: Bucket name
+            prefix: Key prefix of the snapshot objects
+            clock: Time source (seconds since the epoch)
+        """
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self._clock = clock
+
+    def key(self, table_name: str) -> str:
+        return f"{self.prefix}{table_name}.npz"
+
+    def save(self, table_name: str, trades: List[Dict[str, Any]], checkpoint: Optional[Dict[str, Any]]) -> None:
+        data = encode_trades(trades, checkpoint, written_at=self._clock())
+        self.client.put_object(
+            Bucket=self.bucket, Key=self.key(table_name), Body=data, ContentType='application/octet-stream'
+        )
+        logger.info(f"Snapshot of {table_name}: {len(trades)} trades, {len(data)} bytes")
+
+    def load(self, table_name: str) -> Optional[Snapshot]:
+        """The latest snapshot of a table, or None if there is none."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.key(table_name))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return decode_trades(response['Body'].read(), clock=self._clock)
+
+
+class TradeBookSnapshotWriter:
+    """Daemon thread calling write_snapshot() on every trade book at a fixed interval."""
+
+    def __init__(self, books: Callable[[], Iterable[Any]], interval_seconds: float = DEFAULT_INTERVAL_SECONDS):
+        """
+        Args:
+            books: Returns the trade books to snapshot
+            interval_seconds: Seconds between snapshot rounds
+        """
+        self._books = books
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.rounds = 0
+        self.failures = 0
+
+    def write_all(self) -> int:
+        """Snapshot every changed book now; returns the number of snapshots written."""
+        written = 0
+        for book in list(self._books()):
+            try:
+                written += book.write_snapshot()
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Snapshot of trade book {book.table_name} failed: {e}")
+        self.rounds += 1
+        return written
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.write_all()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='trade-book-snapshots', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,139 @@
+"""
+Keyed Source-Trade Lookup for the Trade Matching Agent
+
+Locates source trades by ID without iterating the whole source table.
+
+- TradeIdIndex maps every trade's raw ID and its normalized form
+  (normalize_trade_id: prefix stripped, numeric core) to the trade. A
+  request resolves by exact ID first and by normalized form only when that
+  form belongs to exactly one trade, so an ambiguous alias never picks an
+  arbitrary trade.
+- get_trade / batch_get_trades read trades by primary key (Trade_ID) with
+  GetItem / BatchGetItem when there is no resident copy of the table.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from dynamodb_scan import deserialize_item, projection_arguments
+
+logger = logging.getLogger(__name__)
+
+TABLE_KEY_ATTRIBUTE = 'Trade_ID'
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT = 100
+MAX_UNPROCESSED_RETRIES = 5
+
+
+class TradeIdIndex:
+    """Exact and normalized trade-ID lookup over a list of trades."""
+
+    def __init__(
+        self,
+        trades: Sequence[Dict],
+        id_of: Callable[[Dict], Any],
+        normalize: Callable[[str], str],
+    ):
+        """
+        Args:
+            trades: Trades of one table
+            id_of: Raw trade ID of a trade, whichever key spelling it uses
+            normalize: Trade-ID normalization (normalize_trade_id)
+        """
+        self.trades = trades
+        self._normalize = normalize
+        self._exact: Dict[str, int] = {}
+        self._normalized: Dict[str, List[int]] = {}
+        for position, trade in enumerate(trades):
+            raw_id = id_of(trade)
+            if raw_id is None:
+                continue
+            raw_id = str(raw_id)
+            # First trade per ID wins, as in a linear search
+            self._exact.setdefault(raw_id, position)
+            positions = self._normalized.setdefault(normalize(raw_id), [])
+            if not positions or positions[-1] != position:
+                positions.append(position)
+
+    def position_of(self, trade_id: Any) -> Optional[int]:
+        """Position of the trade with this ID, or None if unknown or ambiguous."""
+        trade_id = str(trade_id)
+        position = self._exact.get(trade_id)
+        if position is not None:
+            return position
+        positions = self._normalized.get(self._normalize(trade_id), [])
+        if len(positions) == 1:
+            return positions[0]
+        if positions:
+            logger.warning(f"Trade ID {trade_id} is ambiguous: its normalized form matches {len(positions)} trades")
+        return None
+
+    def get(self, trade_id: Any) -> Optional[Dict]:
+        position = self.position_of(trade_id)
+        return self.trades[position] if position is not None else None
+
+
+def _key(trade_id: Any) -> Dict[str, Any]:
+    return {TABLE_KEY_ATTRIBUTE: {'S': str(trade_id)}}
+
+
+def get_trade(
+    client: Any, table_name: str, trade_id: Any, attributes: Optional[Sequence[str]] = None
+) -> Optional[Dict]:
+    """
+    Read one trade by primary key.
+
+    Args:
+        client: boto3 DynamoDB client
+        table_name: Trade table
+        trade_id: Trade_ID value
+        attributes: Attribute names to fetch, or None for the whole item
+
+    Returns:
+        The deserialized trade, or None if no item has this key
+    """
+    kwargs: Dict[str, Any] = {"TableName": table_name, "Key": _key(trade_id)}
+    if attributes:
+        kwargs.update(projection_arguments(attributes))
+    item = client.get_item(**kwargs).get('Item')
+    return deserialize_item(item) if item else None
+
+
+def batch_get_trades(
+    client: Any, table_name: str, trade_ids: Iterable[Any], attributes: Optional[Sequence[str]] = None
+) -> Dict[str, Dict]:
+    """
+    Read many trades by primary key with BatchGetItem, retrying unprocessed keys.
+
+    Args:
+        client: boto3 DynamoDB client
+        table_name: Trade table
+        trade_ids: Trade_ID values (duplicates are read once)
+        attributes: Attribute names to fetch, or None for whole items
+
+    Returns:
+        Trade_ID -> deserialized trade, for the IDs that exist
+    """
+    unique_ids = list(dict.fromkeys(str(trade_id) for trade_id in trade_ids))
+    table_request: Dict[str, Any] = {}
+    if attributes:
+        table_request.update(projection_arguments(attributes))
+
+    found: Dict[str, Dict] = {}
+    for start in range(0, len(unique_ids), BATCH_GET_LIMIT):
+        keys = [_key(trade_id) for trade_id in unique_ids[start:start + BATCH_GET_LIMIT]]
+        request = {table_name: dict(table_request, Keys=keys)}
+        for attempt in range(MAX_UNPROCESSED_RETRIES + 1):
+            response = client.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(table_name, []):
+                trade = deserialize_item(item)
+                found[str(trade[TABLE_KEY_ATTRIBUTE])] = trade
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                break
+            time.sleep(0.05 * 2 ** attempt)
+        else:
+            raise RuntimeError(f"BatchGetItem on {table_name} left keys unprocessed after {MAX_UNPROCESSED_RETRIES} retries")
+    return found
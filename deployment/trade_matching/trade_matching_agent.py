@@ -11,7 +11,7 @@ import json
 import os
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, FrozenSet, List, Literal, Optional, Tuple, Union
 import logging
 import boto3
 from botocore.exceptions import ClientError
@@ -20,6 +20,10 @@ from pydantic import BaseModel, Field
 # REQUIRED: Import BedrockAgentCoreApp
 from bedrock_agentcore import BedrockAgentCoreApp
 
+from date_parsing import DateParser
+from dynamodb_scan import iter_scan
+from match_rules import RuleSet, PreparedTrade, SOURCE, TARGET
+
 # Memory integration (optional - graceful fallback if not available)
 try:
     import sys
@@ -84,6 +88,12 @@ FIELD_WEIGHTS = {
 DATE_TOLERANCE_DAYS = 2  # Bank and counterparty may record different dates
 NOTIONAL_TOLERANCE_PCT = 0.02  # 2% tolerance for notional differences
 
+# Parallel scan segments for full table loads
+SCAN_TOTAL_SEGMENTS = int(os.getenv("DYNAMODB_SCAN_SEGMENTS", "4"))
+
+# Trade dates are stored as YYYY-MM-DD; parsed values are memoized as ordinal days
+_iso_date_parser = DateParser(["%Y-%m-%d"], strip=False)
+
 
 # ============================================================================
 # Data Models
@@ -132,74 +142,91 @@ def _parse_dynamodb_item(item: Dict[str, Any]) -> Dict[str, Any]:
     return result
 
 
-def _compute_date_score(date1: str, date2: str) -> float:
-    """Compute score for date comparison with tolerance."""
-    try:
-        d1 = datetime.strptime(date1, "%Y-%m-%d")
-        d2 = datetime.strptime(date2, "%Y-%m-%d")
-        diff_days = abs((d1 - d2).days)
-        
-        if diff_days == 0:
-            return 1.0
-        elif diff_days <= DATE_TOLERANCE_DAYS:
-            return 0.9
-        else:
-            return max(0.0, 1.0 - (diff_days * 0.1))
-    except (ValueError, TypeError):
-        return 0.0
-
-
-def _compute_notional_score(notional1: float, notional2: float) -> float:
-    """Compute score for notional comparison with tolerance."""
-    try:
-        if notional1 == 0 and notional2 == 0:
-            return 1.0
-        if notional1 == 0 or notional2 == 0:
-            return 0.0
-        
-        diff_pct = abs(notional1 - notional2) / max(notional1, notional2)
-        
-        if diff_pct <= NOTIONAL_TOLERANCE_PCT:
-            return 1.0
-        elif diff_pct <= 0.001:  # 0.1%
-            return 0.9
-        elif diff_pct <= 0.01:   # 1%
-            return 0.7
-        else:
-            return max(0.0, 1.0 - diff_pct)
-    except (ValueError, TypeError, ZeroDivisionError):
-        return 0.0
+def _fuzzy_tokens(value: Any) -> Optional[Tuple[str, FrozenSet[str]]]:
+    """Lowercased text and word set of a value for _token_similarity, or None if empty."""
+    if not value:
+        return None
+    text = value.lower().strip()
+    return text, frozenset(text.split())
 
 
-def _compute_fuzzy_score(str1: str, str2: str) -> float:
-    """Compute fuzzy string similarity score."""
-    if not str1 or not str2:
+def _token_similarity(tokens1: Optional[Tuple[str, FrozenSet[str]]], tokens2: Optional[Tuple[str, FrozenSet[str]]]) -> float:
+    """Jaccard similarity on words of two _fuzzy_tokens values."""
+    if tokens1 is None or tokens2 is None:
         return 0.0
-    
-    str1 = str1.lower().strip()
-    str2 = str2.lower().strip()
-    
-    if str1 == str2:
+    text1, words1 = tokens1
+    text2, words2 = tokens2
+    if text1 == text2:
         return 1.0
-    
-    # Simple Jaccard similarity on words
-    words1 = set(str1.split())
-    words2 = set(str2.split())
-    
     if not words1 or not words2:
         return 0.0
-    
-    intersection = len(words1 & words2)
     union = len(words1 | words2)
-    
-    return intersection / union if union > 0 else 0.0
+    return len(words1 & words2) / union if union > 0 else 0.0
 
 
-def fuzzy_match(bank_trade: Dict[str, Any], cp_trade: Dict[str, Any]) -> Dict[str, Any]:
+def _compute_fuzzy_score(str1: str, str2: str) -> float:
+    """Compute fuzzy string similarity score."""
+    return _token_similarity(_fuzzy_tokens(str1), _fuzzy_tokens(str2))
+
+
+def _iso_date(value: Any) -> Tuple[Optional[int], Any]:
+    return _iso_date_parser.parse_ordinal(value), value
+
+
+def _upper(value: Any) -> str:
+    return str(value).upper()
+
+
+# Date score: 1.0 same day, 0.9 within DATE_TOLERANCE_DAYS, then -0.1 per day
+_DATE_PARAMS = {'tiers': [(0, 1.0), (DATE_TOLERANCE_DAYS, 0.9)], 'decay': 0.1}
+
+# Attribute-based matching rules (no Trade_ID since IDs differ across systems).
+# Source is the bank trade, target the counterparty trade.
+MATCH_RULES = RuleSet([
+    # Currency (exact match - critical)
+    {'name': 'currency', 'weight': FIELD_WEIGHTS['currency'], 'default': '', 'normalize': _upper,
+     'display': 'normalized', 'compare': 'equal', 'reason': 'CURRENCY_MISMATCH'},
+    # Maturity date (identical text, else within tolerance)
+    {'name': 'maturity_date', 'weight': FIELD_WEIGHTS['maturity_date'], 'default': '', 'normalize': _iso_date,
+     'compare': 'dates', 'params': dict(_DATE_PARAMS, compare_text=True),
+     'reason': 'MATURITY_DATE_MISMATCH', 'reason_below': 0.9},
+    # Notional (within tolerance of the larger amount)
+    {'name': 'notional', 'weight': FIELD_WEIGHTS['notional'], 'default': 0, 'normalize': float,
+     'display': 'normalized', 'compare': 'relative_difference',
+     'params': {'tiers': [(NOTIONAL_TOLERANCE_PCT, 1.0), (0.001, 0.9), (0.01, 0.7)],
+                'base': 'larger', 'decay': 1.0, 'guard': 'nonzero'},
+     'reason': 'NOTIONAL_MISMATCH', 'reason_below': 0.9},
+    # Trade date (within tolerance - dates may differ by 1-2 days)
+    {'name': 'trade_date', 'weight': FIELD_WEIGHTS['trade_date'], 'default': '', 'normalize': _iso_date,
+     'compare': 'dates', 'params': _DATE_PARAMS, 'reason': 'TRADE_DATE_MISMATCH', 'reason_below': 0.8},
+    # Counterparty (fuzzy match - names differ across systems). Bank sees the
+    # counterparty, the counterparty sees the bank; buyer/seller cross-match.
+    {'name': 'counterparty', 'weight': FIELD_WEIGHTS['counterparty'], 'default': '',
+     'source_fields': [('counterparty', 'seller'), 'buyer'],
+     'target_fields': [('counterparty', 'buyer'), 'seller'],
+     'normalize': _fuzzy_tokens, 'compare': 'similarity', 'params': {'measure': _token_similarity},
+     'reason': 'COUNTERPARTY_MISMATCH', 'reason_below': 0.5},
+    # Product type (should match)
+    {'name': 'product_type', 'weight': FIELD_WEIGHTS['product_type'], 'default': '', 'normalize': _upper,
+     'display': 'normalized', 'compare': 'containment', 'params': {'partial': 0.8, 'otherwise': _compute_fuzzy_score},
+     'report_below': 0.8, 'reason': 'PRODUCT_TYPE_MISMATCH', 'reason_below': 0.8},
+    # Fixed rate (should match exactly; 0.5 when one or both are missing). The
+    # decayed score floors at the integer 0 the matcher has always reported
+    {'name': 'fixed_rate', 'weight': FIELD_WEIGHTS['fixed_rate'], 'default': 0, 'normalize': float,
+     'display': 'normalized', 'compare': 'relative_difference',
+     'params': {'base': 'larger', 'decay': 10, 'guard': 'positive', 'missing_credit': 0.5, 'floor': 0},
+     'report_below': 0.9, 'reason': 'FIXED_RATE_MISMATCH', 'reason_below': 0.9},
+])
+
+
+def fuzzy_match(
+    bank_trade: Union[Dict[str, Any], PreparedTrade], cp_trade: Union[Dict[str, Any], PreparedTrade]
+) -> Dict[str, Any]:
     """
     Perform attribute-based fuzzy matching between bank and counterparty trades.
     
-    Since there's no common Trade_ID across systems, matching relies on:
+    Since there's no common Trade_ID across systems, matching relies on
+    MATCH_RULES:
     - Currency (exact match)
     - Maturity date (exact match)
     - Notional amount (within tolerance)
@@ -209,106 +236,27 @@ def fuzzy_match(bank_trade: Dict[str, Any], cp_trade: Dict[str, Any]) -> Dict[st
     - Fixed rate (exact match)
     
     Args:
-        bank_trade: Bank trade data
-        cp_trade: Counterparty trade data
+        bank_trade: Bank trade data, or MATCH_RULES.prepare(trade, SOURCE)
+        cp_trade: Counterparty trade data, or MATCH_RULES.prepare(trade, TARGET)
         
     Returns:
         dict: Match result with field scores and differences
     """
-    field_scores = {}
-    differences = {}
-    reason_codes = []
-    
-    # Currency comparison (exact match - critical)
-    bank_ccy = str(bank_trade.get("currency", "")).upper()
-    cp_ccy = str(cp_trade.get("currency", "")).upper()
-    if bank_ccy == cp_ccy:
-        field_scores["currency"] = 1.0
-    else:
-        field_scores["currency"] = 0.0
-        differences["currency"] = {"bank": bank_ccy, "counterparty": cp_ccy}
-        reason_codes.append("CURRENCY_MISMATCH")
-    
-    # Maturity date comparison (exact match - critical)
-    bank_maturity = bank_trade.get("maturity_date", "")
-    cp_maturity = cp_trade.get("maturity_date", "")
-    if bank_maturity == cp_maturity:
-        field_scores["maturity_date"] = 1.0
-    else:
-        field_scores["maturity_date"] = _compute_date_score(bank_maturity, cp_maturity)
-        if field_scores["maturity_date"] < 1.0:
-            differences["maturity_date"] = {"bank": bank_maturity, "counterparty": cp_maturity}
-            if field_scores["maturity_date"] < 0.9:
-                reason_codes.append("MATURITY_DATE_MISMATCH")
-    
-    # Notional comparison (within tolerance)
-    bank_notional = float(bank_trade.get("notional", 0))
-    cp_notional = float(cp_trade.get("notional", 0))
-    field_scores["notional"] = _compute_notional_score(bank_notional, cp_notional)
-    if field_scores["notional"] < 1.0:
-        differences["notional"] = {"bank": bank_notional, "counterparty": cp_notional}
-        if field_scores["notional"] < 0.9:
-            reason_codes.append("NOTIONAL_MISMATCH")
-    
-    # Trade date comparison (within tolerance - dates may differ by 1-2 days)
-    bank_date = bank_trade.get("trade_date", "")
-    cp_date = cp_trade.get("trade_date", "")
-    field_scores["trade_date"] = _compute_date_score(bank_date, cp_date)
-    if field_scores["trade_date"] < 1.0:
-        differences["trade_date"] = {"bank": bank_date, "counterparty": cp_date}
-        if field_scores["trade_date"] < 0.8:
-            reason_codes.append("TRADE_DATE_MISMATCH")
-    
-    # Counterparty comparison (fuzzy match - names differ across systems)
-    # Bank sees counterparty, Counterparty sees bank as their counterparty
-    bank_cp = bank_trade.get("counterparty", "") or bank_trade.get("seller", "")
-    cp_cp = cp_trade.get("counterparty", "") or cp_trade.get("buyer", "")
-    
-    # Also check buyer/seller fields for cross-matching
-    bank_buyer = bank_trade.get("buyer", "")
-    cp_seller = cp_trade.get("seller", "")
+    evaluation = MATCH_RULES.evaluate(bank_trade, cp_trade)
+    if isinstance(bank_trade, PreparedTrade):
+        bank_trade = bank_trade.trade
+    if isinstance(cp_trade, PreparedTrade):
+        cp_trade = cp_trade.trade
     
-    # Compute best counterparty match
-    cp_score1 = _compute_fuzzy_score(bank_cp, cp_cp)
-    cp_score2 = _compute_fuzzy_score(bank_cp, cp_seller)
-    cp_score3 = _compute_fuzzy_score(bank_buyer, cp_cp)
-    cp_score4 = _compute_fuzzy_score(bank_buyer, cp_seller)
-    
-    field_scores["counterparty"] = max(cp_score1, cp_score2, cp_score3, cp_score4)
-    if field_scores["counterparty"] < 1.0:
-        differences["counterparty"] = {
-            "bank": f"{bank_cp} / {bank_buyer}",
-            "counterparty": f"{cp_cp} / {cp_seller}"
-        }
-        if field_scores["counterparty"] < 0.5:
-            reason_codes.append("COUNTERPARTY_MISMATCH")
-    
-    # Product type comparison (should match)
-    bank_product = str(bank_trade.get("product_type", "")).upper()
-    cp_product = str(cp_trade.get("product_type", "")).upper()
-    if bank_product == cp_product:
-        field_scores["product_type"] = 1.0
-    elif bank_product in cp_product or cp_product in bank_product:
-        field_scores["product_type"] = 0.8
-    else:
-        field_scores["product_type"] = _compute_fuzzy_score(bank_product, cp_product)
-        if field_scores["product_type"] < 0.8:
-            differences["product_type"] = {"bank": bank_product, "counterparty": cp_product}
-            reason_codes.append("PRODUCT_TYPE_MISMATCH")
-    
-    # Fixed rate comparison (should match exactly)
-    bank_rate = float(bank_trade.get("fixed_rate", 0))
-    cp_rate = float(cp_trade.get("fixed_rate", 0))
-    if bank_rate == cp_rate:
-        field_scores["fixed_rate"] = 1.0
-    elif bank_rate > 0 and cp_rate > 0:
-        rate_diff = abs(bank_rate - cp_rate) / max(bank_rate, cp_rate)
-        field_scores["fixed_rate"] = max(0, 1.0 - rate_diff * 10)
-        if field_scores["fixed_rate"] < 0.9:
-            differences["fixed_rate"] = {"bank": bank_rate, "counterparty": cp_rate}
-            reason_codes.append("FIXED_RATE_MISMATCH")
-    else:
-        field_scores["fixed_rate"] = 0.5  # One or both missing
+    differences = {}
+    for result in evaluation.differences():
+        if result.name == "counterparty":
+            differences["counterparty"] = {
+                "bank": " / ".join(map(str, result.source)),
+                "counterparty": " / ".join(map(str, result.target))
+            }
+        else:
+            differences[result.name] = {"bank": result.source, "counterparty": result.target}
     
     # Record Trade IDs for reference (not used in scoring)
     differences["reference_ids"] = {
@@ -317,9 +265,9 @@ def fuzzy_match(bank_trade: Dict[str, Any], cp_trade: Dict[str, Any]) -> Dict[st
     }
     
     return {
-        "field_scores": field_scores,
+        "field_scores": evaluation.scores(),
         "differences": differences,
-        "reason_codes": reason_codes
+        "reason_codes": evaluation.reason_codes()
     }
 
 
@@ -348,13 +296,11 @@ def classify_match(match_score: float, reason_codes: List[str]) -> str:
 
 
 def _scan_table(dynamodb_client, table_name: str) -> List[Dict[str, Any]]:
-    """Scan a DynamoDB table and return all items."""
+    """Scan a DynamoDB table with parallel segments and return all items."""
     items = []
     try:
-        paginator = dynamodb_client.get_paginator('scan')
-        for page in paginator.paginate(TableName=table_name):
-            for item in page.get('Items', []):
-                items.append(_parse_dynamodb_item(item))
+        for item in iter_scan(dynamodb_client, table_name, SCAN_TOTAL_SEGMENTS, deserialize=_parse_dynamodb_item):
+            items.append(item)
     except ClientError as e:
         logger.warning(f"Error scanning table {table_name}: {e}")
     return items
@@ -379,14 +325,19 @@ def find_best_match(
     best_match = None
     best_score = 0.0
     
+    # The source trade is normalized once for all candidates
+    source_side, candidate_side = (SOURCE, TARGET) if source_type == "BANK" else (TARGET, SOURCE)
+    prepared_source = MATCH_RULES.prepare(source_trade, source_side)
+    
     for candidate in candidate_trades:
         # Skip if already matched (could add a matched flag in production)
         
         # Perform fuzzy matching
+        prepared_candidate = MATCH_RULES.prepare(candidate, candidate_side)
         if source_type == "BANK":
-            match_result = fuzzy_match(source_trade, candidate)
+            match_result = fuzzy_match(prepared_source, prepared_candidate)
         else:
-            match_result = fuzzy_match(candidate, source_trade)
+            match_result = fuzzy_match(prepared_candidate, prepared_source)
         
         score = compute_match_score(match_result)
         
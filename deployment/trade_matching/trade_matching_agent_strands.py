@@ -19,9 +19,14 @@ os.environ["BYPASS_TOOL_CONSENT"] = "true"
 import json
 import uuid
 import re
+import random
+import threading
+import time
 import boto3
-from datetime import datetime, timezone
-from typing import Any, Dict, Optional, List
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 import logging
 from decimal import Decimal
 
@@ -44,6 +49,31 @@ from bedrock_agentcore.runtime import BedrockAgentCoreApp
 from bedrock_agentcore.runtime.models import PingStatus
 from bedrock_agentcore.memory import MemoryClient
 
+from active_book import ActiveBookPolicy, MatchedTradeIds, S3TradeArchive
+from allocation_matching import find_allocation_subset, to_cents
+from candidate_blocking import CandidateBlockingIndex, BlockingRecallTracker
+from counterparty_lsh import CounterpartyLshIndex
+from lei_index import LeiJoinIndex, LeiJoinTracker, LEI_PATH, NO_SOURCE_LEI, NO_LEI_CANDIDATES, BELOW_THRESHOLD
+from field_aliases import FieldAliasResolver, KEY_FIELD_ALIASES, alias_field_names
+from reconciliation import classify_score, MATCHED_THRESHOLD
+from sharded_reconciliation import ShardedTradeReconciler
+from pruned_scoring import PrunedMatchScorer, normalize_attributes
+from fast_path import ExecutionPathTracker, is_unambiguous, FAST_PATH, LLM_PATH
+from dynamodb_scan import parallel_scan
+from candidate_retrieval import TradeDateQueryPlanner
+from trade_id_index import TradeIdIndex, get_trade, batch_get_trades
+from trade_book import TradeBook, DynamoDBStreamChangeFeed, FileChangeFeed
+from trade_book_snapshot import S3SnapshotStore, TradeBookSnapshotWriter
+from trade_record import TradeRecordLayout
+from match_rules import SOURCE, TARGET
+from match_cache import MatchResultCache, DynamoDBResultStore, S3ResultStore, content_hash
+from cdm_rules import CDM_MATCH_RULES
+from match_normalizers import (
+    parse_date as _parse_date,
+    parse_date_ordinal,
+    parse_notional,
+)
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -90,6 +120,83 @@ MEMORY_ID = os.getenv("AGENTCORE_MEMORY_ID", "trade_matching_decisions-Z3tG4b4Xs
 MAX_TOOL_RETRIES = 3
 MAX_CONSECUTIVE_ERRORS = 5
 
+# Candidate blocking configuration (currency x product type x trade-date bucket)
+BLOCKING_ENABLED = os.getenv("MATCH_BLOCKING_ENABLED", "true").lower() == "true"
+BLOCKING_BUCKET_DAYS = int(os.getenv("MATCH_BLOCKING_BUCKET_DAYS", "3"))
+BLOCKING_DATE_TOLERANCE_DAYS = int(os.getenv("MATCH_BLOCKING_DATE_TOLERANCE_DAYS", "2"))
+# Fraction of requests that also score the full table to measure blocking recall
+BLOCKING_RECALL_SAMPLE_RATE = float(os.getenv("MATCH_BLOCKING_RECALL_SAMPLE_RATE", "0.05"))
+
+# Number of best candidates returned by find_trade_matches
+TOP_K_CANDIDATES = 5
+
+# LEI hash join: score only the trades sharing the source LEI and currency, when
+# the best of them reaches this score (otherwise fall back to the blocked set)
+LEI_JOIN_ENABLED = os.getenv("MATCH_LEI_JOIN_ENABLED", "true").lower() == "true"
+LEI_JOIN_MIN_SCORE = float(os.getenv("MATCH_LEI_JOIN_MIN_SCORE", "85"))
+
+# Counterparty-name LSH: narrow the blocked set to the trades whose counterparty name is a
+# near duplicate of the source's (character-trigram Jaccard >= threshold) or that carry none
+COUNTERPARTY_LSH_ENABLED = os.getenv("MATCH_COUNTERPARTY_LSH_ENABLED", "false").lower() == "true"
+COUNTERPARTY_LSH_THRESHOLD = float(os.getenv("MATCH_COUNTERPARTY_LSH_THRESHOLD", "0.5"))
+
+# Allocation matching: when no single trade matches, look for blocked candidates that agree
+# with the source on every field but the notional (score with the source notional >= leg min
+# score; 100: every compared field within tolerance) and whose notionals sum to the source
+# notional within the tolerance (relative to the source notional)
+ALLOCATION_MATCHING_ENABLED = os.getenv("MATCH_ALLOCATION_MATCHING_ENABLED", "true").lower() == "true"
+ALLOCATION_TOLERANCE = float(os.getenv("MATCH_ALLOCATION_TOLERANCE", "0.0001"))
+ALLOCATION_MAX_LEGS = int(os.getenv("MATCH_ALLOCATION_MAX_LEGS", "8"))
+ALLOCATION_LEG_MIN_SCORE = float(os.getenv("MATCH_ALLOCATION_LEG_MIN_SCORE", "100"))
+ALLOCATION_MAX_SUBSETS = int(os.getenv("MATCH_ALLOCATION_MAX_SUBSETS", "100000"))
+
+# Batch reconciliation (one-to-one assignment): auto, hungarian or greedy
+RECONCILIATION_METHOD = os.getenv("MATCH_RECONCILIATION_METHOD", "auto")
+# Worker processes scoring (currency, product type) shards of large reconciliations (0: one per CPU)
+RECONCILIATION_WORKERS = int(os.getenv("MATCH_RECONCILIATION_WORKERS", "0"))
+RECONCILIATION_MIN_PARALLEL_TRADES = int(os.getenv("MATCH_RECONCILIATION_MIN_PARALLEL_TRADES", "5000"))
+
+# Resident trade book: in-memory table copies kept current from a change feed
+TRADE_BOOK_ENABLED = os.getenv("MATCH_TRADE_BOOK_ENABLED", "true").lower() == "true"
+TRADE_BOOK_MAX_STALENESS_SECONDS = float(os.getenv("MATCH_TRADE_BOOK_MAX_STALENESS_SECONDS", "30"))
+# "streams" (DynamoDB Streams), "file:<directory>" (<table>.jsonl stand-in) or "none" (periodic reloads)
+TRADE_BOOK_CHANGE_FEED = os.getenv("MATCH_TRADE_BOOK_CHANGE_FEED", "streams")
+# Columnar trade book snapshots in S3: cold runtimes restore the latest snapshot and replay
+# the change feed from there instead of scanning; running runtimes rewrite them periodically
+TRADE_BOOK_SNAPSHOT_ENABLED = os.getenv("MATCH_TRADE_BOOK_SNAPSHOT_ENABLED", "false").lower() == "true"
+TRADE_BOOK_SNAPSHOT_PREFIX = os.getenv("MATCH_TRADE_BOOK_SNAPSHOT_PREFIX", "trade-book-snapshots/")
+TRADE_BOOK_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("MATCH_TRADE_BOOK_SNAPSHOT_INTERVAL_SECONDS", "300"))
+# Hold book trades as compact TradeRecords (shared key layouts, interned enums, pre-parsed
+# notionals and dates) instead of item dicts
+TRADE_BOOK_COMPACT_RECORDS = os.getenv("MATCH_TRADE_BOOK_COMPACT_RECORDS", "true").lower() == "true"
+# Parallel scan segments for full table loads
+SCAN_TOTAL_SEGMENTS = int(os.getenv("DYNAMODB_SCAN_SEGMENTS", "4"))
+# Fetch only the fields the alias table resolves (trade ID and match attributes) instead of whole items
+SCAN_PROJECTION_ENABLED = os.getenv("DYNAMODB_SCAN_PROJECTION", "true").lower() == "true"
+# Without a resident trade book: "index" queries TradeDateIndex for the date window, "scan" reads the whole table
+CANDIDATE_RETRIEVAL = os.getenv("MATCH_CANDIDATE_RETRIEVAL", "index")
+# Active book: candidate retrieval only sees trades whose latest trade or settlement date is
+# within the window, undated trades and trades not yet matched according to the matches table
+# ("" lets the window alone decide). The archive_trade_book mode copies the other trades to S3
+# (and optionally deletes them from the table); they are searched on request only
+ACTIVE_BOOK_ENABLED = os.getenv("MATCH_ACTIVE_BOOK_ENABLED", "false").lower() == "true"
+ACTIVE_BOOK_WINDOW_DAYS = int(os.getenv("MATCH_ACTIVE_BOOK_WINDOW_DAYS", "90"))
+ACTIVE_BOOK_MATCHES_TABLE = os.getenv("MATCH_ACTIVE_BOOK_MATCHES_TABLE", "TradeMatches")
+ACTIVE_BOOK_MATCHES_REFRESH_SECONDS = float(os.getenv("MATCH_ACTIVE_BOOK_MATCHES_REFRESH_SECONDS", "300"))
+ACTIVE_BOOK_ARCHIVE_PREFIX = os.getenv("MATCH_ACTIVE_BOOK_ARCHIVE_PREFIX", "trade-archive/")
+
+# Match-result cache keyed by (source hash, target hash, rules version): in-process LRU entries
+# (0 disables) plus an optional persistent tier in a DynamoDB table or, failing that, an S3 prefix
+MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", "50000"))
+MATCH_CACHE_TABLE = os.getenv("MATCH_CACHE_TABLE", "")
+MATCH_CACHE_BUCKET = os.getenv("MATCH_CACHE_BUCKET", "")
+MATCH_CACHE_PREFIX = os.getenv("MATCH_CACHE_PREFIX", "match-cache/")
+MATCH_CACHE_TTL_DAYS = float(os.getenv("MATCH_CACHE_TTL_DAYS", "7"))
+
+# Execution mode: "agent" sends every request through the Strands agent; "rules_first" answers
+# unambiguous scores (>=85 or <50) deterministically and escalates only the middle band to the LLM
+EXECUTION_MODE = os.getenv("MATCH_EXECUTION_MODE", "agent")
+
 logger.info(f"[INIT] Agent initialized - service={AGENT_NAME}, stage={OBSERVABILITY_STAGE}")
 
 # Lazy-initialized boto3 clients for efficiency (NO profile_name!)
@@ -121,191 +228,422 @@ class DecimalEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+# Attributes read by the matching rules, under every spelling the alias table knows
+_MATCH_ATTRIBUTES = alias_field_names()
+
+# Attributes with a small set of distinct values, interned in trade records
+_ENUM_ATTRIBUTES = (
+    'product_type', 'sub_product_type', 'currency', 'currency_2', 'floating_rate_index',
+    'day_count_fraction', 'payment_frequency', 'payment_frequency_2', 'business_day_convention',
+    'reset_frequency', 'settlement_type',
+)
+
+# Trade records pre-parse the notional and dates under the spelling the alias resolver picks
+_TRADE_RECORD_LAYOUT = TradeRecordLayout(
+    enum_fields=[key for name in _ENUM_ATTRIBUTES for key in KEY_FIELD_ALIASES[name]],
+    parsed_fields={
+        'notional': (KEY_FIELD_ALIASES['notional'], parse_notional),
+        **{name: (KEY_FIELD_ALIASES[name], parse_date_ordinal)
+           for name in ('trade_date', 'effective_date', 'termination_date')},
+    },
+)
+
+
 def _scan_table(table_name: str) -> List[Dict]:
     """Internal helper to scan a DynamoDB table."""
-    from boto3.dynamodb.types import TypeDeserializer
-    deserializer = TypeDeserializer()
-    
-    dynamodb = get_boto_client('dynamodb')
-    response = dynamodb.scan(TableName=table_name)
-    items = response.get('Items', [])
-    
-    while 'LastEvaluatedKey' in response:
-        response = dynamodb.scan(
-            TableName=table_name,
-            ExclusiveStartKey=response['LastEvaluatedKey']
+    return parallel_scan(
+        get_boto_client('dynamodb'),
+        table_name,
+        SCAN_TOTAL_SEGMENTS,
+        attributes=_MATCH_ATTRIBUTES if SCAN_PROJECTION_ENABLED else None,
+    )
+
+
+# Resident trade books, one per table
+_trade_books: Dict[str, TradeBook] = {}
+_trade_books_lock = threading.Lock()
+
+
+def _create_change_feed(table_name: str):
+    """Create the configured change feed for a table, or None for periodic full reloads."""
+    try:
+        if TRADE_BOOK_CHANGE_FEED == "streams":
+            return DynamoDBStreamChangeFeed(
+                table_name, get_boto_client('dynamodb'), get_boto_client('dynamodbstreams')
+            )
+        if TRADE_BOOK_CHANGE_FEED.startswith("file:"):
+            return FileChangeFeed(os.path.join(TRADE_BOOK_CHANGE_FEED[len("file:"):], f"{table_name}.jsonl"))
+    except Exception as e:
+        logger.warning(f"Change feed unavailable for {table_name}, using full reloads: {e}")
+    return None
+
+
+_snapshot_writer: Optional[TradeBookSnapshotWriter] = None
+
+
+def _create_snapshot_store() -> Optional[S3SnapshotStore]:
+    """Create the trade book snapshot store and start the periodic writer, if snapshots are enabled."""
+    global _snapshot_writer
+    if not TRADE_BOOK_SNAPSHOT_ENABLED:
+        return None
+    if _snapshot_writer is None and TRADE_BOOK_SNAPSHOT_INTERVAL_SECONDS > 0:
+        _snapshot_writer = TradeBookSnapshotWriter(
+            lambda: list(_trade_books.values()), TRADE_BOOK_SNAPSHOT_INTERVAL_SECONDS
         )
-        items.extend(response.get('Items', []))
-    
-    trades = []
+        _snapshot_writer.start()
+    return S3SnapshotStore(get_boto_client('s3'), S3_BUCKET, TRADE_BOOK_SNAPSHOT_PREFIX)
+
+
+def _get_trade_book(table_name: str) -> TradeBook:
+    """Get or create the resident trade book for a table."""
+    with _trade_books_lock:
+        book = _trade_books.get(table_name)
+        if book is None:
+            book = TradeBook(
+                table_name,
+                loader=lambda: _scan_table(table_name),
+                change_feed=_create_change_feed(table_name),
+                max_staleness_seconds=TRADE_BOOK_MAX_STALENESS_SECONDS,
+                snapshot_store=_create_snapshot_store(),
+                convert=_TRADE_RECORD_LAYOUT.record if TRADE_BOOK_COMPACT_RECORDS else None,
+            )
+            _trade_books[table_name] = book
+        return book
+
+
+def _trade_dates(trade: Dict) -> List[Optional[int]]:
+    """Ordinals of the trade and settlement dates of a trade (None where missing or unparseable)."""
+    attributes = _extract_key_attributes(trade)
+    return [parse_date_ordinal(attributes.get('trade_date')), parse_date_ordinal(attributes.get('settlement_date'))]
+
+
+_ACTIVE_BOOK_POLICY = ActiveBookPolicy(ACTIVE_BOOK_WINDOW_DAYS, _trade_dates, lambda trade: _trade_id_of(trade))
+
+_matched_trade_ids: Optional[MatchedTradeIds] = None
+_trade_archive: Optional[S3TradeArchive] = None
+_active_book_lock = threading.Lock()
+
+
+def _load_matched_trade_ids() -> Dict[str, set]:
+    """IDs of the bank and counterparty trades recorded as matched (or approved) in the matches table."""
+    items = parallel_scan(
+        get_boto_client('dynamodb'),
+        ACTIVE_BOOK_MATCHES_TABLE,
+        SCAN_TOTAL_SEGMENTS,
+        attributes=['trade_id', 'classification', 'decision_status', 'counterparty_trade'],
+    )
+    bank_ids, counterparty_ids = set(), set()
     for item in items:
-        trade = {k: deserializer.deserialize(v) for k, v in item.items()}
-        trades.append(trade)
-    
-    return trades
+        if item.get('classification') != 'MATCHED' and item.get('decision_status') not in ('AUTO_MATCH', 'APPROVED'):
+            continue
+        if item.get('trade_id'):
+            bank_ids.add(str(item['trade_id']))
+        counterparty_id = (item.get('counterparty_trade') or {}).get('Trade_ID')
+        if counterparty_id:
+            counterparty_ids.add(str(counterparty_id))
+    return {BANK_TABLE: bank_ids, COUNTERPARTY_TABLE: counterparty_ids}
 
 
-def _extract_key_attributes(trade: Dict) -> Dict:
+def _get_matched_trade_ids() -> MatchedTradeIds:
+    global _matched_trade_ids
+    with _active_book_lock:
+        if _matched_trade_ids is None:
+            _matched_trade_ids = MatchedTradeIds(_load_matched_trade_ids, ACTIVE_BOOK_MATCHES_REFRESH_SECONDS)
+        return _matched_trade_ids
+
+
+def _get_trade_archive() -> S3TradeArchive:
+    global _trade_archive
+    with _active_book_lock:
+        if _trade_archive is None:
+            _trade_archive = S3TradeArchive(get_boto_client('s3'), S3_BUCKET, ACTIVE_BOOK_ARCHIVE_PREFIX)
+        return _trade_archive
+
+
+def _active_book_state(table_name: str) -> Tuple[str, Optional[frozenset], int]:
+    """Return (cache key, matched trade IDs or None, cutoff ordinal) of the active book of a table today."""
+    cutoff = _ACTIVE_BOOK_POLICY.cutoff()
+    if not ACTIVE_BOOK_MATCHES_TABLE:
+        return f"{cutoff}", None, cutoff
+    version, matched_ids = _get_matched_trade_ids().get()
+    return f"{cutoff}:{version}", matched_ids.get(table_name, frozenset()), cutoff
+
+
+def _active_trades(table_name: str, trades: List[Dict]) -> List[Dict]:
     """
-    Extract CDM-aligned matching attributes from a trade to reduce token usage.
+    The active trades among trades of a table (all of them unless the active book is enabled).
     
-    Based on FINOS/ISDA Common Domain Model (CDM) field specifications.
+    For the trades of a resident trade book the selection is cached per book
+    version, cutoff date and matched-ID version.
     """
-    # CDM-aligned field name variations (supporting both CDM standard names and legacy formats)
-    key_fields = {
-        # Core Identification
-        'trade_id': ['trade_id', 'Trade_ID', 'TradeID', 'tradeId', 'usi', 'uti'],
-        
-        # Product Classification
-        'product_type': ['product_type', 'Product_Type', 'ProductType', 'product_qualifier', 
-                         'Instrument', 'instrument', 'Trade_Type', 'trade_type', 'asset_class'],
-        'sub_product_type': ['sub_product_type', 'SubProductType'],
-        
-        # Economic Terms - Dates
-        'trade_date': ['trade_date', 'Trade_Date', 'TradeDate', 'tradeDate', 'execution_date'],
-        'effective_date': ['effective_date', 'Effective_Date', 'EffectiveDate', 'effectiveDate', 
-                           'Start_Date', 'start_date', 'value_date'],
-        'termination_date': ['termination_date', 'Termination_Date', 'TerminationDate', 
-                              'Maturity_Date', 'maturity_date', 'End_Date', 'end_date', 'expiry_date'],
-        
-        # Quantity & Price
-        'currency': ['currency', 'Currency', 'CCY', 'ccy', 'notional_currency'],
-        'notional': ['notional_amount', 'notional', 'Notional', 'NotionalAmount', 
-                     'Quantity', 'quantity', 'Total_Quantity', 'principal'],
-        'currency_2': ['currency_2', 'Currency_2', 'second_currency'],
-        'notional_2': ['notional_amount_2', 'notional_2', 'Notional_2'],
-        
-        # Counterparty Information
-        'party_a_name': ['party_a_name', 'Party_A_Name', 'Party_A', 'bank_name', 'Bank_Name'],
-        'party_b_name': ['party_b_name', 'Party_B_Name', 'Party_B', 'counterparty', 'Counterparty', 
-                         'CounterpartyName', 'Counterparty_Name'],
-        'party_a_lei': ['party_a_lei', 'Party_A_LEI', 'bank_lei', 'Bank_LEI'],
-        'party_b_lei': ['party_b_lei', 'Party_B_LEI', 'counterparty_lei', 'Counterparty_LEI'],
-        
-        # Interest Rate Terms (CDM critical fields)
-        'fixed_rate': ['fixed_rate', 'Fixed_Rate', 'FixedRate', 'Fixed_Price', 'fixed_price', 
-                       'Price', 'price', 'Rate', 'rate', 'coupon_rate'],
-        'floating_rate_index': ['floating_rate_index', 'Floating_Rate_Index', 'FloatingIndex', 
-                                 'Index', 'index', 'reference_rate', 'benchmark'],
-        'floating_rate_spread': ['floating_rate_spread', 'Spread', 'spread', 'margin'],
-        'day_count_fraction': ['day_count_fraction', 'Day_Count_Fraction', 'DayCountFraction',
-                                'day_count', 'Day_Count', 'DayCount', 'day_count_convention'],
-        'payment_frequency': ['payment_frequency', 'Payment_Frequency', 'PaymentFrequency',
-                               'frequency', 'Frequency', 'payment_period'],
-        'payment_frequency_2': ['payment_frequency_2', 'Payment_Frequency_2'],
-        'business_day_convention': ['business_day_convention', 'Business_Day_Convention',
-                                     'BusinessDayConvention', 'bdc'],
-        'reset_frequency': ['reset_frequency', 'Reset_Frequency', 'ResetFrequency'],
-        
-        # FX Terms
-        'fx_rate': ['fx_rate', 'FX_Rate', 'exchange_rate', 'Exchange_Rate'],
-        
-        # Settlement Terms
-        'settlement_type': ['settlement_type', 'Settlement_Type', 'SettlementType'],
-        'settlement_date': ['settlement_date', 'Settlement_Date', 'SettlementDate'],
-    }
-    
-    extracted = {}
-    for standard_name, variations in key_fields.items():
-        for var in variations:
-            if var in trade:
-                extracted[standard_name] = trade[var]
-                break
-    
-    return extracted
+    if not ACTIVE_BOOK_ENABLED:
+        return trades
+    key, matched_ids, cutoff = _active_book_state(table_name)
+    if TRADE_BOOK_ENABLED:
+        book_trades, active = _get_trade_book(table_name).derived(
+            f"active_book:{key}",
+            lambda snapshot: (snapshot, _ACTIVE_BOOK_POLICY.split(snapshot, matched_ids, cutoff)[0]),
+        )
+        # The book may have synced since the trades were read
+        if book_trades is trades:
+            return active
+    return _ACTIVE_BOOK_POLICY.split(trades, matched_ids, cutoff)[0]
 
 
-def _parse_date(date_str: str) -> Optional[datetime]:
-    """Parse various date formats to datetime object."""
-    if not date_str:
-        return None
+def _with_archived_trades(table_name: str, trades: List[Dict]) -> List[Dict]:
+    """trades plus the archived trades of the table that are no longer in it."""
+    present = {str(_trade_id_of(trade)) for trade in trades}
+    archived = [trade for trade in _get_trade_archive().load(table_name) if str(_trade_id_of(trade)) not in present]
+    logger.info(f"Archive search: {len(archived)} archived trades of {table_name} added to {len(trades)}")
+    return trades + archived
+
+
+def _load_all_trades(table_name: str, force_refresh: bool = False) -> List[Dict]:
+    if not TRADE_BOOK_ENABLED:
+        return _scan_table(table_name)
+    return _get_trade_book(table_name).trades(force_refresh=force_refresh)
+
+
+def _load_trades(table_name: str, force_refresh: bool = False, search_archive: bool = False) -> List[Dict]:
+    """
+    Return the candidate trades of a table, from the resident trade book when enabled.
     
-    date_formats = [
-        "%Y-%m-%d",
-        "%d/%m/%Y",
-        "%m/%d/%Y",
-        "%d %B %Y",
-        "%d %b %Y",
-        "%B %d, %Y",
-        "%Y%m%d",
-    ]
+    With the active book enabled these are its active trades; search_archive
+    returns every trade of the table plus the archived ones instead.
     
-    for fmt in date_formats:
-        try:
-            return datetime.strptime(str(date_str).strip(), fmt)
-        except ValueError:
-            continue
-    return None
+    The returned list and trades are shared with the book and must not be modified
+    (book trades are read-only TradeRecords unless MATCH_TRADE_BOOK_COMPACT_RECORDS is off).
+    """
+    trades = _load_all_trades(table_name, force_refresh)
+    if search_archive:
+        return _with_archived_trades(table_name, trades)
+    return _active_trades(table_name, trades)
 
 
-def _dates_within_tolerance(date1_str: str, date2_str: str, tolerance_days: int = 2) -> bool:
-    """Check if two dates are within tolerance (±days)."""
-    date1 = _parse_date(date1_str)
-    date2 = _parse_date(date2_str)
+def _load_trades_near(table_name: str, trade_date: Any, window_days: int, search_archive: bool = False) -> List[Dict]:
+    """
+    Return the candidate trades of a table that may be dated within ±window_days of trade_date.
+    
+    Uses the resident trade book when enabled. Otherwise queries TradeDateIndex
+    for each day of the window, falling back to a full scan when trade_date is
+    unusable, the index is unavailable or the window yields nothing (trades
+    without an indexed Trade_Date are only visible to a scan). The result may
+    contain trades outside the window; callers still filter by date. Only
+    active trades are returned unless search_archive (see _load_trades).
+    """
+    if TRADE_BOOK_ENABLED or CANDIDATE_RETRIEVAL != "index" or search_archive:
+        return _load_trades(table_name, search_archive=search_archive)
     
-    if date1 and date2:
-        delta = abs((date1 - date2).days)
-        return delta <= tolerance_days
+    center = _parse_date(trade_date)
+    if center is None:
+        logger.info(f"No usable trade date, scanning {table_name}")
+        return _active_trades(table_name, _scan_table(table_name))
     
-    # Fallback to string comparison if parsing fails
-    return str(date1_str).strip() == str(date2_str).strip()
+    planner = TradeDateQueryPlanner(
+        get_boto_client('dynamodb'),
+        attributes=_MATCH_ATTRIBUTES if SCAN_PROJECTION_ENABLED else None,
+    )
+    try:
+        trades = planner.query_window(table_name, center.date(), window_days)
+    except ClientError as e:
+        logger.warning(f"TradeDateIndex query failed on {table_name}, scanning instead: {e}")
+        return _active_trades(table_name, _scan_table(table_name))
+    if not trades:
+        logger.info(f"No indexed trades near {center.date()} in {table_name}, scanning")
+        return _active_trades(table_name, _scan_table(table_name))
+    return _active_trades(table_name, trades)
+
 
+def _build_trade_id_index(trades: List[Dict]) -> TradeIdIndex:
+    return TradeIdIndex(trades, _trade_id_of, normalize_trade_id)
 
-def _fuzzy_match_counterparty(name1: str, name2: str) -> float:
+
+def _build_counterparty_lsh(trades: List[Dict]) -> CounterpartyLshIndex:
+    return CounterpartyLshIndex(
+        [_extract_key_attributes(trade).get('party_b_name') for trade in trades],
+        threshold=COUNTERPARTY_LSH_THRESHOLD,
+    )
+
+
+def _book_index(name: str, trades: List[Dict], table_name: Optional[str], build: Callable[[List[Dict]], Any]) -> Any:
+    """
+    build(trades), built once per trade book version (and active-book view) when
+    trades are the book's (active) trades of table_name, otherwise on every call.
+    """
+    if TRADE_BOOK_ENABLED and table_name is not None:
+        def build_for_book(snapshot: List[Dict]) -> Tuple[List[Dict], Any]:
+            active = _active_trades(table_name, snapshot)
+            return active, build(active)
+        
+        view = f":{_active_book_state(table_name)[0]}" if ACTIVE_BOOK_ENABLED else ""
+        book_trades, index = _get_trade_book(table_name).derived(name + view, build_for_book)
+        # The book may have synced since the trades were read
+        if book_trades is trades:
+            return index
+    return build(trades)
+
+
+def _counterparty_lsh_index(trades: List[Dict], table_name: Optional[str] = None) -> CounterpartyLshIndex:
+    """
+    Counterparty LSH index over trades, built once per trade book version when
+    they are the book's (active) trades.
     """
-    Fuzzy match counterparty names. Returns a score between 0 and 1.
-    Handles variations like:
-    - "Merrill Lynch International" vs "MERRILL LYNCH INTL"
-    - "FAB Global Markets (Cayman) Limited" vs "FAB GLOBAL MARKETS"
+    return _book_index('counterparty_lsh', trades, table_name, _build_counterparty_lsh)
+
+
+def _build_blocking_index(trades: List[Dict]) -> CandidateBlockingIndex:
+    return CandidateBlockingIndex(
+        trades,
+        extract_attributes=_extract_key_attributes,
+        parse_date=_parse_date,
+        bucket_days=BLOCKING_BUCKET_DAYS,
+        date_tolerance_days=BLOCKING_DATE_TOLERANCE_DAYS,
+    )
+
+
+def _build_lei_index(trades: List[Dict]) -> LeiJoinIndex:
+    return LeiJoinIndex(
+        trades,
+        extract_attributes=_extract_key_attributes,
+        parse_date=_parse_date,
+        date_tolerance_days=BLOCKING_DATE_TOLERANCE_DAYS,
+    )
+
+
+def _find_source_trades(table_name: str, trade_ids: List[str]) -> Dict[str, Dict]:
     """
-    if not name1 or not name2:
-        return 0.0
+    Look up trades by ID, by exact ID or by a normalized alias (see TradeIdIndex).
     
-    # Normalize: uppercase, remove common suffixes, remove punctuation
-    def normalize(name):
-        name = str(name).upper()
-        # Remove common legal suffixes
-        suffixes = ['LIMITED', 'LTD', 'LLC', 'INC', 'CORP', 'CORPORATION', 
-                    'INTERNATIONAL', 'INTL', 'INT\'L', 'PLC', 'SA', 'AG', 'GMBH',
-                    '(CAYMAN)', 'CAYMAN', 'LP', 'LLP']
-        for suffix in suffixes:
-            name = name.replace(suffix, '')
-        # Remove punctuation and extra spaces
-        name = re.sub(r'[^\w\s]', '', name)
-        name = ' '.join(name.split())
-        return name
+    Uses the trade-ID index of the resident trade book when enabled. Otherwise
+    reads the trades by primary key (GetItem / BatchGetItem); only IDs that are
+    not a Trade_ID (other spellings or prefixes) cost a scan.
     
-    n1 = normalize(name1)
-    n2 = normalize(name2)
+    Returns:
+        Requested trade ID -> trade, for the IDs found
+    """
+    if TRADE_BOOK_ENABLED:
+        index = _get_trade_book(table_name).derived('trade_id_index', _build_trade_id_index)
+        found = {str(trade_id): index.get(trade_id) for trade_id in trade_ids}
+        return {trade_id: trade for trade_id, trade in found.items() if trade is not None}
     
-    # Exact match after normalization
-    if n1 == n2:
-        return 1.0
+    client = get_boto_client('dynamodb')
+    attributes = _MATCH_ATTRIBUTES if SCAN_PROJECTION_ENABLED else None
+    if len(trade_ids) == 1:
+        trade = get_trade(client, table_name, trade_ids[0], attributes)
+        found = {str(trade_ids[0]): trade} if trade is not None else {}
+    else:
+        found = batch_get_trades(client, table_name, trade_ids, attributes)
     
-    # Check if one contains the other
-    if n1 in n2 or n2 in n1:
-        return 0.9
+    missing = [str(trade_id) for trade_id in trade_ids if str(trade_id) not in found]
+    if missing:
+        logger.info(f"{len(missing)} trade ID(s) are not keys of {table_name}, resolving aliases with a scan")
+        index = _build_trade_id_index(_scan_table(table_name))
+        for trade_id in missing:
+            trade = index.get(trade_id)
+            if trade is not None:
+                found[trade_id] = trade
+    return found
+
+
+def refresh_trade_books() -> List[Dict[str, Any]]:
+    """Force a full reload of the bank and counterparty trade books and return their stats."""
+    stats = []
+    for table_name in (BANK_TABLE, COUNTERPARTY_TABLE):
+        book = _get_trade_book(table_name)
+        book.refresh(force=True)
+        stats.append(book.stats())
+    return stats
+
+
+# Trade table primary key and BatchWriteItem request limit
+_TRADE_TABLE_KEY = 'Trade_ID'
+_BATCH_WRITE_LIMIT = 25
+
+
+def _delete_trades(table_name: str, trades: List[Dict]) -> int:
+    """Delete trades from a table by primary key; returns the number deleted."""
+    client = get_boto_client('dynamodb')
+    serializer = TypeSerializer()
+    requests = [
+        {'DeleteRequest': {'Key': {_TRADE_TABLE_KEY: serializer.serialize(trade[_TRADE_TABLE_KEY])}}}
+        for trade in trades if trade.get(_TRADE_TABLE_KEY) is not None
+    ]
+    deleted = 0
+    for start in range(0, len(requests), _BATCH_WRITE_LIMIT):
+        pending = requests[start:start + _BATCH_WRITE_LIMIT]
+        for attempt in range(MAX_TOOL_RETRIES + 1):
+            response = client.batch_write_item(RequestItems={table_name: pending})
+            unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+            deleted += len(pending) - len(unprocessed)
+            pending = unprocessed
+            if not pending:
+                break
+            time.sleep(0.05 * 2 ** attempt)
+        if pending:
+            logger.warning(f"{len(pending)} archived trades could not be deleted from {table_name}")
+    return deleted
+
+
+def archive_inactive_trades(table_name: str, delete: bool = False) -> Dict[str, Any]:
+    """
+    Copy the inactive trades of a table (see active_book.py) to the S3 archive, whole items, with a manifest.
     
-    # Word overlap scoring
-    words1 = set(n1.split())
-    words2 = set(n2.split())
+    Trades already listed in an archive manifest are not archived again. With
+    delete, the inactive trades are then deleted from the table (they are all
+    archived by then); otherwise they stay in it, outside candidate retrieval
+    while the active book is enabled.
     
-    if not words1 or not words2:
-        return 0.0
+    Returns:
+        Summary with the trades scanned, inactive, archived, deleted and the archive run
+    """
+    items = parallel_scan(get_boto_client('dynamodb'), table_name, SCAN_TOTAL_SEGMENTS)
+    _, matched_ids, cutoff = _active_book_state(table_name)
+    _, inactive = _ACTIVE_BOOK_POLICY.split(items, matched_ids, cutoff)
+    archive = _get_trade_archive()
+    already_archived = archive.archived_ids(table_name)
+    new = [trade for trade in inactive if str(_trade_id_of(trade)) not in already_archived]
     
-    common_words = words1.intersection(words2)
-    total_words = words1.union(words2)
+    summary: Dict[str, Any] = {
+        "table": table_name,
+        "trades": len(items),
+        "inactive": len(inactive),
+        "archived": len(new),
+        "deleted": 0,
+        "cutoff": date.fromordinal(cutoff).isoformat(),
+        "run": None,
+    }
+    if new:
+        manifest = archive.write(
+            table_name, new, [str(_trade_id_of(trade)) for trade in new], date.fromordinal(cutoff),
+            ACTIVE_BOOK_WINDOW_DAYS,
+        )
+        summary["run"] = manifest["run"]
+    if delete and inactive:
+        summary["deleted"] = _delete_trades(table_name, inactive)
+    logger.info(f"Archive of {table_name}: {summary}")
+    return summary
+
+
+# Compiled alias table with cached per-schema-shape resolution plans
+_alias_resolver = FieldAliasResolver()
+
+
+def _extract_key_attributes(trade: Dict) -> Dict:
+    """
+    Extract CDM-aligned matching attributes from a trade to reduce token usage.
     
-    # Jaccard similarity
-    return len(common_words) / len(total_words) if total_words else 0.0
+    Based on FINOS/ISDA Common Domain Model (CDM) field specifications. Field
+    spellings are resolved through a plan cached per distinct item key set.
+    """
+    return _alias_resolver.resolve(trade)
 
 
 def _calculate_match_score(source_trade: Dict, target_trade: Dict) -> Dict:
     """
     Calculate a match score between two trades based on CDM-aligned matching criteria.
     
-    CDM Matching Criteria (FINOS/ISDA Common Domain Model):
-    - Currency: exact match required
+    CDM Matching Criteria (FINOS/ISDA Common Domain Model), see CDM_MATCH_RULES:
+    - Currency: exact match
     - Notional Amount: ±2% tolerance
     - Dates: ±2 business days tolerance (trade, effective, termination)
     - Counterparty: fuzzy name matching OR exact LEI match
@@ -317,257 +655,396 @@ def _calculate_match_score(source_trade: Dict, target_trade: Dict) -> Dict:
     
     Returns a dict with score, breakdown, and classification.
     """
-    score = 0.0
-    max_score = 0.0
+    evaluation = CDM_MATCH_RULES.evaluate(_extract_key_attributes(source_trade), _extract_key_attributes(target_trade))
+
     breakdown = {}
-    
-    source = _extract_key_attributes(source_trade)
-    target = _extract_key_attributes(target_trade)
-    
-    # =========================================================================
-    # 1. Currency (exact match, high weight) - 12 points
-    # =========================================================================
-    if 'currency' in source and 'currency' in target:
-        max_score += 12
-        if str(source['currency']).upper() == str(target['currency']).upper():
-            score += 12
-            breakdown['currency'] = {'match': True, 'source': source['currency'], 'target': target['currency']}
+    for result in evaluation.results:
+        if not result.reportable:
+            continue
+        if 'error' in result.detail:
+            breakdown[result.name] = {'match': False, **result.detail}
         else:
-            breakdown['currency'] = {'match': False, 'source': source['currency'], 'target': target['currency']}
+            breakdown[result.name] = {'match': result.match, 'source': result.source, 'target': result.target, **result.detail}
+
+    possible = evaluation.possible
+    final_score = (evaluation.earned / possible * 100) if possible > 0 else 0.0
+    
+    return {
+        'score': round(final_score, 1),
+        'breakdown': breakdown,
+        'points_earned': evaluation.earned,
+        'points_possible': possible,
+        'fields_compared': len(breakdown)
+    }
+
+
+# Cumulative recall of candidate blocking, measured on sampled requests
+_blocking_recall = BlockingRecallTracker()
+
+# How often source trades are matched through the LEI hash join
+_lei_join = LeiJoinTracker()
+
+_match_cache: Optional[MatchResultCache] = None
+_match_cache_lock = threading.Lock()
+
+
+def _get_match_cache() -> MatchResultCache:
+    """Get or create the match-result cache for the current CDM rule set."""
+    global _match_cache
+    with _match_cache_lock:
+        if _match_cache is None:
+            store = None
+            if MATCH_CACHE_TABLE:
+                store = DynamoDBResultStore(
+                    get_boto_client('dynamodb'), MATCH_CACHE_TABLE,
+                    ttl_seconds=int(MATCH_CACHE_TTL_DAYS * 86400) or None,
+                )
+            elif MATCH_CACHE_BUCKET:
+                store = S3ResultStore(get_boto_client('s3'), MATCH_CACHE_BUCKET, MATCH_CACHE_PREFIX)
+            _match_cache = MatchResultCache(CDM_MATCH_RULES.version, max_entries=MATCH_CACHE_SIZE, store=store)
+        return _match_cache
+
+
+def _match_attributes_hash(attributes: Dict, side: str) -> str:
+    """Content hash of the attributes CDM_MATCH_RULES reads from extracted trade attributes."""
+    return content_hash(CDM_MATCH_RULES.match_attributes(attributes, side))
+
+
+def _trade_id_of(trade: Dict) -> Any:
+    """Return the raw trade ID of a trade item, whichever key spelling it uses."""
+    return trade.get('Trade_ID') or trade.get('trade_id') or trade.get('TradeID')
+
+
+def _log_blocking_recall(
+    scorer: PrunedMatchScorer,
+    target_trades: List[Dict],
+    candidate_positions: List[int],
+    trade_id: str
+) -> None:
+    """Score every target trade without blocking and log the recall of the blocked set."""
+    full_scores = {
+        position: scorer.score(_extract_key_attributes(target))
+        for position, target in enumerate(target_trades)
+    }
+    
+    sample_recall = _blocking_recall.record(full_scores, set(candidate_positions))
+    stats = _blocking_recall.snapshot()
+    logger.info(
+        f"Blocking recall sample for trade {trade_id}: "
+        f"sample_recall={sample_recall if sample_recall is not None else 'n/a'}, "
+        f"cumulative_recall={stats['recall'] if stats['recall'] is not None else 'n/a'}, "
+        f"scored={len(candidate_positions)}/{len(target_trades)}",
+        extra={"blocking_recall": stats, "trade_id": trade_id}
+    )
+
+
+def _tables_for(source_type: str) -> Tuple[str, str]:
+    """Return (source table, target table) for a source type."""
+    if source_type.upper() == 'BANK':
+        return BANK_TABLE, COUNTERPARTY_TABLE
+    return COUNTERPARTY_TABLE, BANK_TABLE
+
+
+class _TargetCandidates:
+    """
+    Target trades prepared for scoring: the blocking, LEI and counterparty LSH
+    indexes and, when many source trades will be scored against them
+    (shared=True), precomputed key attributes and normalized fields. table_name
+    names the table of a trade book's trades, whose blocking, LEI and LSH
+    indexes are then built once per book version.
+    """
+    
+    def __init__(self, trades: List[Dict], shared: bool = False, table_name: Optional[str] = None):
+        self.trades = trades
+        self.attributes = [_extract_key_attributes(trade) for trade in trades] if shared else None
+        self.normalized = [normalize_attributes(attributes) for attributes in self.attributes] if shared else None
+        self.blocking_index = (
+            _book_index('blocking', trades, table_name, _build_blocking_index) if BLOCKING_ENABLED else None
+        )
+        self.lei_index = _book_index('lei_join', trades, table_name, _build_lei_index) if LEI_JOIN_ENABLED else None
+        self.counterparty_lsh = _counterparty_lsh_index(trades, table_name) if COUNTERPARTY_LSH_ENABLED else None
     
-    # =========================================================================
-    # 2. Notional Amount (±2% tolerance) - 15 points
-    # =========================================================================
-    if 'notional' in source and 'notional' in target:
-        max_score += 15
+    def attributes_of(self, position: int) -> Dict:
+        if self.attributes is not None:
+            return self.attributes[position]
+        return _extract_key_attributes(self.trades[position])
+
+
+def _match_allocations(
+    trade_id: str, scorer: PrunedMatchScorer, candidates: _TargetCandidates, candidate_positions: List[int]
+) -> Optional[Dict[str, Any]]:
+    """
+    Search the candidates for allocations of the source trade (see allocation_matching).
+    
+    A leg must score ALLOCATION_LEG_MIN_SCORE against the source with its notional
+    taken as the source's, i.e. agree on every field but the notional. The
+    allocation scores as its weakest leg; when several subsets fit, the score is
+    capped just below the match threshold so that the allocation is reviewed.
+    """
+    source_attributes = scorer.source
+    try:
+        source_notional = parse_notional(source_attributes['notional'])
+    except (KeyError, ValueError):
+        return None
+    if not source_notional > 0:
+        return None
+    
+    legs = []
+    for position in candidate_positions:
+        attributes = candidates.attributes_of(position)
         try:
-            s_notional = float(str(source['notional']).replace(',', '').replace(' ', ''))
-            t_notional = float(str(target['notional']).replace(',', '').replace(' ', ''))
-            if s_notional > 0:
-                diff_pct = abs(s_notional - t_notional) / s_notional
-                if diff_pct <= 0.02:  # Within 2%
-                    score += 15
-                    breakdown['notional'] = {'match': True, 'source': s_notional, 'target': t_notional, 'diff_pct': round(diff_pct * 100, 2)}
-                elif diff_pct <= 0.05:  # Within 5% - partial credit
-                    score += 8
-                    breakdown['notional'] = {'match': 'partial', 'source': s_notional, 'target': t_notional, 'diff_pct': round(diff_pct * 100, 2)}
-                else:
-                    breakdown['notional'] = {'match': False, 'source': s_notional, 'target': t_notional, 'diff_pct': round(diff_pct * 100, 2)}
-        except (ValueError, ZeroDivisionError):
-            breakdown['notional'] = {'match': False, 'error': 'parse_error'}
-    
-    # =========================================================================
-    # 3. Product Type (exact match) - 10 points
-    # =========================================================================
-    if 'product_type' in source and 'product_type' in target:
-        max_score += 10
-        s_type = str(source['product_type']).upper().replace('_', ' ').replace('-', ' ')
-        t_type = str(target['product_type']).upper().replace('_', ' ').replace('-', ' ')
-        if s_type == t_type:
-            score += 10
-            breakdown['product_type'] = {'match': True, 'source': source['product_type'], 'target': target['product_type']}
-        elif s_type in t_type or t_type in s_type:
-            score += 6
-            breakdown['product_type'] = {'match': 'partial', 'source': source['product_type'], 'target': target['product_type']}
-        else:
-            breakdown['product_type'] = {'match': False, 'source': source['product_type'], 'target': target['product_type']}
-    
-    # =========================================================================
-    # 4. Trade Date (±2 days tolerance) - 8 points
-    # =========================================================================
-    if 'trade_date' in source and 'trade_date' in target:
-        max_score += 8
-        if _dates_within_tolerance(source['trade_date'], target['trade_date'], 2):
-            score += 8
-            breakdown['trade_date'] = {'match': True, 'source': source['trade_date'], 'target': target['trade_date']}
-        else:
-            breakdown['trade_date'] = {'match': False, 'source': source['trade_date'], 'target': target['trade_date']}
-    
-    # =========================================================================
-    # 5. Effective Date (±2 days tolerance) - 8 points
-    # =========================================================================
-    if 'effective_date' in source and 'effective_date' in target:
-        max_score += 8
-        if _dates_within_tolerance(source['effective_date'], target['effective_date'], 2):
-            score += 8
-            breakdown['effective_date'] = {'match': True, 'source': source['effective_date'], 'target': target['effective_date']}
-        else:
-            breakdown['effective_date'] = {'match': False, 'source': source['effective_date'], 'target': target['effective_date']}
-    
-    # =========================================================================
-    # 6. Termination/Maturity Date (±2 days tolerance) - 8 points
-    # =========================================================================
-    if 'termination_date' in source and 'termination_date' in target:
-        max_score += 8
-        if _dates_within_tolerance(source['termination_date'], target['termination_date'], 2):
-            score += 8
-            breakdown['termination_date'] = {'match': True, 'source': source['termination_date'], 'target': target['termination_date']}
-        else:
-            breakdown['termination_date'] = {'match': False, 'source': source['termination_date'], 'target': target['termination_date']}
-    
-    # =========================================================================
-    # 7. Counterparty - LEI match (exact) OR Name match (fuzzy) - 8 points
-    # =========================================================================
-    # First try LEI match (preferred - exact match)
-    lei_matched = False
-    if 'party_b_lei' in source and 'party_b_lei' in target:
-        max_score += 8
-        if str(source['party_b_lei']).upper() == str(target['party_b_lei']).upper():
-            score += 8
-            lei_matched = True
-            breakdown['counterparty_lei'] = {'match': True, 'source': source['party_b_lei'], 'target': target['party_b_lei']}
-        else:
-            breakdown['counterparty_lei'] = {'match': False, 'source': source['party_b_lei'], 'target': target['party_b_lei']}
-    
-    # Fall back to fuzzy name matching if LEI not available or didn't match
-    if not lei_matched and 'party_b_name' in source and 'party_b_name' in target:
-        if 'party_b_lei' not in source or 'party_b_lei' not in target:
-            max_score += 8
-        fuzzy_score = _fuzzy_match_counterparty(source['party_b_name'], target['party_b_name'])
-        if fuzzy_score >= 0.8:
-            score += 8
-            breakdown['counterparty_name'] = {'match': True, 'source': source['party_b_name'], 'target': target['party_b_name'], 'similarity': round(fuzzy_score, 2)}
-        elif fuzzy_score >= 0.5:
-            score += 4
-            breakdown['counterparty_name'] = {'match': 'partial', 'source': source['party_b_name'], 'target': target['party_b_name'], 'similarity': round(fuzzy_score, 2)}
+            notional = parse_notional(attributes['notional'])
+        except (KeyError, ValueError):
+            continue
+        if not 0 < notional < source_notional * (1 + ALLOCATION_TOLERANCE):
+            continue
+        leg_score = scorer.score({**attributes, 'notional': source_attributes['notional']})
+        if leg_score >= ALLOCATION_LEG_MIN_SCORE:
+            legs.append((position, notional, leg_score))
+    if len(legs) < 2:
+        return None
+    
+    target = to_cents(source_notional)
+    search = find_allocation_subset(
+        target,
+        [to_cents(notional) for _, notional, _ in legs],
+        tolerance=int(target * ALLOCATION_TOLERANCE),
+        max_legs=ALLOCATION_MAX_LEGS,
+        max_subsets=ALLOCATION_MAX_SUBSETS,
+    )
+    logger.info(
+        f"Allocation search for trade {trade_id}: {len(legs)} possible legs, {search.enumerated} subsets "
+        f"enumerated{' (truncated)' if search.truncated else ''}, {search.solutions} fitting"
+    )
+    if search.indexes is None:
+        return None
+    
+    chosen = [legs[index] for index in search.indexes]
+    score = min(leg_score for _, _, leg_score in chosen)
+    ambiguous = search.solutions > 1
+    if ambiguous:
+        score = min(score, round(MATCHED_THRESHOLD - 0.1, 1))
+    notional_total = search.total / 100
+    return {
+        "trade_ids": [str(_trade_id_of(candidates.trades[position])) for position, _, _ in chosen],
+        "legs": [
+            {"trade_id": str(_trade_id_of(candidates.trades[position])), "notional": notional, "score": leg_score}
+            for position, notional, leg_score in chosen
+        ],
+        "notional_total": notional_total,
+        "difference_percent": round(abs(notional_total - source_notional) / source_notional * 100, 4),
+        "score": score,
+        "ambiguous": ambiguous,
+        "alternatives": search.solutions - 1,
+        "truncated": search.truncated,
+    }
+
+
+def _match_source_trade(
+    trade_id: str, source_trade: Dict, source_table: str, candidates: _TargetCandidates
+) -> Dict[str, Any]:
+    """Score one source trade against prepared target candidates and build the match analysis."""
+    target_trades = candidates.trades
+    source_attributes = _extract_key_attributes(source_trade)
+    scorer = PrunedMatchScorer(source_attributes)
+    
+    # LEI hash join: an equal LEI is authoritative, so when the trades sharing the
+    # source LEI and currency include a match, only they are scored (and no
+    # counterparty name is compared)
+    top = None
+    if candidates.lei_index is not None:
+        lei_positions = candidates.lei_index.probe(source_attributes)
+        if lei_positions is None:
+            outcome = NO_SOURCE_LEI
+        elif not lei_positions:
+            outcome = NO_LEI_CANDIDATES
         else:
-            breakdown['counterparty_name'] = {'match': False, 'source': source['party_b_name'], 'target': target['party_b_name'], 'similarity': round(fuzzy_score, 2)}
-    
-    # =========================================================================
-    # 8. Day Count Fraction (exact match - CDM critical) - 8 points
-    # =========================================================================
-    if 'day_count_fraction' in source and 'day_count_fraction' in target:
-        max_score += 8
-        s_dc = str(source['day_count_fraction']).upper().replace(' ', '').replace('_', '/')
-        t_dc = str(target['day_count_fraction']).upper().replace(' ', '').replace('_', '/')
-        # Normalize common variations
-        dc_aliases = {
-            'ACT/360': ['ACT/360', 'ACTUAL/360', 'A/360'],
-            'ACT/365': ['ACT/365', 'ACTUAL/365', 'A/365', 'ACT/365F', 'ACT/365FIXED'],
-            '30/360': ['30/360', '30E/360', 'BOND', 'BONDBASIS'],
-            'ACT/ACT': ['ACT/ACT', 'ACTUAL/ACTUAL', 'ACT/ACTISDA', 'ACT/ACTISMA'],
-        }
-        s_normalized = s_dc
-        t_normalized = t_dc
-        for standard, aliases in dc_aliases.items():
-            if s_dc in aliases:
-                s_normalized = standard
-            if t_dc in aliases:
-                t_normalized = standard
-        
-        if s_normalized == t_normalized:
-            score += 8
-            breakdown['day_count_fraction'] = {'match': True, 'source': source['day_count_fraction'], 'target': target['day_count_fraction']}
+            lei_top = scorer.top_k(
+                ((position, candidates.attributes_of(position)) for position in lei_positions),
+                k=TOP_K_CANDIDATES,
+                normalized=candidates.normalized,
+            )
+            outcome = LEI_PATH if lei_top.entries[0][0] >= LEI_JOIN_MIN_SCORE else BELOW_THRESHOLD
+            if outcome == LEI_PATH:
+                top, candidate_positions = lei_top, lei_positions
+        _lei_join.record(outcome)
+        logger.info(f"LEI join for trade {trade_id}: {outcome} ({len(lei_positions or ())} candidates)")
+    
+    if top is None:
+        # Restrict scoring to trades sharing a blocking key with the source trade
+        if candidates.blocking_index is not None:
+            candidate_positions = candidates.blocking_index.candidate_positions(source_trade)
+            logger.info(
+                f"Blocking selected {len(candidate_positions)} of {len(target_trades)} "
+                f"candidates across {candidates.blocking_index.block_count} blocks"
+            )
         else:
-            breakdown['day_count_fraction'] = {'match': False, 'source': source['day_count_fraction'], 'target': target['day_count_fraction']}
-    
-    # =========================================================================
-    # 9. Payment Frequency (exact match - CDM critical) - 7 points
-    # =========================================================================
-    if 'payment_frequency' in source and 'payment_frequency' in target:
-        max_score += 7
-        freq_aliases = {
-            'MONTHLY': ['MONTHLY', '1M', 'M', 'MONTH'],
-            'QUARTERLY': ['QUARTERLY', '3M', 'Q', 'QUARTER'],
-            'SEMI_ANNUAL': ['SEMI_ANNUAL', 'SEMIANNUAL', '6M', 'S', 'SEMI-ANNUAL'],
-            'ANNUAL': ['ANNUAL', '12M', 'A', 'YEARLY', '1Y'],
-        }
-        s_freq = str(source['payment_frequency']).upper().replace('-', '_').replace(' ', '')
-        t_freq = str(target['payment_frequency']).upper().replace('-', '_').replace(' ', '')
+            candidate_positions = list(range(len(target_trades)))
         
-        s_normalized = s_freq
-        t_normalized = t_freq
-        for standard, aliases in freq_aliases.items():
-            if s_freq in aliases:
-                s_normalized = standard
-            if t_freq in aliases:
-                t_normalized = standard
-        
-        if s_normalized == t_normalized:
-            score += 7
-            breakdown['payment_frequency'] = {'match': True, 'source': source['payment_frequency'], 'target': target['payment_frequency']}
-        else:
-            breakdown['payment_frequency'] = {'match': False, 'source': source['payment_frequency'], 'target': target['payment_frequency']}
-    
-    # =========================================================================
-    # 10. Floating Rate Index (exact match - CDM critical) - 8 points
-    # =========================================================================
-    if 'floating_rate_index' in source and 'floating_rate_index' in target:
-        max_score += 8
-        index_aliases = {
-            'SOFR': ['SOFR', 'USD-SOFR', 'SECURED OVERNIGHT FINANCING RATE'],
-            'EURIBOR': ['EURIBOR', 'EUR-EURIBOR', 'EURO INTERBANK OFFERED RATE'],
-            'ESTR': ['ESTR', 'EUR-ESTR', '€STR', 'EURO SHORT-TERM RATE'],
-            'SONIA': ['SONIA', 'GBP-SONIA', 'STERLING OVERNIGHT INDEX AVERAGE'],
-            'LIBOR': ['LIBOR', 'USD-LIBOR', 'GBP-LIBOR', 'EUR-LIBOR'],
-            'EIBOR': ['EIBOR', 'AED-EIBOR', 'EMIRATES INTERBANK OFFERED RATE'],
-        }
-        s_idx = str(source['floating_rate_index']).upper().replace('-', ' ').replace('_', ' ')
-        t_idx = str(target['floating_rate_index']).upper().replace('-', ' ').replace('_', ' ')
+        # Counterparty LSH: keep near-duplicate (or missing) counterparty names, unless none are left
+        if candidates.counterparty_lsh is not None:
+            near = candidates.counterparty_lsh.near_positions(source_attributes.get('party_b_name'))
+            if near is not None:
+                narrowed = [position for position in candidate_positions if position in near]
+                logger.info(f"Counterparty LSH kept {len(narrowed)} of {len(candidate_positions)} candidates")
+                if narrowed:
+                    candidate_positions = narrowed
         
-        s_normalized = s_idx
-        t_normalized = t_idx
-        for standard, aliases in index_aliases.items():
-            for alias in aliases:
-                if alias in s_idx:
-                    s_normalized = standard
-                if alias in t_idx:
-                    t_normalized = standard
+        # Phase 1: points-only scoring with upper-bound pruning, keeping the top 5
+        top = scorer.top_k(
+            ((position, candidates.attributes_of(position)) for position in candidate_positions),
+            k=TOP_K_CANDIDATES,
+            normalized=candidates.normalized,
+        )
+        logger.info(f"Top-{TOP_K_CANDIDATES} scoring: {top.scored} candidates, {top.pruned} pruned early")
         
-        if s_normalized == t_normalized:
-            score += 8
-            breakdown['floating_rate_index'] = {'match': True, 'source': source['floating_rate_index'], 'target': target['floating_rate_index']}
-        else:
-            breakdown['floating_rate_index'] = {'match': False, 'source': source['floating_rate_index'], 'target': target['floating_rate_index']}
+        if BLOCKING_ENABLED and random.random() < BLOCKING_RECALL_SAMPLE_RATE:
+            _log_blocking_recall(scorer, target_trades, candidate_positions, trade_id)
     
-    # =========================================================================
-    # 11. Fixed Rate/Price (±1bp tolerance) - 8 points
-    # =========================================================================
-    if 'fixed_rate' in source and 'fixed_rate' in target:
-        max_score += 8
-        try:
-            s_rate = float(str(source['fixed_rate']).replace(',', '').replace('%', ''))
-            t_rate = float(str(target['fixed_rate']).replace(',', '').replace('%', ''))
-            
-            # Normalize if one is in percentage and other in decimal
-            if s_rate > 1 and t_rate < 1:
-                s_rate = s_rate / 100
-            elif t_rate > 1 and s_rate < 1:
-                t_rate = t_rate / 100
-            
-            diff_bps = abs(s_rate - t_rate) * 10000  # Convert to basis points
-            if diff_bps <= 1:  # Within 1bp
-                score += 8
-                breakdown['fixed_rate'] = {'match': True, 'source': s_rate, 'target': t_rate, 'diff_bps': round(diff_bps, 2)}
-            elif diff_bps <= 5:  # Within 5bp
-                score += 4
-                breakdown['fixed_rate'] = {'match': 'partial', 'source': s_rate, 'target': t_rate, 'diff_bps': round(diff_bps, 2)}
-            else:
-                breakdown['fixed_rate'] = {'match': False, 'source': s_rate, 'target': t_rate, 'diff_bps': round(diff_bps, 2)}
-        except (ValueError, ZeroDivisionError):
-            breakdown['fixed_rate'] = {'match': False, 'error': 'parse_error'}
+    # Phase 2: breakdown and attributes for the survivors only, reusing cached results
+    # of pairs whose match attributes are unchanged. Only breakdowns are cached: phase 1
+    # points (and allocation leg scores) cost less than hashing every candidate's attributes
+    cache = _get_match_cache()
+    source_hash = _match_attributes_hash(source_attributes, SOURCE)
+    match_results = cache.resolve([
+        (
+            cache.key(source_hash, _match_attributes_hash(candidates.attributes_of(position), TARGET)),
+            lambda target=target_trades[position]: _calculate_match_score(source_trade, target),
+        )
+        for _, position in top.entries
+    ])
+    top_candidates = []
+    for (_, position), match_result in zip(top.entries, match_results):
+        target = target_trades[position]
+        top_candidates.append({
+            "trade_id": str(_trade_id_of(target)),
+            "score": match_result['score'],
+            "breakdown": match_result['breakdown'],
+            "attributes": candidates.attributes_of(position)
+        })
     
-    # =========================================================================
-    # Calculate final score
-    # =========================================================================
-    final_score = (score / max_score * 100) if max_score > 0 else 0.0
+    # Determine classification based on top score
+    top_score = top_candidates[0]['score'] if top_candidates else 0
+    classification = classify_score(top_score)
     
+    # Allocation matching: a block confirmed as several allocations matches no single trade
+    allocation = None
+    match_type = "ONE_TO_ONE"
+    if ALLOCATION_MATCHING_ENABLED and top_score < MATCHED_THRESHOLD:
+        allocation = _match_allocations(trade_id, scorer, candidates, candidate_positions)
+        if allocation is not None and allocation['score'] > top_score:
+            top_score = allocation['score']
+            classification = classify_score(top_score)
+            match_type = "ALLOCATION"
+    
+    logger.info(f"Match analysis complete: {classification} ({top_score}%, {match_type}) for trade {trade_id}")
     return {
-        'score': round(final_score, 1),
-        'breakdown': breakdown,
-        'points_earned': score,
-        'points_possible': max_score,
-        'fields_compared': len(breakdown)
+        "source_trade": {
+            "trade_id": str(trade_id),
+            "table": source_table,
+            "attributes": source_attributes
+        },
+        "best_match": top_candidates[0] if top_candidates else None,
+        "other_candidates": top_candidates[1:4] if len(top_candidates) > 1 else [],
+        "classification": classification,
+        "confidence": top_score,
+        "match_type": match_type,
+        "allocation": allocation,
+        "total_candidates_evaluated": len(target_trades),
+        "candidates_scored": len(candidate_positions)
     }
 
 
+def _find_archived_trades(table_name: str, trade_ids: List[str]) -> Dict[str, Dict]:
+    """Look up archived trades by ID, like _find_source_trades."""
+    index = _build_trade_id_index(_get_trade_archive().load(table_name))
+    found = {str(trade_id): index.get(trade_id) for trade_id in trade_ids}
+    return {trade_id: trade for trade_id, trade in found.items() if trade is not None}
+
+
+def _find_trade_matches(trade_id: str, source_type: str, search_archive: bool = False) -> Dict[str, Any]:
+    """Score a trade against the opposite table; see find_trade_matches. Errors are returned, not raised."""
+    try:
+        source_table, target_table = _tables_for(source_type)
+        
+        # Keyed source lookup, then the target trades around the source trade date
+        # (resident trade books when enabled, otherwise GetItem and TradeDateIndex queries)
+        source_trade = _find_source_trades(source_table, [trade_id]).get(str(trade_id))
+        if not source_trade and search_archive:
+            source_trade = _find_archived_trades(source_table, [trade_id]).get(str(trade_id))
+        
+        if not source_trade:
+            return {
+                "error": f"Trade {trade_id} not found in {source_table}",
+                "found": False
+            }
+        
+        target_trades = _load_trades_near(
+            target_table,
+            _extract_key_attributes(source_trade).get('trade_date'),
+            BLOCKING_DATE_TOLERANCE_DAYS,
+            search_archive=search_archive,
+        )
+        logger.info(f"Loaded {len(target_trades)} candidate trades from {target_table}")
+        
+        result = _match_source_trade(
+            trade_id, source_trade, source_table, _TargetCandidates(target_trades, table_name=target_table)
+        )
+        logger.info(f"Field alias resolver stats: {_alias_resolver.stats()}")
+        return result
+    
+    except Exception as e:
+        logger.error(f"Error in find_trade_matches: {e}")
+        return {"error": str(e), "trade_id": trade_id}
+
+
+def _find_trade_matches_batch(
+    trade_ids: List[str], source_type: str, search_archive: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Score many trades of one table against the opposite table, yielding one analysis per trade ID.
+    
+    The source trades are looked up by key in one batch and the target table is
+    loaded once; the target attributes, normalized fields and blocking index are
+    built once and shared by every source trade, so a batch costs one table load
+    instead of one per trade. Each analysis is identical to _find_trade_matches
+    for the same trade; errors are yielded per trade.
+    """
+    source_table, target_table = _tables_for(source_type)
+    sources_by_id = _find_source_trades(source_table, trade_ids)
+    missing = [trade_id for trade_id in trade_ids if str(trade_id) not in sources_by_id]
+    if search_archive and missing:
+        sources_by_id.update(_find_archived_trades(source_table, missing))
+    target_trades = _load_trades(target_table, search_archive=search_archive)
+    logger.info(
+        f"Batch of {len(trade_ids)}: found {len(sources_by_id)} in {source_table}, "
+        f"loaded {len(target_trades)} from {target_table}"
+    )
+    candidates = _TargetCandidates(target_trades, shared=True, table_name=target_table)
+    
+    for trade_id in trade_ids:
+        source_trade = sources_by_id.get(str(trade_id))
+        if source_trade is None:
+            yield {"trade_id": str(trade_id), "error": f"Trade {trade_id} not found in {source_table}", "found": False}
+            continue
+        try:
+            yield _match_source_trade(trade_id, source_trade, source_table, candidates)
+        except Exception as e:
+            logger.error(f"Error in batch match for {trade_id}: {e}")
+            yield {"trade_id": str(trade_id), "error": str(e)}
+    logger.info(f"Field alias resolver stats: {_alias_resolver.stats()}")
+
+
 @tool
-def find_trade_matches(trade_id: str, source_type: str) -> str:
+def find_trade_matches(trade_id: str, source_type: str, search_archive: bool = False) -> str:
     """
     Find potential matches for a trade by comparing against the opposite table.
     This tool does the heavy lifting of scanning both tables and calculating
     match scores based on OTC derivative matching criteria.
     
+    Only trades sharing a blocking key with the source trade (currency, product
+    type and a trade-date bucket widened to the ±2 day tolerance) are scored.
+    
     Matching Criteria:
     - Currency: exact match required
     - Notional Amount: ±2% tolerance  
@@ -576,88 +1053,132 @@ def find_trade_matches(trade_id: str, source_type: str) -> str:
     - Product Type: exact match
     - Fixed Rate/Price: ±1% tolerance
     
+    When no single trade matches, blocked trades agreeing on every field but the
+    notional are searched for an allocation: a subset whose notionals sum to the
+    source notional (match_type ALLOCATION when it scores better).
+    
     Args:
         trade_id: The trade ID to match.
         source_type: Either 'BANK' or 'COUNTERPARTY' indicating which table the trade is from.
+        search_archive: Also search old, settled trades moved out of the active book (investigations only).
     
     Returns:
         JSON with the source trade, top matching candidates with scores and breakdown.
     """
+    return json.dumps(_find_trade_matches(trade_id, source_type, search_archive), cls=DecimalEncoder)
+
+
+@tool
+def find_trade_matches_batch(trade_ids: List[str], source_type: str, search_archive: bool = False) -> str:
+    """
+    Find potential matches for several trades from the same system in one pass.
+    Use this instead of calling find_trade_matches once per trade: both tables
+    are loaded once and shared by every trade in the batch.
+    
+    Args:
+        trade_ids: The trade IDs to match.
+        source_type: Either 'BANK' or 'COUNTERPARTY' indicating which table the trades are from.
+        search_archive: Also search old, settled trades moved out of the active book (investigations only).
+    
+    Returns:
+        JSON with one find_trade_matches result per trade ID, in request order.
+    """
     try:
-        # Determine source and target tables
-        if source_type.upper() == 'BANK':
-            source_table = BANK_TABLE
-            target_table = COUNTERPARTY_TABLE
-        else:
-            source_table = COUNTERPARTY_TABLE
-            target_table = BANK_TABLE
-        
-        # Scan both tables
-        source_trades = _scan_table(source_table)
-        target_trades = _scan_table(target_table)
-        
-        logger.info(f"Scanned {len(source_trades)} from {source_table}, {len(target_trades)} from {target_table}")
-        
-        # Find the source trade
-        source_trade = None
-        for trade in source_trades:
-            trade_id_value = trade.get('Trade_ID') or trade.get('trade_id') or trade.get('TradeID')
-            if str(trade_id_value) == str(trade_id):
-                source_trade = trade
-                break
+        results = list(_find_trade_matches_batch(trade_ids, source_type, search_archive))
+        return json.dumps({"results": results, "trade_count": len(results)}, cls=DecimalEncoder)
+    except Exception as e:
+        logger.error(f"Error in find_trade_matches_batch: {e}")
+        return json.dumps({"error": str(e), "trade_ids": trade_ids})
+
+
+def reconcile_business_day(
+    trade_date: Optional[str] = None, method: str = RECONCILIATION_METHOD, search_archive: bool = False
+) -> Dict[str, Any]:
+    """
+    Reconcile all bank trades of a business day against the counterparty table in one pass.
+    
+    Every blocked pair is scored once and a one-to-one assignment is solved, so no
+    counterparty trade is claimed by two bank trades. Counterparty trades within the
+    date tolerance of the day are eligible; only those dated on the day itself are
+    reported as breaks when left unassigned.
+    
+    Args:
+        trade_date: Business day to reconcile (any supported date format); None for the whole book
+        method: Assignment method - auto, hungarian or greedy
+        search_archive: Include trades outside the active book and archived trades
+    
+    Returns:
+        Summary and per-trade results with MATCHED/PROBABLE_MATCH/REVIEW_REQUIRED/BREAK
+    """
+    reported_counterparty = None
+    if trade_date:
+        day = _parse_date(trade_date)
+        if day is None:
+            raise ValueError(f"Unparseable trade_date: {trade_date}")
+        bank_trades = _load_trades_near(BANK_TABLE, trade_date, 0, search_archive=search_archive)
+        counterparty_trades = _load_trades_near(
+            COUNTERPARTY_TABLE, trade_date, BLOCKING_DATE_TOLERANCE_DAYS, search_archive=search_archive
+        )
+        day = day.toordinal()
         
-        if not source_trade:
-            return json.dumps({
-                "error": f"Trade {trade_id} not found in {source_table}",
-                "found": False
-            })
+        def offset(trade: Dict) -> Optional[int]:
+            parsed = _parse_date(_extract_key_attributes(trade).get('trade_date'))
+            return parsed.toordinal() - day if parsed else None
         
-        # Calculate match scores for all target trades
-        candidates = []
-        for target in target_trades:
-            match_result = _calculate_match_score(source_trade, target)
-            target_id = target.get('Trade_ID') or target.get('trade_id') or target.get('TradeID')
-            candidates.append({
-                "trade_id": str(target_id),
-                "score": match_result['score'],
-                "breakdown": match_result['breakdown'],
-                "attributes": _extract_key_attributes(target)
+        bank_trades = [trade for trade in bank_trades if offset(trade) == 0]
+        eligible = [
+            (trade, delta) for trade, delta in ((trade, offset(trade)) for trade in counterparty_trades)
+            if delta is not None and abs(delta) <= BLOCKING_DATE_TOLERANCE_DAYS
+        ]
+        counterparty_trades = [trade for trade, _ in eligible]
+        reported_counterparty = {position for position, (_, delta) in enumerate(eligible) if delta == 0}
+    else:
+        bank_trades = _load_trades(BANK_TABLE, search_archive=search_archive)
+        counterparty_trades = _load_trades(COUNTERPARTY_TABLE, search_archive=search_archive)
+    
+    reconciler = ShardedTradeReconciler(
+        extract_attributes=_extract_key_attributes,
+        parse_date=_parse_date,
+        workers=RECONCILIATION_WORKERS,
+        min_parallel_trades=RECONCILIATION_MIN_PARALLEL_TRADES,
+        method=method,
+        bucket_days=BLOCKING_BUCKET_DAYS,
+        date_tolerance_days=BLOCKING_DATE_TOLERANCE_DAYS,
+    )
+    reconciliation = reconciler.reconcile(bank_trades, counterparty_trades)
+    
+    results = []
+    for bank_position, trade in enumerate(bank_trades):
+        assigned = reconciliation.counterparty_for(bank_position)
+        results.append({
+            "bank_trade_id": str(_trade_id_of(trade)),
+            "counterparty_trade_id": str(_trade_id_of(counterparty_trades[assigned[0]])) if assigned else None,
+            "score": assigned[1] if assigned else None,
+            "classification": classify_score(assigned[1] if assigned else None),
+        })
+    for position in reconciliation.unmatched_counterparty_positions:
+        if reported_counterparty is None or position in reported_counterparty:
+            results.append({
+                "bank_trade_id": None,
+                "counterparty_trade_id": str(_trade_id_of(counterparty_trades[position])),
+                "score": None,
+                "classification": "BREAK",
             })
-        
-        # Sort by score descending and take top 5
-        candidates.sort(key=lambda x: x['score'], reverse=True)
-        top_candidates = candidates[:5]
-        
-        # Determine classification based on top score
-        top_score = top_candidates[0]['score'] if top_candidates else 0
-        if top_score >= 85:
-            classification = "MATCHED"
-        elif top_score >= 70:
-            classification = "PROBABLE_MATCH"
-        elif top_score >= 50:
-            classification = "REVIEW_REQUIRED"
-        else:
-            classification = "BREAK"
-        
-        result = {
-            "source_trade": {
-                "trade_id": str(trade_id),
-                "table": source_table,
-                "attributes": _extract_key_attributes(source_trade)
-            },
-            "best_match": top_candidates[0] if top_candidates else None,
-            "other_candidates": top_candidates[1:4] if len(top_candidates) > 1 else [],
-            "classification": classification,
-            "confidence": top_score,
-            "total_candidates_evaluated": len(target_trades)
-        }
-        
-        logger.info(f"Match analysis complete: {classification} ({top_score}%) for trade {trade_id}")
-        return json.dumps(result, cls=DecimalEncoder)
     
-    except Exception as e:
-        logger.error(f"Error in find_trade_matches: {e}")
-        return json.dumps({"error": str(e), "trade_id": trade_id})
+    summary: Dict[str, Any] = {"total_results": len(results)}
+    for entry in results:
+        summary[entry["classification"]] = summary.get(entry["classification"], 0) + 1
+    
+    return {
+        "trade_date": trade_date,
+        "bank_trades": len(bank_trades),
+        "counterparty_trades": len(counterparty_trades),
+        "pairs_scored": reconciliation.pairs_scored,
+        "assignment_methods": reconciliation.methods,
+        "shards": reconciliation.shards,
+        "summary": summary,
+        "results": results,
+    }
 
 
 # ============================================================================
@@ -758,16 +1279,21 @@ Match trades between bank and counterparty systems by analyzing their attributes
 CRITICAL: Bank and counterparty systems use COMPLETELY DIFFERENT Trade_IDs for the same trade.
 You must match by comparing trade characteristics, NOT by matching IDs directly.
 
-##Available Tool##
-You have ONE tool available:
+##Available Tools##
 **find_trade_matches** - Finds and scores potential matches for a trade
   - Parameters: trade_id (string), source_type ('BANK' or 'COUNTERPARTY')
-  - Returns: Source trade attributes, top 5 matching candidates with scores, preliminary classification
+  - Returns: Source trade attributes, top 5 matching candidates with scores, preliminary classification,
+    and an allocation (several trades whose notionals sum to the source notional) when no single trade matches
+**find_trade_matches_batch** - Same analysis for several trades of one system at once
+  - Parameters: trade_ids (list of strings), source_type ('BANK' or 'COUNTERPARTY')
+  - Returns: One find_trade_matches result per trade ID
 
 ##CRITICAL INSTRUCTIONS##
 1. Call find_trade_matches with the trade_id and source_type
 2. Review the results returned by the tool
 3. Confirm or adjust the classification based on the attribute comparison
+   (when match_type is ALLOCATION, the classification is for the allocation legs together;
+   an ambiguous allocation has other subsets that also fit the notional)
 4. Return your final analysis as JSON
 
 ##Classification Thresholds##
@@ -784,6 +1310,7 @@ After reviewing the tool results, respond with:
   "confidence_score": 85.5,
   "source_trade_id": "the trade being matched",
   "matched_trade_id": "the best matching counterparty trade ID",
+  "matched_trade_ids": ["the allocation trade IDs, only for an allocation match"],
   "reasoning": "brief explanation of why this classification was chosen"
 }}
 ```
@@ -862,8 +1389,8 @@ def create_nova_model() -> BedrockModel:
     )
 
 
-# Custom tools list - single smart tool that does the heavy lifting
-CUSTOM_TOOLS = [find_trade_matches]
+# Custom tools list - smart tools that do the heavy lifting
+CUSTOM_TOOLS = [find_trade_matches, find_trade_matches_batch]
 
 
 def _invoke_with_mcp(prompt: str, session_manager=None) -> Any:
@@ -954,12 +1481,166 @@ def _extract_token_metrics(result) -> Dict[str, int]:
 # AgentCore Entrypoint
 # ============================================================================
 
+# Requests served per execution path (rules fast path vs LLM) and their latencies
+_execution_paths = ExecutionPathTracker()
+
+
+def _fast_path_response(
+    analysis: Dict[str, Any], trade_id: str, source_type: str, correlation_id: str, start_time: datetime
+) -> Dict[str, Any]:
+    """Build the entrypoint response for a result decided by the rules alone."""
+    best_match = analysis["best_match"]
+    decision = {
+        "match_classification": analysis["classification"],
+        "confidence_score": analysis["confidence"],
+        "source_trade_id": str(trade_id),
+        "matched_trade_id": best_match["trade_id"] if best_match else None,
+        "reasoning": (
+            f"Deterministic rules score {analysis['confidence']}% across "
+            f"{analysis['candidates_scored']} candidates; outside the review band, no LLM review needed"
+        ),
+    }
+    if analysis.get("match_type") == "ALLOCATION":
+        allocation = analysis["allocation"]
+        decision["matched_trade_id"] = None
+        decision["matched_trade_ids"] = allocation["trade_ids"]
+        decision["reasoning"] = (
+            f"Allocation of {len(allocation['trade_ids'])} trades summing to the source notional "
+            f"(difference {allocation['difference_percent']}%), weakest leg scores {analysis['confidence']}%; "
+            f"outside the review band, no LLM review needed"
+        )
+    processing_time_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+    _execution_paths.record(FAST_PATH, processing_time_ms)
+    logger.info(
+        f"[{correlation_id}] Trade matching completed on fast path - "
+        f"trade_id={trade_id}, classification={analysis['classification']}, "
+        f"confidence={analysis['confidence']:.1f}%, time={processing_time_ms:.0f}ms, "
+        f"paths={_execution_paths.stats()}"
+    )
+    return {
+        "success": True,
+        "trade_id": trade_id,
+        "source_type": source_type,
+        "correlation_id": correlation_id,
+        "agent_response": json.dumps(decision, cls=DecimalEncoder),
+        "processing_time_ms": processing_time_ms,
+        "agent_name": AGENT_NAME,
+        "agent_version": AGENT_VERSION,
+        "agent_alias": AGENT_ALIAS,
+        "token_usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+        "match_classification": analysis["classification"],
+        "confidence_score": float(analysis["confidence"]),
+        "execution_path": FAST_PATH,
+    }
+
+
+def _invoke_reconciliation(payload: Dict[str, Any], correlation_id: str, start_time: datetime) -> Dict[str, Any]:
+    """Run a batch reconciliation request from the entrypoint."""
+    trade_date = payload.get("trade_date")
+    method = payload.get("method", RECONCILIATION_METHOD)
+    logger.info(f"[{correlation_id}] RECONCILE_START - trade_date={trade_date or 'ALL'}, method={method}")
+    
+    try:
+        reconciliation = reconcile_business_day(
+            trade_date, method=method, search_archive=bool(payload.get("search_archive", False))
+        )
+        processing_time_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        logger.info(
+            f"[{correlation_id}] Reconciliation completed - {reconciliation['summary']}, "
+            f"time={processing_time_ms:.0f}ms"
+        )
+        return {
+            "success": True,
+            "mode": "reconcile",
+            "correlation_id": correlation_id,
+            "processing_time_ms": processing_time_ms,
+            "agent_name": AGENT_NAME,
+            "agent_version": AGENT_VERSION,
+            **reconciliation,
+        }
+    except Exception as e:
+        logger.error(f"[{correlation_id}] Error in reconciliation: {e}", exc_info=True)
+        return {
+            "success": False,
+            "mode": "reconcile",
+            "error": str(e),
+            "error_type": type(e).__name__,
+            "correlation_id": correlation_id,
+            "agent_name": AGENT_NAME,
+            "agent_version": AGENT_VERSION,
+            "processing_time_ms": (datetime.now(timezone.utc) - start_time).total_seconds() * 1000,
+        }
+
+
+def _stream_batch_matches(payload: Dict[str, Any], correlation_id: str, start_time: datetime) -> Iterator[Dict[str, Any]]:
+    """Run a batch match request from the entrypoint, streaming one event per trade and a final summary."""
+    trade_ids = payload.get("trade_ids")
+    source_type = payload.get("source_type", "BANK").upper()
+    if not isinstance(trade_ids, list) or not trade_ids:
+        yield {
+            "success": False,
+            "mode": "batch_match",
+            "error": "trade_ids must be a non-empty list",
+            "correlation_id": correlation_id,
+        }
+        return
+    
+    logger.info(f"[{correlation_id}] BATCH_MATCH_START - {len(trade_ids)} trades from {source_type}")
+    summary: Dict[str, int] = {}
+    try:
+        for analysis in _find_trade_matches_batch(trade_ids, source_type, bool(payload.get("search_archive", False))):
+            classification = analysis.get("classification", "ERROR")
+            summary[classification] = summary.get(classification, 0) + 1
+            trade_id = analysis["source_trade"]["trade_id"] if "source_trade" in analysis else analysis.get("trade_id")
+            # Plain JSON types for the event stream (DynamoDB numbers are Decimals)
+            yield json.loads(json.dumps({
+                "trade_id": trade_id,
+                "source_type": source_type,
+                "correlation_id": correlation_id,
+                "match_classification": classification,
+                "confidence_score": analysis.get("confidence"),
+                "analysis": analysis,
+            }, cls=DecimalEncoder))
+    except Exception as e:
+        # Setup failures (source lookup, target table load) end the stream like other modes' errors
+        logger.error(f"[{correlation_id}] Error in batch match: {e}", exc_info=True)
+        yield {
+            "success": False,
+            "mode": "batch_match",
+            "error": str(e),
+            "error_type": type(e).__name__,
+            "summary": summary,
+            "correlation_id": correlation_id,
+            "agent_name": AGENT_NAME,
+            "agent_version": AGENT_VERSION,
+        }
+        return
+    
+    processing_time_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+    logger.info(f"[{correlation_id}] Batch match completed - {summary}, time={processing_time_ms:.0f}ms")
+    yield {
+        "success": True,
+        "mode": "batch_match",
+        "done": True,
+        "trade_count": len(trade_ids),
+        "summary": summary,
+        "correlation_id": correlation_id,
+        "processing_time_ms": processing_time_ms,
+        "agent_name": AGENT_NAME,
+        "agent_version": AGENT_VERSION,
+    }
+
+
 @app.entrypoint
-def invoke(payload: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
+def invoke(payload: Dict[str, Any], context: Any = None) -> Union[Dict[str, Any], Iterator[Dict[str, Any]]]:
     """
     AgentCore Runtime entrypoint for Trade Matching Agent.
     
     Uses Strands SDK with custom DynamoDB tools for reliable operation.
+    
+    Returns a response dict, except in batch_match mode (or when trade_ids is
+    given), which yields a stream of events: one per trade, ending with a final
+    summary event, or with an error event if the batch fails.
     """
     start_time = datetime.now(timezone.utc)
     
@@ -967,6 +1648,81 @@ def invoke(payload: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
     trade_id = payload.get("trade_id")
     source_type = payload.get("source_type", "BANK").upper()
     correlation_id = payload.get("correlation_id", f"corr_{uuid.uuid4().hex[:12]}")
+    # Investigations of old trades also search outside the active book
+    search_archive = bool(payload.get("search_archive", False))
+    
+    # Forced reload of the resident trade books, e.g. after a bulk load
+    if payload.get("mode") == "refresh_trade_book" or payload.get("refresh_trade_book"):
+        if TRADE_BOOK_ENABLED:
+            try:
+                trade_book_stats = refresh_trade_books()
+            except Exception as e:
+                logger.error(f"[{correlation_id}] Error refreshing trade books: {e}", exc_info=True)
+                return {
+                    "success": False,
+                    "mode": "refresh_trade_book",
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                    "correlation_id": correlation_id,
+                    "agent_name": AGENT_NAME,
+                    "agent_version": AGENT_VERSION,
+                }
+            logger.info(f"[{correlation_id}] Trade books refreshed: {trade_book_stats}")
+        if payload.get("mode") == "refresh_trade_book":
+            return {
+                "success": True,
+                "mode": "refresh_trade_book",
+                "trade_books": trade_book_stats if TRADE_BOOK_ENABLED else [],
+                "correlation_id": correlation_id,
+                "agent_name": AGENT_NAME,
+                "agent_version": AGENT_VERSION,
+            }
+    
+    # Archive the trades outside the active book to S3, e.g. from a nightly schedule
+    if payload.get("mode") == "archive_trade_book":
+        tables = payload.get("tables") or [BANK_TABLE, COUNTERPARTY_TABLE]
+        try:
+            archives = [archive_inactive_trades(table, delete=bool(payload.get("delete", False))) for table in tables]
+        except Exception as e:
+            logger.error(f"[{correlation_id}] Error archiving trade books: {e}", exc_info=True)
+            return {
+                "success": False,
+                "mode": "archive_trade_book",
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "correlation_id": correlation_id,
+                "agent_name": AGENT_NAME,
+                "agent_version": AGENT_VERSION,
+            }
+        return {
+            "success": True,
+            "mode": "archive_trade_book",
+            "archives": archives,
+            "correlation_id": correlation_id,
+            "agent_name": AGENT_NAME,
+            "agent_version": AGENT_VERSION,
+        }
+    
+    # Batch reconciliation runs deterministically, without the LLM
+    if payload.get("mode") == "reconcile":
+        return _invoke_reconciliation(payload, correlation_id, start_time)
+    
+    # Batch matching runs deterministically and streams one result per trade
+    if payload.get("mode") == "batch_match" or "trade_ids" in payload:
+        return _stream_batch_matches(payload, correlation_id, start_time)
+    
+    if payload.get("mode") == "execution_stats":
+        return {
+            "success": True,
+            "mode": "execution_stats",
+            "execution_mode": EXECUTION_MODE,
+            "execution_paths": _execution_paths.stats(),
+            "match_cache": _get_match_cache().stats(),
+            "lei_join": _lei_join.stats(),
+            "correlation_id": correlation_id,
+            "agent_name": AGENT_NAME,
+            "agent_version": AGENT_VERSION,
+        }
     
     logger.info(
         f"[{correlation_id}] INVOKE_START - Trade Matching Agent invoked",
@@ -990,6 +1746,16 @@ def invoke(payload: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
         }
     
     try:
+        # Rules first: only ambiguous results reach the LLM
+        if EXECUTION_MODE == "rules_first":
+            analysis = _find_trade_matches(trade_id, source_type, search_archive)
+            if is_unambiguous(analysis):
+                return _fast_path_response(analysis, trade_id, source_type, correlation_id, start_time)
+            logger.info(
+                f"[{correlation_id}] Escalating to LLM - confidence={analysis.get('confidence')}, "
+                f"error={analysis.get('error')}"
+            )
+        
         # Create memory session manager
         session_manager = None
         if MEMORY_AVAILABLE and MEMORY_ID:
@@ -1003,7 +1769,7 @@ def invoke(payload: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
         # Construct goal-oriented prompt
         prompt = f"""Match trade ID "{trade_id}" from {source_type} system.
 
-Call the find_trade_matches tool with trade_id="{trade_id}" and source_type="{source_type}".
+Call the find_trade_matches tool with trade_id="{trade_id}" and source_type="{source_type}"{', search_archive=true' if search_archive else ''}.
 Then review the results and provide your final classification as JSON.
 """
         
@@ -1042,10 +1808,12 @@ Then review the results and provide your final classification as JSON.
         except Exception:
             pass
         
+        _execution_paths.record(LLM_PATH, processing_time_ms)
         logger.info(
             f"[{correlation_id}] Trade matching completed - "
             f"trade_id={trade_id}, classification={classification}, "
-            f"confidence={confidence_score:.1f}%, time={processing_time_ms:.0f}ms"
+            f"confidence={confidence_score:.1f}%, time={processing_time_ms:.0f}ms, "
+            f"paths={_execution_paths.stats()}"
         )
         
         return {
@@ -1061,6 +1829,7 @@ Then review the results and provide your final classification as JSON.
             "token_usage": token_metrics,
             "match_classification": classification,
             "confidence_score": confidence_score,
+            "execution_path": LLM_PATH,
         }
         
     except Exception as e:
@@ -0,0 +1,169 @@
+"""
+Compact Trade Records
+
+A trade read from DynamoDB is a plain dict. Every dict carries its own hash
+table and its own copies of the key strings (the deserializer creates new
+strings for every item), and enum-like values such as "USD" or "ACT/360" are
+separate string objects per trade. For a resident book of several hundred
+thousand trades the containers, not the values, are most of the memory.
+
+A TradeRecord is a read-only mapping with the same keys and values as the
+item it was converted from, stored as:
+- a shape shared by every record with the same key set (the key tuple and a
+  key -> position table, held once per extractor schema rather than per trade),
+- one tuple of values in shape order, followed by the pre-parsed values
+  (e.g. the notional as a float and dates as ordinal days) named by the layout,
+- enum strings (currency, product type, day count, frequency, ...) interned,
+  so equal values share one object across the book.
+
+Records compare equal to the items they came from and support everything
+the matching code does with an item (get, [], in, iteration, dict(record)),
+so they can replace items anywhere trades are only read.
+
+TradeRecordLayout describes what to intern and pre-parse for one table
+family and converts deserialized DynamoDB items (scan results, stream
+images, snapshot rows) into records.
+
+This module is shared by the trade_matching agent and the web portal API;
+each carries an identical copy.
+"""
+
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Pre-parsed value name -> (item keys in priority order, parser)
+ParsedFields = Dict[str, Tuple[Sequence[str], Callable[[Any], Any]]]
+
+
+class RecordShape:
+    """Key layout shared by all records converted from items with the same key set."""
+
+    __slots__ = ('keys', 'index', 'parsed', 'parsed_names')
+
+    def __init__(self, keys: Tuple[str, ...], parsed: Dict[str, int], parsed_names: FrozenSet[str]):
+        self.keys = keys
+        self.index: Dict[str, int] = {key: position for position, key in enumerate(keys)}
+        # Pre-parsed value name -> position in the values tuple (after the raw values)
+        self.parsed = parsed
+        # Every parsed value name of the layout, including those this key set lacks
+        self.parsed_names = parsed_names
+
+
+class TradeRecord(Mapping):
+    """Read-only, tuple-backed trade item; see the module docstring."""
+
+    __slots__ = ('_shape', '_values')
+
+    def __init__(self, shape: RecordShape, values: Tuple[Any, ...]):
+        self._shape = shape
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._shape.index[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._shape.keys)
+
+    def __len__(self) -> int:
+        return len(self._shape.keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._shape.index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self._shape.index.get(key)
+        return default if position is None else self._values[position]
+
+    def parsed(self, name: str) -> Any:
+        """
+        Pre-parsed value of the layout's parsed field name.
+
+        Returns None when the item has none of the field's keys or its value
+        failed to parse.
+        """
+        position = self._shape.parsed.get(name)
+        return None if position is None else self._values[position]
+
+    @property
+    def parsed_names(self) -> FrozenSet[str]:
+        """Names the layout pre-parses (parsed() is only meaningful for these)."""
+        return self._shape.parsed_names
+
+    def to_item(self) -> Dict[str, Any]:
+        """The record as a plain item dict."""
+        return dict(zip(self._shape.keys, self._values))
+
+    def __reduce__(self):
+        return TradeRecord, (self._shape, self._values)
+
+    def __repr__(self) -> str:
+        return f"TradeRecord({self.to_item()!r})"
+
+
+class TradeRecordLayout:
+    """
+    Converts deserialized DynamoDB items into TradeRecords.
+
+    Thread-safe. Shapes are cached per distinct key set; items from the same
+    extractor version share one.
+    """
+
+    def __init__(self, enum_fields: Iterable[str] = (), parsed_fields: Optional[ParsedFields] = None):
+        """
+        Args:
+            enum_fields: Item keys whose string values are interned
+            parsed_fields: Pre-parsed value name -> (item keys in priority order,
+                parser); the first key present is parsed, and a parser raising
+                ValueError, TypeError or ArithmeticError stores None
+        """
+        self.enum_fields = frozenset(enum_fields)
+        self.parsed_fields: ParsedFields = dict(parsed_fields or {})
+        self._parsed_names = frozenset(self.parsed_fields)
+        # Key set -> (shape, positions of enum keys, (source position, parser) per parsed value)
+        self._shapes: Dict[FrozenSet[str], Tuple[RecordShape, Tuple[int, ...], Tuple[Tuple[int, Callable], ...]]] = {}
+        self._lock = threading.Lock()
+
+    def _shape_for(self, item: Dict[str, Any]):
+        signature = frozenset(item)
+        entry = self._shapes.get(signature)
+        if entry is not None:
+            return entry
+        keys = tuple(sys.intern(key) for key in item)
+        parsers = []
+        parsed: Dict[str, int] = {}
+        for name, (spellings, parser) in self.parsed_fields.items():
+            source = next((key for key in spellings if key in signature), None)
+            if source is not None:
+                parsed[name] = len(keys) + len(parsers)
+                parsers.append((keys.index(source), parser))
+        enums = tuple(position for position, key in enumerate(keys) if key in self.enum_fields)
+        entry = (RecordShape(keys, parsed, self._parsed_names), enums, tuple(parsers))
+        with self._lock:
+            return self._shapes.setdefault(signature, entry)
+
+    def record(self, item: Dict[str, Any]) -> TradeRecord:
+        """Convert one item; a TradeRecord is returned unchanged."""
+        if isinstance(item, TradeRecord):
+            return item
+        shape, enums, parsers = self._shape_for(item)
+        values = [item[key] for key in shape.keys]
+        for position in enums:
+            if type(values[position]) is str:
+                values[position] = sys.intern(values[position])
+        for position, parser in parsers:
+            try:
+                values.append(parser(values[position]))
+            except (ValueError, TypeError, ArithmeticError):
+                values.append(None)
+        return TradeRecord(shape, tuple(values))
+
+    def records(self, items: Iterable[Dict[str, Any]]) -> List[TradeRecord]:
+        """Convert a list of items (e.g. a table scan)."""
+        return [self.record(item) for item in items]
+
+    @property
+    def shape_count(self) -> int:
+        """Number of distinct item key sets converted so far."""
+        return len(self._shapes)
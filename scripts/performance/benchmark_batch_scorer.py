@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vectorized BatchScorer vs scalar _calculate_match_score
+
+Scores a handful of source trades against synthetic candidate books of
+increasing size with both implementations, checks that the score vectors are
+identical and reports per-source latency and the speedup.
+
+Usage:
+    python scripts/performance/benchmark_batch_scorer.py
+    python scripts/performance/benchmark_batch_scorer.py --sizes 10000 100000 --sources 5 --output results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'deployment', 'trade_matching'))
+
+from batch_scorer import BatchScorer  # noqa: E402
+from trade_matching_agent_strands import _calculate_match_score, _extract_key_attributes  # noqa: E402
+
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "AUD", "CAD"]
+PRODUCTS = ["Interest Rate Swap", "FX Forward", "Commodity Swap", "Credit Default Swap"]
+COUNTERPARTIES = [
+    "Goldman Sachs International", "JP Morgan Chase", "Morgan Stanley", "Citibank NA",
+    "Merrill Lynch International", "Deutsche Bank AG", "Barclays Bank PLC", "HSBC Bank",
+]
+DAY_COUNTS = ["ACT/360", "ACT/365", "30/360", "ACT/ACT"]
+FREQUENCIES = ["Monthly", "Quarterly", "Semi-Annual", "Annual"]
+INDICES = ["USD-SOFR", "EURIBOR", "SONIA", "ESTR"]
+
+
+def generate_trade(rng: random.Random, trade_id: str) -> Dict[str, Any]:
+    """Generate one synthetic CDM-style trade."""
+    trade_date = date(2025, 1, 1) + timedelta(days=rng.randint(0, 90))
+    return {
+        "Trade_ID": trade_id,
+        "currency": rng.choice(CURRENCIES),
+        "notional": round(rng.uniform(1e5, 1e7), 2),
+        "product_type": rng.choice(PRODUCTS),
+        "trade_date": trade_date.isoformat(),
+        "effective_date": (trade_date + timedelta(days=2)).isoformat(),
+        "termination_date": (trade_date + timedelta(days=rng.randint(365, 3650))).isoformat(),
+        "counterparty": rng.choice(COUNTERPARTIES),
+        "day_count_fraction": rng.choice(DAY_COUNTS),
+        "payment_frequency": rng.choice(FREQUENCIES),
+        "floating_rate_index": rng.choice(INDICES),
+        "fixed_rate": round(rng.uniform(0.01, 0.06), 4),
+    }
+
+
+def benchmark(size: int, sources: int, seed: int) -> Dict[str, Any]:
+    """Benchmark both scorers for one candidate book size."""
+    rng = random.Random(seed)
+    candidates = [generate_trade(rng, f"CP{i}") for i in range(size)]
+    source_trades = [generate_trade(rng, f"BK{i}") for i in range(sources)]
+
+    load_start = time.perf_counter()
+    scorer = BatchScorer(candidates, _extract_key_attributes)
+    load_seconds = time.perf_counter() - load_start
+
+    scalar_seconds = 0.0
+    batch_seconds = 0.0
+    for source in source_trades:
+        start = time.perf_counter()
+        scalar_scores = [_calculate_match_score(source, candidate)['score'] for candidate in candidates]
+        scalar_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch_scores = scorer.score(source).scores
+        batch_seconds += time.perf_counter() - start
+
+        if batch_scores.tolist() != scalar_scores:
+            raise AssertionError(f"Score mismatch between scalar and batch scorer at size {size}")
+
+    return {
+        "candidates": size,
+        "sources": sources,
+        "load_seconds": round(load_seconds, 4),
+        "scalar_ms_per_source": round(scalar_seconds / sources * 1000, 2),
+        "batch_ms_per_source": round(batch_seconds / sources * 1000, 2),
+        "speedup": round(scalar_seconds / batch_seconds, 1) if batch_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized batch scorer against the scalar scorer")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Candidate book sizes")
+    parser.add_argument("--sources", type=int, default=5, help="Source trades scored per book size")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic books")
+    parser.add_argument("--output", help="Optional path for JSON results")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'candidates':>10} {'load (s)':>9} {'scalar ms/src':>14} {'batch ms/src':>13} {'speedup':>8}")
+    for size in args.sizes:
+        row = benchmark(size, args.sources, args.seed)
+        results.append(row)
+        print(f"{row['candidates']:>10} {row['load_seconds']:>9} {row['scalar_ms_per_source']:>14} "
+              f"{row['batch_ms_per_source']:>13} {row['speedup']:>7}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark: counterparty near-duplicate lookup, word Jaccard vs trigram MinHash/LSH
+
+Builds a book of synthetic counterparty names, queries it with variants of
+book names (abbreviations, typos, joined or split words, punctuation and legal
+suffix changes) and reports, per lookup method, the recall (share of queries
+whose original name is found), the names returned per query and the latency:
+- jaccard_scan: fuzzy_match_counterparty >= 0.5 against every book name (the
+  partial-credit tier of the counterparty rule),
+- jaccard_index: the same through CounterpartyNameIndex (identical results),
+- trigram_scan: exact trigram Jaccard >= threshold against every book name,
+- lsh: CounterpartyLshIndex (same similarity, sub-linear lookup; the gap to
+  trigram_scan is the recall lost to LSH).
+
+Usage:
+    python scripts/performance/benchmark_counterparty_lsh.py
+    python scripts/performance/benchmark_counterparty_lsh.py --names 1000 10000 50000 --queries 500 --output results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'deployment', 'trade_matching'))
+
+from counterparty_index import CounterpartyNameIndex  # noqa: E402
+from counterparty_lsh import CounterpartyLshIndex, name_trigrams, trigram_similarity  # noqa: E402
+from match_normalizers import fuzzy_match_counterparty, normalize_counterparty_name  # noqa: E402
+
+WORDS = [
+    'CAPITAL', 'MARKETS', 'SECURITIES', 'MANAGEMENT', 'BANK', 'FINANCIAL', 'GLOBAL', 'INVESTMENTS',
+    'PARTNERS', 'BROTHERS', 'ASSET', 'TRUST', 'HOLDINGS', 'ADVISORS', 'FUND', 'GROUP', 'CREDIT',
+    'SAVINGS', 'COMMERCIAL', 'MERCHANT', 'NATIONAL', 'PACIFIC', 'ATLANTIC', 'NORTHERN', 'ROYAL',
+]
+ABBREVIATIONS = {
+    'CAPITAL': 'CAP', 'MARKETS': 'MKTS', 'SECURITIES': 'SECS', 'MANAGEMENT': 'MGMT', 'BANK': 'BK',
+    'FINANCIAL': 'FINL', 'GLOBAL': 'GLBL', 'INVESTMENTS': 'INVTS', 'PARTNERS': 'PTNRS', 'BROTHERS': 'BROS',
+    'HOLDINGS': 'HLDGS', 'ADVISORS': 'ADVS', 'COMMERCIAL': 'COML', 'NATIONAL': 'NATL',
+}
+SUFFIXES = ['', ' LIMITED', ' LTD', ' LLC', ' INC', ' PLC', ' AG', ' INTERNATIONAL', ' INTL']
+SYLLABLES = ['AR', 'BEL', 'COR', 'DAN', 'EL', 'FOR', 'GAR', 'HAL', 'IN', 'KER', 'LAN', 'MOR', 'NOR',
+             'OS', 'PER', 'RAN', 'SOL', 'TEN', 'UR', 'VAL', 'WEL', 'ZEN']
+PERTURBATIONS = ['abbreviation', 'typo', 'join_split', 'punctuation_suffix']
+
+
+def surname(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def generate_names(count: int, rng: random.Random) -> List[str]:
+    """Distinct counterparty names: one or two surnames, one or two business words and a legal suffix."""
+    names: Dict[str, str] = {}
+    while len(names) < count:
+        words = [surname(rng) for _ in range(rng.randint(1, 2))] + rng.sample(WORDS, rng.randint(1, 2))
+        name = ' '.join(words) + rng.choice(SUFFIXES)
+        names.setdefault(normalize_counterparty_name(name), name)
+    return list(names.values())
+
+
+def perturb(name: str, kind: str, rng: random.Random) -> str:
+    """A variant of a name as another extractor or desk might write it."""
+    words = normalize_counterparty_name(name).split()
+    if kind == 'abbreviation':
+        positions = [i for i, word in enumerate(words) if word in ABBREVIATIONS]
+        if positions:
+            position = rng.choice(positions)
+            words[position] = ABBREVIATIONS[words[position]]
+        else:
+            kind = 'typo'
+    if kind == 'typo':
+        position = max(range(len(words)), key=lambda i: len(words[i]))
+        word = words[position]
+        i = rng.randrange(1, len(word) - 1)
+        words[position] = rng.choice([word[:i] + word[i + 1:], word[:i] + word[i] + word[i:],
+                                      word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]])
+    elif kind == 'join_split':
+        if len(words) > 1:
+            position = rng.randrange(len(words) - 1)
+            words[position:position + 2] = [words[position] + words[position + 1]]
+        else:
+            word = words[0]
+            words = [word[:len(word) // 2], word[len(word) // 2:]]
+    elif kind == 'punctuation_suffix':
+        return f"{' '.join(word.title() for word in words)}.,{rng.choice(SUFFIXES)}"
+    return ' '.join(words)
+
+
+def timed_lookups(lookup: Callable[[str], Set[int]], queries: List[Tuple[str, int, str]]) -> Dict[str, Any]:
+    found: Dict[str, List[bool]] = {kind: [] for kind in PERTURBATIONS}
+    returned = 0
+    start = time.perf_counter()
+    for query, expected, kind in queries:
+        hits = lookup(query)
+        returned += len(hits)
+        found[kind].append(expected in hits)
+    seconds = time.perf_counter() - start
+    all_found = [hit for hits in found.values() for hit in hits]
+    return {
+        "recall": round(sum(all_found) / len(all_found), 3),
+        "recall_by_variant": {kind: round(sum(hits) / len(hits), 3) for kind, hits in found.items() if hits},
+        "names_per_query": round(returned / len(queries), 2),
+        "ms_per_query": round(seconds / len(queries) * 1000, 3),
+    }
+
+
+def benchmark(count: int, query_count: int, threshold: float, seed: int) -> List[Dict[str, Any]]:
+    """Benchmark every lookup method on one book size."""
+    rng = random.Random(seed)
+    names = generate_names(count, rng)
+    queries = []
+    for i in range(query_count):
+        expected = rng.randrange(count)
+        kind = PERTURBATIONS[i % len(PERTURBATIONS)]
+        queries.append((perturb(names[expected], kind, rng), expected, kind))
+
+    start = time.perf_counter()
+    name_index = CounterpartyNameIndex(names)
+    name_index_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    lsh = CounterpartyLshIndex(names, threshold=threshold)
+    lsh_seconds = time.perf_counter() - start
+    book_trigrams = [name_trigrams(normalize_counterparty_name(name)) for name in names]
+
+    def jaccard_scan(query):
+        return {i for i, name in enumerate(names) if fuzzy_match_counterparty(query, name) >= 0.5}
+
+    def jaccard_index(query):
+        return {i for i, score in name_index.similarities(query).items() if score >= 0.5}
+
+    def trigram_scan(query):
+        trigrams = name_trigrams(normalize_counterparty_name(query))
+        return {i for i, other in enumerate(book_trigrams) if trigram_similarity(trigrams, other) >= threshold}
+
+    def lsh_lookup(query):
+        return set(lsh.similarities(query))
+
+    # Linear scans are slow on large books; a sample of the queries is enough for them
+    scan_queries = queries[:max(40, min(len(queries), 200_000 // count))]
+    rows = []
+    for method, lookup, build_seconds, method_queries in (
+        ("jaccard_scan", jaccard_scan, 0.0, scan_queries),
+        ("jaccard_index", jaccard_index, name_index_seconds, queries),
+        ("trigram_scan", trigram_scan, 0.0, scan_queries),
+        ("lsh", lsh_lookup, lsh_seconds, queries),
+    ):
+        row = {"names": count, "method": method, "queries": len(method_queries), "build_seconds": round(build_seconds, 2)}
+        row.update(timed_lookups(lookup, method_queries))
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark counterparty near-duplicate lookup")
+    parser.add_argument("--names", type=int, nargs="+", default=[1000, 10000, 50000], help="Distinct names per book")
+    parser.add_argument("--queries", type=int, default=400, help="Queries per book")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Trigram similarity threshold")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", help="Optional path for JSON results")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'names':>7} {'method':>14} {'queries':>8} {'recall':>7} {'abbr':>6} {'typo':>6} {'join':>6} "
+          f"{'punct':>6} {'hits/q':>7} {'ms/q':>9} {'build s':>8}")
+    for count in args.names:
+        for row in benchmark(count, args.queries, args.threshold, args.seed):
+            results.append(row)
+            by_variant = row['recall_by_variant']
+            print(f"{row['names']:>7} {row['method']:>14} {row['queries']:>8} {row['recall']:>7} "
+                  + ' '.join(f"{by_variant.get(kind, ''):>6}" for kind in PERTURBATIONS)
+                  + f" {row['names_per_query']:>7} {row['ms_per_query']:>9} {row['build_seconds']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"threshold": args.threshold, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
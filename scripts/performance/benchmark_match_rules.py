@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compiled match-rules engine
+
+Evaluates each production rule set (CDM agent scorer, legacy attribute
+matcher, web portal batch matcher) on synthetic candidate books in two ways:
+
+- per pair: both trades are resolved and normalized on every comparison
+- prepared: candidates are normalized once when the book is loaded and the
+  source once per request, as find_best_match does
+
+checks that both give identical totals and reports per-source latency and
+the speedup of prepared evaluation.
+
+Usage:
+    python scripts/performance/benchmark_match_rules.py
+    python scripts/performance/benchmark_match_rules.py --sizes 10000 50000 --sources 5 --output results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'deployment', 'trade_matching'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'web-portal-api'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from benchmark_batch_scorer import generate_trade  # noqa: E402
+from match_rules import RuleSet, SOURCE, TARGET  # noqa: E402
+from trade_matching_agent import MATCH_RULES as LEGACY_MATCH_RULES  # noqa: E402
+from trade_matching_agent_strands import CDM_MATCH_RULES, _extract_key_attributes  # noqa: E402
+from app.routers.matching import MATCH_RULES as PORTAL_MATCH_RULES  # noqa: E402
+
+
+def legacy_view(trade: Dict[str, Any]) -> Dict[str, Any]:
+    """The synthetic trade in the legacy agent's field names."""
+    return {
+        "Trade_ID": trade["Trade_ID"],
+        "currency": trade["currency"],
+        "maturity_date": trade["termination_date"],
+        "notional": trade["notional"],
+        "trade_date": trade["trade_date"],
+        "counterparty": trade["counterparty"],
+        "product_type": trade["product_type"],
+        "fixed_rate": trade["fixed_rate"],
+    }
+
+
+def portal_view(trade: Dict[str, Any]) -> Dict[str, Any]:
+    """The synthetic trade in the web portal's field names."""
+    return {
+        "trade_id": trade["Trade_ID"],
+        "notional": trade["notional"],
+        "currency": trade["currency"],
+        "trade_date": trade["trade_date"],
+        "settlement_date": trade["effective_date"],
+        "product": trade["product_type"],
+        "counterparty": trade["counterparty"],
+    }
+
+
+RULE_SETS: Dict[str, Any] = {
+    "cdm": (CDM_MATCH_RULES, _extract_key_attributes),
+    "legacy": (LEGACY_MATCH_RULES, legacy_view),
+    "portal": (PORTAL_MATCH_RULES, portal_view),
+}
+
+
+def benchmark(name: str, rules: RuleSet, view: Callable[[Dict], Dict], size: int, sources: int, seed: int) -> Dict[str, Any]:
+    """Benchmark one rule set for one candidate book size."""
+    rng = random.Random(seed)
+    candidates = [view(generate_trade(rng, f"CP{i}")) for i in range(size)]
+    source_trades = [view(generate_trade(rng, f"BK{i}")) for i in range(sources)]
+
+    load_start = time.perf_counter()
+    prepared_candidates = [rules.prepare(candidate, TARGET) for candidate in candidates]
+    load_seconds = time.perf_counter() - load_start
+
+    pair_seconds = 0.0
+    prepared_seconds = 0.0
+    for source in source_trades:
+        start = time.perf_counter()
+        pair_totals = [rules.evaluate(source, candidate).earned for candidate in candidates]
+        pair_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        prepared_source = rules.prepare(source, SOURCE)
+        prepared_totals = [rules.evaluate(prepared_source, candidate).earned for candidate in prepared_candidates]
+        prepared_seconds += time.perf_counter() - start
+
+        if pair_totals != prepared_totals:
+            raise AssertionError(f"Total mismatch between per-pair and prepared evaluation for {name} at size {size}")
+
+    return {
+        "rule_set": name,
+        "candidates": size,
+        "sources": sources,
+        "load_seconds": round(load_seconds, 4),
+        "pair_ms_per_source": round(pair_seconds / sources * 1000, 2),
+        "prepared_ms_per_source": round(prepared_seconds / sources * 1000, 2),
+        "speedup": round(pair_seconds / prepared_seconds, 1) if prepared_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled match-rules engine")
+    parser.add_argument("--rule-sets", nargs="+", choices=sorted(RULE_SETS), default=sorted(RULE_SETS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000], help="Candidate book sizes")
+    parser.add_argument("--sources", type=int, default=5, help="Source trades evaluated per book size")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic books")
+    parser.add_argument("--output", help="Optional path for JSON results")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'rule set':>8} {'candidates':>10} {'load (s)':>9} {'pair ms/src':>12} {'prepared ms/src':>16} {'speedup':>8}")
+    for name in args.rule_sets:
+        rules, view = RULE_SETS[name]
+        for size in args.sizes:
+            row = benchmark(name, rules, view, size, args.sources, args.seed)
+            results.append(row)
+            print(f"{row['rule_set']:>8} {row['candidates']:>10} {row['load_seconds']:>9} "
+                  f"{row['pair_ms_per_source']:>12} {row['prepared_ms_per_source']:>16} {row['speedup']:>7}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sharded multi-process reconciliation vs in-process scoring
+
+Reconciles synthetic bank/counterparty books with TradeReconciler (one core)
+and with ShardedTradeReconciler at increasing worker counts, checks that the
+assignments are identical and reports wall time, pairs scored per second and
+the speedup over the in-process run (ideally close to the worker count, up to
+the number of cores).
+
+Usage:
+    python scripts/performance/benchmark_sharded_reconciliation.py
+    python scripts/performance/benchmark_sharded_reconciliation.py --sizes 50000 200000 --workers 1 2 4 8 --output results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'deployment', 'trade_matching'))
+
+from benchmark_batch_scorer import generate_trade  # noqa: E402
+from reconciliation import TradeReconciler  # noqa: E402
+from sharded_reconciliation import ShardedTradeReconciler  # noqa: E402
+from trade_matching_agent_strands import _extract_key_attributes, _parse_date  # noqa: E402
+
+
+def generate_books(size: int, seed: int):
+    """A bank book and a counterparty book of near copies (90%) plus unrelated trades."""
+    rng = random.Random(seed)
+    bank = [generate_trade(rng, f"BK{i}") for i in range(size)]
+    counterparty = []
+    for i, trade in enumerate(bank):
+        if rng.random() < 0.9:
+            copy = dict(trade, Trade_ID=f"CP{i}")
+            copy["notional"] = round(copy["notional"] * (1 + rng.uniform(-0.01, 0.01)), 2)
+            counterparty.append(copy)
+        else:
+            counterparty.append(generate_trade(rng, f"CP{i}"))
+    return bank, counterparty
+
+
+def benchmark(size: int, worker_counts: List[int], seed: int, method: str) -> List[Dict[str, Any]]:
+    """Benchmark in-process and sharded reconciliation for one book size."""
+    bank, counterparty = generate_books(size, seed)
+
+    start = time.perf_counter()
+    serial = TradeReconciler(_extract_key_attributes, _parse_date, method=method).reconcile(bank, counterparty)
+    serial_seconds = time.perf_counter() - start
+
+    rows = [{
+        "trades": size, "workers": 0, "shards": 1, "seconds": round(serial_seconds, 2),
+        "pairs_per_second": round(serial.pairs_scored / serial_seconds), "speedup": 1.0,
+    }]
+    for workers in worker_counts:
+        reconciler = ShardedTradeReconciler(
+            _extract_key_attributes, _parse_date, workers=workers, min_parallel_trades=0, method=method
+        )
+        # The worker pool lives as long as the process; start it outside the timed run
+        reconciler.reconcile(bank[:100], counterparty[:100])
+        start = time.perf_counter()
+        sharded = reconciler.reconcile(bank, counterparty)
+        seconds = time.perf_counter() - start
+        if sharded.assignments != serial.assignments or sharded.pairs_scored != serial.pairs_scored:
+            raise AssertionError(f"Sharded reconciliation differs from in-process at {size} trades, {workers} workers")
+        rows.append({
+            "trades": size, "workers": workers, "shards": sharded.shards, "seconds": round(seconds, 2),
+            "pairs_per_second": round(sharded.pairs_scored / seconds),
+            "speedup": round(serial_seconds / seconds, 2),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded multi-process reconciliation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 100000], help="Trades per book")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1],
+                        help="Worker counts to run (0 is the in-process baseline, always run)")
+    parser.add_argument("--method", default="greedy", choices=["auto", "hungarian", "greedy"])
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic books")
+    parser.add_argument("--output", help="Optional path for JSON results")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'trades':>8} {'workers':>8} {'shards':>7} {'seconds':>8} {'pairs/s':>11} {'speedup':>8}")
+    for size in args.sizes:
+        for row in benchmark(size, sorted(set(args.workers)), args.seed, args.method):
+            results.append(row)
+            print(f"{row['trades']:>8} {row['workers']:>8} {row['shards']:>7} {row['seconds']:>8} "
+                  f"{row['pairs_per_second']:>11} {row['speedup']:>7}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
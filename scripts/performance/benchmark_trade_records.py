@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory of a resident trade book as item dicts vs TradeRecords
+
+Builds a book of synthetic trades the way the trade book receives them (DynamoDB
+wire-format items deserialized with boto3's TypeDeserializer, so every item has
+its own key strings), measures its memory with tracemalloc, converts it to
+TradeRecords with the agent's record layout and measures again. Also reports
+the conversion time and the BatchScorer build time over both representations,
+and checks that alias resolution returns the same attributes for both.
+
+Usage:
+    python scripts/performance/benchmark_trade_records.py
+    python scripts/performance/benchmark_trade_records.py --sizes 100000 500000 --output results.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'deployment', 'trade_matching'))
+
+from batch_scorer import BatchScorer  # noqa: E402
+from benchmark_batch_scorer import generate_trade  # noqa: E402
+from trade_matching_agent_strands import _TRADE_RECORD_LAYOUT, _extract_key_attributes  # noqa: E402
+
+
+def wire_items(size: int, seed: int) -> str:
+    """Synthetic trades as a JSON array of DynamoDB wire-format items."""
+    rng = random.Random(seed)
+    serializer = TypeSerializer()
+    items = []
+    for i in range(size):
+        trade = generate_trade(rng, f"CP{i}")
+        trade = {name: Decimal(str(value)) if isinstance(value, float) else value for name, value in trade.items()}
+        items.append({name: serializer.serialize(value) for name, value in trade.items()})
+    return json.dumps(items)
+
+
+def traced_bytes() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def load_items(wire: str) -> List[Dict[str, Any]]:
+    deserializer = TypeDeserializer()
+    return [{name: deserializer.deserialize(value) for name, value in item.items()} for item in json.loads(wire)]
+
+
+def benchmark(size: int, seed: int) -> Dict[str, Any]:
+    """Measure one book size."""
+    wire = wire_items(size, seed)
+
+    tracemalloc.start()
+    base = traced_bytes()
+    items = load_items(wire)
+    dict_bytes = traced_bytes() - base
+
+    records = _TRADE_RECORD_LAYOUT.records(items)
+    del items
+    record_bytes = traced_bytes() - base
+    tracemalloc.stop()
+
+    # Timings are taken outside tracemalloc, which slows allocation down
+    items = load_items(wire)
+    start = time.perf_counter()
+    records = _TRADE_RECORD_LAYOUT.records(items)
+    convert_seconds = time.perf_counter() - start
+    sample = range(0, size, max(1, size // 1000))
+    if any(_extract_key_attributes(records[i]) != _extract_key_attributes(items[i]) for i in sample):
+        raise AssertionError(f"Record attributes differ from item attributes at {size} trades")
+
+    start = time.perf_counter()
+    BatchScorer(items, _extract_key_attributes)
+    dict_scorer_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    BatchScorer(records, _extract_key_attributes)
+    record_scorer_seconds = time.perf_counter() - start
+
+    return {
+        "trades": size,
+        "dict_mb": round(dict_bytes / 2**20, 1),
+        "record_mb": round(record_bytes / 2**20, 1),
+        "dict_bytes_per_trade": round(dict_bytes / size),
+        "record_bytes_per_trade": round(record_bytes / size),
+        "reduction": round(1 - record_bytes / dict_bytes, 3),
+        "convert_seconds": round(convert_seconds, 2),
+        "dict_scorer_build_seconds": round(dict_scorer_seconds, 2),
+        "record_scorer_build_seconds": round(record_scorer_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trade book memory as item dicts vs TradeRecords")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000], help="Trades per book")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic books")
+    parser.add_argument("--output", help="Optional path for JSON results")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'trades':>8} {'dict MB':>8} {'rec MB':>8} {'dict B/t':>8} {'rec B/t':>8} {'saved':>6} "
+          f"{'convert s':>9} {'dict bld':>9} {'rec bld':>9}")
+    for size in args.sizes:
+        row = benchmark(size, args.seed)
+        results.append(row)
+        print(f"{row['trades']:>8} {row['dict_mb']:>8} {row['record_mb']:>8} {row['dict_bytes_per_trade']:>8} "
+              f"{row['record_bytes_per_trade']:>8} {row['reduction']:>6.0%} {row['convert_seconds']:>9} "
+              f"{row['dict_scorer_build_seconds']:>9} {row['record_scorer_build_seconds']:>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
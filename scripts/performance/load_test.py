@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Load test: matching-engine benchmark suite
+
+Scores reproducible synthetic books of bank/counterparty trade pairs, from
+1k to 1M pairs, with each production matcher:
+
+- cdm:    _calculate_match_score (Strands trade matching agent)
+- legacy: fuzzy_match (legacy attribute matcher)
+- portal: compare_trades (web portal matching router)
+
+Books are built with tests/e2e/test_data_generator.py: a configurable mix of
+matching, probable, break and data-error pairs, plus controlled noise on the
+counterparty side (spelling, case, date format, small notional and date
+shifts). The same seed, reference date, mix and noise always produce the same
+book.
+
+Each (matcher, size) run executes in a fresh process and reports throughput,
+p50/p90/p99/max latency per comparison and peak RSS. Results are written as
+JSON with the commit and environment, and --compare checks them against an
+earlier results file so regressions show up across commits.
+
+Usage:
+    python scripts/performance/load_test.py
+    python scripts/performance/load_test.py --sizes 1000 10000 100000 1000000 --output results.json
+    python scripts/performance/load_test.py --matchers cdm portal --noise 0.3 --compare baseline.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'deployment', 'trade_matching'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'web-portal-api'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'tests', 'e2e'))
+
+from test_data_generator import TestDataGenerator  # noqa: E402
+
+MATCHERS = ('cdm', 'legacy', 'portal')
+PAIR_KINDS = ('matched', 'probable', 'break', 'error')
+DEFAULT_MIX = 'matched=0.6,probable=0.2,break=0.15,error=0.05'
+REFERENCE_DATE = '2025-06-30'
+
+# Metrics compared by --compare and whether higher is better
+COMPARED_METRICS = {
+    'throughput_per_second': True,
+    'p50_us': False,
+    'p99_us': False,
+    'peak_rss_mb': False,
+}
+
+
+# ----------------------------------------------------------------------------
+# Synthetic books
+# ----------------------------------------------------------------------------
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse 'matched=0.6,probable=0.2,...' into normalized pair-kind weights."""
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in PAIR_KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown pair kind {kind!r}; expected one of {', '.join(PAIR_KINDS)}")
+        mix[kind.strip()] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("Pair mix weights must sum to a positive number")
+    return {kind: weight / total for kind, weight in mix.items()}
+
+
+def apply_noise(trade: Dict[str, Any], rng: random.Random, level: float) -> Dict[str, Any]:
+    """Perturb a counterparty trade the way real confirmations differ; each change has probability level."""
+    if level <= 0:
+        return trade
+    trade = dict(trade)
+    if rng.random() < level:
+        trade['counterparty'] = rng.choice([
+            trade['counterparty'].upper(), f"{trade['counterparty']} Ltd", f"  {trade['counterparty'].lower()}",
+        ])
+    if rng.random() < level:
+        trade['currency'] = trade['currency'].lower()
+    if rng.random() < level:
+        trade['product_type'] = trade['product_type'].upper()
+    if rng.random() < level and isinstance(trade.get('notional'), float):
+        trade['notional'] = round(trade['notional'] * (1 + rng.uniform(-0.01, 0.01)), 2)
+    if rng.random() < level:
+        shifted = datetime.strptime(trade['trade_date'], '%Y-%m-%d') + timedelta(days=rng.choice([-1, 1]))
+        trade['trade_date'] = shifted.strftime('%Y-%m-%d')
+    if rng.random() < level:
+        trade['maturity_date'] = datetime.strptime(trade['maturity_date'], '%Y-%m-%d').strftime('%d/%m/%Y')
+    return trade
+
+
+def generate_pairs(size: int, seed: int, mix: Dict[str, float], noise: float,
+                   reference_date: datetime) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Yield a reproducible book of (bank trade, counterparty trade) pairs."""
+    generator = TestDataGenerator(seed=seed, reference_date=reference_date)
+    make_pair = {
+        'matched': generator.generate_matching_pair,
+        'probable': generator.generate_probable_match_pair,
+        'break': generator.generate_break_pair,
+        'error': generator.generate_data_error_pair,
+    }
+    rng = random.Random(seed + 1)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    for position in range(size):
+        pair = make_pair[rng.choices(kinds, weights)[0]](trade_id=f"TRD{position:08d}")
+        yield pair.bank_trade, apply_noise(pair.counterparty_trade, rng, noise)
+
+
+# ----------------------------------------------------------------------------
+# Matchers
+# ----------------------------------------------------------------------------
+
+def _portal_view(trade: Dict[str, Any]) -> Dict[str, Any]:
+    """A generated trade in the web portal's field names."""
+    return {
+        'trade_id': trade['Trade_ID'],
+        'notional': trade.get('notional'),
+        'currency': trade.get('currency'),
+        'trade_date': trade.get('trade_date'),
+        'settlement_date': trade.get('effective_date'),
+        'product': trade.get('product_type'),
+        'counterparty': trade.get('counterparty'),
+    }
+
+
+def load_matcher(name: str, match_cache: bool) -> Tuple[Callable[[Dict, Dict], Any], Callable[[Dict], Dict]]:
+    """Return (compare(bank, counterparty), view(trade)) for a matcher."""
+    if name == 'cdm':
+        from trade_matching_agent_strands import _calculate_match_score
+        return _calculate_match_score, lambda trade: trade
+    if name == 'legacy':
+        from trade_matching_agent import fuzzy_match
+        return fuzzy_match, lambda trade: trade
+    if name == 'portal':
+        from app.routers import matching
+        from app.services.match_cache import MatchResultCache
+        if not match_cache:
+            # Measure scoring, not cache lookups of a book where every pair is new
+            matching.match_cache = MatchResultCache(matching.MATCH_RULES.version, max_entries=0)
+        return matching.compare_trades, _portal_view
+    raise ValueError(f"Unknown matcher {name}")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_benchmark(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Score one book with one matcher; runs in its own process so peak RSS is per run."""
+    import logging
+    logging.disable(logging.INFO)
+
+    compare, view = load_matcher(config['matcher'], config['match_cache'])
+    rss_before = peak_rss_mb()
+    pairs = generate_pairs(
+        config['size'], config['seed'], config['mix'], config['noise'],
+        datetime.strptime(config['reference_date'], '%Y-%m-%d'),
+    )
+
+    latencies = np.empty(config['size'], dtype=np.int64)
+    clock = time.perf_counter_ns
+    for position, (bank, counterparty) in enumerate(pairs):
+        bank, counterparty = view(bank), view(counterparty)
+        start = clock()
+        compare(bank, counterparty)
+        latencies[position] = clock() - start
+
+    total_seconds = latencies.sum() / 1e9
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) / 1000
+    peak = peak_rss_mb()
+    return {
+        'matcher': config['matcher'],
+        'pairs': config['size'],
+        'noise': config['noise'],
+        'scoring_seconds': round(float(total_seconds), 3),
+        'throughput_per_second': round(config['size'] / total_seconds) if total_seconds else None,
+        'mean_us': round(float(latencies.mean()) / 1000, 2),
+        'p50_us': round(float(p50), 2),
+        'p90_us': round(float(p90), 2),
+        'p99_us': round(float(p99), 2),
+        'max_us': round(float(latencies.max()) / 1000, 2),
+        'peak_rss_mb': peak,
+        'rss_growth_mb': round(peak - rss_before, 1),
+    }
+
+
+# ----------------------------------------------------------------------------
+# Results
+# ----------------------------------------------------------------------------
+
+def environment() -> Dict[str, Any]:
+    """Commit and machine the results were measured on."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare_results(current: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Describe every metric that regressed by more than tolerance against a baseline results file."""
+    with open(baseline_path) as f:
+        baseline = {(row['matcher'], row['pairs'], row['noise']): row for row in json.load(f)['results']}
+    regressions = []
+    for row in current:
+        before = baseline.get((row['matcher'], row['pairs'], row['noise']))
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    f"{row['matcher']} @ {row['pairs']} pairs: {metric} {old} -> {new} ({change:+.1%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the trade matchers on synthetic books")
+    parser.add_argument("--matchers", nargs="+", choices=MATCHERS, default=list(MATCHERS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Book sizes in trade pairs (up to 1000000)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the synthetic books")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Weights of the pair kinds (default {DEFAULT_MIX})")
+    parser.add_argument("--noise", type=float, default=0.1,
+                        help="Probability of each counterparty-side perturbation (0 disables noise)")
+    parser.add_argument("--reference-date", default=REFERENCE_DATE,
+                        help="Trade dates fall in the 30 days before this date (YYYY-MM-DD)")
+    parser.add_argument("--match-cache", action="store_true",
+                        help="Keep the portal's match-result cache enabled")
+    parser.add_argument("--output", help="Optional path for JSON results")
+    parser.add_argument("--compare", help="Results file of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative change counted as a regression by --compare")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    results: List[Dict[str, Any]] = []
+    print(f"{'matcher':>8} {'pairs':>9} {'pairs/s':>10} {'p50 us':>8} {'p99 us':>8} {'max us':>9} {'peak RSS MB':>12}")
+    for matcher in args.matchers:
+        for size in args.sizes:
+            config = {
+                'matcher': matcher, 'size': size, 'seed': args.seed, 'mix': args.mix, 'noise': args.noise,
+                'reference_date': args.reference_date, 'match_cache': args.match_cache,
+            }
+            with context.Pool(1) as pool:
+                row = pool.apply(run_benchmark, (config,))
+            results.append(row)
+            print(f"{row['matcher']:>8} {row['pairs']:>9} {row['throughput_per_second']:>10} {row['p50_us']:>8} "
+                  f"{row['p99_us']:>8} {row['max_us']:>9} {row['peak_rss_mb']:>12}")
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'parameters': {
+            'seed': args.seed, 'mix': args.mix, 'noise': args.noise,
+            'reference_date': args.reference_date, 'match_cache': args.match_cache,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare_results(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,10 @@ resource "aws_dynamodb_table" "bank_trade_data" {
     projection_type = "ALL"
   }
 
+  # Change feed for the matching agent's resident trade book
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
   point_in_time_recovery {
     enabled = true
   }
@@ -112,6 +116,10 @@ resource "aws_dynamodb_table" "counterparty_trade_data" {
     projection_type = "ALL"
   }
 
+  # Change feed for the matching agent's resident trade book
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
   point_in_time_recovery {
     enabled = true
   }
@@ -305,6 +313,36 @@ resource "aws_dynamodb_table" "orchestrator_status" {
   })
 }
 
+# DynamoDB Table for the Match-Result Cache (persistent tier, see match_cache.py)
+resource "aws_dynamodb_table" "match_result_cache" {
+  name         = "${var.project_name}-match-result-cache-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "cache_key"
+
+  attribute {
+    name = "cache_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled     = true
+    kms_key_arn = aws_kms_key.dynamodb.arn
+  }
+
+  tags = merge(var.tags, {
+    Name        = "Match Result Cache"
+    Type        = "Database"
+    Component   = "AgentCore"
+    Environment = var.environment
+    Purpose     = "Scored trade pairs keyed by content hash and rules version"
+  })
+}
+
 # KMS Key for DynamoDB Encryption
 resource "aws_kms_key" "dynamodb" {
   description             = "KMS key for DynamoDB table encryption"
@@ -354,6 +392,11 @@ output "exceptions_table_arn" {
   value       = aws_dynamodb_table.exceptions.arn
 }
 
+output "match_result_cache_table_name" {
+  description = "Name of the Match Result Cache table"
+  value       = aws_dynamodb_table.match_result_cache.name
+}
+
 output "agent_registry_table_name" {
   description = "Name of the Agent Registry table"
   value       = aws_dynamodb_table.agent_registry.name
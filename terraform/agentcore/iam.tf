@@ -127,7 +127,23 @@ resource "aws_iam_policy" "agentcore_dynamodb_access" {
           aws_dynamodb_table.agent_registry.arn,
           "${aws_dynamodb_table.agent_registry.arn}/index/*",
           aws_dynamodb_table.orchestrator_status.arn,
-          "${aws_dynamodb_table.orchestrator_status.arn}/index/*"
+          "${aws_dynamodb_table.orchestrator_status.arn}/index/*",
+          aws_dynamodb_table.match_result_cache.arn
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeTable",
+          "dynamodb:DescribeStream",
+          "dynamodb:GetShardIterator",
+          "dynamodb:GetRecords"
+        ]
+        Resource = [
+          aws_dynamodb_table.bank_trade_data.arn,
+          "${aws_dynamodb_table.bank_trade_data.arn}/stream/*",
+          aws_dynamodb_table.counterparty_trade_data.arn,
+          "${aws_dynamodb_table.counterparty_trade_data.arn}/stream/*"
         ]
       },
       {
@@ -72,6 +72,7 @@ output "summary" {
       counterparty_trade_table = aws_dynamodb_table.counterparty_trade_data.name
       exceptions_table         = aws_dynamodb_table.exceptions.name
       agent_registry_table     = aws_dynamodb_table.agent_registry.name
+      match_result_cache_table = aws_dynamodb_table.match_result_cache.name
     }
 
     sqs = {
@@ -172,6 +172,20 @@ resource "aws_s3_bucket_lifecycle_configuration" "agentcore_trade_documents" {
       days = 7
     }
   }
+
+  # Rule for trade book snapshots (rewritten every few minutes; only the latest is read)
+  rule {
+    id     = "trade-book-snapshots-cleanup"
+    status = "Enabled"
+
+    filter {
+      prefix = "trade-book-snapshots/"
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
 }
 
 # Create folder structure using S3 objects with zero-byte files
@@ -36,9 +36,11 @@ class TestDataGenerator:
     
     COMMODITY_TYPES = ["Crude Oil", "Natural Gas", "Gold", "Silver", "Copper"]
     
-    def __init__(self, seed: Optional[int] = None):
+    def __init__(self, seed: Optional[int] = None, reference_date: Optional[datetime] = None):
         if seed is not None:
             random.seed(seed)
+        # Trade dates are drawn from the 30 days before this date (default: now)
+        self.reference_date = reference_date
     
     def generate_trade_id(self) -> str:
         """Generate a unique trade ID."""
@@ -48,7 +50,7 @@ class TestDataGenerator:
     
     def generate_base_trade(self, trade_id: str, source_type: str) -> Dict[str, Any]:
         """Generate a base trade with all fields."""
-        trade_date = datetime.now() - timedelta(days=random.randint(0, 30))
+        trade_date = (self.reference_date or datetime.now()) - timedelta(days=random.randint(0, 30))
         effective_date = trade_date + timedelta(days=random.randint(1, 5))
         maturity_date = effective_date + timedelta(days=random.randint(30, 365))
         
@@ -0,0 +1,181 @@
+"""
+Unit tests for the active trade book policy, the S3 trade archive and their use in candidate retrieval.
+"""
+
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from active_book import ActiveBookPolicy, MatchedTradeIds, S3TradeArchive
+from trade_book import TradeBook
+import trade_matching_agent_strands as agent
+from test_trade_book import CountingLoader, FakeClock
+from test_trade_book_snapshot import FakeS3
+
+TODAY = date(2025, 6, 30)
+
+
+class ListingS3(FakeS3):
+    def get_paginator(self, name):
+        assert name == 'list_objects_v2'
+        s3 = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(key for bucket, key in s3.objects if bucket == Bucket and key.startswith(Prefix))
+                yield {'Contents': [{'Key': key} for key in keys]}
+
+        return Paginator()
+
+
+def trade(trade_id, trade_date=None, settlement_date=None, **fields):
+    item = {'Trade_ID': trade_id, 'currency': 'USD', 'notional': Decimal('1000000')}
+    if trade_date:
+        item['trade_date'] = trade_date
+    if settlement_date:
+        item['settlement_date'] = settlement_date
+    item.update(fields)
+    return item
+
+
+def policy(window_days=30):
+    return ActiveBookPolicy(window_days, agent._trade_dates, agent._trade_id_of, today=lambda: TODAY)
+
+
+def test_trades_are_active_within_the_window_undated_or_unmatched():
+    trades = [
+        trade('RECENT', '2025-06-20'),
+        trade('LATE_SETTLING', '2025-04-01', '2025-06-15'),
+        trade('UNDATED'),
+        trade('OLD_MATCHED', '2025-03-01', '2025-03-03'),
+        trade('OLD_UNMATCHED', '2025-03-01'),
+    ]
+
+    active, inactive = policy().split(trades, matched_ids={'OLD_MATCHED', 'RECENT'})
+    assert [t['Trade_ID'] for t in active] == ['RECENT', 'LATE_SETTLING', 'UNDATED', 'OLD_UNMATCHED']
+    assert [t['Trade_ID'] for t in inactive] == ['OLD_MATCHED']
+
+    # Without match information the window alone decides
+    active, inactive = policy().split(trades)
+    assert [t['Trade_ID'] for t in inactive] == ['OLD_MATCHED', 'OLD_UNMATCHED']
+    assert policy(window_days=130).split(trades)[1] == []
+
+
+def test_matched_ids_are_reloaded_after_their_refresh_interval():
+    loads = [{'Bank': {'T1'}}, RuntimeError('throttled'), {'Bank': {'T1', 'T2'}}]
+
+    def loader():
+        result = loads.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    clock = FakeClock()
+    matched = MatchedTradeIds(loader, refresh_seconds=60, clock=clock)
+
+    assert matched.get() == (1, {'Bank': frozenset({'T1'})})
+    assert matched.get()[0] == 1
+    clock.now = 60
+    assert matched.get() == (2, {'Bank': frozenset({'T1'})}) and matched.load_failures == 1
+    clock.now = 120
+    assert matched.get() == (3, {'Bank': frozenset({'T1', 'T2'})})
+
+    failing = MatchedTradeIds(lambda: 1 / 0)
+    assert failing.get()[1] == {}
+
+
+def test_archive_runs_round_trip_with_manifests():
+    s3 = ListingS3()
+    clock = FakeClock()
+    archive = S3TradeArchive(s3, 'bucket', 'archive/', clock=clock)
+
+    first = archive.write('Bank', [trade('A', '2025-01-02', tags={'x'})], ['A'], date(2025, 5, 31), 30)
+    clock.now = 86400
+    archive.write('Bank', [trade('B', '2025-01-03')], ['B'], date(2025, 6, 1), 30)
+    # A run whose manifest was never written is ignored
+    s3.put_object(Bucket='bucket', Key='archive/Bank/99991231T000000000000Z/trades.npz', Body=b'', ContentType='x')
+
+    assert first['cutoff'] == '2025-05-31' and first['trade_count'] == 1
+    assert ('bucket', f"archive/Bank/{first['run']}/manifest.json") in s3.objects
+    assert [m['trade_ids'] for m in archive.manifests('Bank')] == [['A'], ['B']]
+    assert archive.archived_ids('Bank') == {'A', 'B'}
+    assert archive.load('Bank') == [trade('A', '2025-01-02', tags={'x'}), trade('B', '2025-01-03')]
+    assert archive.load('Counterparty') == []
+
+
+@pytest.fixture
+def active_agent(monkeypatch):
+    table_items = [trade('NEW', '2025-06-25'), trade('OLD', '2025-01-10'), trade('OLD_OPEN', '2025-01-10')]
+    loader = CountingLoader(table_items)
+    book = TradeBook(agent.COUNTERPARTY_TABLE, loader, clock=lambda: 0.0)
+    s3 = ListingS3()
+    monkeypatch.setattr(agent, 'ACTIVE_BOOK_ENABLED', True)
+    monkeypatch.setattr(agent, 'TRADE_BOOK_ENABLED', True)
+    monkeypatch.setattr(agent, '_ACTIVE_BOOK_POLICY', policy())
+    monkeypatch.setattr(agent, '_matched_trade_ids', MatchedTradeIds(
+        lambda: {agent.COUNTERPARTY_TABLE: {'NEW', 'OLD'}}
+    ))
+    monkeypatch.setattr(agent, '_trade_archive', S3TradeArchive(s3, 'bucket'))
+    monkeypatch.setitem(agent._trade_books, agent.COUNTERPARTY_TABLE, book)
+    return loader
+
+
+def ids(trades):
+    return [str(agent._trade_id_of(t)) for t in trades]
+
+
+def test_candidate_retrieval_sees_the_active_book_unless_the_archive_is_searched(active_agent, monkeypatch):
+    active = agent._load_trades(agent.COUNTERPARTY_TABLE)
+
+    assert ids(active) == ['NEW', 'OLD_OPEN']
+    assert agent._load_trades(agent.COUNTERPARTY_TABLE) is active
+    assert agent._load_trades_near(agent.COUNTERPARTY_TABLE, '2025-06-25', 2) is active
+
+    agent._get_trade_archive().write(agent.COUNTERPARTY_TABLE, [trade('GONE', '2024-12-01')], ['GONE'],
+                                     date(2025, 5, 31), 30)
+    assert ids(agent._load_trades(agent.COUNTERPARTY_TABLE, search_archive=True)) == ['NEW', 'OLD', 'OLD_OPEN', 'GONE']
+
+    monkeypatch.setattr(agent, 'ACTIVE_BOOK_ENABLED', False)
+    assert ids(agent._load_trades(agent.COUNTERPARTY_TABLE)) == ['NEW', 'OLD', 'OLD_OPEN']
+
+
+def test_inactive_trades_are_archived_once_and_optionally_deleted(active_agent, monkeypatch):
+    class DeletingClient:
+        def __init__(self):
+            self.deleted = []
+
+        def batch_write_item(self, RequestItems):
+            for request in RequestItems[agent.COUNTERPARTY_TABLE]:
+                self.deleted.append(request['DeleteRequest']['Key']['Trade_ID']['S'])
+            return {}
+
+    client = DeletingClient()
+    monkeypatch.setattr(agent, 'get_boto_client', lambda service: client)
+    monkeypatch.setattr(agent, 'parallel_scan', lambda client, table_name, segments: active_agent())
+
+    first = agent.archive_inactive_trades(agent.COUNTERPARTY_TABLE)
+    again = agent.archive_inactive_trades(agent.COUNTERPARTY_TABLE, delete=True)
+
+    assert (first['inactive'], first['archived'], first['deleted']) == (1, 1, 0)
+    assert first['cutoff'] == '2025-05-31' and first['run'] is not None
+    assert (again['inactive'], again['archived'], again['deleted'], again['run']) == (1, 0, 1, None)
+    assert client.deleted == ['OLD']
+    assert agent._get_trade_archive().load(agent.COUNTERPARTY_TABLE) == [trade('OLD', '2025-01-10')]
+
+
+def test_failed_trade_book_refresh_is_returned_as_an_error(active_agent, monkeypatch):
+    def failing_refresh():
+        raise RuntimeError("scan failed")
+
+    monkeypatch.setattr(agent, 'refresh_trade_books', failing_refresh)
+
+    for payload in ({'mode': 'refresh_trade_book'}, {'refresh_trade_book': True, 'trade_id': 'T1'}):
+        response = agent.invoke(payload)
+        assert response['success'] is False and response['mode'] == 'refresh_trade_book'
+        assert response['error'] == 'scan failed' and response['error_type'] == 'RuntimeError'
@@ -0,0 +1,120 @@
+"""
+Unit tests for allocation (many-to-one) matching.
+"""
+
+import itertools
+import os
+import random
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from allocation_matching import find_allocation_subset
+import trade_matching_agent_strands as agent
+
+
+def brute_force(target, amounts, tolerance, min_legs, max_legs):
+    fitting = []
+    for legs in range(min_legs, max_legs + 1):
+        for indexes in itertools.combinations(range(len(amounts)), legs):
+            total = sum(amounts[i] for i in indexes)
+            if amounts and all(amounts[i] > 0 for i in indexes) and abs(total - target) <= tolerance:
+                fitting.append((abs(total - target), legs, indexes))
+    return sorted(fitting)
+
+
+def test_search_finds_the_same_best_subset_as_brute_force():
+    rng = random.Random(7)
+    for _ in range(40):
+        amounts = [rng.randrange(1, 60) * 100_000 for _ in range(rng.randint(2, 12))]
+        target = sum(rng.sample(amounts, rng.randint(2, min(4, len(amounts))))) + rng.choice([0, 0, 100, 900_000])
+        expected = brute_force(target, amounts, 500, 2, 4)
+
+        search = find_allocation_subset(target, amounts, tolerance=500, max_legs=4)
+
+        assert search.solutions == len(expected)
+        assert search.indexes == (list(expected[0][2]) if expected else None)
+        assert not search.truncated
+
+
+def test_search_stays_fast_on_large_blocks():
+    rng = random.Random(11)
+    allocations = [250_000_000, 125_000_000, 75_000_000, 50_000_000]
+    amounts = [rng.randrange(10_000, 500_000) * 1000 + 7 for _ in range(60)] + allocations
+    rng.shuffle(amounts)
+
+    start = time.perf_counter()
+    search = find_allocation_subset(sum(allocations), amounts, tolerance=0)
+
+    assert time.perf_counter() - start < 2
+    assert sorted(amounts[i] for i in search.indexes) == sorted(allocations)
+    assert search.solutions == 1
+
+
+def test_ambiguity_limits_and_truncation_are_reported():
+    search = find_allocation_subset(300, [100, 200, 150, 150, 400])
+    assert search.indexes == [0, 1] and search.solutions == 2
+
+    assert find_allocation_subset(300, [100, 100, 100], max_legs=2).indexes is None
+    assert find_allocation_subset(300, [300, 50]).indexes is None
+    assert find_allocation_subset(300, [290, 5], tolerance=5).total == 295
+
+    truncated = find_allocation_subset(10 ** 6, [1] * 40, max_subsets=50)
+    assert truncated.truncated and truncated.indexes is None
+    with pytest.raises(ValueError):
+        find_allocation_subset(300, [100, 200], min_legs=3, max_legs=2)
+
+
+def trade(trade_id, notional, currency='USD', counterparty='Goldman Sachs International'):
+    return {'Trade_ID': trade_id, 'currency': currency, 'product_type': 'Interest Rate Swap',
+            'trade_date': '2025-01-15', 'notional': notional, 'counterparty': counterparty,
+            'fixed_rate': '3.25'}
+
+
+@pytest.fixture
+def no_sampling(monkeypatch):
+    monkeypatch.setattr(agent, 'BLOCKING_RECALL_SAMPLE_RATE', 0.0)
+
+
+def match(source, targets):
+    return agent._match_source_trade('BLOCK', source, agent.BANK_TABLE, agent._TargetCandidates(targets))
+
+
+def test_block_trade_matches_its_allocations(no_sampling):
+    targets = [
+        trade('A1', 6_000_000), trade('A2', 3_000_000), trade('A3', 1_000_000),
+        trade('OTHER_PARTY', 4_000_000, counterparty='Barclays Bank PLC'),
+        trade('OTHER_CCY', 4_000_000, currency='EUR'),
+        trade('UNRELATED', 2_500_000),
+    ]
+
+    result = match(trade('BLOCK', 10_000_000), targets)
+
+    assert result['match_type'] == 'ALLOCATION'
+    assert result['classification'] == 'MATCHED' and result['confidence'] == 100.0
+    assert result['allocation']['trade_ids'] == ['A1', 'A2', 'A3']
+    assert result['allocation']['notional_total'] == 10_000_000
+    assert not result['allocation']['ambiguous']
+
+    response = agent._fast_path_response(result, 'BLOCK', 'BANK', 'c', agent.datetime.now(agent.timezone.utc))
+    assert '"matched_trade_ids": ["A1", "A2", "A3"]' in response['agent_response']
+
+
+def test_ambiguous_allocations_are_sent_for_review(no_sampling, monkeypatch):
+    targets = [trade('A1', 6_000_000), trade('A2', 4_000_000), trade('B1', 5_000_000), trade('B2', 5_000_000)]
+
+    result = match(trade('BLOCK', 10_000_000), targets)
+    assert result['match_type'] == 'ALLOCATION'
+    assert result['classification'] == 'PROBABLE_MATCH' and result['allocation']['alternatives'] == 1
+
+    # A one-to-one match is never replaced
+    result = match(trade('BLOCK', 10_000_000), targets + [trade('ONE', 10_000_000)])
+    assert result['match_type'] == 'ONE_TO_ONE' and result['allocation'] is None
+
+    monkeypatch.setattr(agent, 'ALLOCATION_MATCHING_ENABLED', False)
+    result = match(trade('BLOCK', 10_000_000), targets)
+    assert result['match_type'] == 'ONE_TO_ONE' and result['allocation'] is None
+    assert result['classification'] == 'PROBABLE_MATCH' and result['confidence'] < 85
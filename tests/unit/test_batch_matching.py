@@ -0,0 +1,90 @@
+"""
+Unit tests for batch find_trade_matches: one table load for many trade IDs.
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import trade_matching_agent_strands as agent
+from test_batch_scorer import random_trade
+from test_trade_id_index import KeyedTableClient
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    rng = random.Random(7)
+    tables = {
+        agent.BANK_TABLE: [random_trade(rng, f"B{i}") for i in range(60)],
+        agent.COUNTERPARTY_TABLE: [random_trade(rng, f"C{i}") for i in range(200)],
+    }
+    loads = []
+    monkeypatch.setattr(agent, 'TRADE_BOOK_ENABLED', False)
+    monkeypatch.setattr(agent, 'CANDIDATE_RETRIEVAL', 'scan')
+    monkeypatch.setattr(agent, 'BLOCKING_RECALL_SAMPLE_RATE', 0.0)
+    monkeypatch.setattr(agent, 'get_boto_client', lambda service: KeyedTableClient(tables))
+    monkeypatch.setattr(agent, '_scan_table', lambda table_name: loads.append(table_name) or tables[table_name])
+    return loads
+
+
+def test_batch_results_equal_single_trade_results(tables):
+    trade_ids = [f"B{i}" for i in range(0, 60, 3)]
+
+    batch = list(agent._find_trade_matches_batch(trade_ids, 'BANK'))
+
+    # Source trades are read by key; only the target table is loaded
+    assert tables == [agent.COUNTERPARTY_TABLE]
+    for trade_id, analysis in zip(trade_ids, batch):
+        single = agent._find_trade_matches(trade_id, 'BANK')
+        assert json.dumps(analysis, sort_keys=True, default=str) == json.dumps(single, sort_keys=True, default=str)
+
+
+def test_unknown_trade_is_reported_in_place(tables):
+    batch = list(agent._find_trade_matches_batch(['B1', 'NOPE', 'B2'], 'BANK'))
+
+    assert [entry.get('found', True) for entry in batch] == [True, False, True]
+    assert batch[1]['trade_id'] == 'NOPE'
+
+
+def test_batch_tool_returns_results_in_request_order(tables):
+    result = json.loads(agent.find_trade_matches_batch(['B5', 'B4'], 'BANK'))
+
+    assert result['trade_count'] == 2
+    assert [r['source_trade']['trade_id'] for r in result['results']] == ['B5', 'B4']
+
+
+def test_entrypoint_streams_one_event_per_trade(tables):
+    events = list(agent.invoke({'trade_ids': ['B1', 'B2', 'NOPE'], 'source_type': 'BANK'}))
+
+    assert [event.get('trade_id') for event in events[:3]] == ['B1', 'B2', 'NOPE']
+    assert events[2]['match_classification'] == 'ERROR'
+    assert events[-1]['done'] is True
+    assert sum(events[-1]['summary'].values()) == 3
+
+
+def test_entrypoint_rejects_empty_batch(tables):
+    events = list(agent.invoke({'mode': 'batch_match', 'trade_ids': []}))
+
+    assert events == [{
+        'success': False, 'mode': 'batch_match', 'error': 'trade_ids must be a non-empty list',
+        'correlation_id': events[0]['correlation_id'],
+    }]
+
+
+def test_entrypoint_reports_setup_failure_as_final_event(tables, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise RuntimeError("table unavailable")
+
+    monkeypatch.setattr(agent, '_find_source_trades', unavailable)
+
+    events = list(agent.invoke({'trade_ids': ['B1', 'B2'], 'source_type': 'BANK'}))
+
+    assert len(events) == 1
+    assert events[0]['success'] is False and events[0]['mode'] == 'batch_match'
+    assert events[0]['error'] == 'table unavailable'
@@ -0,0 +1,112 @@
+"""
+Unit tests for the vectorized BatchScorer.
+
+The batch scorer must reproduce _calculate_match_score exactly, including the
+breakdown, so these tests compare both implementations on randomized books
+with messy field spellings, unparseable values and missing attributes.
+"""
+
+import json
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from batch_scorer import BatchScorer, FIELD_MATCH, FIELD_NOT_COMPARED, FIELD_PARSE_ERROR
+from match_normalizers import normalize_currency
+from match_rules import POINTS, RuleSet
+from trade_matching_agent_strands import _calculate_match_score, _extract_key_attributes
+
+FIELD_CHOICES = {
+    'currency': ['USD', 'usd', 'EUR', ' USD', None, ''],
+    'notional': [1000000, '1,000,000', '1 000 000', 1010000, 1040000, 2000000, 'abc', 0, -5, None],
+    'product_type': ['Interest Rate Swap', 'INTEREST_RATE_SWAP', 'SWAP', 'FX Forward', 'fx-forward', ''],
+    'trade_date': ['2025-01-15', '15/01/2025', '01/16/2025', '15 January 2025', '20250117', '2025-02-15', 'garbage', ''],
+    'effective_date': ['2025-01-17', '2025-01-18', '17 Jan 2025', 'x'],
+    'Maturity_Date': ['2030-01-17', '2030-01-19', 'January 17, 2030'],
+    'party_b_lei': ['LEI1', 'lei1', 'LEI2', None],
+    'counterparty': ['Goldman Sachs International', 'GOLDMAN SACHS INTL', 'Goldman Sachs', 'JP Morgan', '', None],
+    'day_count': ['ACT/360', 'Actual/360', 'A/360', '30/360', 'ACT_365', 'bond', None],
+    'frequency': ['Quarterly', '3M', 'q', 'Monthly', 'SEMI-ANNUAL', '6M'],
+    'floating_rate_index': ['USD-SOFR', 'SOFR', 'EUR_EURIBOR', 'EURIBOR 3M', 'libor'],
+    'fixed_rate': [3.5, '3.5%', 0.035, 0.0351, 0.0355, 0.04, 'x', '1,2'],
+}
+
+
+def random_trade(rng, trade_id):
+    trade = {'Trade_ID': trade_id}
+    for field, choices in FIELD_CHOICES.items():
+        if rng.random() < 0.8:
+            trade[field] = rng.choice(choices)
+    return trade
+
+
+def as_json(result):
+    return json.dumps(result, sort_keys=True, default=str)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_batch_scores_equal_scalar_scores(seed):
+    rng = random.Random(seed)
+    targets = [random_trade(rng, f"T{i}") for i in range(200)]
+    scorer = BatchScorer(targets, _extract_key_attributes)
+
+    for source_index in range(10):
+        source = random_trade(rng, f"S{source_index}")
+        result = scorer.score(source)
+
+        for position, target in enumerate(targets):
+            assert as_json(result.match_result(position)) == as_json(_calculate_match_score(source, target))
+            assert result.scores[position] == _calculate_match_score(source, target)['score']
+
+
+def test_field_states_and_masks():
+    targets = [
+        {'Trade_ID': 'T1', 'currency': 'USD', 'notional': '1,000,000'},
+        {'Trade_ID': 'T2', 'currency': 'EUR', 'notional': 'n/a'},
+        {'Trade_ID': 'T3'},
+    ]
+    result = BatchScorer(targets, _extract_key_attributes).score({'currency': 'usd', 'notional': 1000000})
+
+    assert result.match_mask('currency').tolist() == [True, False, False]
+    assert result.field_states['notional'].tolist() == [FIELD_MATCH, FIELD_PARSE_ERROR, FIELD_NOT_COMPARED]
+    assert result.scores.tolist() == [100.0, 0.0, 0.0]
+
+
+def test_top_k_keeps_candidate_order_for_ties():
+    targets = [{'Trade_ID': f'T{i}', 'currency': 'USD' if i % 2 else 'EUR'} for i in range(6)]
+    result = BatchScorer(targets, _extract_key_attributes).score({'currency': 'USD'})
+
+    assert result.top_k(3).tolist() == [1, 3, 5]
+
+
+def test_empty_candidate_set():
+    result = BatchScorer([], _extract_key_attributes).score({'currency': 'USD'})
+
+    assert isinstance(result.scores, np.ndarray)
+    assert len(result.scores) == 0
+
+
+def test_weights_and_tiers_come_from_the_rule_set():
+    rules = RuleSet([
+        {'name': 'currency', 'weight': 3, 'presence': 'both', 'normalize': normalize_currency, 'compare': 'equal'},
+        {'name': 'notional', 'weight': 5, 'presence': 'both', 'compare': 'relative_difference',
+         'params': {'tiers': [(0.1, 5), (0.5, 1)], 'report_percent': True}},
+    ], scoring=POINTS)
+    targets = [{'currency': 'usd', 'notional': 140.0}, {'currency': 'EUR', 'notional': 105.0}, {'notional': 100.0}]
+    source = {'currency': 'USD', 'notional': 100.0}
+
+    result = BatchScorer(targets, lambda trade: trade, rules).score(source)
+
+    assert result.scores.tolist() == [50.0, 62.5, 100.0]
+    assert result.match_result(0)['breakdown']['notional'] == {
+        'match': 'partial', 'source': 100.0, 'target': 140.0, 'diff_pct': 40.0,
+    }
+    untyped = RuleSet([{'name': 'x', 'weight': 1, 'compare': 'value', 'params': {'tolerance': 0, 'text_credit': 1}}],
+                      scoring=POINTS)
+    with pytest.raises(ValueError):
+        BatchScorer(targets, lambda trade: trade, untyped)
@@ -0,0 +1,147 @@
+"""
+Unit tests for candidate blocking in the Trade Matching Agent.
+
+Tests blocking key computation, neighbour-bucket expansion for the ±2 day
+tolerance, wildcard handling for missing attributes and the recall tracker.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from candidate_blocking import CandidateBlockingIndex, BlockingRecallTracker
+from trade_matching_agent_strands import _extract_key_attributes, _parse_date, _calculate_match_score
+
+
+def make_trade(trade_id, currency="USD", product="Interest Rate Swap", trade_date="2025-01-15", **extra):
+    trade = {"Trade_ID": trade_id, "notional": 1000000, "counterparty": "Goldman Sachs"}
+    if currency is not None:
+        trade["currency"] = currency
+    if product is not None:
+        trade["product_type"] = product
+    if trade_date is not None:
+        trade["trade_date"] = trade_date
+    trade.update(extra)
+    return trade
+
+
+def build_index(trades):
+    return CandidateBlockingIndex(trades, extract_attributes=_extract_key_attributes, parse_date=_parse_date)
+
+
+class TestCandidateBlockingIndex:
+    """Test block membership and candidate retrieval."""
+
+    def test_filters_other_currency_and_product(self):
+        trades = [
+            make_trade("T1"),
+            make_trade("T2", currency="EUR"),
+            make_trade("T3", product="FX Forward"),
+        ]
+        index = build_index(trades)
+
+        ids = [t["Trade_ID"] for t in index.candidates(make_trade("S1"))]
+
+        assert ids == ["T1"]
+
+    def test_normalizes_currency_and_product(self):
+        trades = [make_trade("T1", currency=" usd ", product="INTEREST_RATE-SWAP")]
+        index = build_index(trades)
+
+        assert [t["Trade_ID"] for t in index.candidates(make_trade("S1"))] == ["T1"]
+
+    @pytest.mark.parametrize("offset_date", ["2025-01-13", "2025-01-14", "2025-01-16", "2025-01-17"])
+    def test_dates_within_tolerance_are_never_lost(self, offset_date):
+        index = build_index([make_trade("T1", trade_date=offset_date)])
+
+        assert len(index.candidates(make_trade("S1", trade_date="2025-01-15"))) == 1
+
+    def test_distant_dates_are_excluded(self):
+        index = build_index([make_trade("T1", trade_date="2025-03-15")])
+
+        assert index.candidates(make_trade("S1", trade_date="2025-01-15")) == []
+
+    def test_missing_attributes_act_as_wildcards(self):
+        trades = [
+            make_trade("T1", currency=None),
+            make_trade("T2", product=None),
+            make_trade("T3", trade_date=None),
+            make_trade("T4", trade_date="not a date"),
+        ]
+        index = build_index(trades)
+
+        ids = [t["Trade_ID"] for t in index.candidates(make_trade("S1"))]
+
+        assert ids == ["T1", "T2", "T3", "T4"]
+
+    def test_source_without_date_searches_all_buckets(self):
+        trades = [make_trade("T1", trade_date="2025-01-01"), make_trade("T2", trade_date="2025-06-01")]
+        index = build_index(trades)
+
+        assert len(index.candidates(make_trade("S1", trade_date=None))) == 2
+
+    def test_candidates_keep_table_order(self):
+        trades = [make_trade(f"T{i}", trade_date=f"2025-01-{15 + (i % 3) - 1:02d}") for i in range(9)]
+        index = build_index(trades)
+
+        assert index.candidate_positions(make_trade("S1")) == list(range(9))
+
+    def test_best_match_matches_unblocked_scoring(self):
+        source = make_trade("S1", notional=5000000, fixed_rate=0.035)
+        trades = [
+            make_trade("T1", currency="EUR", notional=5000000, fixed_rate=0.035),
+            make_trade("T2", notional=5000000, fixed_rate=0.035, trade_date="2025-01-16"),
+            make_trade("T3", notional=9000000, fixed_rate=0.050),
+        ]
+        index = build_index(trades)
+
+        def best(candidates):
+            return max(candidates, key=lambda t: _calculate_match_score(source, t)["score"])["Trade_ID"]
+
+        assert best(index.candidates(source)) == best(trades) == "T2"
+
+    def test_rejects_invalid_bucket_width(self):
+        with pytest.raises(ValueError):
+            CandidateBlockingIndex([], _extract_key_attributes, _parse_date, bucket_days=0)
+
+    def test_trade_book_index_is_built_once_per_book_version(self, monkeypatch):
+        import trade_matching_agent_strands as agent
+        from trade_book import TradeBook
+
+        trades = [make_trade("CP1"), make_trade("CP2", currency="EUR")]
+        book = TradeBook(agent.COUNTERPARTY_TABLE, lambda: list(trades), clock=lambda: 0.0)
+        monkeypatch.setattr(agent, 'TRADE_BOOK_ENABLED', True)
+        monkeypatch.setattr(agent, 'ACTIVE_BOOK_ENABLED', False)
+        monkeypatch.setitem(agent._trade_books, agent.COUNTERPARTY_TABLE, book)
+
+        def candidates():
+            return agent._TargetCandidates(agent._load_trades(agent.COUNTERPARTY_TABLE), table_name=agent.COUNTERPARTY_TABLE)
+
+        index = candidates().blocking_index
+        assert candidates().blocking_index is index
+        assert index.candidates(make_trade("S1")) == [trades[0]]
+
+        trades.append(make_trade("CP3"))
+        agent._load_trades(agent.COUNTERPARTY_TABLE, force_refresh=True)
+        assert [t["Trade_ID"] for t in candidates().blocking_index.candidates(make_trade("S1"))] == ["CP1", "CP3"]
+
+
+class TestBlockingRecallTracker:
+    """Test recall accounting."""
+
+    def test_recall_counts_retained_true_matches(self):
+        tracker = BlockingRecallTracker(match_threshold=70.0)
+
+        sample = tracker.record({0: 90.0, 1: 75.0, 2: 40.0}, blocked_ids={0, 2})
+
+        assert sample == 0.5
+        assert tracker.snapshot() == {"samples": 1, "true_matches": 2, "retained_matches": 1, "recall": 0.5}
+
+    def test_sample_without_true_matches_returns_none(self):
+        tracker = BlockingRecallTracker()
+
+        assert tracker.record({0: 10.0}, blocked_ids=set()) is None
+        assert tracker.recall is None
@@ -0,0 +1,122 @@
+"""
+Unit tests for TradeDateIndex candidate retrieval.
+"""
+
+import json
+import os
+import sys
+import threading
+from datetime import date
+
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from candidate_retrieval import TradeDateQueryPlanner, date_window
+import trade_matching_agent_strands as agent
+from test_trade_id_index import KeyedTableClient
+
+
+class IndexClient(KeyedTableClient):
+    """Serves TradeDateIndex queries from {table: [items]}, one item per page, and keyed reads."""
+
+    def __init__(self, tables, fail=False):
+        super().__init__(tables)
+        self.fail = fail
+        self.queries = []
+        self.scans = 0
+        self._lock = threading.Lock()
+
+    def query(self, TableName, IndexName, KeyConditionExpression, ExpressionAttributeNames,
+              ExpressionAttributeValues, ExclusiveStartKey=None, **kwargs):
+        if self.fail:
+            raise ClientError({'Error': {'Code': 'ValidationException', 'Message': 'no such index'}}, 'Query')
+        day = ExpressionAttributeValues[':trade_date']['S']
+        with self._lock:
+            self.queries.append((TableName, IndexName, day, kwargs.get('ProjectionExpression')))
+        matches = [item for item in self.tables[TableName] if item.get('Trade_Date') == day]
+        start = int(ExclusiveStartKey['n']['N']) if ExclusiveStartKey else 0
+        response = {'Items': [{k: {'S': v} for k, v in item.items()} for item in matches[start:start + 1]]}
+        if start + 1 < len(matches):
+            response['LastEvaluatedKey'] = {'n': {'N': str(start + 1)}}
+        return response
+
+
+def test_date_window():
+    assert date_window(date(2025, 1, 1), 1) == ['2024-12-31', '2025-01-01', '2025-01-02']
+    assert date_window(date(2025, 1, 1), 0) == ['2025-01-01']
+
+
+def test_window_queries_every_day_and_page():
+    items = [{'Trade_ID': f'T{i}', 'Trade_Date': f'2025-01-{10 + i % 7:02d}'} for i in range(20)]
+    client = IndexClient({'Bank': items})
+    planner = TradeDateQueryPlanner(client, attributes=['Trade_ID', 'Trade_Date'])
+
+    trades = planner.query_window('Bank', date(2025, 1, 13), 2)
+
+    expected = [item for item in items if '2025-01-11' <= item['Trade_Date'] <= '2025-01-15']
+    assert sorted(t['Trade_ID'] for t in trades) == sorted(t['Trade_ID'] for t in expected)
+    # Merged in date order
+    assert [t['Trade_Date'] for t in trades] == sorted(t['Trade_Date'] for t in trades)
+    assert {day for _, _, day, _ in client.queries} == set(date_window(date(2025, 1, 13), 2))
+    assert all(index == 'TradeDateIndex' and projection == '#p0, #p1' for _, index, _, projection in client.queries)
+
+
+@pytest.fixture
+def index_agent(monkeypatch):
+    def use(tables, fail=False):
+        client = IndexClient(tables, fail=fail)
+        scanned = []
+        monkeypatch.setattr(agent, 'TRADE_BOOK_ENABLED', False)
+        monkeypatch.setattr(agent, 'CANDIDATE_RETRIEVAL', 'index')
+        monkeypatch.setattr(agent, 'get_boto_client', lambda service: client)
+        monkeypatch.setattr(agent, '_scan_table', lambda table_name: scanned.append(table_name) or tables[table_name])
+        return client, scanned
+    return use
+
+
+def trade(trade_id, trade_date, currency='USD'):
+    return {'Trade_ID': trade_id, 'Trade_Date': trade_date, 'currency': currency,
+            'product_type': 'Swap', 'notional': '1000000'}
+
+
+def test_find_trade_matches_reads_only_the_date_window(index_agent):
+    tables = {
+        agent.BANK_TABLE: [trade('B1', '2025-01-15')],
+        agent.COUNTERPARTY_TABLE: [trade('C1', '2025-01-16'), trade('C2', '2025-03-01')],
+    }
+    client, scanned = index_agent(tables)
+
+    result = json.loads(agent.find_trade_matches('B1', 'BANK'))
+
+    assert result['best_match']['trade_id'] == 'C1'
+    assert result['total_candidates_evaluated'] == 1
+    assert scanned == []
+    assert len(client.queries) == 2 * agent.BLOCKING_DATE_TOLERANCE_DAYS + 1
+
+
+@pytest.mark.parametrize("trade_date, fail", [(None, False), ('2025-01-15', True), ('2030-01-01', False)])
+def test_falls_back_to_scan(index_agent, trade_date, fail):
+    tables = {agent.COUNTERPARTY_TABLE: [trade('C1', '2025-01-16')]}
+    client, scanned = index_agent(tables, fail=fail)
+
+    trades = agent._load_trades_near(agent.COUNTERPARTY_TABLE, trade_date, 2)
+
+    assert [t['Trade_ID'] for t in trades] == ['C1']
+    assert scanned == [agent.COUNTERPARTY_TABLE]
+
+
+def test_reconcile_business_day_uses_index(index_agent):
+    tables = {
+        agent.BANK_TABLE: [trade('B1', '2025-01-15'), trade('B2', '2025-01-16')],
+        agent.COUNTERPARTY_TABLE: [trade('C1', '2025-01-14'), trade('C2', '2025-02-01')],
+    }
+    client, scanned = index_agent(tables)
+
+    result = agent.reconcile_business_day('2025-01-15', method='greedy')
+
+    assert scanned == []
+    assert (result['bank_trades'], result['counterparty_trades']) == (1, 1)
+    assert result['results'][0]['counterparty_trade_id'] == 'C1'
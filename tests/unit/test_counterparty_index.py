@@ -0,0 +1,48 @@
+"""
+Unit tests for the counterparty name index and memoized name normalization.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from counterparty_index import CounterpartyNameIndex
+from match_normalizers import fuzzy_match_counterparty, normalize_counterparty_name
+
+WORDS = ['GOLDMAN', 'SACHS', 'GOLD', 'MAN', 'SA', 'AG', 'LTD', 'LIMITED', 'CORP', 'CORPORATION',
+         'INTL', "INT'L", 'INTERNATIONAL', '(CAYMAN)', 'BANK', 'OF', 'AMERICA', 'JP', 'MORGAN',
+         '&', 'CO.', 'N.A.', 'LLC', 'PLC', 'SANTANDER', 'GMBH', 'HSBC', '']
+
+
+def random_name(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 4))) + rng.choice(['', '.', ','])
+
+
+def test_normalization_strips_suffixes_in_order():
+    assert normalize_counterparty_name('Merrill Lynch International') == 'MERRILL LYNCH'
+    assert normalize_counterparty_name('FAB Global Markets (Cayman) Limited') == 'FAB GLOBAL MARKETS'
+    # CORP is removed before CORPORATION is looked for
+    assert normalize_counterparty_name('Acme Corporation') == 'ACME ORATION'
+
+
+def test_similarities_equal_pairwise_fuzzy_match():
+    rng = random.Random(11)
+    for _ in range(100):
+        names = [random_name(rng) for _ in range(rng.randint(1, 40))] + ['', None]
+        index = CounterpartyNameIndex(names)
+        for query in [random_name(rng) for _ in range(10)] + ['']:
+            found = index.similarities(query)
+            for position, name in enumerate(names):
+                assert found.get(position, 0.0) == fuzzy_match_counterparty(query, name), (query, name)
+
+
+def test_only_related_names_are_returned():
+    index = CounterpartyNameIndex(['Goldman Sachs International', 'GOLDMAN SACHS', 'Barclays Bank PLC', 'Goldmanx'])
+
+    assert index.similarities('Goldman Sachs Intl') == {0: 1.0, 1: 1.0}
+    # Partial-word containment is found without a shared token
+    assert index.similarities('GOLDMA') == {0: 0.9, 1: 0.9, 3: 0.9}
+    assert index.similarities('') == {}
+    assert len(index) == 3
@@ -0,0 +1,102 @@
+"""
+Unit tests for the counterparty-name MinHash/LSH index.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from counterparty_lsh import CounterpartyLshIndex, choose_bands, name_trigrams, trigram_similarity
+from match_normalizers import normalize_counterparty_name
+import trade_matching_agent_strands as agent
+
+NAMES = [
+    'Goldman Sachs International', 'JPMorgan Chase Bank NA', 'Merrill Lynch Capital Markets',
+    'Deutsche Bank AG', 'Barclays Bank PLC', None, '',
+]
+
+
+def exact_similarity(a, b):
+    return trigram_similarity(name_trigrams(normalize_counterparty_name(a)), name_trigrams(normalize_counterparty_name(b)))
+
+
+def test_near_duplicates_are_found_with_their_trigram_similarity():
+    index = CounterpartyLshIndex(NAMES)
+
+    for query, position in [('GOLDMAN SACHES INTL', 0), ('J.P. Morgan Chase Bank N.A.', 1),
+                            ('Merrill Lynch Cap Markets', 2), ('Deutsch Bank', 3)]:
+        assert index.similarities(query) == {position: exact_similarity(query, NAMES[position])}
+
+    assert index.similarities('HSBC Bank') == {}
+    assert index.similarities('Goldman Sachs') == {0: 1.0}
+    assert index.near_positions('HSBC Bank') == {5, 6}
+    assert index.near_positions('Ltd') is None and index.near_positions(None) is None
+
+
+def test_band_count_reaches_the_recall_target_at_the_threshold():
+    bands = choose_bands(128, 0.5)
+    rows = 128 // bands
+
+    assert 1 - (1 - 0.5 ** rows) ** bands >= 0.85
+    assert 1 - (1 - 0.5 ** (rows * 2)) ** (bands // 2) < 0.85
+    with pytest.raises(ValueError):
+        CounterpartyLshIndex(NAMES, num_perm=128, bands=3)
+
+
+def test_lsh_finds_nearly_every_name_a_full_scan_finds():
+    rng = random.Random(3)
+    letters = 'ABCDEFGHIKLMNOPRSTUVW'
+    names = [' '.join(''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(2))
+             for _ in range(500)]
+    index = CounterpartyLshIndex(names)
+
+    expected = found = 0
+    for name in rng.sample(names, 100):
+        i = rng.randrange(1, len(name) - 1)
+        query = name[:i] + name[i + 1:]
+        scan = {position: exact_similarity(query, other) for position, other in enumerate(names)}
+        scan = {position: score for position, score in scan.items() if score >= 0.5}
+        result = index.similarities(query)
+        assert all(scan[position] == score for position, score in result.items())
+        expected += len(scan)
+        found += len(result)
+
+    assert found / expected >= 0.95
+
+
+def trade(trade_id, counterparty=None):
+    item = {'Trade_ID': trade_id, 'currency': 'USD', 'product_type': 'Interest Rate Swap',
+            'trade_date': '2025-01-15', 'notional': 1000000}
+    if counterparty is not None:
+        item['counterparty'] = counterparty
+    return item
+
+
+@pytest.fixture
+def lsh_enabled(monkeypatch):
+    monkeypatch.setattr(agent, 'COUNTERPARTY_LSH_ENABLED', True)
+    monkeypatch.setattr(agent, 'BLOCKING_RECALL_SAMPLE_RATE', 0.0)
+
+
+def test_blocked_candidates_are_narrowed_to_near_duplicate_names(lsh_enabled):
+    targets = [trade(f"N{i}", 'Barclays Bank') for i in range(10)] + [trade('G1', 'Goldman Sachs Intl'), trade('U1')]
+
+    result = agent._match_source_trade(
+        'S', trade('S', 'GOLDMAN SACHES'), agent.BANK_TABLE, agent._TargetCandidates(targets)
+    )
+
+    scored = [result['best_match']] + result['other_candidates']
+    assert result['candidates_scored'] == 2
+    assert {candidate['trade_id'] for candidate in scored} == {'G1', 'U1'}
+
+
+def test_blocked_set_is_kept_without_near_duplicate_names(lsh_enabled):
+    targets = [trade(f"N{i}", 'Barclays Bank') for i in range(3)]
+
+    for source in (trade('S', 'Goldman Sachs'), trade('S')):
+        result = agent._match_source_trade('S', source, agent.BANK_TABLE, agent._TargetCandidates(targets))
+        assert result['candidates_scored'] == 3
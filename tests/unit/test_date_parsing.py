@@ -0,0 +1,82 @@
+"""
+Unit tests for the shared memoized date parser.
+"""
+
+import os
+import random
+import sys
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from date_parsing import DateParser
+from match_normalizers import DATE_FORMATS
+
+VALIDATOR_FORMATS = [
+    '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%SZ', '%m/%d/%Y', '%d/%m/%Y',
+    '%m-%d-%Y', '%d-%m-%Y', '%Y/%m/%d', '%B %d, %Y', '%d %B %Y',
+]
+
+
+def sequential_parse(value, formats):
+    """Reference implementation: try each format in order."""
+    if not value:
+        return None
+    for fmt in formats:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).toordinal()
+        except ValueError:
+            continue
+    return None
+
+
+def test_matches_sequential_strptime():
+    rng = random.Random(7)
+    parts = ['2025', '25', '1', '01', '13', '31', '29', 'Jan', 'January', 'T', 'Z', '10',
+             ':', '-', '/', ' ', ',', '20250115', 'x']
+    samples = [''.join(rng.choice(parts) for _ in range(rng.randint(1, 6))) for _ in range(5000)]
+    for _ in range(2000):
+        day = date.fromordinal(rng.randint(738000, 740000))
+        samples.append(day.strftime(rng.choice(VALIDATOR_FORMATS + DATE_FORMATS)))
+    samples += ['2024-02-29', '2025-02-29', ' 2025-01-15 ', 20250115, 20250115.0, 0, None, '']
+
+    for formats in (DATE_FORMATS, VALIDATOR_FORMATS):
+        parser = DateParser(formats)
+        for sample in samples:
+            assert parser.parse_ordinal(sample) == sequential_parse(sample, formats), sample
+
+
+def test_ambiguous_dates_follow_format_priority():
+    assert DateParser(['%d/%m/%Y', '%m/%d/%Y']).to_iso('03/04/2025') == '2025-04-03'
+    assert DateParser(['%m/%d/%Y', '%d/%m/%Y']).to_iso('03/04/2025') == '2025-03-04'
+
+
+def test_validator_dates_do_not_depend_on_earlier_documents():
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_extraction'))
+    from trade_data_validator import TradeDataValidator
+
+    documents = ['03/05/2025', '13/04/2025', '04/13/2025', '2025-01-15', '03/05/2025', '07/08/2025']
+    expected = [sequential_parse(value, TradeDataValidator.DATE_FORMATS) for value in documents]
+    rng = random.Random(5)
+    for _ in range(20):
+        TradeDataValidator._date_parser.cache_clear()
+        order = rng.sample(range(len(documents)), len(documents))
+        for i in order:
+            valid, iso_date, _ = TradeDataValidator()._normalize_date(documents[i], 'trade_date')
+            assert valid and iso_date == date.fromordinal(expected[i]).isoformat(), (documents[i], order)
+
+
+def test_results_are_memoized():
+    parser = DateParser(DATE_FORMATS)
+    parser.parse_ordinal('15 January 2025')
+    parser.parse_ordinal('15 January 2025')
+
+    info = parser.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_strip_disabled_rejects_padded_values():
+    parser = DateParser(['%Y-%m-%d'], strip=False)
+
+    assert parser.parse_ordinal(' 2025-01-15') is None
+    assert parser.parse_date('2025-01-15') == datetime(2025, 1, 15)
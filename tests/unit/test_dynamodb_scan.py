@@ -0,0 +1,93 @@
+"""
+Unit tests for the parallel segmented DynamoDB scan.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from dynamodb_scan import iter_scan, parallel_scan, projection_arguments
+
+
+class PagedScanClient:
+    """Serves `pages` pages of `page_size` items per segment and records every call."""
+
+    def __init__(self, pages=3, page_size=2, fail_segment=None):
+        self.pages = pages
+        self.page_size = page_size
+        self.fail_segment = fail_segment
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def scan(self, TableName, Segment=0, TotalSegments=1, ExclusiveStartKey=None, **kwargs):
+        with self._lock:
+            self.calls.append({'Segment': Segment, 'TotalSegments': TotalSegments, **kwargs})
+        if Segment == self.fail_segment:
+            raise RuntimeError("throttled")
+        page = int(ExclusiveStartKey['page']['N']) + 1 if ExclusiveStartKey else 0
+        items = [
+            {'Trade_ID': {'S': f'S{Segment}P{page}I{i}'}, 'notional': {'N': '100'}, 'Index': {'S': 'SOFR'}}
+            for i in range(self.page_size)
+        ]
+        response = {'Items': items}
+        if page < self.pages - 1:
+            response['LastEvaluatedKey'] = {'page': {'N': str(page)}}
+        return response
+
+
+def test_projection_uses_placeholders_for_every_name():
+    arguments = projection_arguments(['Trade_ID', 'Index', 'Trade_ID'])
+
+    assert arguments == {
+        'ProjectionExpression': '#p0, #p1',
+        'ExpressionAttributeNames': {'#p0': 'Trade_ID', '#p1': 'Index'},
+    }
+
+
+@pytest.mark.parametrize("segments", [1, 3])
+def test_projection_is_sent_with_every_page(segments):
+    client = PagedScanClient()
+    items = parallel_scan(client, 'Bank', segments, attributes=['Trade_ID', 'notional'])
+
+    assert len(items) == segments * 3 * 2
+    assert len(client.calls) == segments * 3
+    assert all(call['ProjectionExpression'] == '#p0, #p1' for call in client.calls)
+    assert {call['Segment'] for call in client.calls} == set(range(segments))
+
+
+def test_iter_scan_streams_with_custom_deserializer():
+    client = PagedScanClient(pages=2, page_size=1)
+    items = iter_scan(client, 'Bank', 4, deserialize=lambda item: item['Trade_ID']['S'])
+
+    assert sorted(items) == sorted(f'S{s}P{p}I0' for s in range(4) for p in range(2))
+
+
+def test_stopping_early_releases_segment_workers():
+    client = PagedScanClient(pages=50, page_size=10)
+    items = iter_scan(client, 'Bank', 4)
+
+    first = [next(items) for _ in range(5)]
+    items.close()
+
+    assert len(first) == 5
+    # Workers stop once their buffered pages are not consumed
+    assert len(client.calls) < 4 * 50
+    assert not [t for t in threading.enumerate() if t.name.startswith('scan-Bank')]
+
+
+def test_segment_failure_is_raised_to_the_consumer():
+    client = PagedScanClient(fail_segment=2)
+
+    with pytest.raises(RuntimeError, match="throttled"):
+        parallel_scan(client, 'Bank', 4)
+
+
+def test_web_portal_copy_is_identical():
+    repo_root = os.path.join(os.path.dirname(__file__), '../..')
+    with open(os.path.join(repo_root, 'deployment/trade_matching/dynamodb_scan.py')) as agent_copy, \
+            open(os.path.join(repo_root, 'web-portal-api/app/services/dynamodb_scan.py')) as portal_copy:
+        assert agent_copy.read() == portal_copy.read()
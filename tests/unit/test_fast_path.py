@@ -0,0 +1,99 @@
+"""
+Unit tests for rules-first execution of the trade matching entrypoint.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fast_path import ExecutionPathTracker, is_unambiguous, FAST_PATH, LLM_PATH
+import trade_matching_agent_strands as agent
+from test_trade_id_index import KeyedTableClient
+
+
+@pytest.mark.parametrize("result, expected", [
+    ({"confidence": 85.0}, True),
+    ({"confidence": 49.9}, True),
+    ({"confidence": 0}, True),
+    ({"confidence": 50.0}, False),
+    ({"confidence": 84.9}, False),
+    ({"error": "Trade T1 not found", "found": False}, False),
+])
+def test_is_unambiguous(result, expected):
+    assert is_unambiguous(result) is expected
+
+
+def test_tracker_reports_fraction_and_latency_per_path():
+    tracker = ExecutionPathTracker()
+    assert tracker.fast_path_fraction() is None
+
+    for latency in (10, 20, 30):
+        tracker.record(FAST_PATH, latency)
+    tracker.record(LLM_PATH, 4000)
+
+    stats = tracker.stats()
+    assert stats["requests"] == {FAST_PATH: 3, LLM_PATH: 1}
+    assert stats["fast_path_fraction"] == 0.75
+    assert stats["latency"][FAST_PATH]["mean_ms"] == 20.0
+    assert stats["latency"][LLM_PATH]["p95_ms"] == 4000.0
+
+
+class FakeAgentResult:
+    message = '{"match_classification": "PROBABLE_MATCH", "confidence_score": 72.0}'
+
+
+@pytest.fixture
+def rules_first(monkeypatch):
+    llm_calls = []
+    monkeypatch.setattr(agent, 'EXECUTION_MODE', 'rules_first')
+    monkeypatch.setattr(agent, 'MEMORY_AVAILABLE', False)
+    monkeypatch.setattr(agent, '_execution_paths', ExecutionPathTracker())
+    monkeypatch.setattr(agent, 'invoke_matching_agent', lambda prompt, session_manager=None: llm_calls.append(prompt) or FakeAgentResult())
+    return llm_calls
+
+
+def test_exact_match_is_served_without_the_llm(rules_first, monkeypatch):
+    trade = {'Trade_ID': 'B1', 'currency': 'USD', 'product_type': 'Swap', 'notional': 1000000, 'trade_date': '2025-01-15'}
+    tables = {agent.BANK_TABLE: [trade], agent.COUNTERPARTY_TABLE: [dict(trade, Trade_ID='C1')]}
+    monkeypatch.setattr(agent, 'TRADE_BOOK_ENABLED', False)
+    monkeypatch.setattr(agent, 'CANDIDATE_RETRIEVAL', 'scan')
+    monkeypatch.setattr(agent, '_scan_table', lambda table_name: tables[table_name])
+    monkeypatch.setattr(agent, 'get_boto_client', lambda service: KeyedTableClient(tables))
+
+    response = agent.invoke({'trade_id': 'B1', 'source_type': 'BANK'})
+
+    assert rules_first == []
+    assert response['execution_path'] == FAST_PATH
+    assert response['match_classification'] == 'MATCHED'
+    assert response['confidence_score'] == 100.0
+    assert json.loads(response['agent_response'])['matched_trade_id'] == 'C1'
+    assert response['token_usage']['total_tokens'] == 0
+
+
+def test_middle_band_is_escalated(rules_first, monkeypatch):
+    monkeypatch.setattr(agent, '_find_trade_matches', lambda trade_id, source_type, search_archive=False: {
+        'classification': 'PROBABLE_MATCH', 'confidence': 72.0, 'best_match': None, 'candidates_scored': 3,
+    })
+
+    response = agent.invoke({'trade_id': 'B1', 'source_type': 'BANK'})
+
+    assert len(rules_first) == 1
+    assert response['execution_path'] == LLM_PATH
+    assert response['confidence_score'] == 72.0
+
+    stats = agent.invoke({'mode': 'execution_stats'})['execution_paths']
+    assert stats['requests'] == {FAST_PATH: 0, LLM_PATH: 1}
+
+
+def test_agent_mode_always_uses_the_llm(rules_first, monkeypatch):
+    monkeypatch.setattr(agent, 'EXECUTION_MODE', 'agent')
+    monkeypatch.setattr(agent, '_find_trade_matches', lambda trade_id, source_type, search_archive=False: pytest.fail("rules not used"))
+
+    agent.invoke({'trade_id': 'B1', 'source_type': 'BANK'})
+
+    assert len(rules_first) == 1
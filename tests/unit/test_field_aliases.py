@@ -0,0 +1,67 @@
+"""
+Unit tests for the compiled field-alias resolver.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from field_aliases import FieldAliasResolver, KEY_FIELD_ALIASES
+
+
+def reference_extract(item):
+    """Uncached first-alias-wins extraction over the alias table."""
+    extracted = {}
+    for standard_name, variations in KEY_FIELD_ALIASES.items():
+        for variation in variations:
+            if variation in item:
+                extracted[standard_name] = item[variation]
+                break
+    return extracted
+
+
+def test_first_alias_in_priority_order_wins():
+    resolver = FieldAliasResolver()
+    item = {'Counterparty': 'B', 'party_b_name': 'A', 'notional': 5, 'Quantity': 7}
+
+    assert resolver.resolve(item) == {'notional': 5, 'party_b_name': 'A'}
+
+
+def test_key_shared_by_two_attributes_resolves_both():
+    resolver = FieldAliasResolver({'trade_date': ['trade_date'], 'as_of': ['date', 'trade_date']})
+
+    assert resolver.resolve({'trade_date': '2025-01-15'}) == {'trade_date': '2025-01-15', 'as_of': '2025-01-15'}
+
+
+def test_matches_reference_extraction_and_order():
+    resolver = FieldAliasResolver()
+    items = [
+        {'Trade_ID': 'T1', 'Currency': 'USD', 'Notional': 1, 'Maturity_Date': '2030-01-01', 'junk': 1},
+        {'trade_id': 'T2', 'ccy': 'EUR', 'price': 0.5, 'Rate': 0.4, 'Index': 'SOFR'},
+        {'usi': 'U1', 'uti': 'U2', 'counterparty_lei': 'LEI', 'Bank_LEI': 'BLEI'},
+        {},
+    ]
+    for item in items:
+        resolved = resolver.resolve(item)
+        assert resolved == reference_extract(item)
+        assert list(resolved) == list(reference_extract(item))
+
+
+def test_plan_cached_per_key_set():
+    resolver = FieldAliasResolver()
+    resolver.resolve({'Trade_ID': 'T1', 'currency': 'USD'})
+    resolver.resolve({'currency': 'EUR', 'Trade_ID': 'T2'})
+    resolver.resolve({'Trade_ID': 'T3'})
+
+    assert resolver.stats() == {'schema_shapes': 2, 'hits': 1, 'misses': 2, 'evictions': 0}
+
+
+def test_plan_cache_is_bounded():
+    resolver = FieldAliasResolver(max_plans=2)
+    for index in range(4):
+        resolver.resolve({'Trade_ID': 'T', f'extra_{index}': index})
+
+    stats = resolver.stats()
+    assert stats['schema_shapes'] == 2
+    assert stats['evictions'] == 2
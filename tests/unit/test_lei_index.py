@@ -0,0 +1,143 @@
+"""
+Unit tests for the LEI hash join fast path.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+import cdm_rules
+from lei_index import LEI_PATH, NO_LEI_CANDIDATES, NO_SOURCE_LEI, BELOW_THRESHOLD, LeiJoinIndex, LeiJoinTracker
+import trade_matching_agent_strands as agent
+
+LEI = '549300ABCDEF12345678'
+
+
+def trade(trade_id, lei=None, currency='USD', trade_date='2025-01-15', notional=1000000, counterparty='Goldman Sachs'):
+    item = {
+        'Trade_ID': trade_id,
+        'currency': currency,
+        'product_type': 'Interest Rate Swap',
+        'trade_date': trade_date,
+        'notional': notional,
+        'counterparty': counterparty,
+    }
+    if lei is not None:
+        item['counterparty_lei'] = lei
+    return item
+
+
+def index(trades):
+    return LeiJoinIndex(trades, agent._extract_key_attributes, agent._parse_date, date_tolerance_days=2)
+
+
+def attributes(item):
+    return agent._extract_key_attributes(item)
+
+
+def test_probe_returns_trades_with_the_lei_and_currency_within_the_date_tolerance():
+    targets = [
+        trade('T0', LEI),
+        trade('T1', LEI.lower(), trade_date='2025-01-17'),
+        trade('T2', LEI, currency='EUR'),
+        trade('T3', LEI, trade_date='2025-01-20'),
+        trade('T4', LEI, trade_date='not a date'),
+        trade('T5', 'OTHERLEI000000000000'),
+        trade('T6'),
+    ]
+
+    assert index(targets).probe(attributes(trade('S', LEI))) == [0, 1, 4]
+    assert index(targets).probe(attributes(trade('S', LEI, trade_date='n/a'))) == [0, 1, 3, 4]
+    assert index(targets).probe(attributes(trade('S', 'UNKNOWN'))) == []
+    assert index(targets).probe(attributes(trade('S'))) is None
+    assert len(index(targets)) == 6
+
+
+def test_tracker_reports_the_lei_path_fraction():
+    tracker = LeiJoinTracker()
+    assert tracker.stats()['lei_path_fraction'] is None
+
+    for outcome in (LEI_PATH, LEI_PATH, NO_SOURCE_LEI, BELOW_THRESHOLD):
+        tracker.record(outcome)
+
+    stats = tracker.stats()
+    assert stats['probes'] == {LEI_PATH: 2, NO_SOURCE_LEI: 1, NO_LEI_CANDIDATES: 0, BELOW_THRESHOLD: 1}
+    assert stats['lei_path_fraction'] == 0.5
+
+
+@pytest.fixture
+def lei_join(monkeypatch):
+    tracker = LeiJoinTracker()
+    monkeypatch.setattr(agent, '_lei_join', tracker)
+    monkeypatch.setattr(agent, 'BLOCKING_RECALL_SAMPLE_RATE', 0.0)
+    name_comparisons = []
+    similarity = cdm_rules.normalized_name_similarity
+    monkeypatch.setattr(
+        cdm_rules, 'normalized_name_similarity', lambda a, b: name_comparisons.append((a, b)) or similarity(a, b)
+    )
+    return tracker, name_comparisons
+
+
+def test_lei_candidates_replace_the_blocked_set(lei_join):
+    tracker, name_comparisons = lei_join
+    targets = [trade(f"N{i}", counterparty='Goldman Sachs Intl') for i in range(20)] + [trade('L1', LEI)]
+
+    result = agent._match_source_trade('S', trade('S', LEI), agent.BANK_TABLE, agent._TargetCandidates(targets))
+
+    assert result['best_match']['trade_id'] == 'L1'
+    assert result['candidates_scored'] == 1
+    assert name_comparisons == []
+    assert tracker.stats()['probes'][LEI_PATH] == 1
+
+
+def test_weak_lei_candidates_fall_back_to_blocking(lei_join):
+    tracker, _ = lei_join
+    targets = [trade('N1', counterparty='Goldman Sachs'), trade('L1', LEI, notional=9000000)]
+
+    result = agent._match_source_trade(
+        'S', trade('S', LEI), agent.BANK_TABLE, agent._TargetCandidates(targets, shared=True)
+    )
+
+    assert result['candidates_scored'] == 2
+    assert result['best_match']['trade_id'] == 'N1'
+    assert tracker.stats()['probes'][BELOW_THRESHOLD] == 1
+
+
+def test_sources_without_lei_use_blocking(lei_join):
+    tracker, _ = lei_join
+    targets = [trade('N1'), trade('L1', LEI)]
+
+    result = agent._match_source_trade('S', trade('S'), agent.BANK_TABLE, agent._TargetCandidates(targets))
+
+    assert result['candidates_scored'] == 2
+    assert tracker.stats()['probes'][NO_SOURCE_LEI] == 1
+
+
+def test_book_lei_index_is_built_once_per_book_version(lei_join, monkeypatch):
+    from trade_book import TradeBook
+
+    targets = [trade('N1'), trade('L1', LEI)]
+    book = TradeBook(agent.COUNTERPARTY_TABLE, lambda: list(targets), clock=lambda: 0.0)
+    monkeypatch.setattr(agent, 'TRADE_BOOK_ENABLED', True)
+    monkeypatch.setattr(agent, 'ACTIVE_BOOK_ENABLED', False)
+    monkeypatch.setitem(agent._trade_books, agent.COUNTERPARTY_TABLE, book)
+    built = []
+    monkeypatch.setattr(agent, 'LeiJoinIndex', lambda trades, **kwargs: built.append(trades) or index(trades))
+
+    for _ in range(3):
+        trades = agent._load_trades(agent.COUNTERPARTY_TABLE)
+        result = agent._match_source_trade(
+            'S', trade('S', LEI), agent.BANK_TABLE, agent._TargetCandidates(trades, table_name=agent.COUNTERPARTY_TABLE)
+        )
+        assert result['best_match']['trade_id'] == 'L1'
+    assert len(built) == 1
+
+    targets.append(trade('L2', LEI))
+    agent._load_trades(agent.COUNTERPARTY_TABLE, force_refresh=True)
+    agent._TargetCandidates(agent._load_trades(agent.COUNTERPARTY_TABLE), table_name=agent.COUNTERPARTY_TABLE)
+    # Trades that are not the book's own list get an index of their own
+    agent._TargetCandidates([trade('X1', LEI)], table_name=agent.COUNTERPARTY_TABLE)
+    assert [len(trades) for trades in built] == [2, 3, 1]
@@ -0,0 +1,253 @@
+"""
+Unit tests for the content-hash match-result cache.
+"""
+
+import json
+import os
+import random
+import sys
+from decimal import Decimal
+
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from match_cache import DynamoDBResultStore, MatchResultCache, S3ResultStore, content_hash
+from match_rules import SOURCE, TARGET, RuleSet
+import trade_matching_agent_strands as agent
+from test_batch_scorer import random_trade
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '../..')
+
+
+class FakeCacheTable:
+    """DynamoDB client stand-in for the cache table, keyed by cache_key."""
+
+    def __init__(self, unprocessed_rounds=0, fail=False):
+        self.items = {}
+        self.unprocessed_rounds = unprocessed_rounds
+        self.fail = fail
+        self.get_batches = []
+        self.write_batches = []
+
+    def batch_get_item(self, RequestItems):
+        if self.fail:
+            raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'BatchGetItem')
+        (table_name, request), = RequestItems.items()
+        self.get_batches.append(len(request['Keys']))
+        if self.unprocessed_rounds:
+            self.unprocessed_rounds -= 1
+            return {'Responses': {table_name: []}, 'UnprocessedKeys': RequestItems}
+        items = [self.items[key['cache_key']['S']] for key in request['Keys'] if key['cache_key']['S'] in self.items]
+        return {'Responses': {table_name: items}, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems):
+        if self.fail:
+            raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'BatchWriteItem')
+        (table_name, requests), = RequestItems.items()
+        self.write_batches.append(len(requests))
+        for request in requests:
+            item = request['PutRequest']['Item']
+            self.items[item['cache_key']['S']] = item
+        return {'UnprocessedItems': {}}
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeBucket:
+    """S3 client stand-in for get_object/put_object."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        return {'Body': FakeBody(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[(Bucket, Key)] = Body
+
+
+def counting(results):
+    calls = []
+
+    def compute(key):
+        def run():
+            calls.append(key)
+            return results[key]
+        return run
+    return calls, compute
+
+
+# ----------------------------------------------------------------------------
+# Hashing and rule versions
+# ----------------------------------------------------------------------------
+
+def test_content_hash_ignores_key_order_but_not_types():
+    assert content_hash({'a': 1, 'b': 'x'}) == content_hash({'b': 'x', 'a': 1})
+    assert content_hash({'a': 1}) != content_hash({'a': 1.0})
+    assert content_hash({'a': Decimal('1')}) != content_hash({'a': '1'})
+    assert content_hash({'a': 1}) != content_hash({'a': 2})
+
+
+def test_rule_set_version_changes_with_the_specs():
+    spec = {'name': 'currency', 'weight': 1.0, 'compare': 'equal'}
+
+    assert RuleSet([spec]).version == RuleSet([dict(spec)]).version
+    assert RuleSet([spec]).version != RuleSet([dict(spec, weight=0.5)]).version
+    assert RuleSet([spec]).version != RuleSet([spec], version='2').version
+    assert RuleSet([spec]).version.startswith('1-')
+
+
+def test_match_attributes_are_the_values_the_rules_read():
+    rules = RuleSet([
+        {'name': 'currency', 'weight': 1.0, 'presence': 'both', 'compare': 'equal'},
+        {'name': 'party', 'weight': 1.0, 'source_fields': [('counterparty', 'seller')],
+         'target_fields': [('counterparty', 'buyer')], 'default': '', 'compare': 'equal'},
+    ])
+    trade = {'currency': 'USD', 'seller': 'ACME', 'buyer': 'BANK', 'Trade_ID': 'T1', 'status': 'NEW'}
+
+    assert rules.match_attributes(trade, SOURCE) == {'currency': 'USD', 'party': 'ACME'}
+    assert rules.match_attributes(trade, TARGET) == {'currency': 'USD', 'party': 'BANK'}
+    assert rules.match_attributes({}, SOURCE) == {'party': ''}
+
+
+# ----------------------------------------------------------------------------
+# Cache tiers
+# ----------------------------------------------------------------------------
+
+def test_resolve_computes_only_misses_and_evicts_least_recently_used():
+    cache = MatchResultCache('v1', max_entries=2)
+    calls, compute = counting({'a': {'score': 1}, 'b': {'score': 2}, 'c': {'score': 3}})
+
+    assert cache.resolve([('a', compute('a')), ('b', compute('b')), ('a', compute('a'))]) == [
+        {'score': 1}, {'score': 2}, {'score': 1}]
+    assert calls == ['a', 'b']
+
+    assert cache.get_or_compute('a', compute('a')) == {'score': 1}
+    cache.get_or_compute('c', compute('c'))
+    cache.get_or_compute('b', compute('b'))
+
+    assert calls == ['a', 'b', 'c', 'b']
+    assert cache.stats()['evictions'] == 2
+    assert cache.stats()['memory_hits'] == 1
+
+
+def test_disabled_cache_always_computes():
+    cache = MatchResultCache('v1', max_entries=0)
+    calls, compute = counting({'a': 1})
+
+    cache.get_or_compute('a', compute('a'))
+    cache.get_or_compute('a', compute('a'))
+
+    assert not cache.enabled
+    assert calls == ['a', 'a']
+
+
+def test_dynamodb_tier_is_shared_between_instances_and_honours_ttl():
+    table = FakeCacheTable(unprocessed_rounds=1)
+    now = [1000.0]
+    store = DynamoDBResultStore(table, 'cache', ttl_seconds=60, clock=lambda: now[0])
+    calls, compute = counting({f"k{i}": {'score': i} for i in range(150)})
+
+    MatchResultCache('v1', store=store).resolve([(f"k{i}", compute(f"k{i}")) for i in range(150)])
+    assert table.write_batches == [25] * 6
+
+    other = MatchResultCache('v1', store=store)
+    assert other.resolve([(f"k{i}", compute(f"k{i}")) for i in range(150)])[149] == {'score': 149}
+    assert len(calls) == 150
+    assert other.stats()['store_hits'] == 150
+    # The first lookup's first batch came back unprocessed once and was retried
+    assert table.get_batches == [100, 100, 50, 100, 50]
+
+    now[0] += 61
+    MatchResultCache('v1', store=store).get_or_compute('k1', compute('k1'))
+    assert calls[-1] == 'k1'
+
+
+def test_s3_tier_round_trips_results():
+    bucket = FakeBucket()
+    store = S3ResultStore(bucket, 'trades', prefix='cache/')
+    calls, compute = counting({'v1/a/b': {'score': 0.5, 'codes': ['X'], 'notional': Decimal('1E+6')}})
+
+    MatchResultCache('v1', store=store).get_or_compute('v1/a/b', compute('v1/a/b'))
+    result = MatchResultCache('v1', store=store).get_or_compute('v1/a/b', compute('v1/a/b'))
+
+    assert ('trades', 'cache/v1/a/b.json') in bucket.objects
+    assert result == {'score': 0.5, 'codes': ['X'], 'notional': Decimal('1E+6')}
+    assert isinstance(result['notional'], Decimal)
+    assert calls == ['v1/a/b']
+
+
+def test_store_errors_are_misses():
+    cache = MatchResultCache('v1', max_entries=0, store=DynamoDBResultStore(FakeCacheTable(fail=True), 'cache'))
+    calls, compute = counting({'a': 1})
+
+    assert cache.get_or_compute('a', compute('a')) == 1
+    assert calls == ['a']
+    assert cache.stats()['store_errors'] == 2
+
+
+# ----------------------------------------------------------------------------
+# Trade matching agent
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def match_cache(monkeypatch):
+    cache = MatchResultCache(agent.CDM_MATCH_RULES.version)
+    monkeypatch.setattr(agent, '_match_cache', cache)
+    monkeypatch.setattr(agent, 'BLOCKING_RECALL_SAMPLE_RATE', 0.0)
+    calls = []
+    score = agent._calculate_match_score
+    monkeypatch.setattr(agent, '_calculate_match_score', lambda s, t: calls.append(t['Trade_ID']) or score(s, t))
+    return calls
+
+
+def as_json(result):
+    return json.dumps(result, sort_keys=True, default=str)
+
+
+def test_unchanged_pairs_are_not_rescored(match_cache):
+    rng = random.Random(7)
+    targets = [random_trade(rng, f"T{i}") for i in range(40)]
+    source = random_trade(rng, 'S')
+
+    first = agent._match_source_trade('S', source, agent.BANK_TABLE, agent._TargetCandidates(targets))
+    scored = len(match_cache)
+    second = agent._match_source_trade('S', source, agent.BANK_TABLE, agent._TargetCandidates(targets))
+
+    assert scored > 0
+    assert len(match_cache) == scored
+    assert as_json(second) == as_json(first)
+
+
+def test_changed_trades_are_rescored(match_cache):
+    # Fewer targets than TOP_K_CANDIDATES in one block, so every target survives phase 1
+    source = {'Trade_ID': 'S', 'currency': 'USD', 'product_type': 'Swap', 'notional': 1000000,
+              'trade_date': '2025-01-15'}
+    targets = [dict(source, Trade_ID=f"T{i}", notional=1000000 + i * 15000) for i in range(3)]
+    agent._match_source_trade('S', source, agent.BANK_TABLE, agent._TargetCandidates(targets))
+
+    changed = [dict(targets[0], notional='7,777,777.00')] + targets[1:]
+    del match_cache[:]
+    agent._match_source_trade('S', source, agent.BANK_TABLE, agent._TargetCandidates(changed))
+    assert match_cache == ['T0']
+
+    del match_cache[:]
+    agent._match_source_trade('S', dict(source, notional=1001000), agent.BANK_TABLE, agent._TargetCandidates(changed))
+    assert sorted(match_cache) == ['T0', 'T1', 'T2']
+
+
+def test_web_portal_copy_is_identical():
+    with open(os.path.join(REPO_ROOT, 'deployment/trade_matching/match_cache.py')) as agent_copy, \
+            open(os.path.join(REPO_ROOT, 'web-portal-api/app/services/match_cache.py')) as portal_copy:
+        assert agent_copy.read() == portal_copy.read()
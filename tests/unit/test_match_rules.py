@@ -0,0 +1,326 @@
+"""
+Unit tests for the compiled match-rules engine.
+
+The rule sets must reproduce the scorers they replaced exactly, so these tests
+compare them with reference copies of the previous hand-written
+implementations on randomized trades with messy spellings, unparseable values
+and missing attributes.
+"""
+
+import json
+import os
+import random
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from match_normalizers import (
+    dates_within_tolerance, fuzzy_match_counterparty, normalize_currency, normalize_day_count, normalize_lei,
+    normalize_payment_frequency, normalize_product_type, normalize_rate_index, parse_notional, parse_rate,
+)
+from match_rules import POINTS, SOURCE, TARGET, RuleSet
+import trade_matching_agent as legacy
+from trade_matching_agent_strands import _calculate_match_score, _extract_key_attributes
+from test_batch_scorer import random_trade
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '../..')
+
+
+# ----------------------------------------------------------------------------
+# Reference implementations the rule sets replaced
+# ----------------------------------------------------------------------------
+
+def reference_cdm_score(source_trade, target_trade):
+    score = 0.0
+    max_score = 0.0
+    breakdown = {}
+    source = _extract_key_attributes(source_trade)
+    target = _extract_key_attributes(target_trade)
+
+    def exact(field, weight, normalize, name=None):
+        nonlocal score, max_score
+        if field in source and field in target:
+            max_score += weight
+            match = normalize(source[field]) == normalize(target[field])
+            score += weight if match else 0
+            breakdown[name or field] = {'match': match, 'source': source[field], 'target': target[field]}
+            return match
+        return False
+
+    exact('currency', 12, normalize_currency)
+    if 'notional' in source and 'notional' in target:
+        max_score += 15
+        try:
+            s, t = parse_notional(source['notional']), parse_notional(target['notional'])
+            if s > 0:
+                diff = abs(s - t) / s
+                match = True if diff <= 0.02 else 'partial' if diff <= 0.05 else False
+                score += {True: 15, 'partial': 8, False: 0}[match]
+                breakdown['notional'] = {'match': match, 'source': s, 'target': t, 'diff_pct': round(diff * 100, 2)}
+        except (ValueError, ZeroDivisionError):
+            breakdown['notional'] = {'match': False, 'error': 'parse_error'}
+    if 'product_type' in source and 'product_type' in target:
+        max_score += 10
+        s, t = normalize_product_type(source['product_type']), normalize_product_type(target['product_type'])
+        match = True if s == t else 'partial' if s in t or t in s else False
+        score += {True: 10, 'partial': 6, False: 0}[match]
+        breakdown['product_type'] = {'match': match, 'source': source['product_type'], 'target': target['product_type']}
+    for field in ('trade_date', 'effective_date', 'termination_date'):
+        if field in source and field in target:
+            max_score += 8
+            match = dates_within_tolerance(source[field], target[field], 2)
+            score += 8 if match else 0
+            breakdown[field] = {'match': match, 'source': source[field], 'target': target[field]}
+    lei_matched = exact('party_b_lei', 8, normalize_lei, 'counterparty_lei')
+    if not lei_matched and 'party_b_name' in source and 'party_b_name' in target:
+        if 'party_b_lei' not in source or 'party_b_lei' not in target:
+            max_score += 8
+        similarity = fuzzy_match_counterparty(source['party_b_name'], target['party_b_name'])
+        match = True if similarity >= 0.8 else 'partial' if similarity >= 0.5 else False
+        score += {True: 8, 'partial': 4, False: 0}[match]
+        breakdown['counterparty_name'] = {'match': match, 'source': source['party_b_name'],
+                                          'target': target['party_b_name'], 'similarity': round(similarity, 2)}
+    exact('day_count_fraction', 8, normalize_day_count)
+    exact('payment_frequency', 7, normalize_payment_frequency)
+    exact('floating_rate_index', 8, normalize_rate_index)
+    if 'fixed_rate' in source and 'fixed_rate' in target:
+        max_score += 8
+        try:
+            s, t = parse_rate(source['fixed_rate']), parse_rate(target['fixed_rate'])
+            if s > 1 and t < 1:
+                s = s / 100
+            elif t > 1 and s < 1:
+                t = t / 100
+            diff_bps = abs(s - t) * 10000
+            match = True if diff_bps <= 1 else 'partial' if diff_bps <= 5 else False
+            score += {True: 8, 'partial': 4, False: 0}[match]
+            breakdown['fixed_rate'] = {'match': match, 'source': s, 'target': t, 'diff_bps': round(diff_bps, 2)}
+        except (ValueError, ZeroDivisionError):
+            breakdown['fixed_rate'] = {'match': False, 'error': 'parse_error'}
+
+    final_score = (score / max_score * 100) if max_score > 0 else 0.0
+    return {'score': round(final_score, 1), 'breakdown': breakdown, 'points_earned': score,
+            'points_possible': max_score, 'fields_compared': len(breakdown)}
+
+
+def _reference_date_score(date1, date2):
+    try:
+        d1 = datetime.strptime(date1, "%Y-%m-%d")
+        d2 = datetime.strptime(date2, "%Y-%m-%d")
+    except (ValueError, TypeError):
+        return 0.0
+    diff_days = abs((d1 - d2).days)
+    if diff_days == 0:
+        return 1.0
+    if diff_days <= legacy.DATE_TOLERANCE_DAYS:
+        return 0.9
+    return max(0.0, 1.0 - (diff_days * 0.1))
+
+
+def _reference_fuzzy_score(str1, str2):
+    if not str1 or not str2:
+        return 0.0
+    str1, str2 = str1.lower().strip(), str2.lower().strip()
+    if str1 == str2:
+        return 1.0
+    words1, words2 = set(str1.split()), set(str2.split())
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / len(words1 | words2)
+
+
+def reference_legacy_match(bank_trade, cp_trade):
+    scores, differences, reasons = {}, {}, []
+
+    bank_ccy, cp_ccy = str(bank_trade.get("currency", "")).upper(), str(cp_trade.get("currency", "")).upper()
+    scores["currency"] = 1.0 if bank_ccy == cp_ccy else 0.0
+    if bank_ccy != cp_ccy:
+        differences["currency"] = {"bank": bank_ccy, "counterparty": cp_ccy}
+        reasons.append("CURRENCY_MISMATCH")
+
+    bank_maturity, cp_maturity = bank_trade.get("maturity_date", ""), cp_trade.get("maturity_date", "")
+    scores["maturity_date"] = 1.0 if bank_maturity == cp_maturity else _reference_date_score(bank_maturity, cp_maturity)
+    if scores["maturity_date"] < 1.0:
+        differences["maturity_date"] = {"bank": bank_maturity, "counterparty": cp_maturity}
+        if scores["maturity_date"] < 0.9:
+            reasons.append("MATURITY_DATE_MISMATCH")
+
+    n1, n2 = float(bank_trade.get("notional", 0)), float(cp_trade.get("notional", 0))
+    if n1 == 0 and n2 == 0:
+        scores["notional"] = 1.0
+    elif n1 == 0 or n2 == 0:
+        scores["notional"] = 0.0
+    else:
+        diff_pct = abs(n1 - n2) / max(n1, n2)
+        scores["notional"] = 1.0 if diff_pct <= legacy.NOTIONAL_TOLERANCE_PCT else max(0.0, 1.0 - diff_pct)
+    if scores["notional"] < 1.0:
+        differences["notional"] = {"bank": n1, "counterparty": n2}
+        if scores["notional"] < 0.9:
+            reasons.append("NOTIONAL_MISMATCH")
+
+    bank_date, cp_date = bank_trade.get("trade_date", ""), cp_trade.get("trade_date", "")
+    scores["trade_date"] = _reference_date_score(bank_date, cp_date)
+    if scores["trade_date"] < 1.0:
+        differences["trade_date"] = {"bank": bank_date, "counterparty": cp_date}
+        if scores["trade_date"] < 0.8:
+            reasons.append("TRADE_DATE_MISMATCH")
+
+    bank_cp = bank_trade.get("counterparty", "") or bank_trade.get("seller", "")
+    cp_cp = cp_trade.get("counterparty", "") or cp_trade.get("buyer", "")
+    bank_buyer, cp_seller = bank_trade.get("buyer", ""), cp_trade.get("seller", "")
+    scores["counterparty"] = max(_reference_fuzzy_score(a, b) for a in (bank_cp, bank_buyer) for b in (cp_cp, cp_seller))
+    if scores["counterparty"] < 1.0:
+        differences["counterparty"] = {"bank": f"{bank_cp} / {bank_buyer}", "counterparty": f"{cp_cp} / {cp_seller}"}
+        if scores["counterparty"] < 0.5:
+            reasons.append("COUNTERPARTY_MISMATCH")
+
+    bank_product, cp_product = str(bank_trade.get("product_type", "")).upper(), str(cp_trade.get("product_type", "")).upper()
+    if bank_product == cp_product:
+        scores["product_type"] = 1.0
+    elif bank_product in cp_product or cp_product in bank_product:
+        scores["product_type"] = 0.8
+    else:
+        scores["product_type"] = _reference_fuzzy_score(bank_product, cp_product)
+        if scores["product_type"] < 0.8:
+            differences["product_type"] = {"bank": bank_product, "counterparty": cp_product}
+            reasons.append("PRODUCT_TYPE_MISMATCH")
+
+    r1, r2 = float(bank_trade.get("fixed_rate", 0)), float(cp_trade.get("fixed_rate", 0))
+    if r1 == r2:
+        scores["fixed_rate"] = 1.0
+    elif r1 > 0 and r2 > 0:
+        scores["fixed_rate"] = max(0, 1.0 - abs(r1 - r2) / max(r1, r2) * 10)
+        if scores["fixed_rate"] < 0.9:
+            differences["fixed_rate"] = {"bank": r1, "counterparty": r2}
+            reasons.append("FIXED_RATE_MISMATCH")
+    else:
+        scores["fixed_rate"] = 0.5
+
+    differences["reference_ids"] = {
+        "bank_trade_id": bank_trade.get("Trade_ID", ""), "counterparty_trade_id": cp_trade.get("Trade_ID", "")
+    }
+    return {"field_scores": scores, "differences": differences, "reason_codes": reasons}
+
+
+# ----------------------------------------------------------------------------
+# Parity
+# ----------------------------------------------------------------------------
+
+LEGACY_FIELD_CHOICES = {
+    'currency': ['USD', 'usd', 'EUR', ''],
+    'maturity_date': ['2030-01-17', '2030-01-18', '2030-01-20', '2030-02-17', '17/01/2030', ''],
+    'notional': [1000000, 1000000.0, '1000000', Decimal('1000000'), 1010000, 1500000, 0, -5, 3000000],
+    'trade_date': ['2025-01-15', '2025-01-16', '2025-01-19', '2025-03-01', 'garbage', ''],
+    'counterparty': ['Goldman Sachs International', 'goldman sachs', 'JP Morgan', '  ', ''],
+    'buyer': ['First Abu Dhabi Bank', 'FAB', ''],
+    'seller': ['Goldman Sachs International', 'Morgan Stanley', ''],
+    'product_type': ['Interest Rate Swap', 'INTEREST RATE SWAP', 'Swap', 'Rate Swap Basis', 'FX Forward', ''],
+    'fixed_rate': [0.035, '0.035', 0.0351, 0.04, 3.5, 0, -0.01],
+}
+
+
+def random_legacy_trade(rng, trade_id):
+    trade = {'Trade_ID': trade_id}
+    for field, choices in LEGACY_FIELD_CHOICES.items():
+        if rng.random() < 0.85:
+            trade[field] = rng.choice(choices)
+    return trade
+
+
+def as_json(result):
+    return json.dumps(result, sort_keys=True, default=str)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_cdm_rules_match_reference_scorer(seed):
+    rng = random.Random(seed)
+    trades = [random_trade(rng, f"T{i}") for i in range(60)]
+
+    for source in trades[:20]:
+        for target in trades:
+            assert as_json(_calculate_match_score(source, target)) == as_json(reference_cdm_score(source, target))
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_legacy_rules_match_reference_matcher(seed):
+    rng = random.Random(seed)
+    trades = [random_legacy_trade(rng, f"T{i}") for i in range(60)]
+
+    for bank in trades[:20]:
+        prepared_bank = legacy.MATCH_RULES.prepare(bank, SOURCE)
+        for cp in trades:
+            expected = reference_legacy_match(bank, cp)
+            assert as_json(legacy.fuzzy_match(bank, cp)) == as_json(expected)
+            assert as_json(legacy.fuzzy_match(prepared_bank, legacy.MATCH_RULES.prepare(cp, TARGET))) == as_json(expected)
+
+
+def test_find_best_match_prepares_the_source_for_both_directions():
+    rng = random.Random(4)
+    source = random_legacy_trade(rng, 'S')
+    candidates = [random_legacy_trade(rng, f"C{i}") for i in range(50)]
+
+    for source_type, orient in (('BANK', lambda c: (source, c)), ('COUNTERPARTY', lambda c: (c, source))):
+        expected = max(
+            (legacy.compute_match_score(reference_legacy_match(*orient(c))) for c in candidates), default=0.0
+        )
+        best = legacy.find_best_match(source, source_type, candidates)
+        if expected >= legacy.CANDIDATE_THRESHOLD:
+            assert best['score'] == expected
+        else:
+            assert best is None
+
+
+# ----------------------------------------------------------------------------
+# Engine semantics
+# ----------------------------------------------------------------------------
+
+def test_fallback_rule_counts_only_when_primary_was_not_compared():
+    rules = RuleSet([
+        {'name': 'lei', 'weight': 8, 'presence': 'both', 'compare': 'equal'},
+        {'name': 'name', 'weight': 8, 'presence': 'both', 'fallback_for': 'lei', 'compare': 'equal'},
+    ], scoring=POINTS)
+
+    matched = rules.evaluate({'lei': 'A', 'name': 'x'}, {'lei': 'A', 'name': 'x'})
+    assert [r.name for r in matched.results] == ['lei']
+
+    mismatched = rules.evaluate({'lei': 'A', 'name': 'x'}, {'lei': 'B', 'name': 'x'})
+    assert (mismatched.earned, mismatched.possible) == (8.0, 8.0)
+
+    no_lei = rules.evaluate({'name': 'x'}, {'lei': 'B', 'name': 'x'})
+    assert (no_lei.earned, no_lei.possible) == (8.0, 8.0)
+
+
+def test_alias_groups_and_reason_thresholds():
+    rules = RuleSet([
+        {'name': 'party', 'weight': 1.0, 'default': '', 'source_fields': [('counterparty', 'seller'), 'buyer'],
+         'target_fields': [('counterparty', 'buyer'), 'seller'], 'compare': 'similarity',
+         'params': {'measure': lambda a, b: 1.0 if a and a == b else 0.0}, 'reason': 'PARTY', 'reason_below': 0.5},
+    ])
+
+    crossed = rules.evaluate({'seller': 'ACME', 'buyer': 'BANK'}, {'counterparty': '', 'buyer': 'X', 'seller': 'BANK'})
+    assert crossed.scores() == {'party': 1.0}
+    assert crossed['party'].source == ('ACME', 'BANK')
+    assert crossed.reason_codes() == []
+
+    unrelated = rules.evaluate({'counterparty': 'A'}, {'counterparty': 'B'})
+    assert unrelated.reason_codes() == ['PARTY']
+    assert [r.name for r in unrelated.differences()] == ['party']
+
+
+def test_fallback_must_follow_its_primary():
+    with pytest.raises(ValueError):
+        RuleSet([
+            {'name': 'name', 'weight': 1, 'fallback_for': 'lei', 'compare': 'equal'},
+            {'name': 'lei', 'weight': 1, 'compare': 'equal'},
+        ])
+
+
+def test_web_portal_copy_is_identical():
+    with open(os.path.join(REPO_ROOT, 'deployment/trade_matching/match_rules.py')) as agent_copy, \
+            open(os.path.join(REPO_ROOT, 'web-portal-api/app/services/match_rules.py')) as portal_copy:
+        assert agent_copy.read() == portal_copy.read()
@@ -0,0 +1,98 @@
+"""
+Unit tests for pruned top-k candidate scoring.
+
+The pruned scorer must produce the same scores as _calculate_match_score and
+the same top-k as a stable descending sort of all candidates.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from match_normalizers import normalize_currency
+from match_rules import POINTS, WEIGHTED, RuleSet
+from pruned_scoring import PrunedMatchScorer, normalize_attributes
+from trade_matching_agent_strands import _calculate_match_score, _extract_key_attributes
+from test_batch_scorer import random_trade
+
+
+@pytest.mark.parametrize("seed", [4, 5])
+def test_scores_equal_scalar_scores(seed):
+    rng = random.Random(seed)
+    targets = [random_trade(rng, f"T{i}") for i in range(200)]
+    for source_index in range(10):
+        source = random_trade(rng, f"S{source_index}")
+        scorer = PrunedMatchScorer(_extract_key_attributes(source))
+        for target in targets:
+            assert scorer.score(_extract_key_attributes(target)) == _calculate_match_score(source, target)['score']
+
+
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_top_k_equals_stable_sort(k):
+    rng = random.Random(k)
+    targets = [random_trade(rng, f"T{i}") for i in range(300)]
+    for source_index in range(10):
+        source = random_trade(rng, f"S{source_index}")
+        scores = [_calculate_match_score(source, target)['score'] for target in targets]
+        expected = sorted(range(len(targets)), key=lambda i: -scores[i])[:k]
+
+        result = PrunedMatchScorer(_extract_key_attributes(source)).top_k(
+            ((i, _extract_key_attributes(target)) for i, target in enumerate(targets)), k
+        )
+
+        assert [position for _, position in result.entries] == expected
+        assert [score for score, _ in result.entries] == [scores[i] for i in expected]
+        assert result.scored == len(targets)
+
+
+def test_hopeless_candidates_are_pruned():
+    source = {'currency': 'USD', 'notional': 1000000, 'product_type': 'Swap'}
+    targets = [dict(source)] * 3 + [{'currency': 'EUR', 'notional': 5, 'product_type': 'Bond'}] * 10
+    scorer = PrunedMatchScorer(_extract_key_attributes(source))
+
+    result = scorer.top_k(enumerate(targets), 3)
+
+    assert result.entries == [(100.0, 0), (100.0, 1), (100.0, 2)]
+    assert result.pruned == 10
+
+
+def test_floor_returns_none_for_pruned_candidates():
+    scorer = PrunedMatchScorer({'currency': 'USD'})
+
+    assert scorer.score({'currency': 'EUR'}, floor=0.0) is None
+    assert scorer.score({'currency': 'USD'}, floor=99.9) == 100.0
+    assert scorer.score({}) == 0.0
+
+
+def test_shared_normalized_targets_give_same_top_k():
+    rng = random.Random(11)
+    targets = [_extract_key_attributes(random_trade(rng, f"T{i}")) for i in range(300)]
+    normalized = [normalize_attributes(target) for target in targets]
+    for source_index in range(10):
+        scorer = PrunedMatchScorer(_extract_key_attributes(random_trade(rng, f"S{source_index}")))
+
+        shared = scorer.top_k(enumerate(targets), 5, normalized=normalized)
+        unshared = scorer.top_k(enumerate(targets), 5)
+
+        assert shared.entries == unshared.entries
+
+
+def test_scores_follow_the_rule_set():
+    rules = RuleSet([
+        {'name': 'currency', 'weight': 3, 'presence': 'both', 'normalize': normalize_currency, 'compare': 'equal'},
+        {'name': 'notional', 'weight': 5, 'presence': 'both', 'compare': 'relative_difference',
+         'params': {'tiers': [(0.1, 5), (0.5, 1)]}},
+    ], scoring=POINTS)
+    source = {'currency': 'USD', 'notional': 100.0}
+    scorer = PrunedMatchScorer(source, rules)
+
+    assert [scorer.score(target) for target in ({'currency': 'usd', 'notional': 140.0},
+                                                {'currency': 'EUR', 'notional': 105.0},
+                                                {'notional': 100.0})] == [50.0, 62.5, 100.0]
+    with pytest.raises(ValueError):
+        PrunedMatchScorer(source, RuleSet([{'name': 'currency', 'weight': 1, 'compare': 'equal'}], scoring=WEIGHTED))
@@ -0,0 +1,102 @@
+"""
+Unit tests for batch one-to-one reconciliation.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+import reconciliation
+from reconciliation import TradeReconciler, assign_greedy, classify_score, solve_assignment
+import trade_matching_agent_strands as agent
+
+requires_scipy = pytest.mark.skipif(not reconciliation.SCIPY_AVAILABLE, reason="scipy not installed")
+
+
+def trade(trade_id, trade_date='2025-01-15', notional=1000000, counterparty='Goldman Sachs'):
+    return {
+        'Trade_ID': trade_id,
+        'currency': 'USD',
+        'product_type': 'Interest Rate Swap',
+        'trade_date': trade_date,
+        'notional': notional,
+        'counterparty': counterparty,
+    }
+
+
+# Bank 0 prefers counterparty 0 but can also take 1; bank 1 can only take 0
+CONFLICT_EDGES = [(95.0, 0, 0), (90.0, 0, 1), (92.0, 1, 0)]
+
+
+def test_greedy_takes_highest_pairs_first():
+    assert assign_greedy(CONFLICT_EDGES) == {0: (0, 95.0)}
+
+
+@requires_scipy
+def test_hungarian_maximizes_total_score():
+    assignments, methods = solve_assignment(CONFLICT_EDGES, method="hungarian")
+
+    assert assignments == {0: (1, 90.0), 1: (0, 92.0)}
+    assert methods == {"hungarian": 1, "greedy": 0}
+
+
+def test_components_solved_independently():
+    edges = [(80.0, 0, 0), (70.0, 1, 1), (60.0, 2, 1)]
+    assignments, methods = solve_assignment(edges, method="greedy")
+
+    assert assignments == {0: (0, 80.0), 1: (1, 70.0)}
+    assert methods["greedy"] == 2
+
+
+def test_unknown_method_rejected():
+    with pytest.raises(ValueError):
+        solve_assignment([], method="simplex")
+
+
+def test_classify_score():
+    assert [classify_score(s) for s in (90, 75, 55, 10, None)] == [
+        "MATCHED", "PROBABLE_MATCH", "REVIEW_REQUIRED", "BREAK", "BREAK"
+    ]
+
+
+@pytest.mark.parametrize("method", ["greedy", pytest.param("hungarian", marks=requires_scipy)])
+def test_counterparty_trade_is_never_claimed_twice(method):
+    bank = [trade('B1'), trade('B2'), trade('B3', trade_date='2025-03-01', notional=5000000)]
+    counterparty = [trade('C1'), trade('C2', notional=1010000)]
+
+    result = TradeReconciler(agent._extract_key_attributes, agent._parse_date, method=method).reconcile(bank, counterparty)
+
+    assigned = [result.counterparty_for(i)[0] for i in range(3) if result.counterparty_for(i)]
+    assert sorted(assigned) == [0, 1]
+    assert result.counterparty_for(2) is None
+    assert result.unmatched_counterparty_positions == []
+    assert result.classification_counts()["BREAK"] == 1
+
+
+def test_reconcile_business_day(monkeypatch):
+    tables = {
+        agent.BANK_TABLE: [trade('B1'), trade('B2', trade_date='2025-01-16')],
+        agent.COUNTERPARTY_TABLE: [
+            trade('C1', trade_date='2025-01-16'),
+            trade('C2', notional=9000000, counterparty='Barclays'),
+            trade('C3', trade_date='2025-01-20'),
+        ],
+    }
+    monkeypatch.setattr(agent, 'TRADE_BOOK_ENABLED', False)
+    monkeypatch.setattr(agent, 'CANDIDATE_RETRIEVAL', 'scan')
+    monkeypatch.setattr(agent, '_scan_table', lambda table_name: tables[table_name])
+
+    result = agent.reconcile_business_day('2025-01-15', method='greedy')
+
+    assert result['bank_trades'] == 1
+    # C3 is outside the date tolerance of the business day
+    assert result['counterparty_trades'] == 2
+    assert result['results'][0]['bank_trade_id'] == 'B1'
+    assert result['results'][0]['counterparty_trade_id'] == 'C1'
+    assert result['results'][0]['classification'] == 'MATCHED'
+    assert result['results'][1] == {
+        'bank_trade_id': None, 'counterparty_trade_id': 'C2', 'score': None, 'classification': 'BREAK'
+    }
@@ -0,0 +1,96 @@
+"""
+Unit tests for sharded multi-process batch reconciliation.
+"""
+
+import os
+import random
+import sys
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from reconciliation import TradeReconciler
+from sharded_reconciliation import RowDecoder, SharedArrays, ShardedTradeReconciler, encode_rows
+import trade_matching_agent_strands as agent
+from test_batch_scorer import random_trade
+
+
+def books(seed, bank_count, counterparty_count):
+    rng = random.Random(seed)
+    bank = [random_trade(rng, f"B{i}") for i in range(bank_count)]
+    # Half the counterparty book are near copies of bank trades, so there are strong edges to assign
+    counterparty = [
+        dict(rng.choice(bank), Trade_ID=f"C{i}") if i % 2 else random_trade(rng, f"C{i}")
+        for i in range(counterparty_count)
+    ]
+    return bank, counterparty
+
+
+def reconcilers(workers):
+    serial = TradeReconciler(agent._extract_key_attributes, agent._parse_date, method="greedy")
+    sharded = ShardedTradeReconciler(
+        agent._extract_key_attributes, agent._parse_date, workers=workers, min_parallel_trades=0, method="greedy"
+    )
+    return serial, sharded
+
+
+def test_rows_round_trip_with_their_types():
+    rows = [
+        {'notional': Decimal('1.0'), 'flag': True, 'currency': 'USD'},
+        {'notional': Decimal('1'), 'flag': 1, 'parties': {'buyer': 'FAB'}},
+        {},
+    ]
+    fields = ['notional', 'flag', 'currency', 'parties']
+    arrays = encode_rows(rows, fields)
+    shared = SharedArrays.create(arrays)
+    try:
+        attached = SharedArrays.attach(shared.memory.name, shared.layout)
+        decoded = RowDecoder(attached['codes'], attached['vocabulary'], attached['offsets'], fields).rows(np.arange(3))
+    finally:
+        shared.release()
+
+    assert decoded == rows
+    assert [type(row.get('flag')) for row in decoded] == [bool, int, type(None)]
+    assert str(decoded[0]['notional']) == '1.0'
+
+
+def test_plan_covers_every_bank_trade_once():
+    bank, counterparty = books(1, 300, 300)
+    _, sharded = reconcilers(workers=3)
+    bank_attributes = [agent._extract_key_attributes(trade) for trade in bank]
+    counterparty_attributes = [agent._extract_key_attributes(trade) for trade in counterparty]
+
+    arrays, tasks = sharded.plan(bank_attributes, counterparty_attributes)
+
+    covered = np.concatenate([arrays['bank_order'][start:stop] for _, _, start, stop in tasks])
+    assert sorted(covered.tolist()) == list(range(300))
+    assert len(tasks) >= sharded.shards > 1
+
+
+def test_sharded_edges_equal_serial_edges():
+    bank, counterparty = books(2, 400, 500)
+    serial, sharded = reconcilers(workers=2)
+
+    serial_edges, serial_pairs = serial.score_edges(bank, counterparty)
+    sharded_edges, sharded_pairs = sharded.score_edges(bank, counterparty)
+
+    assert sharded_pairs == serial_pairs
+    assert sharded_edges == sorted(serial_edges, key=lambda edge: (edge[1], edge[2]))
+
+    result = sharded.reconcile(bank, counterparty)
+    assert result.assignments == serial.reconcile(bank, counterparty).assignments
+    assert result.shards == sharded.shards > 1
+
+
+def test_small_books_are_scored_in_process():
+    bank, counterparty = books(3, 20, 20)
+    serial, _ = reconcilers(workers=4)
+    sharded = ShardedTradeReconciler(agent._extract_key_attributes, agent._parse_date, workers=4, method="greedy")
+
+    result = sharded.reconcile(bank, counterparty)
+
+    assert result.shards == 1
+    assert result.assignments == serial.reconcile(bank, counterparty).assignments
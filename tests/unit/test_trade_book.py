@@ -0,0 +1,204 @@
+"""
+Unit tests for the resident trade book, its change feeds and the parallel scan.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from dynamodb_scan import parallel_scan
+from trade_book import ChangeFeedError, DynamoDBStreamChangeFeed, FileChangeFeed, TradeBook
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingLoader:
+    def __init__(self, items):
+        self.items = items
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [dict(item) for item in self.items]
+
+
+def stream_record(event_name, trade_id, **attributes):
+    record = {'eventName': event_name, 'dynamodb': {'Keys': {'Trade_ID': {'S': trade_id}}}}
+    if event_name != 'REMOVE':
+        image = {'Trade_ID': {'S': trade_id}}
+        image.update({name: {'S': value} for name, value in attributes.items()})
+        record['dynamodb']['NewImage'] = image
+    return record
+
+
+def append_records(path, *records):
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def test_book_is_loaded_once_within_staleness_bound():
+    loader = CountingLoader([{'Trade_ID': 'T1'}])
+    clock = FakeClock()
+    book = TradeBook('Bank', loader, max_staleness_seconds=30, clock=clock)
+
+    assert [t['Trade_ID'] for t in book.trades()] == ['T1']
+    book.trades()
+    clock.now = 29
+    book.trades()
+    assert loader.calls == 1
+
+    # Without a change feed, exceeding the bound triggers a full reload
+    clock.now = 31
+    book.trades()
+    assert loader.calls == 2
+
+
+def test_forced_refresh_reloads_immediately():
+    loader = CountingLoader([{'Trade_ID': 'T1'}])
+    book = TradeBook('Bank', loader, clock=FakeClock())
+    book.trades()
+    loader.items.append({'Trade_ID': 'T2'})
+
+    assert len(book.trades(force_refresh=True)) == 2
+    assert loader.calls == 2
+
+
+def test_file_feed_applies_incremental_changes(tmp_path):
+    path = str(tmp_path / 'Bank.jsonl')
+    loader = CountingLoader([{'Trade_ID': 'T1', 'currency': 'USD'}, {'Trade_ID': 'T2'}])
+    clock = FakeClock()
+    book = TradeBook('Bank', loader, change_feed=FileChangeFeed(path), max_staleness_seconds=5, clock=clock)
+    book.trades()
+
+    append_records(
+        path,
+        stream_record('MODIFY', 'T1', currency='EUR'),
+        stream_record('REMOVE', 'T2'),
+        stream_record('INSERT', 'T3', currency='GBP'),
+    )
+    # Still within the staleness bound: no sync yet
+    assert len(book.trades()) == 2
+
+    clock.now = 6
+    trades = {t['Trade_ID']: t for t in book.trades()}
+    assert trades == {'T1': {'Trade_ID': 'T1', 'currency': 'EUR'}, 'T3': {'Trade_ID': 'T3', 'currency': 'GBP'}}
+    assert loader.calls == 1
+    assert book.stats()['changes_applied'] == 3
+
+
+def test_file_feed_skips_records_written_before_start(tmp_path):
+    path = str(tmp_path / 'Bank.jsonl')
+    append_records(path, stream_record('INSERT', 'OLD'))
+    feed = FileChangeFeed(path)
+    feed.start()
+    append_records(path, stream_record('INSERT', 'NEW'))
+
+    assert [record.keys['Trade_ID'] for record in feed.poll()] == ['NEW']
+    assert feed.poll() == []
+
+
+def test_feed_failure_falls_back_to_full_reload(tmp_path):
+    path = str(tmp_path / 'Bank.jsonl')
+    append_records(path, stream_record('INSERT', 'T9'))
+    loader = CountingLoader([{'Trade_ID': 'T1'}])
+    clock = FakeClock()
+    book = TradeBook('Bank', loader, change_feed=FileChangeFeed(path), max_staleness_seconds=1, clock=clock)
+    book.trades()
+
+    open(path, 'w').close()  # Truncated feed: continuity lost
+    clock.now = 2
+    book.trades()
+
+    assert loader.calls == 2
+    assert book.stats()['feed_failures'] == 1
+
+
+class FakeStreams:
+    """Two-shard stream where shard-2 is a child of shard-1."""
+
+    def __init__(self, records_by_shard, open_shards):
+        self.records_by_shard = records_by_shard
+        self.open_shards = open_shards
+
+    def describe_table(self, TableName):
+        return {'Table': {'LatestStreamArn': 'arn:stream', 'StreamSpecification': {'StreamViewType': 'NEW_AND_OLD_IMAGES'}}}
+
+    def describe_stream(self, StreamArn, **kwargs):
+        shards = []
+        for shard_id, parent in self.open_shards:
+            shard = {'ShardId': shard_id, 'SequenceNumberRange': {}}
+            if parent:
+                shard['ParentShardId'] = parent
+            shards.append(shard)
+        return {'StreamDescription': {'Shards': shards}}
+
+    def get_shard_iterator(self, StreamArn, ShardId, ShardIteratorType):
+        start = len(self.records_by_shard[ShardId]) if ShardIteratorType == 'LATEST' else 0
+        return {'ShardIterator': f'{ShardId}:{start}'}
+
+    def get_records(self, ShardIterator, Limit):
+        shard_id, start = ShardIterator.split(':')
+        records = self.records_by_shard[shard_id][int(start):]
+        closed = shard_id == 'shard-1' and ('shard-2', 'shard-1') in self.open_shards
+        next_iterator = None if closed and not records else f'{shard_id}:{int(start) + len(records)}'
+        return {'Records': records, 'NextShardIterator': next_iterator}
+
+
+def test_stream_feed_reads_parent_shard_before_child():
+    streams = FakeStreams({'shard-1': [stream_record('INSERT', 'OLD')], 'shard-2': []}, [('shard-1', None)])
+    feed = DynamoDBStreamChangeFeed('Bank', streams, streams)
+    feed.start()
+
+    streams.records_by_shard['shard-1'].append(stream_record('INSERT', 'T1', currency='USD'))
+    streams.records_by_shard['shard-2'].append(stream_record('MODIFY', 'T1', currency='EUR'))
+    streams.open_shards.append(('shard-2', 'shard-1'))
+
+    records = feed.poll()
+    assert [(r.event_name, r.new_image['currency']) for r in records] == [('INSERT', 'USD'), ('MODIFY', 'EUR')]
+    assert feed.poll() == []
+
+
+def test_stream_feed_requires_new_images():
+    class KeysOnly(FakeStreams):
+        def describe_table(self, TableName):
+            return {'Table': {'LatestStreamArn': 'arn', 'StreamSpecification': {'StreamViewType': 'KEYS_ONLY'}}}
+
+    with pytest.raises(ChangeFeedError):
+        DynamoDBStreamChangeFeed('Bank', KeysOnly({}, []), None)
+
+
+class FakeScanClient:
+    """Serves two pages per segment."""
+
+    def __init__(self):
+        self.calls = []
+
+    def scan(self, TableName, Segment=0, TotalSegments=1, ExclusiveStartKey=None):
+        self.calls.append((Segment, ExclusiveStartKey))
+        page = 1 if ExclusiveStartKey else 0
+        response = {'Items': [{'Trade_ID': {'S': f'S{Segment}P{page}'}, 'notional': {'N': '100'}}]}
+        if page == 0:
+            response['LastEvaluatedKey'] = {'Trade_ID': {'S': f'S{Segment}P0'}}
+        return response
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_parallel_scan_reads_every_segment_and_page(segments):
+    client = FakeScanClient()
+    items = parallel_scan(client, 'Bank', total_segments=segments)
+
+    assert len(items) == 2 * segments
+    assert len(client.calls) == 2 * segments
+    assert {item['Trade_ID'] for item in items} == {f'S{s}P{p}' for s in range(segments) for p in (0, 1)}
+    assert items[0]['notional'] == 100
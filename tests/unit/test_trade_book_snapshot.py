@@ -0,0 +1,217 @@
+"""
+Unit tests for columnar trade book snapshots and bootstrapping trade books from them.
+"""
+
+import io
+import os
+import random
+import sys
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from trade_book import ChangeFeedError, DynamoDBStreamChangeFeed, FileChangeFeed, TradeBook
+from trade_book_snapshot import (
+    S3SnapshotStore, TradeBookSnapshotWriter, decode_trades, encode_trades,
+)
+from test_trade_book import CountingLoader, FakeClock, FakeStreams, append_records, stream_record
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        return {'Body': FakeBody(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[(Bucket, Key)] = Body
+
+
+def random_item(rng, trade_id):
+    item = {'Trade_ID': trade_id}
+    choices = {
+        'currency': ['USD', 'EUR', 'usd '],
+        'notional': [Decimal('1000000'), Decimal('1.5E+3'), Decimal('2500000.25')],
+        'fixed_rate': [Decimal('0.035'), Decimal('3.5'), '3.5%'],
+        'precise': [Decimal('12345678901234567890.123'), Decimal('1')],
+        'parties': [{'buyer': 'FAB', 'seller': 'GS'}, ['A', Decimal('2')], None, True],
+        'tags': [{'a', 'b'}, {Decimal('1')}],
+    }
+    for name, values in choices.items():
+        if rng.random() < 0.8:
+            item[name] = rng.choice(values)
+    return item
+
+
+# ----------------------------------------------------------------------------
+# Encoding
+# ----------------------------------------------------------------------------
+
+def test_snapshot_round_trips_items_with_their_types():
+    rng = random.Random(3)
+    trades = [random_item(rng, f"T{i}") for i in range(300)]
+
+    snapshot = decode_trades(encode_trades(trades, {'offset': 42}, written_at=100.0), clock=lambda: 160.0)
+
+    assert snapshot.trades == trades
+    assert all(type(a[k]) is type(b[k]) for a, b in zip(snapshot.trades, trades) for k in a)
+    assert str(snapshot.trades[0].get('notional')) == str(trades[0].get('notional'))
+    assert (snapshot.checkpoint, snapshot.age_seconds) == ({'offset': 42}, 60.0)
+
+
+def test_containers_are_not_shared_between_trades():
+    trades = [{'Trade_ID': 'T1', 'parties': {'buyer': 'FAB'}}, {'Trade_ID': 'T2', 'parties': {'buyer': 'FAB'}}]
+
+    restored = decode_trades(encode_trades(trades)).trades
+
+    assert restored[0]['parties'] is not restored[1]['parties']
+
+
+def test_columns_are_dictionary_encoded_and_numeric():
+    trades = [{'Trade_ID': f"T{i}", 'currency': 'USD' if i % 2 else 'EUR', 'notional': Decimal(i * 1000)}
+              for i in range(100)]
+
+    with np.load(io.BytesIO(encode_trades(trades)), allow_pickle=False) as archive:
+        assert archive['c1_dictionary'].tolist() == ['EUR', 'USD']
+        assert archive['c1_codes'].dtype == np.int32
+        assert archive['c2_values'].dtype == np.float64
+
+
+def test_unsupported_values_are_rejected():
+    with pytest.raises(TypeError):
+        encode_trades([{'Trade_ID': 'T1', 'blob': b'\x00'}])
+
+
+# ----------------------------------------------------------------------------
+# Trade books
+# ----------------------------------------------------------------------------
+
+def test_cold_book_restores_snapshot_and_replays_later_changes(tmp_path):
+    path = str(tmp_path / 'Bank.jsonl')
+    store = S3SnapshotStore(FakeS3(), 'bucket')
+    loader = CountingLoader([{'Trade_ID': 'T1', 'currency': 'USD'}, {'Trade_ID': 'T2', 'currency': 'EUR'}])
+    clock = FakeClock()
+    warm = TradeBook('Bank', loader, change_feed=FileChangeFeed(path), max_staleness_seconds=1,
+                     clock=clock, snapshot_store=store)
+    warm.trades()
+    append_records(path, stream_record('MODIFY', 'T1', currency='GBP'))
+    clock.now = 2
+    warm.trades()
+    assert warm.write_snapshot()
+    assert not warm.write_snapshot()
+
+    # Written after the snapshot: replayed by the cold book
+    append_records(path, stream_record('REMOVE', 'T2'), stream_record('INSERT', 'T3', currency='JPY'))
+
+    cold = TradeBook('Bank', loader, change_feed=FileChangeFeed(path), clock=clock, snapshot_store=store)
+    trades = {t['Trade_ID']: t['currency'] for t in cold.trades()}
+
+    assert trades == {'T1': 'GBP', 'T3': 'JPY'}
+    assert loader.calls == 1
+    assert cold.stats()['snapshot_loads'] == 1
+    assert cold.stats()['changes_applied'] == 2
+
+
+def test_unusable_snapshot_falls_back_to_full_load(tmp_path):
+    path = str(tmp_path / 'Bank.jsonl')
+    store = S3SnapshotStore(FakeS3(), 'bucket')
+    store.save('Bank', [{'Trade_ID': 'STALE'}], {'path': str(tmp_path / 'other.jsonl'), 'offset': 0})
+    loader = CountingLoader([{'Trade_ID': 'T1'}])
+
+    book = TradeBook('Bank', loader, change_feed=FileChangeFeed(path), clock=FakeClock(), snapshot_store=store)
+
+    assert [t['Trade_ID'] for t in book.trades()] == ['T1']
+    assert loader.calls == 1
+    assert book.stats()['snapshot_loads'] == 0
+
+
+def test_forced_refresh_ignores_snapshot(tmp_path):
+    path = str(tmp_path / 'Bank.jsonl')
+    store = S3SnapshotStore(FakeS3(), 'bucket')
+    loader = CountingLoader([{'Trade_ID': 'T1'}])
+    book = TradeBook('Bank', loader, change_feed=FileChangeFeed(path), clock=FakeClock(), snapshot_store=store)
+    book.trades()
+    book.write_snapshot()
+
+    book.refresh(force=True)
+
+    assert loader.calls == 2
+
+
+def test_writer_snapshots_changed_books_and_survives_failures(tmp_path):
+    class FailingStore:
+        def save(self, table_name, trades, checkpoint):
+            raise ClientError({'Error': {'Code': 'AccessDenied'}}, 'PutObject')
+
+    s3 = FakeS3()
+    good = TradeBook('Bank', CountingLoader([{'Trade_ID': 'T1'}]), change_feed=FileChangeFeed(str(tmp_path / 'b')),
+                     clock=FakeClock(), snapshot_store=S3SnapshotStore(s3, 'bucket'))
+    bad = TradeBook('Cpty', CountingLoader([{'Trade_ID': 'C1'}]), change_feed=FileChangeFeed(str(tmp_path / 'c')),
+                    clock=FakeClock(), snapshot_store=FailingStore())
+    good.trades()
+    bad.trades()
+    writer = TradeBookSnapshotWriter(lambda: [good, bad], interval_seconds=60)
+
+    assert writer.write_all() == 1
+    assert writer.failures == 1
+    assert ('bucket', 'trade-book-snapshots/Bank.npz') in s3.objects
+    assert writer.write_all() == 0
+
+
+class SequencedStreams(FakeStreams):
+    """FakeStreams with sequence numbers (the record index) and AFTER_SEQUENCE_NUMBER iterators."""
+
+    def get_shard_iterator(self, StreamArn, ShardId, ShardIteratorType, SequenceNumber=None):
+        if ShardIteratorType == 'AFTER_SEQUENCE_NUMBER':
+            return {'ShardIterator': f'{ShardId}:{int(SequenceNumber) + 1}'}
+        return super().get_shard_iterator(StreamArn, ShardId, ShardIteratorType)
+
+    def append(self, shard_id, record):
+        record['dynamodb']['SequenceNumber'] = str(len(self.records_by_shard[shard_id]))
+        self.records_by_shard[shard_id].append(record)
+
+
+def test_stream_feed_resumes_from_checkpoint():
+    streams = SequencedStreams({'shard-1': [], 'shard-2': []}, [('shard-1', None)])
+    feed = DynamoDBStreamChangeFeed('Bank', streams, streams)
+    feed.start()
+    streams.append('shard-1', stream_record('INSERT', 'T1', currency='USD'))
+    assert len(feed.poll()) == 1
+    checkpoint = feed.checkpoint()
+
+    streams.append('shard-1', stream_record('MODIFY', 'T1', currency='EUR'))
+    streams.append('shard-2', stream_record('INSERT', 'T2', currency='GBP'))
+    streams.open_shards.append(('shard-2', 'shard-1'))
+
+    resumed = DynamoDBStreamChangeFeed('Bank', streams, streams)
+    resumed.start(checkpoint)
+    records = resumed.poll()
+
+    assert [(r.keys['Trade_ID'], r.new_image['currency']) for r in records] == [('T1', 'EUR'), ('T2', 'GBP')]
+
+
+def test_stream_checkpoint_with_trimmed_shard_is_rejected():
+    streams = SequencedStreams({'shard-1': []}, [('shard-1', None)])
+    feed = DynamoDBStreamChangeFeed('Bank', streams, streams)
+    feed.start()
+    checkpoint = feed.checkpoint()
+    streams.open_shards[:] = []
+
+    with pytest.raises(ChangeFeedError):
+        DynamoDBStreamChangeFeed('Bank', streams, streams).start(checkpoint)
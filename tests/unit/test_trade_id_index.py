@@ -0,0 +1,135 @@
+"""
+Unit tests for keyed source-trade lookup and the trade-ID alias index.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+
+from trade_id_index import TradeIdIndex, batch_get_trades, get_trade
+import trade_matching_agent_strands as agent
+
+
+def typed(value):
+    if isinstance(value, str):
+        return {'S': value}
+    return {'N': str(value)}
+
+
+class KeyedTableClient:
+    """DynamoDB client stand-in serving GetItem/BatchGetItem by Trade_ID from {table: [plain items]}."""
+
+    def __init__(self, tables, unprocessed_rounds=0):
+        self.tables = tables
+        self.unprocessed_rounds = unprocessed_rounds
+        self.get_calls = 0
+        self.batch_calls = []
+
+    def _item(self, table_name, key):
+        for item in self.tables[table_name]:
+            if str(item.get('Trade_ID')) == key['Trade_ID']['S']:
+                return {name: typed(value) for name, value in item.items()}
+        return None
+
+    def get_item(self, TableName, Key, **kwargs):
+        self.get_calls += 1
+        item = self._item(TableName, Key)
+        return {'Item': item} if item else {}
+
+    def batch_get_item(self, RequestItems):
+        (table_name, request), = RequestItems.items()
+        self.batch_calls.append(len(request['Keys']))
+        if self.unprocessed_rounds:
+            self.unprocessed_rounds -= 1
+            return {'Responses': {table_name: []}, 'UnprocessedKeys': RequestItems}
+        items = [item for item in (self._item(table_name, key) for key in request['Keys']) if item]
+        return {'Responses': {table_name: items}, 'UnprocessedKeys': {}}
+
+
+def test_exact_id_wins_over_alias():
+    trades = [{'Trade_ID': 'FAB_123'}, {'Trade_ID': '123'}, {'Trade_ID': 'FAB_9', 'trade_id': 'x'}]
+    index = TradeIdIndex(trades, agent._trade_id_of, agent.normalize_trade_id)
+
+    assert index.get('FAB_123') is trades[0]
+    assert index.get('FAB_9') is trades[2]
+    assert index.get('bank_9') is trades[2]
+    # '123' is both an exact ID and the normalized form of FAB_123
+    assert index.get('123') is trades[1]
+
+
+def test_ambiguous_alias_is_not_resolved():
+    trades = [{'Trade_ID': 'FAB_77'}, {'Trade_ID': 'CPTY_77'}]
+    index = TradeIdIndex(trades, agent._trade_id_of, agent.normalize_trade_id)
+
+    assert index.get('bank_77') is None
+    assert index.get('CPTY_77') is trades[1]
+
+
+def test_get_and_batch_get_by_key():
+    client = KeyedTableClient({'Bank': [{'Trade_ID': f'T{i}', 'notional': i} for i in range(250)]})
+
+    assert get_trade(client, 'Bank', 'T5', attributes=['Trade_ID']) == {'Trade_ID': 'T5', 'notional': 5}
+    assert get_trade(client, 'Bank', 'missing') is None
+
+    found = batch_get_trades(client, 'Bank', [f'T{i}' for i in range(240)] + ['T1', 'missing'])
+    assert len(found) == 240
+    assert client.batch_calls == [100, 100, 41]
+
+
+def test_batch_get_retries_unprocessed_keys():
+    client = KeyedTableClient({'Bank': [{'Trade_ID': 'T1'}]}, unprocessed_rounds=2)
+
+    assert batch_get_trades(client, 'Bank', ['T1']) == {'T1': {'Trade_ID': 'T1'}}
+    assert len(client.batch_calls) == 3
+
+
+@pytest.fixture
+def keyed_agent(monkeypatch):
+    tables = {agent.BANK_TABLE: [{'Trade_ID': 'FAB_123', 'currency': 'USD'}, {'Trade_ID': 'B2', 'currency': 'EUR'}]}
+    client = KeyedTableClient(tables)
+    scans = []
+    monkeypatch.setattr(agent, 'TRADE_BOOK_ENABLED', False)
+    monkeypatch.setattr(agent, 'get_boto_client', lambda service: client)
+    monkeypatch.setattr(agent, '_scan_table', lambda table_name: scans.append(table_name) or tables[table_name])
+    return client, scans
+
+
+def test_source_lookup_uses_get_item(keyed_agent):
+    client, scans = keyed_agent
+
+    found = agent._find_source_trades(agent.BANK_TABLE, ['FAB_123'])
+
+    assert found['FAB_123']['currency'] == 'USD'
+    assert (client.get_calls, scans) == (1, [])
+
+
+def test_alias_lookup_scans_only_for_unkeyed_ids(keyed_agent):
+    client, scans = keyed_agent
+
+    found = agent._find_source_trades(agent.BANK_TABLE, ['B2', 'bank_123', 'nope'])
+
+    assert sorted(found) == ['B2', 'bank_123']
+    assert found['bank_123']['Trade_ID'] == 'FAB_123'
+    assert client.batch_calls == [3]
+    assert scans == [agent.BANK_TABLE]
+
+
+def test_trade_book_index_is_rebuilt_only_after_changes(monkeypatch):
+    from trade_book import TradeBook
+
+    trades = [{'Trade_ID': 'FAB_1'}]
+    builds = []
+    book = TradeBook('Bank', lambda: list(trades), clock=lambda: 0.0)
+
+    def build(snapshot):
+        builds.append(len(snapshot))
+        return agent._build_trade_id_index(snapshot)
+
+    assert book.derived('ids', build).get('bank_1') == {'Trade_ID': 'FAB_1'}
+    book.derived('ids', build)
+    trades.append({'Trade_ID': 'FAB_2'})
+    assert book.derived('ids', build, force_refresh=True).get('FAB_2') == {'Trade_ID': 'FAB_2'}
+    assert builds == [1, 2]
@@ -0,0 +1,99 @@
+"""
+Unit tests for compact trade records and their use in the trade book and matching.
+"""
+
+import os
+import pickle
+import random
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../deployment/trade_matching'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from batch_scorer import BatchScorer
+from trade_book import FileChangeFeed, TradeBook
+from trade_record import TradeRecord, TradeRecordLayout
+import trade_matching_agent_strands as agent
+from test_batch_scorer import as_json, random_trade
+from test_trade_book import CountingLoader, FakeClock, append_records, stream_record
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '../..')
+
+LAYOUT = agent._TRADE_RECORD_LAYOUT
+
+
+def test_record_reads_like_the_item():
+    item = {'Trade_ID': 'T1', 'Currency': 'USD', 'notional': Decimal('1000000.50'), 'trade_date': '15/01/2025'}
+
+    record = LAYOUT.record(item)
+
+    assert record == item
+    assert dict(record) == record.to_item() == item
+    assert list(record) == list(item) and len(record) == 4
+    assert record['Currency'] == 'USD' and record.get('currency') is None and record.get('x', 0) == 0
+    assert 'notional' in record and 'Notional' not in record
+    assert LAYOUT.record(record) is record
+    assert pickle.loads(pickle.dumps(record)) == item
+
+
+def test_records_share_shapes_and_enum_strings():
+    items = [{'Trade_ID': f"T{i}", 'currency': ''.join(['U', 'S', 'D']), 'counterparty': ''.join(['A', 'B'])}
+             for i in range(3)]
+    layout = TradeRecordLayout(enum_fields=['currency'])
+
+    records = layout.records(items)
+
+    assert layout.shape_count == 1
+    assert records[0]['currency'] is records[2]['currency']
+    assert records[0]['counterparty'] is not records[2]['counterparty']
+
+
+def test_notional_and_dates_are_parsed_under_the_resolved_spelling():
+    record = LAYOUT.record({'Trade_ID': 'T1', 'Notional': 'abc', 'notional_amount': '1,000,000',
+                            'TradeDate': '15 January 2025', 'effective_date': 'garbage'})
+
+    assert record.parsed('notional') == 1000000.0
+    assert record.parsed('trade_date') == agent.parse_date_ordinal('2025-01-15')
+    assert record.parsed('effective_date') is None
+    assert record.parsed('termination_date') is None
+    assert record.parsed_names == {'notional', 'trade_date', 'effective_date', 'termination_date'}
+
+
+def test_matching_records_equals_matching_items():
+    rng = random.Random(7)
+    targets = [random_trade(rng, f"T{i}") for i in range(150)]
+    records = LAYOUT.records(targets)
+    item_scorer = BatchScorer(targets, agent._extract_key_attributes)
+    record_scorer = BatchScorer(records, agent._extract_key_attributes)
+
+    for source_index in range(5):
+        source = random_trade(rng, f"S{source_index}")
+        item_result, record_result = item_scorer.score(source), record_scorer.score(source)
+        for position, (target, record) in enumerate(zip(targets, records)):
+            assert agent._extract_key_attributes(record) == agent._extract_key_attributes(target)
+            assert as_json(agent._calculate_match_score(LAYOUT.record(source), record)) == \
+                as_json(agent._calculate_match_score(source, target))
+            assert as_json(record_result.match_result(position)) == as_json(item_result.match_result(position))
+
+
+def test_book_converts_loaded_and_changed_items(tmp_path):
+    path = str(tmp_path / 'Bank.jsonl')
+    loader = CountingLoader([{'Trade_ID': 'T1', 'currency': 'USD'}])
+    clock = FakeClock()
+    book = TradeBook('Bank', loader, change_feed=FileChangeFeed(path), max_staleness_seconds=5, clock=clock,
+                     convert=LAYOUT.record)
+    assert all(isinstance(trade, TradeRecord) for trade in book.trades())
+
+    append_records(path, stream_record('INSERT', 'T2', currency='GBP'))
+    clock.now = 6
+    trades = {trade['Trade_ID']: trade for trade in book.trades()}
+
+    assert all(isinstance(trade, TradeRecord) for trade in trades.values())
+    assert trades == {'T1': {'Trade_ID': 'T1', 'currency': 'USD'}, 'T2': {'Trade_ID': 'T2', 'currency': 'GBP'}}
+
+
+def test_web_portal_copy_is_identical():
+    with open(os.path.join(REPO_ROOT, 'deployment/trade_matching/trade_record.py')) as agent_copy, \
+            open(os.path.join(REPO_ROOT, 'web-portal-api/app/services/trade_record.py')) as portal_copy:
+        assert agent_copy.read() == portal_copy.read()
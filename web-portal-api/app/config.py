@@ -23,6 +23,26 @@ class Settings(BaseSettings):
     # Production S3 Bucket
     s3_bucket: str = "trade-matching-system-agentcore-production"
 
+    # Match-result cache: in-process LRU entries (0 disables) and an optional
+    # persistent tier (DynamoDB table, or S3 prefix in the bucket above)
+    match_cache_size: int = 50000
+    match_cache_table: str = ""
+    match_cache_s3_prefix: str = ""
+    match_cache_ttl_days: float = 7
+
+    # Batch matching: parallel scan segments per table, and the minimum score at which
+    # a bank trade without a (trade_id, internal_reference) counterpart is paired fuzzily
+    batch_match_scan_segments: int = 4
+    batch_match_fuzzy_min_score: float = 0.80
+
+    # Batch-match jobs: jobs run at once, bank trades per checkpointed partition, results
+    # kept per job for streaming, and the S3 prefix (in the bucket above) of the
+    # checkpoints ("" keeps jobs in memory only; they cannot be resumed after a restart)
+    batch_match_job_workers: int = 2
+    batch_match_partition_size: int = 1000
+    batch_match_event_buffer: int = 10000
+    batch_match_checkpoint_prefix: str = "batch-match-jobs/"
+
     # SQS Queues
     hitl_queue_url: str = ""
 
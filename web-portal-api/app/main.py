@@ -10,6 +10,7 @@ from .config import settings
 from .routers import agents_router, hitl_router, audit_router, metrics_router, matching_router, upload_router, workflow_router, logs_router
 from .services.websocket import manager
 from .routers.logs import log_poller
+from .routers.matching import batch_jobs
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -70,6 +71,8 @@ async def lifespan(app: FastAPI):
             pass
     # Stop log polling on shutdown
     log_poller.stop_polling()
+    # Stop taking batch-match jobs; interrupted jobs resume from their checkpoints
+    batch_jobs.shutdown()
     logger.info("Shutting down Web Portal API...")
 
 
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
 from pydantic import BaseModel
 
 
@@ -40,5 +40,5 @@ class MatchingResult(BaseModel):
     reasonCodes: list[str]
     bankTrade: Optional[Trade] = None
     counterpartyTrade: Optional[Trade] = None
-    differences: dict[str, dict[str, str]]
+    differences: dict[str, dict[str, Any]]
     createdAt: str
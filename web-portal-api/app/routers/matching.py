@@ -1,13 +1,21 @@
-from typing import Optional, List, Dict, Any, Tuple
-from fastapi import APIRouter, Depends, Query, HTTPException
+from typing import Optional, List, Dict, Any, Callable, Mapping, Tuple
+from fastapi import APIRouter, Depends, Query, HTTPException, Header
+from fastapi.responses import StreamingResponse
 from boto3.dynamodb.conditions import Attr
 from pydantic import BaseModel
 from datetime import datetime, timezone
 from decimal import Decimal
+import asyncio
+import json
+import time
 import uuid
 import boto3
 from ..models import MatchingResult, MatchClassification, DecisionStatus, Trade
 from ..services.dynamodb import db_service
+from ..services.match_rules import RuleSet, decimal_to_float, SOURCE, TARGET
+from ..services.match_cache import MatchResultCache, DynamoDBResultStore, S3ResultStore, content_hash
+from ..services.trade_record import TradeRecordLayout
+from ..services.batch_jobs import BatchJob, BatchJobManager, S3CheckpointStore
 from ..config import settings
 from ..auth import get_current_user, optional_auth_or_dev, User
 
@@ -33,43 +41,47 @@ def transform_dynamodb_trade_to_model(trade_data: Dict[str, Any]) -> Trade:
     )
 
 
-# Matching algorithm helper functions
-def calculate_field_match_score(bank_value: Any, cp_value: Any, field_name: str) -> float:
-    """Calculate match score for a specific field (0.0 to 1.0)."""
-    if bank_value is None or cp_value is None:
-        return 0.0 if bank_value != cp_value else 1.0
-
-    # Convert Decimal to float for comparison
-    if isinstance(bank_value, Decimal):
-        bank_value = float(bank_value)
-    if isinstance(cp_value, Decimal):
-        cp_value = float(cp_value)
-
-    # Exact match
-    if bank_value == cp_value:
-        return 1.0
-
-    # Numeric fields - calculate percentage difference
-    if isinstance(bank_value, (int, float)) and isinstance(cp_value, (int, float)):
-        if bank_value == 0 and cp_value == 0:
-            return 1.0
-        max_val = max(abs(bank_value), abs(cp_value))
-        if max_val == 0:
-            return 1.0
-        difference = abs(bank_value - cp_value)
-        tolerance = max_val * 0.01  # 1% tolerance
-        if difference <= tolerance:
-            return 1.0
-        # Score decreases as difference increases
-        return max(0.0, 1.0 - (difference / max_val))
-
-    # String fields - case-insensitive comparison
-    if isinstance(bank_value, str) and isinstance(cp_value, str):
-        if bank_value.strip().lower() == cp_value.strip().lower():
-            return 0.95  # Slightly penalize case differences
-        return 0.0
-
-    return 0.0
+# Matching rules: every field is compared as an untyped value (numbers within
+# 1% tolerance, strings equal up to case at 0.95) and weighted into the score
+_FIELD_RULE = {'normalize': decimal_to_float, 'compare': 'value', 'params': {'tolerance': 0.01, 'text_credit': 0.95}}
+
+MATCH_RULES = RuleSet([
+    dict(_FIELD_RULE, name='notional', weight=0.35, reason='NOTIONAL_MISMATCH', reason_below=0.99),  # Most important
+    dict(_FIELD_RULE, name='currency', weight=0.15, reason='CURRENCY_MISMATCH'),
+    dict(_FIELD_RULE, name='trade_date', weight=0.15, reason='DATE_MISMATCH'),
+    dict(_FIELD_RULE, name='settlement_date', weight=0.15, reason='SETTLEMENT_DATE_MISMATCH'),
+    dict(_FIELD_RULE, name='product', weight=0.10, reason='PRODUCT_TYPE_MISMATCH'),
+    dict(_FIELD_RULE, name='counterparty', weight=0.10, reason='COUNTERPARTY_NAME_MISMATCH'),
+], reason_order=[
+    'NOTIONAL_MISMATCH', 'DATE_MISMATCH', 'SETTLEMENT_DATE_MISMATCH',
+    'CURRENCY_MISMATCH', 'PRODUCT_TYPE_MISMATCH', 'COUNTERPARTY_NAME_MISMATCH',
+])
+
+
+def _match_result_store():
+    """Persistent tier of the match-result cache, if configured."""
+    if settings.match_cache_table:
+        return DynamoDBResultStore(
+            boto3.client('dynamodb', region_name=settings.aws_region), settings.match_cache_table,
+            ttl_seconds=int(settings.match_cache_ttl_days * 86400) or None,
+        )
+    if settings.match_cache_s3_prefix:
+        return S3ResultStore(
+            boto3.client('s3', region_name=settings.aws_region), settings.s3_bucket, settings.match_cache_s3_prefix
+        )
+    return None
+
+
+# Results of unchanged trade pairs are served from the cache instead of being re-scored
+match_cache = MatchResultCache(MATCH_RULES.version, max_entries=settings.match_cache_size, store=_match_result_store())
+
+# Scanned trades are held as compact read-only records with interned currency, product and source strings
+TRADE_RECORD_LAYOUT = TradeRecordLayout(enum_fields=('currency', 'product', 'source'))
+
+
+def scan_trades(table_name: str, limit: int) -> List[Mapping[str, Any]]:
+    """Scan a trade table into TradeRecords."""
+    return TRADE_RECORD_LAYOUT.records(db_service.scan_table(table_name, limit=limit))
 
 
 def compare_trades(bank_trade: Dict[str, Any], cp_trade: Dict[str, Any]) -> Tuple[float, Dict[str, Any], List[str]]:
@@ -79,56 +91,46 @@ def compare_trades(bank_trade: Dict[str, Any], cp_trade: Dict[str, Any]) -> Tupl
     Returns:
         Tuple of (match_score, differences_dict, reason_codes)
     """
-    # Fields to compare with weights
-    field_weights = {
-        'notional': 0.35,  # Most important
-        'currency': 0.15,
-        'trade_date': 0.15,
-        'settlement_date': 0.15,
-        'product': 0.10,
-        'counterparty': 0.10,
-    }
+    return compare_trade_candidates(bank_trade, [cp_trade])[0]
 
-    field_scores = {}
-    differences = {}
 
-    for field, weight in field_weights.items():
-        bank_val = bank_trade.get(field)
-        cp_val = cp_trade.get(field)
+def compare_trade_candidates(
+    bank_trade: Mapping[str, Any], cp_trades: List[Mapping[str, Any]]
+) -> List[Tuple[float, Dict[str, Any], List[str]]]:
+    """
+    Compare a bank trade with several counterparty trades (see compare_trades).
 
-        score = calculate_field_match_score(bank_val, cp_val, field)
-        field_scores[field] = score
+    The cache keys of all pairs are resolved together, so a persistent cache
+    tier costs one batched lookup instead of one per pair.
+    """
+    bank_hash = content_hash(MATCH_RULES.match_attributes(bank_trade, SOURCE))
+    results = match_cache.resolve([
+        (
+            match_cache.key(bank_hash, content_hash(MATCH_RULES.match_attributes(cp_trade, TARGET))),
+            lambda cp_trade=cp_trade: _score_trades(bank_trade, cp_trade),
+        )
+        for cp_trade in cp_trades
+    ])
+    return [(result['score'], result['differences'], result['reason_codes']) for result in results]
 
-        # Record difference if not a perfect match
-        if score < 1.0:
-            differences[field] = {
-                'bank': str(bank_val) if bank_val is not None else None,
-                'counterparty': str(cp_val) if cp_val is not None else None,
-                'score': round(score, 3)
-            }
 
-    # Calculate weighted average
-    total_score = sum(score * field_weights[field] for field, score in field_scores.items())
+def _score_trades(bank_trade: Dict[str, Any], cp_trade: Dict[str, Any]) -> Dict[str, Any]:
+    """Score a trade pair with MATCH_RULES (see compare_trades)."""
+    evaluation = MATCH_RULES.evaluate(bank_trade, cp_trade)
 
-    # Generate reason codes based on differences
-    reason_codes = []
-    if 'notional' in differences and field_scores['notional'] < 0.99:
-        reason_codes.append('NOTIONAL_MISMATCH')
-    if 'trade_date' in differences:
-        reason_codes.append('DATE_MISMATCH')
-    if 'settlement_date' in differences:
-        reason_codes.append('SETTLEMENT_DATE_MISMATCH')
-    if 'currency' in differences:
-        reason_codes.append('CURRENCY_MISMATCH')
-    if 'product' in differences:
-        reason_codes.append('PRODUCT_TYPE_MISMATCH')
-    if 'counterparty' in differences:
-        reason_codes.append('COUNTERPARTY_NAME_MISMATCH')
+    # Record difference if not a perfect match
+    differences = {
+        result.name: {
+            'bank': str(result.source) if result.source is not None else None,
+            'counterparty': str(result.target) if result.target is not None else None,
+            'score': round(result.credit, 3)
+        }
+        for result in evaluation.differences()
+    }
 
-    if not reason_codes:
-        reason_codes = ['PERFECT_MATCH']
+    reason_codes = evaluation.reason_codes() or ['PERFECT_MATCH']
 
-    return round(total_score, 3), differences, reason_codes
+    return {'score': round(evaluation.earned, 3), 'differences': differences, 'reason_codes': reason_codes}
 
 
 def persist_match_result(result: MatchingResult) -> str:
@@ -141,8 +143,14 @@ def persist_match_result(result: MatchingResult) -> str:
     Returns:
         match_id of the persisted record
     """
-    matches_table = dynamodb.Table(settings.dynamodb_matched_table)
-    match_id = f"match-{uuid.uuid4()}"
+    item = match_result_item(result)
+    dynamodb.Table(settings.dynamodb_matched_table).put_item(Item=item)
+    return item['match_id']
+
+
+def match_result_item(result: MatchingResult, match_id: Optional[str] = None) -> Dict[str, Any]:
+    """TradeMatches item for a matching result, under match_id or a new one."""
+    match_id = match_id or f"match-{uuid.uuid4()}"
 
     # Prepare item for DynamoDB (convert to dict and handle types)
     item = {
@@ -152,7 +160,10 @@ def persist_match_result(result: MatchingResult) -> str:
         'match_score': Decimal(str(result.matchScore)),
         'decision_status': result.decisionStatus.value,
         'reason_codes': result.reasonCodes,
-        'differences': result.differences,
+        'differences': {
+            name: {key: Decimal(str(value)) if isinstance(value, float) else value for key, value in diff.items()}
+            for name, diff in result.differences.items()
+        },
         'created_at': result.createdAt,
         'updated_at': datetime.now(timezone.utc).isoformat() + 'Z',
     }
@@ -180,8 +191,7 @@ def persist_match_result(result: MatchingResult) -> str:
             'product_type': result.counterpartyTrade.product_type,
         }
 
-    matches_table.put_item(Item=item)
-    return match_id
+    return item
 
 
 class QueueItem(BaseModel):
@@ -212,8 +222,8 @@ async def get_matching_results(
 
         if not items:
             # If TradeMatches is empty, build results from Bank and Counterparty data
-            bank_items = db_service.scan_table(settings.dynamodb_bank_table, limit=50)
-            cp_items = db_service.scan_table(settings.dynamodb_counterparty_table, limit=50)
+            bank_items = scan_trades(settings.dynamodb_bank_table, limit=50)
+            cp_items = scan_trades(settings.dynamodb_counterparty_table, limit=50)
 
             results = []
             # Create matched results from existing trade data
@@ -237,7 +247,7 @@ async def get_matching_results(
                         decision_status = DecisionStatus.AUTO_MATCH
                     elif match_score >= 0.80:
                         classification = MatchClassification.REVIEW_REQUIRED
-                        decision_status = DecisionStatus.PENDING_REVIEW
+                        decision_status = DecisionStatus.PENDING
                     else:
                         classification = MatchClassification.BREAK
                         decision_status = DecisionStatus.EXCEPTION
@@ -380,118 +390,209 @@ class BatchMatchResponse(BaseModel):
     matchedCount: int
     unmatchedCount: int
     persistedCount: int
+    fuzzyMatchedCount: int = 0
+    bankTradeCount: int = 0
+    counterpartyTradeCount: int = 0
+    # Bank trades paired and scored per second (matching phase only)
+    tradesPerSecond: float = 0.0
+    # Seconds spent loading, matching, persisting and in total
+    timings: Dict[str, float] = {}
+    # DynamoDB requests made: Scan pages and BatchWriteItem calls
+    dynamodbRoundTrips: Dict[str, int] = {}
     errors: List[str] = []
 
 
+def load_trades(table_name: str) -> Tuple[List[Mapping[str, Any]], int]:
+    """
+    Load a whole trade table into TradeRecords with a parallel segmented scan.
+
+    Returns:
+        Tuple of (trades, number of Scan requests made)
+    """
+    items, scans = db_service.scan_all(table_name, settings.batch_match_scan_segments)
+    return TRADE_RECORD_LAYOUT.records(items), scans
+
+
+def _fuzzy_block(trade: Mapping[str, Any]) -> Tuple[str, str]:
+    # Currency and trade date as the rules compare text values (up to case)
+    return str(trade.get("currency", "")).strip().lower(), str(trade.get("trade_date", "")).strip().lower()
+
+
+def pair_trades(
+    bank_trades: List[Mapping[str, Any]], cp_trades: List[Mapping[str, Any]], fuzzy_min_score: float
+) -> Tuple[List[Tuple[Mapping[str, Any], Optional[Mapping[str, Any]]]], int]:
+    """
+    Pair every bank trade with at most one counterparty trade.
+
+    Bank trades are first hash-joined to the first counterparty trade with the
+    same (trade_id, internal_reference). A bank trade without one is paired
+    with the best-scoring counterparty trade of the same currency and trade
+    date that no other bank trade was joined or paired with, if it scores at
+    least fuzzy_min_score.
+
+    Returns:
+        Tuple of ((bank trade, counterparty trade or None) in bank trade order,
+        number of fuzzy pairings)
+    """
+    by_key: Dict[Tuple[Any, Any], Mapping[str, Any]] = {}
+    for cp in cp_trades:
+        by_key.setdefault((cp.get("trade_id"), cp.get("internal_reference")), cp)
+
+    pairs = [
+        (bank, by_key.get((bank.get("trade_id", "UNKNOWN"), bank.get("internal_reference", ""))))
+        for bank in bank_trades
+    ]
+
+    joined = {id(cp) for _, cp in pairs if cp is not None}
+    blocks: Dict[Tuple[str, str], List[Mapping[str, Any]]] = {}
+    for cp in cp_trades:
+        if id(cp) not in joined:
+            blocks.setdefault(_fuzzy_block(cp), []).append(cp)
+
+    fuzzy_count = 0
+    for position, (bank, cp) in enumerate(pairs):
+        if cp is not None:
+            continue
+        candidates = blocks.get(_fuzzy_block(bank))
+        if not candidates:
+            continue
+        comparisons = compare_trade_candidates(bank, candidates)
+        score, best = max((comparison[0], i) for i, comparison in enumerate(comparisons))
+        if score >= fuzzy_min_score:
+            pairs[position] = (bank, candidates.pop(best))
+            fuzzy_count += 1
+    return pairs, fuzzy_count
+
+
+def score_pair(bank_trade: Mapping[str, Any], matched_cp: Optional[Mapping[str, Any]]) -> MatchingResult:
+    """Matching result of a bank trade and its paired counterparty trade (None if unpaired)."""
+    trade_id = bank_trade.get("trade_id", "UNKNOWN")
+    created_at = bank_trade.get(
+        "created_at", bank_trade.get("extraction_timestamp", datetime.now(timezone.utc).isoformat() + "Z")
+    )
+    if matched_cp:
+        # Perform comparison
+        match_score, differences, reason_codes = compare_trades(bank_trade, matched_cp)
+
+        # Determine classification
+        if match_score >= 0.95:
+            classification = MatchClassification.MATCHED
+            decision_status = DecisionStatus.AUTO_MATCH
+        elif match_score >= 0.80:
+            classification = MatchClassification.REVIEW_REQUIRED
+            decision_status = DecisionStatus.PENDING
+        else:
+            classification = MatchClassification.BREAK
+            decision_status = DecisionStatus.EXCEPTION
+
+        return MatchingResult(
+            tradeId=trade_id,
+            classification=classification,
+            matchScore=match_score,
+            decisionStatus=decision_status,
+            reasonCodes=reason_codes,
+            differences=differences,
+            createdAt=created_at,
+            bankTrade=transform_dynamodb_trade_to_model(bank_trade),
+            counterpartyTrade=transform_dynamodb_trade_to_model(matched_cp)
+        )
+
+    # Unmatched trade
+    return MatchingResult(
+        tradeId=trade_id,
+        classification=MatchClassification.BREAK,
+        matchScore=0.0,
+        decisionStatus=DecisionStatus.EXCEPTION,
+        reasonCodes=["NO_COUNTERPARTY_MATCH"],
+        differences={},
+        createdAt=created_at,
+        bankTrade=transform_dynamodb_trade_to_model(bank_trade),
+        counterpartyTrade=None
+    )
+
+
 @router.post("/batch-match", response_model=BatchMatchResponse)
-async def batch_match_trades(
+def batch_match_trades(
     persist: bool = Query(True, description="Whether to persist results to TradeMatches table"),
     user: Optional[User] = Depends(optional_auth_or_dev)
 ):
     """
     Perform batch matching of all bank and counterparty trades.
 
-    Calculates match scores for all trade pairs and optionally persists
-    results to the TradeMatches table for faster subsequent queries.
+    Loads both tables in full (parallel segmented scans following every page),
+    pairs the trades (see pair_trades), calculates their match scores and
+    optionally persists the results to the TradeMatches table with
+    BatchWriteItem, 25 results per request. Runs in the server's thread pool;
+    books too large for one request are matched with POST /batch-match/jobs.
 
     Args:
         persist: Whether to persist results to TradeMatches table (default: True)
 
     Returns:
-        BatchMatchResponse with match statistics
+        BatchMatchResponse with match statistics, throughput and DynamoDB round trips
     """
     try:
-        # Scan bank and counterparty tables
-        bank_items = db_service.scan_table(settings.dynamodb_bank_table, limit=100)
-        cp_items = db_service.scan_table(settings.dynamodb_counterparty_table, limit=100)
+        started = time.perf_counter()
+        bank_items, bank_scans = load_trades(settings.dynamodb_bank_table)
+        cp_items, cp_scans = load_trades(settings.dynamodb_counterparty_table)
+        loaded = time.perf_counter()
 
         matched_count = 0
         unmatched_count = 0
-        persisted_count = 0
         errors = []
+        results_to_persist = []
 
-        # Process each bank trade
-        for bank_trade in bank_items:
+        pairs, fuzzy_count = pair_trades(bank_items, cp_items, settings.batch_match_fuzzy_min_score)
+        for bank_trade, matched_cp in pairs:
+            trade_id = bank_trade.get("trade_id", "UNKNOWN")
             try:
-                trade_id = bank_trade.get("trade_id", "UNKNOWN")
-                internal_ref = bank_trade.get("internal_reference", "")
-
-                # Find matching counterparty trade
-                matched_cp = next((
-                    cp for cp in cp_items
-                    if cp.get("trade_id") == trade_id and cp.get("internal_reference") == internal_ref
-                ), None)
-
+                result = score_pair(bank_trade, matched_cp)
                 if matched_cp:
-                    # Perform comparison
-                    match_score, differences, reason_codes = compare_trades(bank_trade, matched_cp)
-
-                    # Determine classification
-                    if match_score >= 0.95:
-                        classification = MatchClassification.MATCHED
-                        decision_status = DecisionStatus.AUTO_MATCH
-                    elif match_score >= 0.80:
-                        classification = MatchClassification.REVIEW_REQUIRED
-                        decision_status = DecisionStatus.PENDING_REVIEW
-                    else:
-                        classification = MatchClassification.BREAK
-                        decision_status = DecisionStatus.EXCEPTION
-
-                    # Create MatchingResult object
-                    result = MatchingResult(
-                        tradeId=trade_id,
-                        classification=classification,
-                        matchScore=match_score,
-                        decisionStatus=decision_status,
-                        reasonCodes=reason_codes,
-                        differences=differences,
-                        createdAt=bank_trade.get("created_at", bank_trade.get("extraction_timestamp", datetime.now(timezone.utc).isoformat() + "Z")),
-                        bankTrade=transform_dynamodb_trade_to_model(bank_trade),
-                        counterpartyTrade=transform_dynamodb_trade_to_model(matched_cp)
-                    )
-
                     matched_count += 1
-
-                    # Persist if requested
-                    if persist:
-                        persist_match_result(result)
-                        persisted_count += 1
-
                 else:
-                    # Unmatched trade
-                    result = MatchingResult(
-                        tradeId=trade_id,
-                        classification=MatchClassification.BREAK,
-                        matchScore=0.0,
-                        decisionStatus=DecisionStatus.EXCEPTION,
-                        reasonCodes=["NO_COUNTERPARTY_MATCH"],
-                        differences={},
-                        createdAt=bank_trade.get("created_at", bank_trade.get("extraction_timestamp", datetime.now(timezone.utc).isoformat() + "Z")),
-                        bankTrade=transform_dynamodb_trade_to_model(bank_trade),
-                        counterpartyTrade=None
-                    )
-
                     unmatched_count += 1
 
-                    # Persist unmatched results too if requested
-                    if persist:
-                        persist_match_result(result)
-                        persisted_count += 1
+                # Unmatched results are persisted too
+                if persist:
+                    results_to_persist.append(match_result_item(result))
 
             except Exception as e:
                 errors.append(f"Error processing trade {trade_id}: {str(e)}")
                 continue
+        matched = time.perf_counter()
 
-        message = f"Batch matching complete: {matched_count} matched, {unmatched_count} unmatched"
+        persisted_count = 0
+        write_requests = 0
+        if results_to_persist:
+            persisted_count, write_requests = db_service.batch_put_items(
+                settings.dynamodb_matched_table, results_to_persist
+            )
+            if persisted_count < len(results_to_persist):
+                errors.append(f"{len(results_to_persist) - persisted_count} results could not be persisted")
+        finished = time.perf_counter()
+
+        message = f"Batch matching complete: {matched_count} matched ({fuzzy_count} by fuzzy fallback), {unmatched_count} unmatched"
         if persist:
             message += f", {persisted_count} persisted to TradeMatches table"
 
+        match_seconds = matched - loaded
         return BatchMatchResponse(
             success=True,
             message=message,
             matchedCount=matched_count,
             unmatchedCount=unmatched_count,
             persistedCount=persisted_count,
+            fuzzyMatchedCount=fuzzy_count,
+            bankTradeCount=len(bank_items),
+            counterpartyTradeCount=len(cp_items),
+            tradesPerSecond=round(len(pairs) / match_seconds, 1) if match_seconds > 0 else 0.0,
+            timings={
+                "load": round(loaded - started, 3),
+                "match": round(match_seconds, 3),
+                "persist": round(finished - matched, 3),
+                "total": round(finished - started, 3),
+            },
+            dynamodbRoundTrips={"scan": bank_scans + cp_scans, "batchWriteItem": write_requests},
             errors=errors
         )
 
@@ -500,3 +601,214 @@ async def batch_match_trades(
             status_code=500,
             detail=f"Batch matching failed: {str(e)}"
         )
+
+
+# Seconds between checks for new results of a streamed job
+JOB_EVENT_POLL_SECONDS = 0.5
+
+
+def _pairing_key(trade: Mapping[str, Any]) -> Tuple[str, str]:
+    return str(trade.get("trade_id", "")), str(trade.get("internal_reference", ""))
+
+
+def run_batch_match_job(job: BatchJob, checkpoint: Callable[[], None]) -> None:
+    """
+    Run a batch-match job partition by partition.
+
+    Both books are loaded in full and sorted by (trade_id, internal_reference)
+    before pairing, so a resumed job pairs the trades as the interrupted run
+    did (unless the tables changed in between) and its partitions - slices of
+    batch_match_partition_size pairs - are the same. Results are persisted
+    under match ids made of the job id and the pair's position, so a partition
+    replayed after a crash overwrites its own results.
+
+    Args:
+        job: The job; params {'persist': bool}
+        checkpoint: Called after every completed partition
+    """
+    persist = job.params.get("persist", True)
+    bank_items, _ = load_trades(settings.dynamodb_bank_table)
+    cp_items, _ = load_trades(settings.dynamodb_counterparty_table)
+    bank_items.sort(key=_pairing_key)
+    cp_items.sort(key=_pairing_key)
+    pairs, fuzzy_count = pair_trades(bank_items, cp_items, settings.batch_match_fuzzy_min_score)
+
+    size = max(1, settings.batch_match_partition_size)
+    job.start_partitions(-(-len(pairs) // size), total=len(pairs), fuzzyMatched=fuzzy_count)
+    for start in range(job.partitions_done * size, len(pairs), size):
+        partition = pairs[start:start + size]
+        events = []
+        errors = []
+        items_to_persist = []
+        matched_count = 0
+        unmatched_count = 0
+        for position, (bank_trade, matched_cp) in enumerate(partition, start):
+            trade_id = bank_trade.get("trade_id", "UNKNOWN")
+            try:
+                result = score_pair(bank_trade, matched_cp)
+            except Exception as e:
+                errors.append(f"Error processing trade {trade_id}: {str(e)}")
+                continue
+            if matched_cp:
+                matched_count += 1
+            else:
+                unmatched_count += 1
+            events.append({
+                "tradeId": result.tradeId,
+                "counterpartyTradeId": result.counterpartyTrade.Trade_ID if result.counterpartyTrade else None,
+                "classification": result.classification.value,
+                "matchScore": result.matchScore,
+                "decisionStatus": result.decisionStatus.value,
+                "reasonCodes": result.reasonCodes,
+            })
+            if persist:
+                items_to_persist.append(match_result_item(result, match_id=f"match-{job.job_id}-{position}"))
+
+        persisted_count = 0
+        if items_to_persist:
+            persisted_count, _ = db_service.batch_put_items(settings.dynamodb_matched_table, items_to_persist)
+            if persisted_count < len(items_to_persist):
+                errors.append(f"{len(items_to_persist) - persisted_count} results could not be persisted")
+
+        job.complete_partition(
+            events, errors,
+            processed=len(partition), matched=matched_count, unmatched=unmatched_count, persisted=persisted_count,
+        )
+        checkpoint()
+
+
+def _checkpoint_store():
+    if settings.batch_match_checkpoint_prefix:
+        return S3CheckpointStore(
+            boto3.client('s3', region_name=settings.aws_region), settings.s3_bucket,
+            settings.batch_match_checkpoint_prefix,
+        )
+    return None
+
+
+batch_jobs = BatchJobManager(
+    run_batch_match_job, store=_checkpoint_store(),
+    max_workers=settings.batch_match_job_workers, event_buffer=settings.batch_match_event_buffer,
+)
+
+
+class BatchMatchJobResponse(BaseModel):
+    """Progress of a batch-match job."""
+    jobId: str
+    status: str
+    params: Dict[str, Any]
+    createdAt: str
+    updatedAt: str
+    partitionsTotal: Optional[int] = None
+    partitionsDone: int
+    # total, processed, matched, unmatched, fuzzyMatched, persisted, errors
+    counters: Dict[str, int]
+    errors: List[str] = []
+    # Number of the next result event
+    nextEventId: int
+
+
+@router.post("/batch-match/jobs", response_model=BatchMatchJobResponse, status_code=202)
+def create_batch_match_job(
+    persist: bool = Query(True, description="Whether to persist results to TradeMatches table"),
+    user: Optional[User] = Depends(optional_auth_or_dev)
+):
+    """
+    Start batch matching of all bank and counterparty trades as a background job.
+
+    Returns at once; follow the job with GET /batch-match/jobs/{job_id} or
+    stream its results from GET /batch-match/jobs/{job_id}/events.
+
+    Args:
+        persist: Whether to persist results to TradeMatches table (default: True)
+
+    Returns:
+        BatchMatchJobResponse of the queued job
+    """
+    return BatchMatchJobResponse(**batch_jobs.submit({"persist": persist}).progress())
+
+
+@router.get("/batch-match/jobs/{job_id}", response_model=BatchMatchJobResponse)
+def get_batch_match_job(
+    job_id: str,
+    user: Optional[User] = Depends(optional_auth_or_dev)
+):
+    """
+    Get the progress counters of a batch-match job.
+
+    Jobs not running in this process are reported from their last checkpoint.
+    """
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch match job {job_id} not found")
+    return BatchMatchJobResponse(**job.progress())
+
+
+@router.post("/batch-match/jobs/{job_id}/resume", response_model=BatchMatchJobResponse, status_code=202)
+def resume_batch_match_job(
+    job_id: str,
+    user: Optional[User] = Depends(optional_auth_or_dev)
+):
+    """
+    Resume a failed or interrupted batch-match job after its last checkpointed partition.
+    """
+    try:
+        job = batch_jobs.resume(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Batch match job {job_id} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return BatchMatchJobResponse(**job.progress())
+
+
+def _sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _job_events(job: BatchJob, after: int, follow: bool):
+    last_progress = None
+    while True:
+        # Checked before draining, so results published before the job finished are all sent
+        done = job.finished or not follow
+        for number, event in job.events_after(after):
+            after = number
+            yield _sse("result", event, number)
+        progress = job.progress()
+        if done:
+            yield _sse("end", progress)
+            return
+        if progress != last_progress:
+            last_progress = progress
+            yield _sse("progress", progress)
+        await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+
+
+@router.get("/batch-match/jobs/{job_id}/events")
+def stream_batch_match_job(
+    job_id: str,
+    last_event_id: Optional[str] = Header(None),
+    user: Optional[User] = Depends(optional_auth_or_dev)
+):
+    """
+    Stream the per-trade results of a batch-match job as server-sent events.
+
+    Events: `result` (one per scored bank trade, with the event number as
+    id), `progress` (the job progress, whenever it changes) and a final `end`
+    (the progress of the finished job). A reconnecting client sends
+    Last-Event-ID to continue after the last result it received; results
+    older than the job's event buffer are no longer available. A job not
+    running in this process only gets its `end` event.
+    """
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch match job {job_id} not found")
+    try:
+        after = int(last_event_id or 0)
+    except ValueError:
+        after = 0
+    return StreamingResponse(
+        _job_events(job, after, follow=batch_jobs.is_local(job_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
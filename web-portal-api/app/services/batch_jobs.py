@@ -0,0 +1,286 @@
+"""
+Batch-Match Jobs
+
+A batch match over a large book runs for longer than an HTTP request should,
+so it can run as a job on a worker pool instead:
+- creating a job returns its id at once; a worker thread runs it,
+- the run reports progress through counters and publishes per-trade results
+  as numbered events, kept in a bounded buffer for streaming clients,
+- the work is split into partitions; after every partition the job state
+  (counters, partitions done, next event number) is checkpointed, so a job
+  interrupted by a crash or restart, or one that failed, can be resumed
+  after its last completed partition.
+
+Checkpoints are JSON objects under an S3 prefix (S3CheckpointStore). Store
+errors are logged; a job never fails because its checkpoint could not be
+written, it just resumes from an earlier partition.
+
+What a partition is, and how a run resumes, is up to the run function passed
+to BatchJobManager (see routers/matching.py).
+"""
+
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+# Counters every job reports; the run function updates them
+JOB_COUNTERS = ('total', 'processed', 'matched', 'unmatched', 'fuzzyMatched', 'persisted', 'errors')
+
+# Errors kept per job (the errors counter keeps counting)
+MAX_JOB_ERRORS = 100
+
+
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class BatchJob:
+    """State of one job; updated by its worker thread, read by request handlers."""
+
+    def __init__(self, job_id: str, params: Dict[str, Any], event_buffer: int = 10000):
+        """
+        Args:
+            job_id: Job identifier
+            params: Parameters of the run (JSON-serializable)
+            event_buffer: Most recent events kept for streaming clients
+        """
+        self.job_id = job_id
+        self.params = params
+        self.status = JobStatus.QUEUED
+        self.created_at = _now()
+        self.updated_at = self.created_at
+        self.partitions_total: Optional[int] = None
+        self.partitions_done = 0
+        self.counters: Dict[str, int] = dict.fromkeys(JOB_COUNTERS, 0)
+        self.errors: List[str] = []
+        self._events: deque = deque(maxlen=event_buffer)
+        self._next_event = 1
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def set_status(self, status: JobStatus, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.status = status
+            if error:
+                self._add_error(error)
+            self.updated_at = _now()
+
+    def _add_error(self, error: str) -> None:
+        self.counters['errors'] += 1
+        if len(self.errors) < MAX_JOB_ERRORS:
+            self.errors.append(error)
+
+    def start_partitions(self, partitions_total: int, **counters: int) -> None:
+        """Record the number of partitions of the run and set counters known up front."""
+        with self._lock:
+            self.partitions_total = partitions_total
+            self.counters.update(counters)
+            self.updated_at = _now()
+
+    def complete_partition(
+        self, events: List[Dict[str, Any]], errors: List[str] = (), **increments: int
+    ) -> None:
+        """Publish a partition's events, add its counter increments and count it done."""
+        with self._lock:
+            for name, increment in increments.items():
+                self.counters[name] += increment
+            for error in errors:
+                self._add_error(error)
+            self.partitions_done += 1
+            for event in events:
+                self._events.append((self._next_event, event))
+                self._next_event += 1
+            self.updated_at = _now()
+
+    def events_after(self, event_id: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Buffered events numbered above event_id, oldest first.
+
+        Events pushed out of the buffer before a client read them are skipped;
+        the event numbers show the gap.
+        """
+        with self._lock:
+            return [(number, event) for number, event in self._events if number > event_id]
+
+    def progress(self) -> Dict[str, Any]:
+        """Progress report; also what is checkpointed."""
+        with self._lock:
+            return {
+                'jobId': self.job_id,
+                'status': self.status.value,
+                'params': self.params,
+                'createdAt': self.created_at,
+                'updatedAt': self.updated_at,
+                'partitionsTotal': self.partitions_total,
+                'partitionsDone': self.partitions_done,
+                'counters': dict(self.counters),
+                'errors': list(self.errors),
+                'nextEventId': self._next_event,
+            }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: Dict[str, Any], event_buffer: int = 10000) -> 'BatchJob':
+        job = cls(checkpoint['jobId'], checkpoint.get('params', {}), event_buffer)
+        job.status = JobStatus(checkpoint['status'])
+        job.created_at = checkpoint['createdAt']
+        job.updated_at = checkpoint['updatedAt']
+        job.partitions_total = checkpoint.get('partitionsTotal')
+        job.partitions_done = checkpoint.get('partitionsDone', 0)
+        job.counters.update(checkpoint.get('counters', {}))
+        job.errors = list(checkpoint.get('errors', []))
+        job._next_event = checkpoint.get('nextEventId', 1)
+        return job
+
+
+class S3CheckpointStore:
+    """Job checkpoints as one JSON object per job under an S3 prefix."""
+
+    def __init__(self, client: Any, bucket: str, prefix: str = 'batch-match-jobs/'):
+        """
+        Args:
+            client: boto3 S3 client
+            bucket: Bucket name
+            prefix: Key prefix of the checkpoint objects
+        """
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def save(self, checkpoint: Dict[str, Any]) -> None:
+        self.client.put_object(
+            Bucket=self.bucket, Key=f"{self.prefix}{checkpoint['jobId']}.json",
+            Body=json.dumps(checkpoint).encode('utf-8'), ContentType='application/json',
+        )
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{job_id}.json")
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return json.loads(response['Body'].read().decode('utf-8'))
+
+
+class BatchJobManager:
+    """Runs jobs on a worker pool and keeps the jobs of this process."""
+
+    def __init__(
+        self,
+        run: Callable[[BatchJob, Callable[[], None]], None],
+        store: Optional[Any] = None,
+        max_workers: int = 2,
+        event_buffer: int = 10000,
+    ):
+        """
+        Args:
+            run: Runs a job, calling the given checkpoint function after every
+                completed partition; a resumed job has partitions_done > 0
+            store: S3CheckpointStore (or any object with save/load) or None
+            max_workers: Jobs run at the same time; further jobs queue
+            event_buffer: Most recent events kept per job
+        """
+        self._run = run
+        self.store = store
+        self.event_buffer = event_buffer
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-job")
+        self._jobs: Dict[str, BatchJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, params: Dict[str, Any]) -> BatchJob:
+        """Create a job and queue it."""
+        job = BatchJob(str(uuid.uuid4()), params, self.event_buffer)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._checkpoint(job)
+        self._pool.submit(self._execute, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        """A job of this process, or the last checkpoint of a job run elsewhere or before a restart."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    def is_local(self, job_id: str) -> bool:
+        """Whether the job was submitted or resumed in this process."""
+        with self._lock:
+            return job_id in self._jobs
+
+    def resume(self, job_id: str) -> BatchJob:
+        """
+        Queue an interrupted or failed job again; it continues after its last checkpointed partition.
+
+        A checkpoint left QUEUED or RUNNING by another process is taken as
+        interrupted; the caller knows that process is gone.
+
+        Raises:
+            KeyError: No such job
+            ValueError: The job is completed, or queued or running in this process
+        """
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        with self._lock:
+            current = self._jobs.get(job_id)
+            if current is not None and not current.finished:
+                raise ValueError(f"Job {job_id} is already {current.status.value.lower()}")
+            if job.status == JobStatus.COMPLETED:
+                raise ValueError(f"Job {job_id} is already completed")
+            job.set_status(JobStatus.QUEUED)
+            self._jobs[job_id] = job
+        self._pool.submit(self._execute, job)
+        return job
+
+    def _load(self, job_id: str) -> Optional[BatchJob]:
+        if self.store is None:
+            return None
+        try:
+            checkpoint = self.store.load(job_id)
+        except (BotoCoreError, ClientError, ValueError) as e:
+            logger.warning(f"Could not load checkpoint of job {job_id}: {e}")
+            return None
+        return BatchJob.from_checkpoint(checkpoint, self.event_buffer) if checkpoint else None
+
+    def shutdown(self) -> None:
+        """Stop taking jobs; queued jobs are dropped and can be resumed later."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _checkpoint(self, job: BatchJob) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.save(job.progress())
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Could not checkpoint job {job.job_id}: {e}")
+
+    def _execute(self, job: BatchJob) -> None:
+        job.set_status(JobStatus.RUNNING)
+        self._checkpoint(job)
+        try:
+            self._run(job, lambda: self._checkpoint(job))
+            job.set_status(JobStatus.COMPLETED)
+        except Exception as e:
+            logger.exception(f"Batch job {job.job_id} failed")
+            job.set_status(JobStatus.FAILED, f"Job failed: {e}")
+        self._checkpoint(job)
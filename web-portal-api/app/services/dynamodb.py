@@ -1,6 +1,29 @@
 import boto3
+import logging
+import threading
+import time
 from typing import Optional, Any
 from ..config import settings
+from .dynamodb_scan import parallel_scan
+
+logger = logging.getLogger(__name__)
+
+# BatchWriteItem accepts at most 25 put requests
+BATCH_WRITE_SIZE = 25
+
+
+class _CountingClient:
+    """DynamoDB client wrapper counting Scan requests (the segments of a parallel scan share it)."""
+
+    def __init__(self, client: Any):
+        self._client = client
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def scan(self, **kwargs) -> dict:
+        with self._lock:
+            self.scans += 1
+        return self._client.scan(**kwargs)
 
 
 class DynamoDBService:
@@ -20,6 +43,42 @@ class DynamoDBService:
         response = table.scan(**params)
         return response.get("Items", [])
     
+    def scan_all(self, table_name: str, total_segments: int = 4) -> tuple[list[dict], int]:
+        """
+        Scan a whole table: every page of every parallel segment.
+
+        Returns:
+            Tuple of (items, number of Scan requests made)
+        """
+        client = _CountingClient(self.client)
+        items = parallel_scan(client, table_name, total_segments)
+        return items, client.scans
+
+    def batch_put_items(self, table_name: str, items: list[dict], max_retries: int = 5) -> tuple[int, int]:
+        """
+        Write items with BatchWriteItem in groups of 25, resubmitting unprocessed items with backoff.
+
+        Returns:
+            Tuple of (items written, number of BatchWriteItem requests made)
+        """
+        written = 0
+        requests = 0
+        for start in range(0, len(items), BATCH_WRITE_SIZE):
+            pending = [{"PutRequest": {"Item": item}} for item in items[start:start + BATCH_WRITE_SIZE]]
+            for attempt in range(max_retries + 1):
+                if attempt:
+                    time.sleep(0.05 * 2 ** (attempt - 1))
+                response = self.dynamodb.batch_write_item(RequestItems={table_name: pending})
+                requests += 1
+                unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+                written += len(pending) - len(unprocessed)
+                pending = unprocessed
+                if not pending:
+                    break
+            if pending:
+                logger.warning(f"{len(pending)} items not written to {table_name} after {max_retries} retries")
+        return written, requests
+
     def get_item(self, table_name: str, key: dict) -> Optional[dict]:
         table = self.get_table(table_name)
         response = table.get_item(Key=key)
@@ -0,0 +1,175 @@
+"""
+Parallel DynamoDB Scan for the Trade Matching Agent
+
+Splits a full-table scan into Segment/TotalSegments scans that page through
+the table concurrently on a thread pool, so a full load scales with the
+segment count instead of the page count.
+
+- iter_scan() streams deserialized items as pages arrive from any segment.
+- parallel_scan() collects them into a list.
+- Both accept the attribute names to fetch (a ProjectionExpression), so
+  callers that only match on a few fields do not read whole items.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from boto3.dynamodb.types import TypeDeserializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOTAL_SEGMENTS = 4
+
+# Pages buffered per segment before the segment workers wait for the consumer
+PAGES_BUFFERED_PER_SEGMENT = 2
+
+_deserializer = TypeDeserializer()
+
+# Queue marker for a segment that has no more pages
+_SEGMENT_DONE = object()
+
+
+def deserialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a DynamoDB typed item to plain Python values."""
+    return {key: _deserializer.deserialize(value) for key, value in item.items()}
+
+
+def projection_arguments(attributes: Sequence[str]) -> Dict[str, Any]:
+    """
+    Build the Scan arguments that fetch only the given attributes.
+
+    Every name goes through a placeholder, since trade fields such as Index
+    are DynamoDB reserved words.
+
+    Args:
+        attributes: Attribute names to fetch (duplicates are ignored)
+
+    Returns:
+        ProjectionExpression and ExpressionAttributeNames arguments
+    """
+    names = {f"#p{i}": attribute for i, attribute in enumerate(dict.fromkeys(attributes))}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def _scan_pages(client: Any, scan_kwargs: Dict[str, Any]) -> Iterator[List[Dict]]:
+    """Page through one scan (or scan segment) and yield the raw (typed) items of each page."""
+    response = client.scan(**scan_kwargs)
+    yield response.get('Items', [])
+    while 'LastEvaluatedKey' in response:
+        response = client.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **scan_kwargs)
+        yield response.get('Items', [])
+
+
+def _iter_parallel_pages(
+    client: Any, table_name: str, total_segments: int, scan_kwargs: Dict[str, Any]
+) -> Iterator[List[Dict]]:
+    """Yield pages from all segments in arrival order; a failing segment re-raises in the consumer."""
+    pages: queue.Queue = queue.Queue(maxsize=total_segments * PAGES_BUFFERED_PER_SEGMENT)
+    stopped = threading.Event()
+
+    def put(entry) -> bool:
+        while not stopped.is_set():
+            try:
+                pages.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment: int) -> None:
+        try:
+            kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+            for page in _scan_pages(client, kwargs):
+                if not put(page):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    pool = ThreadPoolExecutor(max_workers=total_segments, thread_name_prefix=f"scan-{table_name}")
+    try:
+        for segment in range(total_segments):
+            pool.submit(scan_segment, segment)
+        remaining = total_segments
+        while remaining:
+            entry = pages.get()
+            if entry is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(entry, Exception):
+                raise entry
+            else:
+                yield entry
+    finally:
+        # Also reached when the consumer stops early: release blocked workers
+        stopped.set()
+        pool.shutdown(wait=True)
+
+
+def iter_scan(
+    client: Any,
+    table_name: str,
+    total_segments: int = DEFAULT_TOTAL_SEGMENTS,
+    attributes: Optional[Sequence[str]] = None,
+    deserialize: Callable[[Dict[str, Any]], Dict[str, Any]] = deserialize_item,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scan a whole table with parallel segments, yielding deserialized items as pages arrive.
+
+    Args:
+        client: boto3 DynamoDB client (thread-safe)
+        table_name: Table to scan
+        total_segments: Number of parallel scan segments (1 = serial scan)
+        attributes: Attribute names to fetch, or None for whole items
+        deserialize: Conversion from a typed item to the item yielded
+
+    Returns:
+        Iterator over items; order across segments is not defined
+    """
+    scan_kwargs: Dict[str, Any] = {"TableName": table_name}
+    if attributes:
+        scan_kwargs.update(projection_arguments(attributes))
+
+    total_segments = max(1, total_segments)
+    if total_segments == 1:
+        pages = _scan_pages(client, scan_kwargs)
+    else:
+        pages = _iter_parallel_pages(client, table_name, total_segments, scan_kwargs)
+
+    try:
+        for page in pages:
+            for item in page:
+                yield deserialize(item)
+    finally:
+        pages.close()
+
+
+def parallel_scan(
+    client: Any,
+    table_name: str,
+    total_segments: int = DEFAULT_TOTAL_SEGMENTS,
+    attributes: Optional[Sequence[str]] = None,
+    deserialize: Callable[[Dict[str, Any]], Dict[str, Any]] = deserialize_item,
+) -> List[Dict[str, Any]]:
+    """
+    Scan a whole table with parallel segments and return the deserialized items.
+
+    Args:
+        client: boto3 DynamoDB client (thread-safe)
+        table_name: Table to scan
+        total_segments: Number of parallel scan segments (1 = serial scan)
+        attributes: Attribute names to fetch, or None for whole items
+        deserialize: Conversion from a typed item to the item returned
+
+    Returns:
+        Deserialized items; order across segments is not defined
+    """
+    items = list(iter_scan(client, table_name, total_segments, attributes, deserialize))
+    logger.info(f"Scanned {len(items)} items from {table_name} with {max(1, total_segments)} segment(s)")
+    return items
@@ -0,0 +1,276 @@
+"""
+Unit tests for the /batch-match endpoint and batch-match jobs: full-table
+loading, hash join with fuzzy fallback, batched persistence, checkpointed
+resumption and result streaming.
+"""
+
+import json
+import time
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import matching
+from app.services import dynamodb
+from app.services.batch_jobs import BatchJobManager, JobStatus
+from app.services.dynamodb import DynamoDBService
+from app.services.match_cache import MatchResultCache
+
+
+def trade(trade_id, reference='', **fields):
+    item = {'trade_id': trade_id, 'internal_reference': reference, 'notional': 1000000, 'currency': 'USD',
+            'trade_date': '2025-01-15', 'settlement_date': '2025-01-17', 'product': 'SWAP',
+            'counterparty': 'Goldman Sachs'}
+    item.update(fields)
+    return item
+
+
+class FakeTables:
+    """Serves scans from in-memory tables and records batch writes.
+
+    Written items go through boto3's TypeSerializer, so items DynamoDB would
+    refuse (floats, for one) fail here as well.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.written = []
+        # The n-th batch write from now fails
+        self.fail_writes = 0
+
+    def scan_all(self, table_name, total_segments=4):
+        return list(self.tables.get(table_name, [])), 2
+
+    def batch_put_items(self, table_name, items):
+        if self.fail_writes:
+            self.fail_writes -= 1
+            if not self.fail_writes:
+                raise RuntimeError("write failed")
+        serializer = TypeSerializer()
+        for item in items:
+            serializer.serialize(item)
+        self.written.extend(items)
+        return len(items), (len(items) + 24) // 25
+
+
+def run_batch_match(monkeypatch, bank, counterparty, persist=True):
+    tables = FakeTables({matching.settings.dynamodb_bank_table: bank,
+                         matching.settings.dynamodb_counterparty_table: counterparty})
+    monkeypatch.setattr(matching, 'db_service', tables)
+    return matching.batch_match_trades(persist=persist, user=None), tables
+
+
+def test_trades_are_joined_on_id_and_reference_before_fuzzy_fallback(monkeypatch):
+    bank = [trade('T1', 'R1'), trade('T2', 'R2', notional=5000), trade('T3', 'R3'), trade('T4', 'R4', currency='EUR')]
+    counterparty = [
+        trade('T1', 'R1'), trade('T1', 'R1', notional=1),
+        trade('T2', 'R2', notional=5000),
+        trade('X3', 'Y3', counterparty='Goldman Sachs Intl'),
+        trade('X4', 'Y4', currency='GBP'),
+    ]
+
+    response, tables = run_batch_match(monkeypatch, bank, counterparty)
+
+    pairs = {item['trade_id']: item.get('counterparty_trade', {}).get('Trade_ID') for item in tables.written}
+    assert pairs == {'T1': 'T1', 'T2': 'T2', 'T3': 'X3', 'T4': None}
+    assert (response.matchedCount, response.unmatchedCount, response.fuzzyMatchedCount) == (3, 1, 1)
+    assert response.persistedCount == 4 and response.errors == []
+    assert response.bankTradeCount == 4 and response.counterpartyTradeCount == 5
+    assert response.dynamodbRoundTrips == {'scan': 4, 'batchWriteItem': 1}
+    assert set(response.timings) == {'load', 'match', 'persist', 'total'}
+
+
+def test_non_exact_pairs_are_persisted_with_decimal_difference_scores(monkeypatch):
+    bank = [trade('T1', 'R1', counterparty='ACME')]
+    counterparty = [trade('T1', 'R1', counterparty='Acme')]
+
+    response, tables = run_batch_match(monkeypatch, bank, counterparty)
+
+    assert response.persistedCount == 1 and response.errors == []
+    (item,) = tables.written
+    assert item['differences']['counterparty']['score'] == Decimal('0.95')
+
+
+def test_fuzzy_fallback_pairs_each_counterparty_trade_once(monkeypatch):
+    bank = [trade('T1', 'R1'), trade('T2', 'R2'), trade('T3', 'R3', notional=1)]
+    counterparty = [trade('X1', 'Y1'), trade('T2', 'R2')]
+
+    response, tables = run_batch_match(monkeypatch, bank, counterparty, persist=False)
+
+    assert (response.matchedCount, response.unmatchedCount, response.fuzzyMatchedCount) == (2, 1, 1)
+    assert response.persistedCount == 0 and tables.written == []
+    assert response.dynamodbRoundTrips['batchWriteItem'] == 0
+
+
+def test_pair_trades_respects_the_fuzzy_minimum_score():
+    bank = [trade('T1', 'R1', notional=10)]
+    counterparty = [trade('X1', 'Y1')]
+
+    assert matching.pair_trades(bank, counterparty, 0.99) == ([(bank[0], None)], 0)
+    assert matching.pair_trades(bank, counterparty, 0.5) == ([(bank[0], counterparty[0])], 1)
+
+
+def test_fuzzy_fallback_resolves_a_block_in_one_cache_lookup(monkeypatch):
+    class CountingStore:
+        def __init__(self):
+            self.lookups = []
+
+        def get_many(self, keys):
+            self.lookups.append(len(keys))
+            return {}
+
+        def put_many(self, entries):
+            pass
+
+    store = CountingStore()
+    monkeypatch.setattr(matching, 'match_cache', MatchResultCache(matching.MATCH_RULES.version, store=store))
+    bank = [trade('T1', 'R1')]
+    counterparty = [trade(f"X{i}", f"Y{i}", notional=1000000 if i == 3 else 10 + i) for i in range(6)]
+
+    pairs, fuzzy_count = matching.pair_trades(bank, counterparty, 0.5)
+
+    assert fuzzy_count == 1 and pairs[0][1]['trade_id'] == 'X3'
+    assert store.lookups == [6]
+
+
+class PagedClient:
+    def __init__(self, pages=3):
+        self.pages = pages
+
+    def scan(self, TableName, Segment=0, TotalSegments=1, ExclusiveStartKey=None, **kwargs):
+        page = int(ExclusiveStartKey['page']['N']) + 1 if ExclusiveStartKey else 0
+        response = {'Items': [{'trade_id': {'S': f'S{Segment}P{page}'}}]}
+        if page < self.pages - 1:
+            response['LastEvaluatedKey'] = {'page': {'N': str(page)}}
+        return response
+
+
+class BatchWriteResource:
+    """Leaves the last item of every first attempt unprocessed."""
+
+    def __init__(self):
+        self.requests = []
+
+    def batch_write_item(self, RequestItems):
+        ((table_name, requests),) = RequestItems.items()
+        self.requests.append(len(requests))
+        if len(self.requests) % 2 and len(requests) > 1:
+            return {'UnprocessedItems': {table_name: requests[-1:]}}
+        return {'UnprocessedItems': {}}
+
+
+def make_service(client=None, resource=None):
+    service = DynamoDBService.__new__(DynamoDBService)
+    service.client = client
+    service.dynamodb = resource
+    return service
+
+
+def test_scan_all_follows_every_page_of_every_segment():
+    items, scans = make_service(client=PagedClient(pages=3)).scan_all('Bank', total_segments=4)
+
+    assert sorted(item['trade_id'] for item in items) == sorted(f'S{s}P{p}' for s in range(4) for p in range(3))
+    assert scans == 12
+
+
+def test_batch_put_items_writes_groups_of_25_and_retries_unprocessed(monkeypatch):
+    monkeypatch.setattr(dynamodb.time, 'sleep', lambda seconds: None)
+    resource = BatchWriteResource()
+
+    written, requests = make_service(resource=resource).batch_put_items('Matches', [{'id': i} for i in range(60)])
+
+    assert written == 60
+    assert resource.requests == [25, 1, 25, 1, 10, 1]
+    assert requests == 6
+
+
+class MemoryCheckpoints:
+    def __init__(self):
+        self.saved = {}
+
+    def save(self, checkpoint):
+        self.saved[checkpoint['jobId']] = json.loads(json.dumps(checkpoint))
+
+    def load(self, job_id):
+        return self.saved.get(job_id)
+
+
+def wait_until_finished(manager, job_id):
+    deadline = time.monotonic() + 10
+    while not manager.get(job_id).finished:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def job_setup(monkeypatch, bank_count=7):
+    monkeypatch.setattr(matching.settings, 'batch_match_partition_size', 3)
+    bank = [trade(f'T{i}', f'R{i}') for i in range(bank_count)]
+    counterparty = [trade(f'T{i}', f'R{i}') for i in range(0, bank_count, 2)]
+    tables = FakeTables({matching.settings.dynamodb_bank_table: bank,
+                         matching.settings.dynamodb_counterparty_table: counterparty})
+    monkeypatch.setattr(matching, 'db_service', tables)
+    store = MemoryCheckpoints()
+    manager = BatchJobManager(matching.run_batch_match_job, store=store, max_workers=1)
+    monkeypatch.setattr(matching, 'batch_jobs', manager)
+    return tables, store, manager
+
+
+def test_job_scores_partitions_and_checkpoints_progress(monkeypatch):
+    tables, store, manager = job_setup(monkeypatch)
+
+    job = wait_until_finished(manager, manager.submit({'persist': True}).job_id)
+
+    progress = job.progress()
+    assert progress['status'] == 'COMPLETED'
+    assert (progress['partitionsTotal'], progress['partitionsDone']) == (3, 3)
+    assert progress['counters'] == {'total': 7, 'processed': 7, 'matched': 4, 'unmatched': 3, 'fuzzyMatched': 0,
+                                    'persisted': 7, 'errors': 0}
+    assert store.saved[job.job_id] == progress
+    assert sorted(item['match_id'] for item in tables.written) == sorted(f'match-{job.job_id}-{i}' for i in range(7))
+    assert [event['tradeId'] for _, event in job.events_after(0)] == [f'T{i}' for i in range(7)]
+
+
+def test_failed_job_resumes_after_its_last_checkpointed_partition(monkeypatch):
+    tables, store, manager = job_setup(monkeypatch)
+    tables.fail_writes = 2
+
+    failed = wait_until_finished(manager, manager.submit({'persist': True}).job_id)
+    assert failed.status == JobStatus.FAILED and failed.partitions_done == 1
+
+    # A restarted process only has the checkpoint
+    restarted = BatchJobManager(matching.run_batch_match_job, store=store, max_workers=1)
+    assert restarted.get(failed.job_id).partitions_done == 1
+    resumed = wait_until_finished(restarted, restarted.resume(failed.job_id).job_id)
+
+    assert resumed.status == JobStatus.COMPLETED
+    assert resumed.counters['processed'] == 7 and resumed.counters['persisted'] == 7
+    assert [number for number, _ in resumed.events_after(0)] == [4, 5, 6, 7]
+    assert sorted(item['match_id'] for item in tables.written) == sorted(f'match-{failed.job_id}-{i}' for i in range(7))
+    with pytest.raises(ValueError):
+        restarted.resume(failed.job_id)
+
+
+def test_job_endpoints_report_progress_and_stream_results(monkeypatch):
+    tables, store, manager = job_setup(monkeypatch)
+    client = TestClient(app)
+
+    created = client.post('/api/matching/batch-match/jobs?persist=false')
+    assert created.status_code == 202
+    job_id = created.json()['jobId']
+    wait_until_finished(manager, job_id)
+
+    progress = client.get(f'/api/matching/batch-match/jobs/{job_id}').json()
+    assert progress['status'] == 'COMPLETED' and progress['counters']['persisted'] == 0
+    assert client.get('/api/matching/batch-match/jobs/unknown').status_code == 404
+    assert client.post(f'/api/matching/batch-match/jobs/{job_id}/resume').status_code == 409
+
+    stream = client.get(f'/api/matching/batch-match/jobs/{job_id}/events', headers={'Last-Event-ID': '5'})
+    events = [dict(line.split(': ', 1) for line in block.splitlines())
+              for block in stream.text.strip().split('\n\n')]
+    assert [(event.get('id'), event['event']) for event in events] == [('6', 'result'), ('7', 'result'), (None, 'end')]
+    assert json.loads(events[0]['data'])['tradeId'] == 'T5'
+    assert json.loads(events[-1]['data'])['status'] == 'COMPLETED'
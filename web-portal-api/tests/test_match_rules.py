@@ -0,0 +1,117 @@
+"""
+Unit tests for the matching router's compiled match rules.
+
+compare_trades must reproduce the previous field-by-field implementation,
+so it is compared with a reference copy on randomized trade pairs.
+"""
+
+import random
+from decimal import Decimal
+
+import pytest
+
+from app.routers import matching
+from app.routers.matching import compare_trades
+from app.services.match_cache import MatchResultCache
+
+
+def reference_field_score(bank_value, cp_value):
+    if bank_value is None or cp_value is None:
+        return 0.0 if bank_value != cp_value else 1.0
+    if isinstance(bank_value, Decimal):
+        bank_value = float(bank_value)
+    if isinstance(cp_value, Decimal):
+        cp_value = float(cp_value)
+    if bank_value == cp_value:
+        return 1.0
+    if isinstance(bank_value, (int, float)) and isinstance(cp_value, (int, float)):
+        if bank_value == 0 and cp_value == 0:
+            return 1.0
+        max_val = max(abs(bank_value), abs(cp_value))
+        if max_val == 0:
+            return 1.0
+        difference = abs(bank_value - cp_value)
+        if difference <= max_val * 0.01:
+            return 1.0
+        return max(0.0, 1.0 - (difference / max_val))
+    if isinstance(bank_value, str) and isinstance(cp_value, str):
+        return 0.95 if bank_value.strip().lower() == cp_value.strip().lower() else 0.0
+    return 0.0
+
+
+def reference_compare_trades(bank_trade, cp_trade):
+    field_weights = {
+        'notional': 0.35, 'currency': 0.15, 'trade_date': 0.15,
+        'settlement_date': 0.15, 'product': 0.10, 'counterparty': 0.10,
+    }
+    field_scores = {}
+    differences = {}
+    for field, weight in field_weights.items():
+        bank_val, cp_val = bank_trade.get(field), cp_trade.get(field)
+        score = reference_field_score(bank_val, cp_val)
+        field_scores[field] = score
+        if score < 1.0:
+            differences[field] = {
+                'bank': str(bank_val) if bank_val is not None else None,
+                'counterparty': str(cp_val) if cp_val is not None else None,
+                'score': round(score, 3),
+            }
+    total_score = sum(score * field_weights[field] for field, score in field_scores.items())
+
+    reason_codes = []
+    if 'notional' in differences and field_scores['notional'] < 0.99:
+        reason_codes.append('NOTIONAL_MISMATCH')
+    for field, code in (('trade_date', 'DATE_MISMATCH'), ('settlement_date', 'SETTLEMENT_DATE_MISMATCH'),
+                        ('currency', 'CURRENCY_MISMATCH'), ('product', 'PRODUCT_TYPE_MISMATCH'),
+                        ('counterparty', 'COUNTERPARTY_NAME_MISMATCH')):
+        if field in differences:
+            reason_codes.append(code)
+    return round(total_score, 3), differences, reason_codes or ['PERFECT_MATCH']
+
+
+FIELD_CHOICES = {
+    'notional': [Decimal('1000000'), Decimal('1005000'), Decimal('1200000'), 1000000.0, 0, Decimal('-10'), '1000000'],
+    'currency': ['USD', 'usd ', 'EUR', None],
+    'trade_date': ['2025-01-15', '2025-01-16', None],
+    'settlement_date': ['2025-01-17', '2025-01-17 ', '2025-01-20'],
+    'product': ['SWAP', 'Swap', 'FX_FORWARD', None],
+    'counterparty': ['Goldman Sachs', 'GOLDMAN SACHS', 'JP Morgan', Decimal('1')],
+}
+
+
+def random_trade(rng):
+    return {field: rng.choice(choices) for field, choices in FIELD_CHOICES.items() if rng.random() < 0.85}
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_compare_trades_matches_reference(seed):
+    rng = random.Random(seed)
+    trades = [random_trade(rng) for _ in range(60)]
+
+    for bank_trade in trades[:20]:
+        for cp_trade in trades:
+            assert compare_trades(bank_trade, cp_trade) == reference_compare_trades(bank_trade, cp_trade)
+
+
+def test_identical_trades_are_a_perfect_match():
+    trade = {'notional': Decimal('5000000'), 'currency': 'USD', 'trade_date': '2025-01-15',
+             'settlement_date': '2025-01-17', 'product': 'SWAP', 'counterparty': 'Goldman Sachs'}
+
+    assert compare_trades(trade, dict(trade)) == (1.0, {}, ['PERFECT_MATCH'])
+
+
+def test_unchanged_pairs_are_served_from_the_match_cache(monkeypatch):
+    monkeypatch.setattr(matching, 'match_cache', MatchResultCache(matching.MATCH_RULES.version))
+    scored = []
+    score_trades = matching._score_trades
+    monkeypatch.setattr(matching, '_score_trades', lambda bank, cp: scored.append(1) or score_trades(bank, cp))
+    bank_trade = {'trade_id': 'B1', 'notional': Decimal('5000000'), 'currency': 'USD', 'product': 'SWAP'}
+    cp_trade = {'trade_id': 'C1', 'notional': Decimal('5100000'), 'currency': 'usd', 'product': 'SWAP'}
+
+    first = compare_trades(bank_trade, cp_trade)
+    # Fields the rules do not read are not part of the key
+    assert compare_trades(dict(bank_trade, trade_id='B2', status='NEW'), cp_trade) == first
+    assert len(scored) == 1
+
+    compare_trades(bank_trade, dict(cp_trade, currency='USD'))
+    assert len(scored) == 2